@@ -82,6 +82,10 @@ def confirm_and_add_to_calendar(
 
     Partial failures (e.g. one provider is down) are reported in the response
     but don't prevent the other providers from being processed.
+
+    Kept synchronous: the ORM work (including the deferred Apple password) and
+    the provider SDK calls (googleapiclient, caldav, Graph) all block, and
+    FastAPI runs a sync handler in the threadpool, off the event loop.
     """
     # 1. Load the email record
     email_record = (
@@ -94,17 +98,25 @@ def confirm_and_add_to_calendar(
 
     if not email_record.predicted_slots:
         # Run detection + prediction on-demand so confirm works without prior fetch-detect-predict
-        from app.services.detection import detect_single  # noqa: PLC0415
+        from app.services.detection import (  # noqa: PLC0415
+            detect_single,
+            load_stored_extraction,
+            store_extraction,
+        )
         from app.services.prediction_service import get_suggested_slots  # noqa: PLC0415
         from app.schemas.detection import EmailInput  # noqa: PLC0415
 
-        ext = detect_single(EmailInput(
-            subject=email_record.subject or "",
-            body=email_record.body or "",
-        ))
-        slots = get_suggested_slots(ext)
-        if slots:
-            email_record.predicted_slots = [s.model_dump(mode="json") for s in slots]
+        # Reuse the persisted extraction when the current extractor produced it
+        ext = load_stored_extraction(email_record)
+        if ext is None:
+            ext = detect_single(EmailInput(
+                subject=email_record.subject or "",
+                body=email_record.body or "",
+            ))
+            store_extraction(email_record, ext)
+        suggested = get_suggested_slots(ext)
+        if suggested:
+            email_record.predicted_slots = [s.model_dump(mode="json") for s in suggested]
             db.flush()
 
     if not email_record.predicted_slots:
@@ -160,7 +172,12 @@ def confirm_and_add_to_calendar(
 
     # 4. Extract event metadata from detection results
     extraction: dict = email_record.extraction_data or {}
-    attendees: list[str] = extraction.get("participants", [])
+    # Stored extractions hold Participant dicts ({"email", "name"}); older rows may hold plain strings
+    attendees: list[str] = []
+    for participant in extraction.get("participants", []):
+        address = participant.get("email") if isinstance(participant, dict) else participant
+        if address:
+            attendees.append(address)
     subject: str = email_record.subject or "Meeting"
     description = f"Scheduled by Iris from email: {subject}"
 
@@ -1,27 +1,37 @@
+import asyncio
 import logging
 from datetime import datetime, timezone
 from email.utils import parsedate_to_datetime as _parsedate
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from anyio import from_thread
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from app.core.auth import get_current_active_user
-from app.db.database import get_db
+from app.core.auth import get_current_active_principal
+from app.core.user_cache import CurrentPrincipal
+from app.db.database import SessionFactory, get_db, get_session_factory, in_session
 from app.models.email import Email
-from app.models.user import User
 from app.schemas.detection import ExtractionResult
 from app.schemas.email import EmailItem, EmailFeedResponse, FetchAndDetectResponse, FetchDetectPredictResponse
 from app.schemas.prediction import CalendarAvailability, PredictionStatus, UserPreferences
-from app.services.detection import categorize_email, detect_batch
+from app.services.detection import categorize_emails_async, detect_batch
+from app.services.feed_events import get_feed_broker, sse_event_stream
+from app.services.email_sync_service import upsert_email_items as _upsert_email_items
 from app.schemas.detection import EmailInput as DetectionEmailInput
 from app.services.gmail_service import GmailService
+from app.services.body_cache import get_cached_body, store_body
+from app.services.detect_stream import MEDIA_TYPES as STREAM_MEDIA_TYPES
+from app.services.detect_stream import StreamFormat, stream_fetch_and_detect
 from app.services.outlook_email_service import (
-    fetch_outlook_emails,
-    fetch_outlook_email_page,
+    fetch_outlook_email_body_async,
+    fetch_outlook_emails_async,
+    fetch_outlook_email_page_async,
     is_outlook_connected,
+    is_outlook_connected_async,
 )
-from app.services.prediction_service import get_suggested_slots
 
 router = APIRouter(tags=["emails"])
 logger = logging.getLogger(__name__)
@@ -36,51 +46,31 @@ def _sort_key(date_str: str | None) -> datetime:
         return datetime.min.replace(tzinfo=timezone.utc)
 
 
-def _upsert_email_items(db: Session, user_id: int, items: list[EmailItem]) -> None:
-    """Insert or update each email in the DB and populate db_id on the item."""
-    for item in items:
-        if not item.message_id:
-            continue
-        existing = (
-            db.query(Email)
-            .filter(Email.message_id == item.message_id, Email.user_id == user_id)
-            .first()
+def _require_connected_providers(user_id: int) -> tuple[bool, bool]:
+    """Return (gmail_connected, outlook_connected); HTTP 404 if neither is connected."""
+    from app.services.gmail_service import _load_gmail_token_from_db
+    gmail_connected = _load_gmail_token_from_db(user_id) is not None
+    outlook_connected = is_outlook_connected(user_id)
+
+    if not gmail_connected and not outlook_connected:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No email provider connected. Please connect Gmail or Outlook.",
         )
-        if existing:
-            item.db_id = existing.id
-            # Backfill metadata that may have been missing on first insert
-            if not existing.category and item.category:
-                existing.category = item.category
-            if not existing.email_date and item.date:
-                existing.email_date = item.date
-            if not existing.provider and item.provider and item.provider != "unknown":
-                existing.provider = item.provider
-            if not existing.sender and item.sender:
-                existing.sender = item.sender
-        else:
-            db_email = Email(
-                subject=item.subject,
-                body=item.body,
-                message_id=item.message_id,
-                user_id=user_id,
-                status="fetched",
-                sender=item.sender,
-                category=item.category,
-                email_date=item.date,
-                provider=item.provider if item.provider != "unknown" else None,
-            )
-            db.add(db_email)
-            db.flush()
-            item.db_id = db_email.id
-    db.commit()
-
-
-def _get_gmail_emails(user_id: int, max_results: int | None = None) -> list[EmailItem]:
-    """Fetch emails from Gmail. Returns empty list if not connected or on error."""
-    svc = GmailService()
-    if not svc.authenticate_for_user(user_id):
-        return []
-    raw = svc.fetch_recent_emails(n=max_results)
+    return gmail_connected, outlook_connected
+
+
+async def _build_gmail_items_async(
+    raw_list: list[dict[str, str]],
+    known_categories: dict[str, str] | None = None,
+) -> list[EmailItem]:
+    """Turn raw Gmail dicts into EmailItems, categorizing unknown emails on the NLP executor."""
+    known = known_categories or {}
+    to_categorize = [r for r in raw_list if r.get("message_id") not in known]
+    categories = await categorize_emails_async(
+        [DetectionEmailInput(subject=r["subject"], body=r["body"]) for r in to_categorize]
+    )
+    fresh = {r["message_id"]: c for r, c in zip(to_categorize, categories, strict=True)}
     return [
         EmailItem(
             subject=r["subject"],
@@ -88,69 +78,68 @@ def _get_gmail_emails(user_id: int, max_results: int | None = None) -> list[Emai
             message_id=r["message_id"],
             sender=r.get("sender"),
             date=r.get("date"),
-            category=categorize_email(
-                DetectionEmailInput(subject=r["subject"], body=r["body"])
-            ),
+            category=fresh.get(r["message_id"]) or known.get(r["message_id"], "info"),
             provider="gmail",
         )
-        for r in raw
+        for r in raw_list
     ]
 
 
-def _get_outlook_emails(user_id: int, max_results: int | None = None) -> list[EmailItem]:
+async def _get_gmail_emails_async(user_id: int, max_results: int | None = None) -> list[EmailItem]:
+    """Fetch emails from Gmail. Returns empty list if not connected."""
+    svc = GmailService()
+    if not await svc.authenticate_for_user_async(user_id):
+        return []
+    raw = await svc.fetch_recent_emails_async(n=max_results)
+    return await _build_gmail_items_async(raw)
+
+
+async def _get_outlook_emails_async(user_id: int, max_results: int | None = None) -> list[EmailItem]:
     """Fetch emails from Outlook. Returns empty list if not connected or on error."""
-    if not is_outlook_connected(user_id):
+    if not await is_outlook_connected_async(user_id):
         return []
     try:
-        return fetch_outlook_emails(user_id, n=max_results)
+        return await fetch_outlook_emails_async(user_id, n=max_results)
     except Exception as exc:
         logger.warning("Outlook email fetch failed for user %d: %s", user_id, exc)
         return []
 
 
-def _get_all_emails_for_user(user_id: int, max_results: int | None = None) -> list[EmailItem]:
+async def _get_all_emails_for_user_async(
+    user_id: int, max_results: int | None = None
+) -> list[EmailItem]:
     """
-    Merge Gmail and Outlook emails for a user.
+    Merge Gmail and Outlook emails for a user, fetching both providers concurrently.
     - Returns 404 if neither Gmail nor Outlook is connected.
     - Silently skips a source that fails but returns results from the other.
     - Returns emails sorted by date (most recent first). max_results=None fetches all.
-    """
-    from app.services.gmail_service import _load_gmail_token_from_db
-    gmail_connected = _load_gmail_token_from_db(user_id) is not None
-    outlook_connected = is_outlook_connected(user_id)
 
-    if not gmail_connected and not outlook_connected:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No email provider connected. Please connect Gmail or Outlook.",
-        )
+    Sync endpoints call it through anyio.from_thread.run.
+    """
+    gmail_connected, outlook_connected = await asyncio.to_thread(_require_connected_providers, user_id)
 
-    emails: list[EmailItem] = []
+    async def _none() -> list[EmailItem]:
+        return []
 
+    gmail_emails, outlook_emails_list = await asyncio.gather(
+        _get_gmail_emails_async(user_id, max_results) if gmail_connected else _none(),
+        _get_outlook_emails_async(user_id, max_results) if outlook_connected else _none(),
+    )
     if gmail_connected:
-        gmail_emails = _get_gmail_emails(user_id, max_results)
-        emails.extend(gmail_emails)
         logger.info("Gmail: %d emails fetched for user %d", len(gmail_emails), user_id)
-
     if outlook_connected:
-        outlook_emails_list = _get_outlook_emails(user_id, max_results)
-        emails.extend(outlook_emails_list)
         logger.info("Outlook: %d emails fetched for user %d", len(outlook_emails_list), user_id)
 
-    if not emails and (gmail_connected or outlook_connected):
-        # Both sources returned empty — can happen when inbox is empty
-        return []
-
-    # Sort by date descending (emails without date go last)
+    emails = gmail_emails + outlook_emails_list
     emails.sort(key=lambda e: e.date or "", reverse=True)
     return emails if max_results is None else emails[:max_results]
 
 
 @router.get("/emails", response_model=list[EmailItem])
-def get_emails(
+async def get_emails(
     max_results: int | None = None,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
+    new_session: SessionFactory = Depends(get_session_factory),
 ) -> list[EmailItem]:
     """
     Fetch recent emails for the authenticated user.
@@ -158,21 +147,46 @@ def get_emails(
     Aggregates from all connected providers (Gmail and/or Outlook).
     Returns HTTP 404 if neither Gmail nor Outlook is connected.
     """
-    items = _get_all_emails_for_user(current_user.id, max_results=max_results)
-    _upsert_email_items(db, current_user.id, items)
+    items = await _get_all_emails_for_user_async(current_user.id, max_results=max_results)
+    await run_in_threadpool(in_session, new_session, _upsert_email_items, current_user.id, items)
     return items
 
 
 @router.post("/emails/fetch-and-detect", response_model=FetchAndDetectResponse)
 def post_fetch_and_detect(
     max_results: int | None = None,
-    current_user: User = Depends(get_current_active_user),
-) -> FetchAndDetectResponse:
+    stream: StreamFormat | None = Query(
+        None, description="Stream results as they are ready: 'ndjson' or 'sse' (Server-Sent Events)"
+    ),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
+    db: Session = Depends(get_db),
+) -> FetchAndDetectResponse | StreamingResponse:
     """
     Fetch recent emails (Gmail + Outlook) and run NLP detection on each.
+    Emails are persisted first so detection results are stored on Email.extraction_data
+    and reused on the next call instead of being recomputed.
     Returns HTTP 404 if no email provider is connected.
+
+    With ?stream=ndjson|sse each email is sent with its extraction as soon as it
+    is detected ({"type": "email", "email": ..., "extraction": ...}), followed by
+    {"type": "done", "count": N}. Streamed emails are ordered per provider
+    (Gmail, then Outlook), not merged by date. A provider failure is reported as
+    {"type": "error", "provider": ..., "detail": ...} and the stream goes on; if
+    detection fails the stream ends with {"type": "error", "detail": ..., "count": N}
+    instead of "done".
     """
-    email_items = _get_all_emails_for_user(current_user.id, max_results=max_results)
+    if stream is not None:
+        gmail_connected, outlook_connected = _require_connected_providers(current_user.id)
+        return StreamingResponse(
+            stream_fetch_and_detect(
+                db, current_user.id, max_results, stream, gmail_connected, outlook_connected
+            ),
+            media_type=STREAM_MEDIA_TYPES[stream],
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    email_items = from_thread.run(_get_all_emails_for_user_async, current_user.id, max_results)
+    _upsert_email_items(db, current_user.id, email_items)
 
     # Build EmailInput objects for detection
     from app.schemas.detection import EmailInput  # local import to avoid circular
@@ -184,7 +198,7 @@ def post_fetch_and_detect(
         )
         for e in email_items
     ]
-    extractions = detect_batch(email_inputs)
+    extractions = detect_batch(email_inputs, db=db, user_id=current_user.id)
     return FetchAndDetectResponse(emails=email_items, extractions=extractions)
 
 
@@ -198,14 +212,15 @@ class FetchDetectPredictBody(BaseModel):
 def post_fetch_detect_predict(
     max_results: int | None = None,
     body: FetchDetectPredictBody | None = Body(None),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
     db: Session = Depends(get_db),
 ) -> FetchDetectPredictResponse:
     """
     Fetch emails (Gmail + Outlook), run detection, then prediction.
     Returns HTTP 404 if no email provider is connected.
     """
-    email_items = _get_all_emails_for_user(current_user.id, max_results=max_results)
+    email_items = from_thread.run(_get_all_emails_for_user_async, current_user.id, max_results)
+    _upsert_email_items(db, current_user.id, email_items)
 
     from app.schemas.detection import EmailInput
     email_inputs = [
@@ -216,13 +231,13 @@ def post_fetch_detect_predict(
         )
         for e in email_items
     ]
-    extractions = detect_batch(email_inputs)
+    extractions = detect_batch(email_inputs, db=db, user_id=current_user.id)
     extraction = extractions[0] if extractions else ExtractionResult()
     prefs = body.preferences if body else None
     cal = body.calendar if body else None
-    suggested_slots = get_suggested_slots(extraction, preferences=prefs, calendar=cal)
+    from app.services.prediction_service import get_suggested_slots  # noqa: PLC0415 — pendulum is loaded on first use
 
-    _upsert_email_items(db, current_user.id, email_items)
+    suggested_slots = get_suggested_slots(extraction, preferences=prefs, calendar=cal)
 
     # Store predicted slots on the first email's DB record
     if email_items and email_items[0].db_id and suggested_slots:
@@ -244,12 +259,13 @@ def post_fetch_detect_predict(
 def get_cached_emails(
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
     db: Session = Depends(get_db),
 ) -> EmailFeedResponse:
     """
     Return emails already stored in the DB for this user — no external API calls.
     Used for instant first-paint before the background /emails/feed refresh completes.
+    Emails pre-fetched by the job worker also carry their stored detection result.
     """
     rows = (
         db.query(Email)
@@ -271,80 +287,74 @@ def get_cached_emails(
             category=row.category or "info",
             date=row.email_date,
             provider=row.provider or "unknown",
+            extraction=(
+                ExtractionResult.model_validate(row.extraction_data)
+                if row.extraction_data else None
+            ),
         )
         for row in rows
     ]
     return EmailFeedResponse(emails=items, has_more=has_more)
 
 
+def _load_known_categories(db: Session, user_id: int) -> dict[str, str]:
+    """Return {message_id: category} for emails already stored for this user."""
+    return {
+        row.message_id: (row.category or "info")
+        for row in db.query(Email.message_id, Email.category)
+            .filter(Email.user_id == user_id)
+            .all()
+        if row.message_id
+    }
+
+
 @router.get("/emails/feed", response_model=EmailFeedResponse)
-def get_email_feed(
+async def get_email_feed(
     limit: int = 50,
     gmail_cursor: str | None = None,
     outlook_skip: int = 0,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
+    new_session: SessionFactory = Depends(get_session_factory),
 ) -> EmailFeedResponse:
     """
     Paginated email feed for infinite scroll.
-    Fetches one page from Gmail (batch, metadata + snippet) and one page from Outlook.
+    Fetches one page from Gmail (batch, metadata + snippet) and one page from Outlook
+    concurrently; categorization runs on the NLP executor.
     """
-    from app.schemas.detection import EmailInput as _DetectionInput
+    user_id = current_user.id
 
     # Pre-fetch known message IDs + stored categories to skip NLP for already-categorised emails.
-    existing_categories: dict[str, str] = {
-        row.message_id: (row.category or "info")
-        for row in db.query(Email.message_id, Email.category)
-            .filter(Email.user_id == current_user.id)
-            .all()
-        if row.message_id
-    }
-    existing_ids = set(existing_categories.keys())
+    existing_categories = await run_in_threadpool(in_session, new_session, _load_known_categories, user_id)
 
-    gmail_emails: list[EmailItem] = []
-    gmail_next_cursor: str | None = None
+    async def _gmail_page() -> tuple[list[EmailItem], str | None]:
+        svc = GmailService()
+        if not await svc.authenticate_for_user_async(user_id):
+            return [], None
+        raw_list, next_cursor = await svc.fetch_email_page_async(
+            page_token=gmail_cursor, limit=limit, user_id=user_id
+        )
+        return await _build_gmail_items_async(raw_list, existing_categories), next_cursor
 
-    svc = GmailService()
-    if svc.authenticate_for_user(current_user.id):
-        raw_list, gmail_next_cursor = svc.fetch_email_page(page_token=gmail_cursor, limit=limit)
-        gmail_emails = [
-            EmailItem(
-                subject=r["subject"],
-                body=r["body"],
-                message_id=r["message_id"],
-                sender=r.get("sender"),
-                date=r.get("date"),
-                category=(
-                    categorize_email(_DetectionInput(subject=r["subject"], body=r["body"]))
-                    if r.get("message_id") not in existing_ids
-                    else existing_categories.get(r.get("message_id"), "info")
-                ),
-                provider="gmail",
-            )
-            for r in raw_list
-        ]
-
-    outlook_emails: list[EmailItem] = []
-    outlook_has_more = False
-    outlook_next_skip = outlook_skip
-
-    if is_outlook_connected(current_user.id):
+    async def _outlook_page() -> tuple[list[EmailItem], bool]:
+        if not await is_outlook_connected_async(user_id):
+            return [], False
         try:
-            outlook_page, outlook_has_more = fetch_outlook_email_page(
-                current_user.id, skip=outlook_skip, limit=limit
-            )
-            outlook_emails = outlook_page
-            if outlook_has_more:
-                outlook_next_skip = outlook_skip + len(outlook_emails)
+            return await fetch_outlook_email_page_async(user_id, skip=outlook_skip, limit=limit)
         except Exception as exc:
-            logger.warning("Outlook feed fetch failed for user %d: %s", current_user.id, exc)
+            logger.warning("Outlook feed fetch failed for user %d: %s", user_id, exc)
+            return [], False
+
+    (gmail_emails, gmail_next_cursor), (outlook_emails, outlook_has_more) = await asyncio.gather(
+        _gmail_page(), _outlook_page()
+    )
+    outlook_next_skip = outlook_skip + len(outlook_emails) if outlook_has_more else outlook_skip
 
     all_emails = gmail_emails + outlook_emails
     all_emails.sort(key=lambda e: _sort_key(e.date), reverse=True)
 
     has_more = (gmail_next_cursor is not None) or outlook_has_more
 
-    _upsert_email_items(db, current_user.id, all_emails)
+    await run_in_threadpool(in_session, new_session, _upsert_email_items, user_id, all_emails)
 
     return EmailFeedResponse(
         emails=all_emails,
@@ -354,60 +364,76 @@ def get_email_feed(
     )
 
 
-def sync_user_emails_background(user_id: int) -> None:
-    """Fetch the first page of emails from all connected providers and persist them.
-    Called as a FastAPI BackgroundTask after OAuth so the DB is populated before
-    the frontend's next /emails/cached or /emails/feed poll."""
-    from app.db.database import SessionLocal  # local import — runs in background thread
-    from app.schemas.detection import EmailInput as _DI
-    db = SessionLocal()
-    try:
-        items: list[EmailItem] = []
-        svc = GmailService()
-        if svc.authenticate_for_user(user_id):
-            try:
-                raw_list, _ = svc.fetch_email_page(page_token=None, limit=50)
-                items.extend([
-                    EmailItem(
-                        subject=r["subject"],
-                        body=r["body"],
-                        message_id=r["message_id"],
-                        sender=r.get("sender"),
-                        date=r.get("date"),
-                        category=categorize_email(_DI(subject=r["subject"], body=r["body"])),
-                        provider="gmail",
-                    )
-                    for r in raw_list
-                ])
-                logger.info("Background sync: fetched %d Gmail emails for user_id=%d", len(raw_list), user_id)
-            except Exception:
-                logger.exception("Background Gmail sync failed for user_id=%d", user_id)
-        if is_outlook_connected(user_id):
-            try:
-                outlook_page, _ = fetch_outlook_email_page(user_id, skip=0, limit=50)
-                items.extend(outlook_page)
-                logger.info("Background sync: fetched %d Outlook emails for user_id=%d", len(outlook_page), user_id)
-            except Exception:
-                logger.exception("Background Outlook sync failed for user_id=%d", user_id)
-        if items:
-            _upsert_email_items(db, user_id, items)
-    except Exception:
-        logger.exception("Background email sync failed for user_id=%d", user_id)
-    finally:
-        db.close()
+@router.get("/emails/events")
+async def stream_email_events(
+    request: Request,
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
+) -> StreamingResponse:
+    """Server-Sent Events stream of feed updates for the current user.
+
+    Emits `email.created` / `email.updated` events ({"type": ..., "email": EmailItem})
+    whenever the sync engine stores new or changed emails, so clients can stop
+    polling /emails/cached and /emails/feed. Comment lines keep the connection alive.
+    """
+    broker = get_feed_broker()
+    sub = broker.subscribe(current_user.id)
+
+    async def events():
+        try:
+            async for chunk in sse_event_stream(sub, request.is_disconnected):
+                yield chunk
+        finally:
+            broker.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/emails/body/{message_id}")
-def get_email_body(
+async def get_email_body(
     message_id: str,
     provider: str = "gmail",
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
 ) -> dict:
-    """Fetch the full body of a single email. Used when opening a Gmail email from the feed."""
+    """Fetch the full body of a single email. Used when opening an email from the feed.
+
+    The decoded body is cached on disk per (user, message) on first open, so
+    reopening an email does not hit the provider again.
+    """
+    if provider not in ("gmail", "outlook"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown provider")
+
+    # Checked before the cache: a disconnected mailbox must not keep serving bodies
+    if provider == "gmail":
+        from app.services.gmail_service import _load_gmail_token_from_db
+        connected = await asyncio.to_thread(_load_gmail_token_from_db, current_user.id) is not None
+    else:
+        connected = await is_outlook_connected_async(current_user.id)
+    if not connected:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"{'Gmail' if provider == 'gmail' else 'Outlook'} not connected",
+        )
+
+    cached = await asyncio.to_thread(get_cached_body, current_user.id, provider, message_id)
+    if cached is not None:
+        return {"body": cached}
+
     if provider == "gmail":
         svc = GmailService()
-        if not svc.authenticate_for_user(current_user.id):
+        if not await svc.authenticate_for_user_async(current_user.id):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Gmail not connected")
-        body = svc.fetch_email_body(message_id)
-        return {"body": body}
-    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown provider")
+        body = await svc.fetch_email_body_async(message_id)
+    else:
+        try:
+            body = await fetch_outlook_email_body_async(current_user.id, message_id)
+        except Exception:
+            logger.exception("Failed to fetch Outlook email body for message_id=%s", message_id)
+            body = ""
+
+    if body:
+        await asyncio.to_thread(store_body, current_user.id, provider, message_id, body)
+    return {"body": body}
@@ -9,7 +9,6 @@ from app.schemas.prediction import (
     PredictionStatus,
     PredictSlotsFromDetectionRequest,
 )
-from app.services.prediction_service import get_suggested_slots
 
 router = APIRouter(tags=["prediction"])
 
@@ -30,6 +29,9 @@ async def predict_from_detection_inline(
 
     This is the endpoint used by the frontend and the test suite.
     """
+    # pendulum is loaded on first use
+    from app.services.prediction_service import get_suggested_slots  # noqa: PLC0415
+
     extraction = _resolve_extraction(body)
     suggestions = get_suggested_slots(
         extraction,
@@ -66,6 +68,8 @@ async def predict_from_email_record(
     # Fix: parse JSON dict back into ExtractionResult before calling service
     extraction = ExtractionResult.model_validate(raw_extraction)
 
+    from app.services.prediction_service import get_suggested_slots  # noqa: PLC0415
+
     suggestions = get_suggested_slots(
         extraction,
         preferences=body.preferences,
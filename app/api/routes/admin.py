@@ -0,0 +1,42 @@
+"""
+Admin-only diagnostics.
+
+Endpoints:
+  GET /api/v1/admin/profiles              — summaries of the stored request profiles, newest first
+  GET /api/v1/admin/profiles/{profile_id} — one profile: slowest functions and the SQL/provider timeline
+
+Profiles are recorded by app.core.profiling and kept in memory by the process
+that served the request: with several workers, ask the one that returned the
+X-Iris-Profile-Id header.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.core.auth import get_current_active_principal
+from app.core.profiling import get_profile, list_profiles
+from app.core.user_cache import CurrentPrincipal
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def require_admin(
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
+) -> CurrentPrincipal:
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    return current_user
+
+
+@router.get("/profiles")
+def get_profiles(_: CurrentPrincipal = Depends(require_admin)) -> list[dict]:
+    return list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile_detail(profile_id: int, _: CurrentPrincipal = Depends(require_admin)) -> dict:
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found (or evicted)")
+    return profile
@@ -8,19 +8,24 @@ import logging
 import os
 from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import RedirectResponse
 
-from app.core.auth import get_current_active_user
+from app.core.auth import get_current_active_principal, get_current_active_user
+from app.core.user_cache import CurrentPrincipal
 from app.db.database import get_db
 from app.models.user import User
 from sqlalchemy.orm import Session
+from app.services.body_cache import delete_user_bodies
 from app.services.google_oauth_service import (
     GoogleOAuthExchangeError,
     exchange_code_for_token,
     get_auth_url,
     get_google_oauth_runtime_diagnostics,
 )
+from app.services.gmail_push_service import enqueue_gmail_watch, stop_gmail_watch
+from app.services.job_queue import enqueue_inbox_sync
+from app.services.page_cache import invalidate_user as invalidate_user_pages
 
 router = APIRouter(tags=["auth"])
 logger = logging.getLogger(__name__)
@@ -56,7 +61,7 @@ def google_connection_status(
     summary="Initiate Google OAuth — returns the consent URL",
 )
 def initiate_google_oauth(
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
 ):
     """
     Returns the Google OAuth consent URL for the authenticated user.
@@ -89,10 +94,10 @@ def initiate_google_oauth(
     include_in_schema=True,
 )
 def google_oauth_callback(
-    background_tasks: BackgroundTasks,
     code: str = Query(..., description="Authorization code from Google"),
     state: str = Query(..., description="HMAC-signed state containing user_id"),
     error: str | None = Query(default=None),
+    db: Session = Depends(get_db),
 ):
     """
     Google redirects here after the user grants (or denies) access.
@@ -118,8 +123,14 @@ def google_oauth_callback(
         )
         return RedirectResponse(url=_build_frontend_redirect("error", reason="unexpected_callback_error"))
 
-    from app.api.endpoints.emails import sync_user_emails_background
-    background_tasks.add_task(sync_user_emails_background, user_id)
+    # Queue the first inbox sync for the job worker; the stored emails are pushed
+    # to the frontend over GET /emails/events as they are upserted.
+    try:
+        enqueue_inbox_sync(db, user_id, "gmail")
+        # Register push notifications so later mail is synced without polling
+        enqueue_gmail_watch(db, user_id)
+    except Exception:
+        logger.exception("Failed to enqueue Gmail inbox sync for user_id=%s", user_id)
 
     return RedirectResponse(url=_build_frontend_redirect("connected"))
 
@@ -133,6 +144,9 @@ def disconnect_google(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
+    stop_gmail_watch(current_user)
     current_user.gmail_oauth_token = None
     current_user.gmail_email = None
     db.commit()
+    invalidate_user_pages(current_user.id)
+    delete_user_bodies(current_user.id, "gmail")
@@ -23,13 +23,17 @@ import os
 import logging
 from urllib.parse import urlencode, urlsplit, urlunsplit, parse_qsl
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import RedirectResponse
+from sqlalchemy.orm import Session
 
-from app.core.auth import get_current_active_user
-from app.models.user import User
+from app.core.auth import get_current_active_principal
+from app.core.user_cache import CurrentPrincipal
+from app.db.database import get_db
+from app.services.job_queue import enqueue_inbox_sync
 from app.services.microsoft_oauth_service import exchange_code_for_token, get_auth_url, _token_path
 from app.services.outlook_email_service import get_outlook_connection_status
+from app.services.outlook_push_service import enqueue_outlook_subscription
 
 router = APIRouter(tags=["auth"])
 logger = logging.getLogger(__name__)
@@ -53,7 +57,7 @@ def _build_frontend_redirect(outlook_status: str, reason: str | None = None) ->
     summary="Initiate Microsoft OAuth — returns the login URL",
 )
 def initiate_microsoft_oauth(
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
 ):
     """
     Returns the Microsoft login URL for the authenticated user.
@@ -72,7 +76,7 @@ def initiate_microsoft_oauth(
     summary="Check if Outlook is connected for the current user",
 )
 def microsoft_connection_status(
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
 ):
     """
     Returns whether the authenticated user has a valid Outlook OAuth token,
@@ -91,11 +95,11 @@ def microsoft_connection_status(
     summary="Microsoft OAuth callback — exchanges code for token and redirects to frontend",
 )
 def microsoft_oauth_callback(
-    background_tasks: BackgroundTasks,
     code: str | None = Query(default=None),
     state: str | None = Query(default=None),
     error: str | None = Query(default=None),
     error_description: str | None = Query(default=None),
+    db: Session = Depends(get_db),
 ):
     """
     Microsoft redirects here after the user logs in.
@@ -116,7 +120,11 @@ def microsoft_oauth_callback(
         logger.error("Microsoft OAuth token exchange failed: %s", exc)
         return RedirectResponse(url=_build_frontend_redirect("error", "token_exchange_failed"))
 
-    from app.api.endpoints.emails import sync_user_emails_background
-    background_tasks.add_task(sync_user_emails_background, user_id)
+    try:
+        enqueue_inbox_sync(db, user_id, "outlook")
+        # Subscribe to change notifications so later mail is synced without polling
+        enqueue_outlook_subscription(db, user_id)
+    except Exception:
+        logger.exception("Failed to enqueue Outlook inbox sync for user_id=%d", user_id)
 
     return RedirectResponse(url=_build_frontend_redirect("success"))
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 
-from app.core.auth import get_current_active_user
+from app.core.auth import get_current_active_principal
+from app.core.user_cache import CurrentPrincipal
 from app.db.database import get_db
-from app.models.user import User
 from app.schemas.detection import (
     DetectResponse,
     EmailBatchInput,
@@ -27,7 +27,7 @@ router = APIRouter(tags=["detection"])
 @router.post("/detect", response_model=DetectResponse)
 def post_detect(
     body: EmailBatchInput,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
 ) -> DetectResponse:
     """Run detection on a batch of emails (subject, body, optional message_id). Returns one extraction per email."""
     results = detect_batch(body.emails)
@@ -37,7 +37,7 @@ def post_detect(
 @router.post("/detect/thread", response_model=ThreadExtractionResult)
 def post_detect_thread(
     body: ThreadInput,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
 ) -> ThreadExtractionResult:
     """Run detection on a thread of messages. Returns merged extraction plus per-message results."""
     return detect_thread(body.messages)
@@ -46,7 +46,7 @@ def post_detect_thread(
 @router.post("/validate", response_model=ValidationResult)
 def post_validate(
     body: ValidationInput,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
 ) -> ValidationResult:
     """Validate an extraction and return missing fields and clarifying questions."""
     return validate_extraction(body.extraction)
@@ -55,7 +55,7 @@ def post_validate(
 @router.post("/feedback", status_code=status.HTTP_201_CREATED, response_model=FeedbackResult)
 def post_feedback(
     body: FeedbackInput,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
     db: Session = Depends(get_db),
 ) -> FeedbackResult:
     """Save user corrections to an extraction for a given message_id."""
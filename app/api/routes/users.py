@@ -1,47 +1,90 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from app.core.auth import get_current_active_user
+from app.core.auth import get_current_active_principal, get_current_active_user
 from app.core.config import settings
 from app.core.encryption import encrypt
-from app.core.security import create_access_token, hash_password, verify_password
-from app.db.database import get_db
+from app.core.security import (
+    PasswordHashingBusyError,
+    create_access_token,
+    hash_password_bounded,
+    verify_password_bounded,
+)
+from app.core.user_cache import CurrentPrincipal
+from app.db.database import SessionFactory, get_db, get_session_factory, in_session
 from app.models.user import User
 from app.schemas.user import LoginRequest, Token, UserCreate, UserResponse, UserUpdate
+from app.services.body_cache import delete_user_bodies
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many password operations in progress, retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _user_by_email(db: Session, email: str) -> User | None:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _user_by_id(db: Session, user_id: int) -> User | None:
+    return db.query(User).filter(User.id == user_id).first()
+
+
+def _add_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def _store_password_hash(db: Session, user_id: int, password_hash: str) -> None:
+    db.query(User).filter(User.id == user_id).update({User.password_hash: password_hash})
+    db.commit()
+
+
+# The account endpoints below are async: password hashing is awaited on its own
+# bounded executor, and each database step runs in a worker thread with its own
+# session (see get_session_factory).
+
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=UserResponse)
-def create_user(user_in: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user_in: UserCreate, new_session: SessionFactory = Depends(get_session_factory)):
     """Create a new user account."""
-    existing_user = db.query(User).filter_by(email=user_in.email).first()
+    existing_user = await run_in_threadpool(in_session, new_session, _user_by_email, user_in.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
+    try:
+        password_hash = await hash_password_bounded(user_in.password)
+    except PasswordHashingBusyError:
+        raise _hashing_busy() from None
+
     user = User(
         email=user_in.email,
-        password_hash=hash_password(user_in.password),
+        password_hash=password_hash,
         name=user_in.name,
         profile_icon=user_in.profile_icon,
         role=user_in.role
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await run_in_threadpool(in_session, new_session, _add_user, user)
 
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, new_session: SessionFactory = Depends(get_session_factory)):
     """
     Authenticate user and return JWT access token.
     Token expires after ACCESS_TOKEN_EXPIRE_MINUTES (default: 60 minutes).
     """
     # Find user by email
-    user = db.query(User).filter(User.email == login_data.email).first()
+    user = await run_in_threadpool(in_session, new_session, _user_by_email, login_data.email)
 
     if not user:
         raise HTTPException(
@@ -51,17 +94,25 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
         )
 
     # Verify password
-    if not verify_password(login_data.password, user.password_hash):
+    try:
+        valid, new_hash = await verify_password_bounded(login_data.password, user.password_hash)
+    except PasswordHashingBusyError:
+        raise _hashing_busy() from None
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Argon2 parameters changed since this hash was made: store one with the current ones
+    if new_hash:
+        await run_in_threadpool(in_session, new_session, _store_password_hash, user.id, new_hash)
+
     # Create access token
     access_token = create_access_token(
         subject=str(user.id),
-        data={"email": user.email, "role": user.role},
+        data={"email": user.email, "role": user.role, "ver": user.token_version},
         secret=settings.SECRET_KEY,
         algorithm=settings.ALGORITHM,
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
@@ -76,7 +127,7 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     description="Returns every registered user. Requires admin role.",
 )
 def get_all_users(
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
     db: Session = Depends(get_db),
 ):
     """Get all users. Admin only."""
@@ -96,7 +147,7 @@ def get_current_user_info(current_user: User = Depends(get_current_active_user))
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(
     user_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
     db: Session = Depends(get_db)
 ):
     """
@@ -113,18 +164,29 @@ def get_user(
 
     return user
 
+def _apply_user_update(db: Session, user_id: int, update_data: dict) -> User | None:
+    user = _user_by_id(db, user_id)
+    if user is None:
+        return None
+    for field, value in update_data.items():
+        setattr(user, field, value)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
 @router.patch("/{user_id}", response_model=UserResponse)
-def update_user(
+async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
+    new_session: SessionFactory = Depends(get_session_factory),
 ):
     """
     Update a user's information.
     Users can only update their own account unless they have admin role.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await run_in_threadpool(in_session, new_session, _user_by_id, user_id)
 
     if not user:
         raise HTTPException(
@@ -144,7 +206,7 @@ def update_user(
 
     # Check if email is being changed and if it's already taken
     if "email" in update_data and update_data["email"] != user.email:
-        existing_user = db.query(User).filter(User.email == update_data["email"]).first()
+        existing_user = await run_in_threadpool(in_session, new_session, _user_by_email, update_data["email"])
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -153,15 +215,21 @@ def update_user(
 
     # Hash password if it's being updated
     if "password" in update_data:
-        update_data["password_hash"] = hash_password(update_data.pop("password"))
+        try:
+            update_data["password_hash"] = await hash_password_bounded(update_data.pop("password"))
+        except PasswordHashingBusyError:
+            raise _hashing_busy() from None
+        # Revoke the access tokens issued with the old password
+        update_data["token_version"] = (user.token_version or 0) + 1
 
     # Apply updates
-    for field, value in update_data.items():
-        setattr(user, field, value)
-
-    db.commit()
-    db.refresh(user)
-    return user
+    updated = await run_in_threadpool(in_session, new_session, _apply_user_update, user_id, update_data)
+    if updated is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return updated
 
 _VALID_PROVIDERS = {"google", "apple", "outlook"}
 
@@ -252,7 +320,7 @@ def disconnect_calendar(
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(
     user_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentPrincipal = Depends(get_current_active_principal),
     db: Session = Depends(get_db)
 ):
     """
@@ -276,4 +344,5 @@ def delete_user(
 
     db.delete(user)
     db.commit()
+    delete_user_bodies(user_id)
     return None
@@ -0,0 +1,79 @@
+"""
+Provider push-notification webhooks.
+
+Endpoints:
+  POST /api/v1/webhooks/gmail   — Cloud Pub/Sub push subscription for Gmail users.watch()
+  POST /api/v1/webhooks/outlook — Microsoft Graph change notifications (and URL validation)
+
+These are called by the providers, not by the frontend: no user authentication,
+a shared verification token (Gmail, required once GMAIL_PUBSUB_TOPIC is set; 404
+otherwise) or clientState (Outlook) instead, and a fast 204 so the provider does not
+retry. The actual sync runs in the job worker.
+"""
+import hmac
+import logging
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import get_db
+from app.services.gmail_push_service import (
+    decode_push_envelope,
+    gmail_push_enabled,
+    handle_gmail_notification,
+)
+from app.services.outlook_push_service import handle_outlook_notifications
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+logger = logging.getLogger(__name__)
+
+
+def _check_gmail_token(provided: str | None) -> None:
+    """404 while Gmail push is not configured; once it is, the verification token is required."""
+    if not gmail_push_enabled():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Gmail push is not configured")
+    expected = settings.GMAIL_PUBSUB_VERIFICATION_TOKEN
+    if not expected:
+        logger.error("GMAIL_PUBSUB_TOPIC is set without GMAIL_PUBSUB_VERIFICATION_TOKEN; rejecting Gmail push")
+    if not expected or not hmac.compare_digest(expected, provided or ""):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid verification token")
+
+
+@router.post("/gmail", status_code=status.HTTP_204_NO_CONTENT)
+def gmail_push_webhook(
+    body: dict = Body(...),
+    token: str | None = Query(None),
+    db: Session = Depends(get_db),
+) -> Response:
+    """Receive a Gmail change notification and queue an incremental history sync.
+
+    Malformed or unknown-mailbox notifications are acknowledged (204) as well:
+    Pub/Sub would otherwise redeliver them for days.
+    """
+    _check_gmail_token(token)
+    decoded = decode_push_envelope(body)
+    if decoded is None:
+        logger.warning("Ignoring malformed Gmail push notification")
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    email_address, history_id = decoded
+    handle_gmail_notification(db, email_address, history_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/outlook", status_code=status.HTTP_202_ACCEPTED)
+def outlook_push_webhook(
+    body: dict | None = Body(None),
+    validation_token: str | None = Query(None, alias="validationToken"),
+    db: Session = Depends(get_db),
+) -> Response:
+    """Receive Graph change notifications and queue a delta sync per notified user.
+
+    When a subscription is created Graph first calls this URL with
+    ?validationToken=...; it must be echoed back as text/plain within 10 seconds.
+    """
+    if validation_token is not None:
+        return PlainTextResponse(validation_token)
+    handle_outlook_notifications(db, body or {})
+    return Response(status_code=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,219 @@
+"""
+Operational commands for the Iris backend.
+
+Usage:
+    python -m app.cli redetect [--user-id N] [--batch-size 200] [--enqueue]
+    python -m app.cli gmail-push --email me@gmail.com --history-id 12345 [--url ...] [--token ...]
+    python -m app.cli migrate [--status]
+    python -m app.cli startup-profile [--module app.main] [--top 25] [--startup]
+"""
+import argparse
+import logging
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import cast
+
+logger = logging.getLogger(__name__)
+
+
+def _cmd_redetect(args: argparse.Namespace) -> int:
+    """Re-run detection on emails whose stored extraction predates the current extractor."""
+    from app.db.database import SessionLocal
+    from app.models.email import Email
+    from app.services.detection import current_extraction_version, redetect_stale_emails
+
+    db = SessionLocal()
+    try:
+        if args.enqueue:
+            # Hand the work to the job worker: one detect_emails job per affected user
+            from app.services.job_queue import enqueue_job
+
+            version = current_extraction_version()
+            query = db.query(Email.user_id).filter(
+                Email.extraction_data.isnot(None),
+                (Email.extraction_version.is_(None)) | (Email.extraction_version != version),
+            )
+            if args.user_id is not None:
+                query = query.filter(Email.user_id == args.user_id)
+            user_ids = sorted({row[0] for row in query.distinct().all()})
+            for user_id in user_ids:
+                enqueue_job(
+                    db,
+                    "redetect_emails",
+                    user_id,
+                    payload={"batch_size": args.batch_size},
+                    dedupe_key=f"redetect:{user_id}:{version}",
+                )
+            print(f"Enqueued re-detection for {len(user_ids)} user(s) (extractor {version}).")
+            return 0
+
+        count = redetect_stale_emails(db, user_id=args.user_id, batch_size=args.batch_size)
+        print(f"Re-detected {count} email(s) (extractor {current_extraction_version()}).")
+        return 0
+    finally:
+        db.close()
+
+
+def _cmd_gmail_push(args: argparse.Namespace) -> int:
+    """Stand-in for Cloud Pub/Sub: POST a Gmail notification to a (local) webhook."""
+    import httpx
+
+    from app.services.gmail_push_service import build_push_envelope
+
+    params = {"token": args.token} if args.token else None
+    resp = httpx.post(args.url, params=params, json=build_push_envelope(args.email, args.history_id), timeout=10)
+    print(f"{resp.status_code} {resp.reason_phrase}")
+    return 0 if resp.is_success else 1
+
+
+def _cmd_migrate(args: argparse.Namespace) -> int:
+    """Apply pending schema migrations (run before deploying with DB_AUTO_MIGRATE=false)."""
+    from app.db.database import engine
+    from app.db.migrations import SCHEMA_VERSION, current_version, migrate
+
+    if args.status:
+        with engine.connect() as connection:
+            version = current_version(connection)
+        print(f"Schema version: {version if version is not None else 'none'} (code expects {SCHEMA_VERSION}).")
+        return 0 if version == SCHEMA_VERSION else 1
+
+    before, after = migrate(engine)
+    if before == after:
+        print(f"Schema already at version {after}.")
+    else:
+        print(f"Migrated schema from version {before if before is not None else 'none'} to {after}.")
+    return 0
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> list[ImportTiming]:
+    """Rows of `python -X importtime` stderr ("import time: self [us] | cumulative | name")."""
+    rows: list[ImportTiming] = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header row
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        rows.append(ImportTiming(
+            module=module,
+            self_us=int(fields[0]),
+            cumulative_us=int(fields[1]),
+            depth=(len(name) - len(module) - 1) // 2,
+        ))
+    return rows
+
+
+def _cmd_startup_profile(args: argparse.Namespace) -> int:
+    """Where the web process spends its cold start: import time per module, then (--startup) the start-up hook."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed", file=sys.stderr)
+        return 1
+    rows = parse_importtime(result.stderr)
+    roots = [row for row in rows if row.depth == 0]
+    target = next((row for row in roots if row.module == args.module), None)
+    print(f"import {args.module}: {(target.cumulative_us if target else 0) / 1000:.0f} ms "
+          f"({sum(r.cumulative_us for r in roots) / 1000:.0f} ms including the interpreter's own imports, "
+          f"{len(rows)} modules)")
+
+    packages: dict[str, int] = {}
+    for row in rows:
+        package = row.module.split(".")[0]
+        packages[package] = packages.get(package, 0) + row.self_us
+    print("\nBy top-level package (self time):")
+    for package, total in sorted(packages.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {total / 1000:9.1f} ms  {package}")
+
+    print("\nSlowest modules (cumulative / self):")
+    for row in sorted(rows, key=lambda r: -r.cumulative_us)[: args.top]:
+        print(f"  {row.cumulative_us / 1000:9.1f} ms  {row.self_us / 1000:8.1f} ms  {row.module}")
+
+    if args.startup:
+        # What the startup hook runs on top of the imports, timed in this process
+        from app.core.config import settings
+        from app.db.database import init_db
+        from app.services.detection import load_nlp_model
+
+        print("\nStart-up hook:")
+        for label, step in (("init_db", init_db), (f"NLP model ({settings.NLP_MODEL_PATH}) and warm-up", load_nlp_model)):
+            started = time.perf_counter()
+            step()
+            print(f"  {(time.perf_counter() - started) * 1000:9.1f} ms  {label}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Iris backend commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    redetect = subparsers.add_parser(
+        "redetect",
+        help="Re-run detection on emails stored by an older extractor version",
+    )
+    redetect.add_argument("--user-id", type=int, default=None, help="Only this user's emails")
+    redetect.add_argument("--batch-size", type=int, default=200, help="Emails per committed batch")
+    redetect.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="Enqueue one job per user for the job worker instead of running inline",
+    )
+    redetect.set_defaults(func=_cmd_redetect)
+
+    gmail_push = subparsers.add_parser(
+        "gmail-push",
+        help="Send a Pub/Sub-style Gmail notification to the webhook (local testing)",
+    )
+    gmail_push.add_argument("--email", required=True, help="Connected Gmail address (User.gmail_email)")
+    gmail_push.add_argument("--history-id", required=True, help="historyId to announce")
+    gmail_push.add_argument("--url", default="http://localhost:8000/api/v1/webhooks/gmail")
+    gmail_push.add_argument("--token", default=None, help="GMAIL_PUBSUB_VERIFICATION_TOKEN, if set")
+    gmail_push.set_defaults(func=_cmd_gmail_push)
+
+    migrate = subparsers.add_parser("migrate", help="Apply pending database schema migrations")
+    migrate.add_argument(
+        "--status",
+        action="store_true",
+        help="Only print the stored and expected schema versions (exit 1 when behind)",
+    )
+    migrate.set_defaults(func=_cmd_migrate)
+
+    startup_profile = subparsers.add_parser(
+        "startup-profile",
+        help="Import-time breakdown of the web app (python -X importtime), slowest first",
+    )
+    startup_profile.add_argument("--module", default="app.main", help="Module to import (default: app.main)")
+    startup_profile.add_argument("--top", type=int, default=25, help="Rows per table")
+    startup_profile.add_argument(
+        "--startup",
+        action="store_true",
+        help="Also time the startup hook's steps (schema check, NLP model load and warm-up)",
+    )
+    startup_profile.set_defaults(func=_cmd_startup_profile)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    args = build_parser().parse_args(argv)
+    return cast(int, args.func(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,81 @@
+from datetime import UTC, datetime, timedelta
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.security import decode_access_token
+from app.core.user_cache import (
+    CurrentPrincipal,
+    cache_principal,
+    get_cached_principal,
+    invalidate_user,
+    update_cached_last_seen,
+)
 from app.db.database import get_db
 from app.models.user import User
 
 security = HTTPBearer(auto_error=False)
 
+# last_seen_at is only rewritten when older than this, so activity tracking
+# costs at most one UPDATE per user every few minutes.
+_LAST_SEEN_RESOLUTION = timedelta(minutes=5)
 
-def get_current_user(
+
+def _credentials_error(detail: str = "Could not validate credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _touch_last_seen(db: Session, principal: CurrentPrincipal) -> None:
+    now = datetime.now(UTC)
+    last = principal.last_seen_at
+    if last is not None and last.tzinfo is None:
+        last = last.replace(tzinfo=UTC)  # SQLite returns naive datetimes
+    if last is not None and now - last < _LAST_SEEN_RESOLUTION:
+        return
+    # Bulk UPDATE: does not load the row, nor invalidate the cached principal
+    try:
+        db.query(User).filter(User.id == principal.id).update(
+            {User.last_seen_at: now}, synchronize_session=False
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        return
+    update_cached_last_seen(principal.id, now)
+
+
+def _load_principal(db: Session, user_id: int) -> CurrentPrincipal | None:
+    row = (
+        db.query(User.id, User.email, User.role, User.token_version, User.last_seen_at)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return CurrentPrincipal(
+        id=row.id,
+        email=row.email,
+        role=row.role,
+        token_version=row.token_version or 0,
+        last_seen_at=row.last_seen_at,
+    )
+
+
+def get_current_principal(
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
     db: Session = Depends(get_db),
-) -> User:
+) -> CurrentPrincipal:
     """
-    Dependency to get the current authenticated user from bearer token.
-    Validates JWT token and returns the User object.
-    Raises 403 if token is missing, 401 if token is invalid/user not found.
+    Dependency resolving the bearer token to a slim, cached view of the caller.
+    Use it when the endpoint only needs the user's id or role; it skips the
+    users row entirely while the principal is cached (see app.core.user_cache).
+    Raises 403 if token is missing, 401 if token is invalid/revoked/user not found.
     """
     if credentials is None:
         raise HTTPException(
@@ -35,31 +93,45 @@ def get_current_user(
     )
 
     if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error()
 
     # Extract user identifier from token
     sub = payload.get("sub")
     if sub is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    user_id_str = str(sub)
+        raise _credentials_error()
+    try:
+        user_id = int(sub)
+    except (TypeError, ValueError):
+        raise _credentials_error() from None
 
-    # Fetch user from database
-    user = db.query(User).filter(User.id == int(user_id_str)).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    principal = get_cached_principal(user_id)
+    if principal is None:
+        principal = _load_principal(db, user_id)
+        if principal is None:
+            raise _credentials_error("User not found")
+        cache_principal(principal)
+
+    # Tokens issued before "ver" existed carry none and count as version 0
+    if int(payload.get("ver") or 0) != principal.token_version:
+        raise _credentials_error("Token has been revoked")
+
+    _touch_last_seen(db, principal)
+    return principal
 
+
+def get_current_user(
+    principal: CurrentPrincipal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+) -> User:
+    """
+    Dependency to get the current authenticated user from bearer token.
+    Validates JWT token and returns the User object (secret columns deferred).
+    Raises 403 if token is missing, 401 if token is invalid/user not found.
+    """
+    user = db.get(User, principal.id)
+    if user is None:
+        invalidate_user(principal.id)
+        raise _credentials_error("User not found")
     return user
 
 def get_current_active_user(
@@ -71,3 +143,10 @@ def get_current_active_user(
     """
     # Future: Add checks for user.is_active, user.email_verified, etc.
     return current_user
+
+
+def get_current_active_principal(
+    principal: CurrentPrincipal = Depends(get_current_principal)
+) -> CurrentPrincipal:
+    """Slim counterpart of get_current_active_user for id/role-only endpoints."""
+    return principal
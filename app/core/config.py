@@ -16,22 +16,173 @@ class Settings(BaseSettings):
 
     # Database Settings
     DATABASE_URL: str = Field(default="sqlite:///./test.db")
+    # Apply pending schema migrations at startup. Turn off when they are run before the
+    # deploy (`python -m app.cli migrate`); startup then refuses an outdated schema.
+    DB_AUTO_MIGRATE: bool = Field(default=True)
+    # Connection pool (app/db/pool.py). Size it against the server's connection limit:
+    # each process holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections, and a checkout
+    # waits up to DB_POOL_TIMEOUT_SECONDS for one before failing
+    DB_POOL_SIZE: int = Field(default=5)
+    DB_MAX_OVERFLOW: int = Field(default=10)
+    DB_POOL_TIMEOUT_SECONDS: float = Field(default=30.0)
+    DB_POOL_RECYCLE_SECONDS: int = Field(default=300)
+    DB_POOL_PRE_PING: bool = Field(default=True)
+    # PostgreSQL driver: "psycopg2" or "psycopg" (psycopg 3, prepares statements server-side
+    # once run DB_PREPARE_THRESHOLD times on a connection). DB_PGBOUNCER=true disables
+    # server-side prepared statements for a transaction-pooling PgBouncer (Neon "-pooler")
+    DB_DRIVER: str = Field(default="psycopg2")
+    DB_PREPARE_THRESHOLD: int = Field(default=5)
+    DB_PGBOUNCER: bool = Field(default=False)
     SECRET_KEY: str = Field(default="test-secret")
     ALGORITHM: str = "HS256"
+    # "HS256" signs with SECRET_KEY. "RS256" / "EdDSA" sign with JWT_PRIVATE_KEY_PATH (PEM)
+    # and verify against a key set selected by the token's "kid" (see app.core.jwks), so
+    # verifying nodes only need public keys: JWT_JWKS_PATH and/or JWT_JWKS_URL
+    JWT_PRIVATE_KEY_PATH: str | None = Field(default=None)
+    # Defaults to the key's RFC 7638 thumbprint
+    JWT_KEY_ID: str | None = Field(default=None)
+    JWT_JWKS_PATH: str | None = Field(default=None)
+    JWT_JWKS_URL: str | None = Field(default=None)
+    JWT_JWKS_CACHE_SECONDS: int = Field(default=300)
+    # Token verifier: "jose" (python-jose; EdDSA tokens go to the native verifier) or, opt-in,
+    # "native" (compact JWS on top of cryptography, parsed keys cached, recently verified
+    # tokens remembered)
+    JWT_VERIFIER: str = Field(default="jose")
+    JWT_VERIFY_CACHE_SIZE: int = Field(default=4096)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # Authenticated users are cached in process for this long (see app.core.user_cache);
+    # updates in this process invalidate immediately, other workers within the TTL
+    USER_CACHE_ENABLED: bool = Field(default=True)
+    USER_CACHE_TTL_SECONDS: float = Field(default=30.0)
+    USER_CACHE_MAX_ENTRIES: int = Field(default=10000)
+    # Argon2id cost parameters (passlib defaults). Hashes made with other parameters
+    # are transparently rehashed on the next successful login. ARGON2_MEMORY_COST is
+    # in KiB per hash — the executor below runs at most PASSWORD_HASH_WORKERS at once.
+    ARGON2_TIME_COST: int = Field(default=3)
+    ARGON2_MEMORY_COST: int = Field(default=65536)
+    ARGON2_PARALLELISM: int = Field(default=4)
+    # Password hashing runs on its own executor so a burst of logins cannot take over the
+    # request threadpool; beyond PASSWORD_HASH_MAX_QUEUE waiting hashes requests get a 503
+    PASSWORD_HASH_WORKERS: int = Field(default=2)
+    PASSWORD_HASH_MAX_QUEUE: int = Field(default=16)
 
     # NLP Settings
     NLP_MODEL_PATH: str = "fr_core_news_sm"
     OPENAI_API_KEY: str | None = Field(default=None)
     LLM_CONFIDENCE_THRESHOLD: float = Field(default=0.6)
+    OPENAI_MODEL: str = Field(default="gpt-4o-mini")
+    # LLM backend (app/nlp/llm_backend.py): "openai" = OpenAI API, or any OpenAI-compatible
+    # server when LLM_BASE_URL is set (e.g. http://localhost:8080/v1 for llama.cpp / vLLM);
+    # "stub" = canned offline answers after LLM_STUB_LATENCY_SECONDS
+    LLM_BACKEND: str = Field(default="openai")
+    LLM_BASE_URL: str | None = Field(default=None)
+    LLM_MAX_CONNECTIONS: int = Field(default=20)
+    LLM_STUB_LATENCY_SECONDS: float = Field(default=0.0)
+    # LLM fallback answers are cached by hash(model, schema, prompt) and concurrent identical
+    # requests share one API call (app/nlp/llm_cache.py)
+    LLM_CACHE_ENABLED: bool = Field(default=True)
+    LLM_CACHE_MAX_ENTRIES: int = Field(default=5000)
+    LLM_CACHE_TTL_SECONDS: int = Field(default=24 * 3600)
+    # Batch detection sends low-confidence emails to the LLM concurrently; emails still
+    # waiting when the batch budget runs out keep their regex/spaCy result
+    LLM_MAX_CONCURRENCY: int = Field(default=8)
+    LLM_CALL_TIMEOUT_SECONDS: float = Field(default=20.0)
+    LLM_BATCH_BUDGET_SECONDS: float = Field(default=60.0)
+    # Normalised subject+body (HTML stripped, quotes/signatures cut) is truncated to this
+    # many characters before regex/spaCy/dateparser run (app/nlp/textnorm.py)
+    NLP_TEXT_MAX_CHARS: int = Field(default=4000)
+    # Worker threads for CPU-bound NLP (regex + spaCy) offloaded from async endpoints
+    NLP_EXECUTOR_WORKERS: int = Field(default=2)
+    # When the web process loads the spaCy model: "background" = in a thread after start-up
+    # (/health answers at once, GET /health/nlp reports readiness), "sync" = before serving,
+    # "off" = on the first detection
+    NLP_PRELOAD: str = Field(default="background")
+    # After loading, run synthetic emails through regex, spaCy and dateparser before
+    # reporting ready, so the first real detection does not pay for their lazy set-up
+    NLP_WARMUP: bool = Field(default=True)
+
+    # GET /metrics (Prometheus text format, app/core/metrics.py). Off by default: route names,
+    # user counts and cache sizes are not for the public. With METRICS_TOKEN set the scraper
+    # must send "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_ENABLED: bool = Field(default=False)
+    METRICS_TOKEN: str | None = Field(default=None)
+    # Request profiling (app/core/profiling.py): requests sent with "X-Iris-Profile: <PROFILE_TOKEN>"
+    # and a PROFILE_SAMPLE_RATE fraction of all requests are profiled; the last
+    # PROFILE_MAX_STORED profiles are listed at GET /api/v1/admin/profiles (admin role)
+    PROFILE_TOKEN: str | None = Field(default=None)
+    PROFILE_SAMPLE_RATE: float = Field(default=0.0)
+    PROFILE_MAX_STORED: int = Field(default=20)
+    PROFILE_TOP_FUNCTIONS: int = Field(default=40)
+    # Timeline entries (SQL statements, provider calls) kept per profile
+    PROFILE_MAX_EVENTS: int = Field(default=500)
+
+    # Background job queue (worker: python -m app.workers.job_worker)
+    # A running job whose lease expires (worker crashed) becomes claimable again
+    JOB_LEASE_SECONDS: int = Field(default=300)
+    # Retry backoff: base * 2^(attempt-1), capped at one hour
+    JOB_RETRY_BASE_SECONDS: int = Field(default=30)
+    JOB_WORKER_CONCURRENCY: int = Field(default=4)
+    JOB_MAX_PER_PROVIDER: int = Field(default=2)
+    JOB_MAX_PER_USER: int = Field(default=1)
+    JOB_POLL_INTERVAL_SECONDS: float = Field(default=2.0)
+    # Run the job worker in a thread of the web process; set to false when a
+    # dedicated worker service runs python -m app.workers.job_worker
+    JOB_EMBEDDED_WORKER: bool = Field(default=True)
+
+    # Periodic inbox pre-fetch + pre-detection for recently active users (run by the job worker)
+    PREFETCH_ENABLED: bool = Field(default=True)
+    PREFETCH_INTERVAL_SECONDS: int = Field(default=900)
+    PREFETCH_ACTIVE_DAYS: int = Field(default=7)
+    PREFETCH_PAGE_SIZE: int = Field(default=50)
+
+    # Email bodies fetched for the feed and detection are truncated to this many characters
+    # (MIME parts are decoded incrementally and decoding stops at the budget); the
+    # /emails/body view always returns the full body
+    EMAIL_BODY_MAX_CHARS: int = Field(default=20000)
+
+    # Streaming /emails/fetch-and-detect: emails buffered between the fetch thread and
+    # detection (backpressure bound), and emails detected per DB round-trip
+    STREAM_BUFFER_SIZE: int = Field(default=100)
+    STREAM_DETECT_BATCH: int = Field(default=20)
+
+    # Server-push feed updates (GET /emails/events). "memory" fans out inside one process;
+    # "postgres" uses LISTEN/NOTIFY so a separate job worker's syncs reach web clients too
+    # (needs a direct connection: rejected together with DB_PGBOUNCER)
+    FEED_BROKER: str = Field(default="memory")
+    FEED_KEEPALIVE_SECONDS: float = Field(default=25.0)
+    FEED_SUBSCRIBER_QUEUE_SIZE: int = Field(default=200)
+
+    # On-disk cache of decoded email bodies served by GET /emails/body (compressed, encrypted
+    # with SECRET_ENCRYPTION_KEY, per user and provider; disabled without the key)
+    BODY_CACHE_ENABLED: bool = Field(default=True)
+    BODY_CACHE_DIR: str = Field(default=".cache/email_bodies")
+    # Oldest entries (by last access) are evicted once the cache grows past this size
+    BODY_CACHE_MAX_MB: int = Field(default=512)
+
+    # In-memory cache of provider feed pages, revalidated on every request (Gmail historyId,
+    # Graph ETag / @odata.etag) so unchanged pages skip the download and categorisation
+    PAGE_CACHE_ENABLED: bool = Field(default=True)
+    PAGE_CACHE_MAX_ENTRIES: int = Field(default=2000)
+    PAGE_CACHE_TTL_SECONDS: int = Field(default=900)
 
     # Gmail OAuth (optional; for OAuth callback flow)
     GOOGLE_CLIENT_ID: str | None = Field(default=None)
     GOOGLE_CLIENT_SECRET: str | None = Field(default=None)
     GMAIL_REDIRECT_URI: str | None = Field(default=None)
     GMAIL_CREDENTIALS_PATH: str = Field(default="credentials.json")
+    # Where pending OAuth flows keep their PKCE code_verifier: "database" (shared by all
+    # instances, see app.services.pkce_store) or "memory" (single process / tests)
+    PKCE_STORE: str = Field(default="database")
+    # Gmail push notifications: users.watch() publishes to this Cloud Pub/Sub topic
+    # ("projects/<project>/topics/<topic>"); its push subscription targets
+    # POST /api/v1/webhooks/gmail?token=<GMAIL_PUBSUB_VERIFICATION_TOKEN> (required once the
+    # topic is set). Unset = no watch, and the webhook answers 404.
+    GMAIL_PUBSUB_TOPIC: str | None = Field(default=None)
+    GMAIL_PUBSUB_VERIFICATION_TOKEN: str | None = Field(default=None)
+    # Notifications arriving within this window are coalesced into one history sync job
+    GMAIL_PUSH_DEBOUNCE_SECONDS: float = Field(default=5.0)
 
-    # Encryption key for Apple App Passwords stored in the DB
+    # Encryption key for OAuth tokens and Apple App Passwords stored in the DB, and cached bodies
     # Generate once: poetry run python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
     SECRET_ENCRYPTION_KEY: str | None = Field(default=None)
 
@@ -43,6 +194,12 @@ class Settings(BaseSettings):
     MICROSOFT_TENANT_ID: str = Field(default="common")
     # "common" allows any Microsoft/Outlook account; set a specific tenant ID for org-only
     MICROSOFT_REDIRECT_URI: str = Field(default="http://localhost:8000/api/v1/auth/microsoft/callback")
+    # Outlook change notifications: public HTTPS URL of POST /api/v1/webhooks/outlook
+    # that Graph subscriptions deliver to. Unset = no subscription, Outlook is polled.
+    OUTLOOK_NOTIFICATION_URL: str | None = Field(default=None)
+    # Secret sent with each subscription; Graph echoes it in every notification
+    OUTLOOK_CLIENT_STATE: str | None = Field(default=None)
+    OUTLOOK_PUSH_DEBOUNCE_SECONDS: float = Field(default=5.0)
 
 settings = Settings()
 
@@ -23,3 +23,16 @@ def decrypt(token: str) -> str:
         return _get_fernet().decrypt(token.encode()).decode()
     except InvalidToken as exc:
         raise ValueError("Failed to decrypt value — key mismatch or corrupted token") from exc
+
+
+def encrypt_bytes(data: bytes) -> bytes:
+    """Encrypt raw bytes (e.g. a compressed cache entry). Returns the Fernet token."""
+    return _get_fernet().encrypt(data)
+
+
+def decrypt_bytes(token: bytes) -> bytes:
+    """Decrypt a token produced by encrypt_bytes."""
+    try:
+        return _get_fernet().decrypt(token)
+    except InvalidToken as exc:
+        raise ValueError("Failed to decrypt value — key mismatch or corrupted token") from exc
@@ -0,0 +1,200 @@
+"""
+Signing key and verification key set for asymmetric access tokens (RS256, EdDSA).
+
+With ALGORITHM = "RS256" or "EdDSA" the node that issues tokens signs them with
+the private key in JWT_PRIVATE_KEY_PATH and puts its key id in the "kid"
+header. Verifying nodes need no secret: they look the kid up in a JWKS-style
+key set assembled from
+
+    - the public half of the local signing key (if any),
+    - the JWKS document at JWT_JWKS_PATH,
+    - the JWKS document served at JWT_JWKS_URL (e.g. another node's
+      GET /.well-known/jwks.json).
+
+Parsed keys are cached for JWT_JWKS_CACHE_SECONDS. An unknown kid triggers an
+early reload (at most once every _MIN_RELOAD_SECONDS) so rotated keys are
+picked up without waiting for the cache to expire.
+"""
+import base64
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = frozenset({"RS256", "EdDSA"})
+_MIN_RELOAD_SECONDS = 30.0
+
+
+def b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _int_to_b64(value: int) -> str:
+    return b64url_encode(value.to_bytes((value.bit_length() + 7) // 8, "big"))
+
+
+def public_jwk(key: rsa.RSAPublicKey | ed25519.Ed25519PublicKey) -> dict[str, str]:
+    """JWK members of a public key (without kid/alg/use)."""
+    if isinstance(key, rsa.RSAPublicKey):
+        numbers = key.public_numbers()
+        return {"kty": "RSA", "n": _int_to_b64(numbers.n), "e": _int_to_b64(numbers.e)}
+    raw = key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return {"kty": "OKP", "crv": "Ed25519", "x": b64url_encode(raw)}
+
+
+def jwk_thumbprint(jwk: dict[str, str]) -> str:
+    """RFC 7638 thumbprint, used as the default kid."""
+    required = ("e", "kty", "n") if jwk["kty"] == "RSA" else ("crv", "kty", "x")
+    canonical = json.dumps({k: jwk[k] for k in required}, separators=(",", ":"), sort_keys=True)
+    return b64url_encode(hashlib.sha256(canonical.encode("utf-8")).digest())
+
+
+def _key_from_jwk(jwk: dict[str, Any]) -> tuple[str, Any] | None:
+    """(alg, public key) for a supported signing JWK, else None."""
+    if jwk.get("use", "sig") != "sig":
+        return None
+    if jwk.get("kty") == "RSA":
+        n = int.from_bytes(b64url_decode(jwk["n"]), "big")
+        e = int.from_bytes(b64url_decode(jwk["e"]), "big")
+        return "RS256", rsa.RSAPublicNumbers(e, n).public_key()
+    if jwk.get("kty") == "OKP" and jwk.get("crv") == "Ed25519":
+        return "EdDSA", ed25519.Ed25519PublicKey.from_public_bytes(b64url_decode(jwk["x"]))
+    return None
+
+
+@dataclass(frozen=True)
+class VerificationKey:
+    kid: str
+    alg: str
+    key: Any
+    jwk: dict[str, str]
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    alg: str
+    private_key: Any
+    pem: bytes
+
+
+_lock = threading.Lock()
+_signing: tuple[str | None, SigningKey | None] = (None, None)
+_keys: dict[str, VerificationKey] = {}
+_loaded_at: float | None = None
+
+
+def get_signing_key() -> SigningKey | None:
+    """The local private key (JWT_PRIVATE_KEY_PATH), loaded once per path."""
+    global _signing
+    path = settings.JWT_PRIVATE_KEY_PATH
+    if not path:
+        return None
+    with _lock:
+        if _signing[0] == path:
+            return _signing[1]
+    with open(path, "rb") as fh:
+        pem = fh.read()
+    private_key = serialization.load_pem_private_key(pem, password=None)
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        alg = "RS256"
+    elif isinstance(private_key, ed25519.Ed25519PrivateKey):
+        alg = "EdDSA"
+    else:
+        raise ValueError("JWT_PRIVATE_KEY_PATH must hold an RSA or Ed25519 private key")
+    kid = settings.JWT_KEY_ID or jwk_thumbprint(public_jwk(private_key.public_key()))
+    signing = SigningKey(kid=kid, alg=alg, private_key=private_key, pem=pem)
+    with _lock:
+        _signing = (path, signing)
+    return signing
+
+
+def _read_jwks() -> list[dict[str, Any]]:
+    documents: list[dict[str, Any]] = []
+    if settings.JWT_JWKS_PATH:
+        with open(settings.JWT_JWKS_PATH, encoding="utf-8") as fh:
+            documents.append(json.load(fh))
+    if settings.JWT_JWKS_URL:
+        import httpx
+
+        try:
+            response = httpx.get(settings.JWT_JWKS_URL, timeout=5.0)
+            response.raise_for_status()
+            documents.append(response.json())
+        except (httpx.HTTPError, ValueError):
+            logger.warning("Could not fetch JWKS from %s", settings.JWT_JWKS_URL, exc_info=True)
+    return [jwk for doc in documents for jwk in doc.get("keys") or [] if isinstance(jwk, dict)]
+
+
+def _load_keys() -> dict[str, VerificationKey]:
+    keys: dict[str, VerificationKey] = {}
+    for jwk in _read_jwks():
+        parsed = _key_from_jwk(jwk)
+        if parsed is None:
+            continue
+        alg, key = parsed
+        member = public_jwk(key)
+        kid = str(jwk.get("kid") or jwk_thumbprint(member))
+        keys[kid] = VerificationKey(kid=kid, alg=jwk.get("alg") or alg, key=key, jwk=member)
+    signing = get_signing_key()
+    if signing is not None:
+        public = signing.private_key.public_key()
+        keys[signing.kid] = VerificationKey(kid=signing.kid, alg=signing.alg, key=public, jwk=public_jwk(public))
+    return keys
+
+
+def _current_keys(force: bool = False) -> dict[str, VerificationKey]:
+    global _keys, _loaded_at
+    now = time.monotonic()
+    with _lock:
+        age = None if _loaded_at is None else now - _loaded_at
+        if age is not None and (age < (_MIN_RELOAD_SECONDS if force else settings.JWT_JWKS_CACHE_SECONDS)):
+            return _keys
+    keys = _load_keys()
+    with _lock:
+        _keys, _loaded_at = keys, now
+    return keys
+
+
+def _pick(keys: dict[str, VerificationKey], kid: str | None) -> VerificationKey | None:
+    if kid:
+        return keys.get(kid)
+    return next(iter(keys.values())) if len(keys) == 1 else None
+
+
+def get_verification_key(kid: str | None) -> VerificationKey | None:
+    """Public key for a token's kid (the only key when the set has one and the token has no kid)."""
+    found = _pick(_current_keys(), kid)
+    if found is None and kid:
+        # Possibly a key rotated in since the last load
+        found = _pick(_current_keys(force=True), kid)
+    return found
+
+
+def public_jwks() -> dict[str, list[dict[str, str]]]:
+    """The verification key set as a JWKS document (public keys only)."""
+    keys = _current_keys().values()
+    return {"keys": [{**k.jwk, "kid": k.kid, "alg": k.alg, "use": "sig"} for k in keys]}
+
+
+def reset_key_cache() -> None:
+    """Forget loaded keys (tests, key rotation)."""
+    global _signing, _keys, _loaded_at
+    with _lock:
+        _signing = (None, None)
+        _keys = {}
+        _loaded_at = None
@@ -0,0 +1,321 @@
+"""
+In-process metrics, exposed in the Prometheus text format at GET /metrics.
+
+Histograms (seconds unless noted):
+
+    iris_http_request_duration_seconds{method,route,status}
+        every HTTP request, by route template (MetricsMiddleware)
+    iris_http_request_db_queries{route}
+        SQL statements executed while serving a request (count, not seconds)
+    iris_provider_request_duration_seconds{provider,endpoint,status}
+        Gmail API requests (per API method), Gmail batches, Microsoft Graph
+        requests made through the shared AsyncClient (per path)
+    iris_stage_duration_seconds{stage}
+        NLP stages (nlp.regex, nlp.spacy, nlp.dateparser, nlp.fields,
+        nlp.llm) and service functions wrapped with @timed
+
+Cache, connection pool and password hashing counters are read from their
+modules at scrape time (_service_samples).
+
+The instruments are built for hot paths: one perf_counter() pair and one lock
+per observation. Wrap code with `with stage_timer("name"):` or a function
+with `@timed("name")` (sync or async).
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from typing import Any, TypeVar, cast
+
+from sqlalchemy import Engine, event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.profiling import record_provider_call
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [
+        f'{name}="{value.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), "")}"'
+        for name, value in zip(names, values, strict=True)
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot: above the largest bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram:
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], _HistogramChild] = {}
+
+    def labels(self, *values: str) -> _HistogramChild:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, _HistogramChild(self.buckets))
+        return child
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def clear(self) -> None:
+        """Zero every child in place: @timed and stage_timer callers keep references to them."""
+        with self._lock:
+            children = list(self._children.values())
+        for child in children:
+            with child._lock:
+                child.counts = [0] * len(child.counts)
+                child.sum = 0.0
+                child.count = 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip((*child.buckets, float("inf")), counts, strict=True):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, values)} {count}")
+        return lines
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "iris_http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "iris_http_request_db_queries", "SQL statements executed per HTTP request", ("route",), QUERY_COUNT_BUCKETS
+)
+PROVIDER_REQUEST_SECONDS = Histogram(
+    "iris_provider_request_duration_seconds", "Email provider API latency", ("provider", "endpoint", "status")
+)
+STAGE_SECONDS = Histogram("iris_stage_duration_seconds", "NLP stage and service function latency", ("stage",))
+
+_HISTOGRAMS = (HTTP_REQUEST_SECONDS, HTTP_REQUEST_DB_QUERIES, PROVIDER_REQUEST_SECONDS, STAGE_SECONDS)
+
+
+class stage_timer:  # noqa: N801 — used like a function: `with stage_timer("nlp.regex"):`
+    """Observe the duration of a block in iris_stage_duration_seconds{stage}."""
+
+    __slots__ = ("_child", "_started")
+
+    def __init__(self, stage: str) -> None:
+        self._child = STAGE_SECONDS.labels(stage)
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._child.observe(time.perf_counter() - self._started)
+
+
+def timed(stage: str) -> Callable[[F], F]:
+    """Decorator form of stage_timer, for sync and async functions."""
+
+    def decorator(fn: F) -> F:
+        child = STAGE_SECONDS.labels(stage)
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - started)
+            return cast(F, async_wrapper)
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def observe_provider_call(provider: str, endpoint: str, status: str, seconds: float) -> None:
+    PROVIDER_REQUEST_SECONDS.labels(provider, endpoint, status).observe(seconds)
+    record_provider_call(provider, endpoint, status, seconds)
+
+
+def endpoint_from_path(path: str) -> str:
+    """Low-cardinality endpoint label: API version prefix dropped, ids replaced by {id}."""
+    segments = [s for s in path.split("/") if s]
+    if segments and segments[0][:1] == "v" and segments[0][1:2].isdigit():
+        segments = segments[1:]
+    return "/".join("{id}" if len(s) >= 16 or s.isdigit() else s for s in segments) or "/"
+
+
+def httpx_event_hooks(provider: str) -> dict[str, list[Callable]]:
+    """event_hooks for an httpx.AsyncClient: each response is observed as a provider call.
+
+    Requests that fail without a response (connect errors, timeouts) are not observed.
+    """
+
+    async def _on_request(request: Any) -> None:
+        request.extensions["iris_started"] = time.perf_counter()
+
+    async def _on_response(response: Any) -> None:
+        started = response.request.extensions.get("iris_started")
+        if started is not None:
+            observe_provider_call(
+                provider, endpoint_from_path(response.request.url.path), str(response.status_code),
+                time.perf_counter() - started,
+            )
+
+    return {"request": [_on_request], "response": [_on_response]}
+
+
+# SQL statements per request: the middleware installs a counter in a context
+# variable; threadpool workers run in a copy of the context and share the object.
+class _QueryCount:
+    __slots__ = ("n",)
+
+    def __init__(self) -> None:
+        self.n = 0
+
+
+_query_count: contextvars.ContextVar[_QueryCount | None] = contextvars.ContextVar("iris_query_count", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = _query_count.get()
+    if counter is not None:
+        counter.n += 1
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing request latency and SQL statement count per route."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        counter = _QueryCount()
+        token = _query_count.set(counter)
+        status = 500
+        started = time.perf_counter()
+
+        async def _send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _query_count.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
+            HTTP_REQUEST_DB_QUERIES.labels(route).observe(counter.n)
+
+
+def _service_samples() -> list[str]:
+    """Counters kept by other modules, read at scrape time."""
+    from app.core.security import password_hashing_stats
+    from app.core.user_cache import user_cache_stats
+    from app.db.database import engine
+    from app.db.pool import pool_stats
+    from app.nlp.llm_fallback_openai import get_response_cache
+    from app.services.page_cache import page_cache_stats
+
+    caches: dict[str, dict[str, Any]] = {
+        f"page_{provider}": stats for provider, stats in page_cache_stats().items()
+    }
+    caches["llm"] = get_response_cache().stats()
+    caches["user"] = user_cache_stats()
+
+    lines = [
+        "# HELP iris_cache_hits_total Cache hits", "# TYPE iris_cache_hits_total counter",
+        *(f'iris_cache_hits_total{{cache="{name}"}} {c["hits"]}' for name, c in caches.items()),
+        "# HELP iris_cache_misses_total Cache misses", "# TYPE iris_cache_misses_total counter",
+        *(f'iris_cache_misses_total{{cache="{name}"}} {c["misses"]}' for name, c in caches.items()),
+        "# HELP iris_cache_hit_ratio Hits / (hits + misses) since start", "# TYPE iris_cache_hit_ratio gauge",
+    ]
+    for name, c in caches.items():
+        lookups = c["hits"] + c["misses"]
+        lines.append(f'iris_cache_hit_ratio{{cache="{name}"}} {_format_value(c["hits"] / lookups if lookups else 0.0)}')
+
+    pool = pool_stats(engine)
+    for key, metric, kind in (
+        ("size", "iris_db_pool_size", "gauge"),
+        ("checkedout", "iris_db_pool_checked_out", "gauge"),
+        ("overflow", "iris_db_pool_overflow", "gauge"),
+        ("waiting", "iris_db_pool_waiting", "gauge"),
+        ("checkouts", "iris_db_pool_checkouts_total", "counter"),
+        ("timeouts", "iris_db_pool_timeouts_total", "counter"),
+    ):
+        if key in pool:
+            lines += [f"# TYPE {metric} {kind}", f"{metric} {pool[key]}"]
+
+    lines += [
+        "# TYPE iris_password_hash_rejected_total counter",
+        f"iris_password_hash_rejected_total {password_hashing_stats()['rejected']}",
+    ]
+    return lines
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+    for histogram in _HISTOGRAMS:
+        lines += histogram.render()
+    lines += _service_samples()
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    """Drop every observation (tests)."""
+    for histogram in _HISTOGRAMS:
+        histogram.clear()
@@ -0,0 +1,254 @@
+"""
+Opt-in profiling of individual requests, for slowness that only shows up in
+production (e.g. one user's feed).
+
+A request is profiled when it carries "X-Iris-Profile: <PROFILE_TOKEN>", or at
+random with probability PROFILE_SAMPLE_RATE. For that request ProfilingMiddleware
+records:
+
+    - a cProfile of the thread serving the request (the event loop for async
+      endpoints), as the PROFILE_TOP_FUNCTIONS slowest functions by cumulative
+      time. Other requests served by the loop at the same time show up too,
+      and only one request is profiled at a time;
+    - a timeline of the SQL statements (without their parameters) and the
+      provider API calls made on its behalf, including those run in worker
+      threads (asyncio.to_thread, threadpool endpoints).
+
+A streaming response (/emails/events, the NDJSON detection streams) is
+profiled up to its first chunk only: the profile is stored then, with
+"streamed": true, instead of holding the profiler for the whole stream.
+
+The last PROFILE_MAX_STORED profiles are kept in memory, per process, and served
+to admins by GET /api/v1/admin/profiles. A profiled response carries their id
+in the X-Iris-Profile-Id header.
+
+Requests that are not profiled pay for one context variable lookup per SQL
+statement and provider call.
+"""
+import contextvars
+import cProfile
+import hmac
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import Engine, event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+PROFILE_HEADER = b"x-iris-profile"
+PROFILE_ID_HEADER = b"x-iris-profile-id"
+_STATEMENT_MAX_CHARS = 300
+
+
+class RequestProfile:
+    def __init__(self, profile_id: int, method: str, path: str, trigger: str) -> None:
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.route: str | None = None
+        self.status: int | None = None
+        self.started_at = datetime.now(UTC)
+        self.started = time.perf_counter()
+        self.duration_ms = 0.0
+        self.streamed = False
+        self.finished = False
+        self.events: list[dict[str, Any]] = []
+        self.dropped_events = 0
+        self.functions: list[dict[str, Any]] = []
+
+    def add_event(self, kind: str, detail: str, started: float, seconds: float, **extra: Any) -> None:
+        # list.append is atomic: worker threads may record concurrently
+        if self.finished or len(self.events) >= settings.PROFILE_MAX_EVENTS:
+            self.dropped_events += 1
+            return
+        self.events.append({
+            "kind": kind,
+            "detail": detail,
+            "offset_ms": round((started - self.started) * 1000, 3),
+            "duration_ms": round(seconds * 1000, 3),
+            "thread": threading.current_thread().name,
+            **extra,
+        })
+
+    def summary(self) -> dict[str, Any]:
+        totals: dict[str, list[float]] = {}
+        for item in self.events:
+            count_ms = totals.setdefault(item["kind"], [0, 0.0])
+            count_ms[0] += 1
+            count_ms[1] += item["duration_ms"]
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+            "streamed": self.streamed,
+            **{f"{kind}_count": int(count) for kind, (count, _) in totals.items()},
+            **{f"{kind}_ms": round(ms, 3) for kind, (_, ms) in totals.items()},
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            **self.summary(),
+            "functions": self.functions,
+            "timeline": sorted(self.events, key=lambda item: item["offset_ms"]),
+            "dropped_events": self.dropped_events,
+        }
+
+
+_active: contextvars.ContextVar[RequestProfile | None] = contextvars.ContextVar("iris_profile", default=None)
+_profiler_lock = threading.Lock()  # one cProfile at a time: a second enable() would take over the hook
+_store_lock = threading.Lock()
+_store: "deque[RequestProfile]" = deque()
+_ids = itertools.count(1)
+
+
+def record_provider_call(provider: str, endpoint: str, status: str, seconds: float) -> None:
+    """Add a finished provider call to the timeline of the request being profiled, if any."""
+    profile = _active.get()
+    if profile is not None:
+        now = time.perf_counter()
+        profile.add_event("provider", f"{provider} {endpoint}", now - seconds, seconds, status=status)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _active.get() is not None:
+        conn.info.setdefault("iris_profile_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _active.get()
+    started_stack = conn.info.get("iris_profile_started")
+    if profile is None or not started_stack:
+        return
+    started = started_stack.pop()
+    profile.add_event("db", " ".join(statement.split())[:_STATEMENT_MAX_CHARS], started, time.perf_counter() - started)
+
+
+def _function_label(key: tuple[str, int, str]) -> str:
+    filename, line, name = key
+    if filename == "~":
+        return name  # built-in
+    for prefix in (os.getcwd() + os.sep, "site-packages" + os.sep):
+        index = filename.find(prefix)
+        if index != -1:
+            filename = filename[index + len(prefix):]
+            break
+    return f"{filename}:{line}({name})"
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> list[dict[str, Any]]:
+    profiler.create_stats()
+    stats = profiler.stats  # {key: (primitive calls, calls, tottime, cumtime, callers)}
+    rows = sorted(stats.items(), key=lambda item: -item[1][3])[:limit]
+    return [
+        {
+            "function": _function_label(key),
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        }
+        for key, (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+def _store_profile(profile: RequestProfile) -> None:
+    with _store_lock:
+        _store.append(profile)
+        while len(_store) > settings.PROFILE_MAX_STORED:
+            _store.popleft()
+
+
+def list_profiles() -> list[dict[str, Any]]:
+    """Summaries of the stored profiles, newest first."""
+    with _store_lock:
+        return [profile.summary() for profile in reversed(_store)]
+
+
+def get_profile(profile_id: int) -> dict[str, Any] | None:
+    with _store_lock:
+        profile = next((p for p in _store if p.id == profile_id), None)
+    return profile.as_dict() if profile is not None else None
+
+
+def clear_profiles() -> None:
+    with _store_lock:
+        _store.clear()
+
+
+def _trigger(scope: Scope) -> str | None:
+    """Why this request is profiled: "header", "sampled", or None."""
+    if settings.PROFILE_TOKEN:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                if hmac.compare_digest(value, settings.PROFILE_TOKEN.encode()):
+                    return "header"
+                break
+    if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling the requests selected by _trigger()."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = _trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(next(_ids), scope["method"], scope["path"], trigger)
+        profiler = cProfile.Profile() if _profiler_lock.acquire(blocking=False) else None
+
+        def _finish() -> None:
+            nonlocal profiler
+            if profile.finished:
+                return
+            profile.finished = True
+            if profiler is not None:
+                profiler.disable()
+                _profiler_lock.release()
+                profile.functions = _top_functions(profiler, settings.PROFILE_TOP_FUNCTIONS)
+                profiler = None
+            profile.duration_ms = round((time.perf_counter() - profile.started) * 1000, 3)
+            profile.route = getattr(scope.get("route"), "path", None)
+            _store_profile(profile)
+
+        async def _send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (PROFILE_ID_HEADER, str(profile.id).encode())],
+                }
+            await send(message)
+            if message["type"] == "http.response.body" and message.get("more_body"):
+                # A streaming response: stop at its first chunk, an SSE stream may stay open for hours
+                profile.streamed = True
+                _finish()
+
+        token = _active.set(profile)
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, _send)
+        finally:
+            _active.reset(token)
+            _finish()
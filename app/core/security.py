@@ -1,25 +1,145 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
+from functools import lru_cache
 from typing import Any, cast
 
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
-# Use Argon2 for OWASP-compliant password hashing
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+from app.core.config import settings
+from app.core.jwks import (
+    ASYMMETRIC_ALGORITHMS,
+    SigningKey,
+    b64url_decode,
+    b64url_encode,
+    get_signing_key,
+    get_verification_key,
+)
+
+
+@lru_cache(maxsize=4)
+def _crypt_context(time_cost: int, memory_cost: int, parallelism: int) -> CryptContext:
+    # Use Argon2 for OWASP-compliant password hashing
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__time_cost=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+
+
+def password_context() -> CryptContext:
+    """CryptContext for the Argon2 parameters currently in settings."""
+    return _crypt_context(settings.ARGON2_TIME_COST, settings.ARGON2_MEMORY_COST, settings.ARGON2_PARALLELISM)
 
 
 def hash_password(plain: str) -> str:
     """Hash a plain text password using Argon2."""
-    return str(pwd_context.hash(plain))
+    return str(password_context().hash(plain))
 
 
 def verify_password(plain: str, hashed: str) -> bool:
     """Verify a plain text password against a hashed password."""
-    return bool(pwd_context.verify(plain, hashed))
+    return bool(password_context().verify(plain, hashed))
+
+
+def verify_and_update_password(plain: str, hashed: str) -> tuple[bool, str | None]:
+    """Verify a password; also return a new hash when the stored one uses outdated parameters."""
+    ok, new_hash = password_context().verify_and_update(plain, hashed)
+    return bool(ok), new_hash
+
+
+class PasswordHashingBusyError(RuntimeError):
+    """The hashing executor and its queue are full; the caller should retry later."""
+
+
+class _HashingPool:
+    """Fixed-size executor with a bounded number of waiting jobs (fast reject beyond it)."""
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self.slots = threading.BoundedSemaphore(workers + max_queue)
+        self.size = (workers, max_queue)
+        self.rejected = 0
+
+    def submit(self, fn, *args) -> Future:
+        if not self.slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHashingBusyError("Too many password operations in progress")
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def run(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+
+_pool: _HashingPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _hashing_pool() -> _HashingPool:
+    global _pool
+    size = (settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+    with _pool_lock:
+        if _pool is None or _pool.size != size:
+            if _pool is not None:
+                _pool.executor.shutdown(wait=False)
+            _pool = _HashingPool(*size)
+        return _pool
+
+
+async def hash_password_bounded(plain: str) -> str:
+    """hash_password on the hashing executor. Raises PasswordHashingBusyError when saturated.
+
+    Awaited from async endpoints, so no request thread is parked while the hash runs.
+    """
+    future = _hashing_pool().submit(hash_password, plain)
+    return cast(str, await asyncio.wrap_future(future))
+
+
+async def verify_password_bounded(plain: str, hashed: str) -> tuple[bool, str | None]:
+    """verify_and_update_password on the hashing executor. Raises PasswordHashingBusyError when saturated."""
+    future = _hashing_pool().submit(verify_and_update_password, plain, hashed)
+    return cast(tuple[bool, str | None], await asyncio.wrap_future(future))
+
+
+def password_hashing_stats() -> dict[str, int]:
+    pool = _hashing_pool()
+    return {"workers": pool.size[0], "max_queue": pool.size[1], "rejected": pool.rejected}
+
+
+def _sign_eddsa(payload: dict[str, Any], key: SigningKey) -> str:
+    # python-jose has no EdDSA; a compact JWS is simple enough to build directly
+    header = {"alg": "EdDSA", "typ": "JWT", "kid": key.kid}
+    signing_input = ".".join(
+        b64url_encode(json.dumps(part, separators=(",", ":")).encode("utf-8")) for part in (header, payload)
+    )
+    return f"{signing_input}.{b64url_encode(key.private_key.sign(signing_input.encode('ascii')))}"
 
 
 def create_access_token(subject: str, data: dict[str, Any], *, secret: str, algorithm: str, minutes: int) -> str:
-    """Create a signed JWT access token for successful authentication."""
+    """Create a signed JWT access token for successful authentication.
+
+    HS* tokens are signed with `secret`; RS256/EdDSA tokens with the key in
+    JWT_PRIVATE_KEY_PATH, whose id goes in the "kid" header.
+    """
     now = datetime.now(UTC)
     payload = {
         "sub": subject,
@@ -27,13 +147,152 @@ def create_access_token(subject: str, data: dict[str, Any], *, secret: str, algo
         "exp": int((now + timedelta(minutes=minutes)).timestamp()),
         **data,
     }
+    if algorithm in ASYMMETRIC_ALGORITHMS:
+        key = get_signing_key()
+        if key is None or key.alg != algorithm:
+            raise RuntimeError(f"ALGORITHM={algorithm} requires a matching private key in JWT_PRIVATE_KEY_PATH")
+        if algorithm == "EdDSA":
+            return _sign_eddsa(payload, key)
+        return str(jwt.encode(payload, key.pem.decode("ascii"), algorithm=algorithm, headers={"kid": key.kid}))
     return str(jwt.encode(payload, secret, algorithm=algorithm))
 
 
+class TokenVerifier(ABC):
+    """Checks a JWT's signature and time claims; returns its payload, or None if invalid."""
+
+    @abstractmethod
+    def decode(self, token: str, secret: str, algorithm: str) -> dict[str, Any] | None: ...
+
+
+class JoseVerifier(TokenVerifier):
+    """python-jose. EdDSA, which it does not implement, is handed to NativeVerifier."""
+
+    def decode(self, token: str, secret: str, algorithm: str) -> dict[str, Any] | None:
+        if algorithm == "EdDSA":
+            return _verifier_named("native").decode(token, secret, algorithm)
+        try:
+            key: Any = secret
+            if algorithm in ASYMMETRIC_ALGORITHMS:
+                verification_key = get_verification_key(jwt.get_unverified_header(token).get("kid"))
+                if verification_key is None or verification_key.alg != algorithm:
+                    return None
+                key = verification_key.jwk
+            return cast(dict[str, Any] | None, jwt.decode(token, key, algorithms=[algorithm]))
+        except JWTError:
+            return None
+
+
+_HMAC_HASHES = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+# A verified token is remembered at most this long, so a key removed from the set stops working soon
+_VERIFIED_TTL_SECONDS = 60.0
+
+
+class NativeVerifier(TokenVerifier):
+    """Compact JWS verification on top of `cryptography` (HS256/384/512, RS256, EdDSA).
+
+    Only the configured algorithm is accepted. Public keys are parsed once by
+    app.core.jwks; tokens verified in the last _VERIFIED_TTL_SECONDS skip the
+    signature check (their exp is still enforced).
+    """
+
+    def __init__(self, cache_size: int | None = None) -> None:
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._verified: OrderedDict[tuple[str, str, str], tuple[float, dict[str, Any]]] = OrderedDict()
+
+    @property
+    def cache_size(self) -> int:
+        return self._cache_size if self._cache_size is not None else settings.JWT_VERIFY_CACHE_SIZE
+
+    def decode(self, token: str, secret: str, algorithm: str) -> dict[str, Any] | None:
+        cache_key = (algorithm, secret, token)
+        now = time.time()
+        with self._lock:
+            entry = self._verified.get(cache_key)
+            if entry is not None and time.monotonic() - entry[0] < _VERIFIED_TTL_SECONDS:
+                self._verified.move_to_end(cache_key)
+                cached = entry[1]
+                return dict(cached) if self._claims_valid(cached, now) else None
+
+        payload = self._verify(token, secret, algorithm)
+        if payload is None or not self._claims_valid(payload, now):
+            return None
+        if self.cache_size > 0:
+            with self._lock:
+                self._verified[cache_key] = (time.monotonic(), payload)
+                while len(self._verified) > self.cache_size:
+                    self._verified.popitem(last=False)
+        return dict(payload)
+
+    @staticmethod
+    def _verify(token: str, secret: str, algorithm: str) -> dict[str, Any] | None:
+        try:
+            header_b64, payload_b64, signature_b64 = token.split(".")
+            header = json.loads(b64url_decode(header_b64))
+            if not isinstance(header, dict) or header.get("alg") != algorithm:
+                return None
+            signature = b64url_decode(signature_b64)
+            signing_input = f"{header_b64}.{payload_b64}".encode("ascii")
+            if algorithm in _HMAC_HASHES:
+                expected = hmac.new(secret.encode("utf-8"), signing_input, _HMAC_HASHES[algorithm]).digest()
+                if not hmac.compare_digest(expected, signature):
+                    return None
+            elif algorithm in ASYMMETRIC_ALGORITHMS:
+                verification_key = get_verification_key(header.get("kid"))
+                if verification_key is None or verification_key.alg != algorithm:
+                    return None
+                if algorithm == "RS256":
+                    verification_key.key.verify(signature, signing_input, padding.PKCS1v15(), hashes.SHA256())
+                else:
+                    verification_key.key.verify(signature, signing_input)
+            else:
+                return None
+            payload = json.loads(b64url_decode(payload_b64))
+        except (ValueError, TypeError, InvalidSignature):
+            return None
+        return payload if isinstance(payload, dict) else None
+
+    @staticmethod
+    def _claims_valid(payload: dict[str, Any], now: float) -> bool:
+        for claim in ("exp", "nbf", "iat"):
+            value = payload.get(claim)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, int | float)):
+                return False
+        if payload.get("exp") is not None and now > payload["exp"]:
+            return False
+        if payload.get("nbf") is not None and now < payload["nbf"]:
+            return False
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._verified.clear()
+
+
+_verifiers: dict[str, TokenVerifier] = {}
+_custom_verifier: TokenVerifier | None = None
+
+
+def _verifier_named(name: str) -> TokenVerifier:
+    verifier = _verifiers.get(name)
+    if verifier is None:
+        if name not in ("native", "jose"):
+            raise ValueError(f"Unknown JWT_VERIFIER {name!r} (expected 'native' or 'jose')")
+        verifier = _verifiers.setdefault(name, NativeVerifier() if name == "native" else JoseVerifier())
+    return verifier
+
+
+def get_token_verifier() -> TokenVerifier:
+    """The verifier installed with set_token_verifier(), else the one named by JWT_VERIFIER."""
+    return _custom_verifier or _verifier_named(settings.JWT_VERIFIER)
+
+
+def set_token_verifier(verifier: TokenVerifier | None) -> None:
+    """Install a custom verifier (None restores JWT_VERIFIER)."""
+    global _custom_verifier
+    _custom_verifier = verifier
+
+
 def decode_access_token(token: str, secret: str, algorithm: str) -> dict[str, Any] | None:
     """Decode and validate a JWT access token. Returns payload if valid, None otherwise."""
-    try:
-        payload = jwt.decode(token, secret, algorithms=[algorithm])
-        return cast(dict[str, Any] | None, payload)
-    except JWTError:
-        return None
+    return get_token_verifier().decode(token, secret, algorithm)
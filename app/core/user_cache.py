@@ -0,0 +1,99 @@
+"""
+Short-lived in-process cache of the authenticated user, keyed by user id.
+
+Every authenticated request used to load the whole users row (including the
+encrypted OAuth token columns) just to learn who is calling. The cache keeps a
+slim, read-only projection — enough for endpoints that only need the id or
+the role — for USER_CACHE_TTL_SECONDS.
+
+Staleness is bounded three ways:
+    - ORM updates and deletes of a User in this process drop its entry
+      (mapper events), so role changes or disconnects are seen at once;
+    - the entry carries token_version, compared with the "ver" claim of the
+      JWT: bumping User.token_version (password change) revokes older tokens;
+    - other worker processes only keep an entry for the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.models.user import User
+
+
+@dataclass(frozen=True)
+class CurrentPrincipal:
+    """What most endpoints need to know about the caller."""
+
+    id: int
+    email: str
+    role: str
+    token_version: int
+    last_seen_at: datetime | None = None
+
+
+_lock = threading.Lock()
+_entries: "OrderedDict[int, tuple[float, CurrentPrincipal]]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_cached_principal(user_id: int) -> CurrentPrincipal | None:
+    if not settings.USER_CACHE_ENABLED:
+        return None
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        stored_at, principal = entry
+        if time.monotonic() - stored_at > settings.USER_CACHE_TTL_SECONDS:
+            del _entries[user_id]
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(user_id)
+        _stats["hits"] += 1
+        return principal
+
+
+def cache_principal(principal: CurrentPrincipal) -> None:
+    if not settings.USER_CACHE_ENABLED:
+        return
+    with _lock:
+        _entries[principal.id] = (time.monotonic(), principal)
+        _entries.move_to_end(principal.id)
+        while len(_entries) > settings.USER_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def update_cached_last_seen(user_id: int, last_seen_at: datetime) -> None:
+    """Record a last_seen_at write without restarting the entry's TTL."""
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry is not None:
+            _entries[user_id] = (entry[0], replace(entry[1], last_seen_at=last_seen_at))
+
+
+def invalidate_user(user_id: int) -> None:
+    with _lock:
+        _entries.pop(user_id, None)
+
+
+def clear_user_cache() -> None:
+    with _lock:
+        _entries.clear()
+        _stats.update(hits=0, misses=0)
+
+
+def user_cache_stats() -> dict[str, int]:
+    with _lock:
+        return {"entries": len(_entries), **_stats}
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target: User) -> None:
+    invalidate_user(target.id)
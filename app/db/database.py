@@ -1,26 +1,20 @@
-from sqlalchemy import create_engine, inspect, text
-from sqlalchemy.orm import sessionmaker
+from collections.abc import Callable
+from contextlib import AbstractContextManager, contextmanager
+from typing import Any, TypeVar
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.db.pool import database_url, engine_options
 
 # Import Base and all models to ensure they're registered with Base.metadata
-# This MUST be done before calling Base.metadata.create_all()
-from app.models import Base, DetectionFeedback, User  # noqa: F401
-
-_db_url = settings.DATABASE_URL
-# Render (and some other hosts) provide "postgres://" but SQLAlchemy 2.0
-# only accepts "postgresql://".
-if _db_url.startswith("postgres://"):
-    _db_url = _db_url.replace("postgres://", "postgresql://", 1)
+# This MUST be done before creating tables (app.db.migrations)
+from app.models import Base, DetectionFeedback, Job, User  # noqa: F401
 
-if _db_url.startswith("sqlite"):
-    engine = create_engine(
-        _db_url,
-        connect_args={"check_same_thread": False},
-        future=True
-    )
-else:
-    engine = create_engine(_db_url, future=True, pool_pre_ping=True, pool_recycle=300)
+# Pool sizing, driver and PgBouncer options: see app.db.pool
+_db_url = database_url(settings.DATABASE_URL)
+engine = create_engine(_db_url, **engine_options(_db_url))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 
@@ -35,46 +29,28 @@ def get_db():
     finally:
         db.close()
 
-def init_db():
+T = TypeVar("T")
+SessionFactory = Callable[[], AbstractContextManager[Session]]
+
+def get_session_factory() -> SessionFactory:
     """
-    Initialize database by creating all tables.
-    Called on application startup.
+    Session dependency for async endpoints. Their blocking database work runs in
+    worker threads, so instead of sharing one request-scoped session between
+    threads each step opens its own: `with new_session() as db: ...`.
     """
-    Base.metadata.create_all(bind=engine)
+    return contextmanager(get_db)
 
-    # Lightweight migration for existing deployments that predate these columns.
-    with engine.begin() as connection:
-        user_columns = {col["name"] for col in inspect(connection).get_columns("users")}
-        if "profile_icon" not in user_columns:
-            connection.execute(text("ALTER TABLE users ADD COLUMN profile_icon VARCHAR(50)"))
-        if "gmail_oauth_token" not in user_columns:
-            connection.execute(text("ALTER TABLE users ADD COLUMN gmail_oauth_token TEXT"))
-        if "gmail_email" not in user_columns:
-            connection.execute(text("ALTER TABLE users ADD COLUMN gmail_email VARCHAR(255)"))
-        if "outlook_oauth_token" not in user_columns:
-            connection.execute(text("ALTER TABLE users ADD COLUMN outlook_oauth_token TEXT"))
-        if "outlook_email" not in user_columns:
-            connection.execute(text("ALTER TABLE users ADD COLUMN outlook_email VARCHAR(255)"))
+def in_session(new_session: SessionFactory, fn: Callable[..., T], *args: Any) -> T:
+    """Run fn(db, *args) with a session opened by the calling (worker) thread."""
+    with new_session() as db:
+        return fn(db, *args)
 
-        # Email table columns (added in v2) — keep try/except in case emails
-        # table doesn't exist yet on a brand-new deployment (create_all handles it).
-        try:
-            email_columns = {col["name"] for col in inspect(connection).get_columns("emails")}
-            if "category" not in email_columns:
-                connection.execute(text("ALTER TABLE emails ADD COLUMN category VARCHAR(20)"))
-            if "email_date" not in email_columns:
-                connection.execute(text("ALTER TABLE emails ADD COLUMN email_date VARCHAR(100)"))
-            if "provider" not in email_columns:
-                connection.execute(text("ALTER TABLE emails ADD COLUMN provider VARCHAR(20)"))
-            if "sender" not in email_columns:
-                connection.execute(text("ALTER TABLE emails ADD COLUMN sender VARCHAR(255)"))
+def init_db():
+    """
+    Check the schema version on application startup.
+    A single query when the schema is current; otherwise the pending
+    migrations run (DB_AUTO_MIGRATE) or startup fails (see app.db.migrations).
+    """
+    from app.db.migrations import ensure_schema
 
-            # Migrate from global unique on message_id → composite unique per (message_id, user_id).
-            # Drop the old single-column index (may or may not exist depending on deployment age).
-            connection.execute(text("DROP INDEX IF EXISTS ix_emails_message_id"))
-            connection.execute(text(
-                "CREATE UNIQUE INDEX IF NOT EXISTS uq_emails_message_id_user "
-                "ON emails (message_id, user_id)"
-            ))
-        except Exception:
-            pass
+    ensure_schema(engine, auto_migrate=settings.DB_AUTO_MIGRATE)
@@ -0,0 +1,151 @@
+"""
+Versioned schema migrations.
+
+The schema version is stored in the one-row `schema_version` table
+(app.models.schema_version). Process start-up (init_db) reads it with a single
+query; migrations only run when it is behind SCHEMA_VERSION — inline when
+DB_AUTO_MIGRATE is on, otherwise the process refuses to start and the
+migrations are run out-of-band before the deploy:
+
+    python -m app.cli migrate            # apply pending migrations
+    python -m app.cli migrate --status   # print the stored and expected versions
+
+How a database is brought up to date:
+    - empty database: tables are created from the models (create_all) and the
+      version is stamped at SCHEMA_VERSION; no migration runs;
+    - database from before versioning (tables, no schema_version): missing
+      tables are created, then every migration runs;
+    - versioned database: the migrations above its version run, in order.
+
+Migrations run in one transaction, under a Postgres advisory lock so that
+workers booting together do not race. Because create_all may already have
+built a table in its latest shape, migrations must tolerate changes that are
+already there (add_column_if_missing, CREATE ... IF NOT EXISTS).
+
+To change the schema: edit the model, append a Migration with the next
+version number to MIGRATIONS.
+"""
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from sqlalchemy import Connection, Engine, inspect, text
+from sqlalchemy.exc import DBAPIError
+
+from app.models import Base
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant identifying the migration lock (pg_advisory_xact_lock)
+_ADVISORY_LOCK_ID = 7_314_452_001
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def add_column_if_missing(connection: Connection, table: str, column: str, ddl: str) -> None:
+    """ALTER TABLE ... ADD COLUMN unless the column exists (`ddl` is the type and constraints)."""
+    columns = {col["name"] for col in inspect(connection).get_columns(table)}
+    if column not in columns:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _columns_before_versioning(connection: Connection) -> None:
+    """The columns init_db used to add on every start-up, for databases created before them."""
+    for column, ddl in (
+        ("profile_icon", "VARCHAR(50)"),
+        ("gmail_oauth_token", "TEXT"),
+        ("gmail_email", "VARCHAR(255)"),
+        ("outlook_oauth_token", "TEXT"),
+        ("outlook_email", "VARCHAR(255)"),
+        ("last_seen_at", "TIMESTAMP WITH TIME ZONE"),
+        ("gmail_history_id", "VARCHAR(32)"),
+        ("gmail_watch_expires_at", "TIMESTAMP WITH TIME ZONE"),
+        ("outlook_subscription_id", "VARCHAR(64)"),
+        ("outlook_subscription_expires_at", "TIMESTAMP WITH TIME ZONE"),
+        ("outlook_delta_link", "TEXT"),
+        ("token_version", "INTEGER NOT NULL DEFAULT 0"),
+    ):
+        add_column_if_missing(connection, "users", column, ddl)
+
+    for column, ddl in (
+        ("category", "VARCHAR(20)"),
+        ("email_date", "VARCHAR(100)"),
+        ("provider", "VARCHAR(20)"),
+        ("sender", "VARCHAR(255)"),
+        ("extraction_version", "VARCHAR(50)"),
+    ):
+        add_column_if_missing(connection, "emails", column, ddl)
+
+    # Global unique on message_id → composite unique per (message_id, user_id)
+    connection.execute(text("DROP INDEX IF EXISTS ix_emails_message_id"))
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_emails_message_id_user ON emails (message_id, user_id)"
+    ))
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "Columns and indexes added before versioned migrations", _columns_before_versioning),
+]
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(connection: Connection) -> int | None:
+    """The stored schema version; None when the database is not versioned yet."""
+    try:
+        with connection.begin_nested():
+            return connection.execute(text("SELECT version FROM schema_version")).scalar()
+    except DBAPIError:
+        return None
+
+
+def _stamp(connection: Connection, version: int) -> None:
+    connection.execute(text("DELETE FROM schema_version"))
+    connection.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
+
+
+def migrate(engine: Engine) -> tuple[int | None, int]:
+    """Bring the schema to SCHEMA_VERSION. Returns (version before, version after)."""
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _ADVISORY_LOCK_ID})
+        before = current_version(connection)
+        if before is not None and before >= SCHEMA_VERSION:
+            return before, before
+
+        if before is None:
+            fresh = not inspect(connection).has_table("users")
+            Base.metadata.create_all(bind=connection)
+            if fresh:
+                _stamp(connection, SCHEMA_VERSION)
+                logger.info("Created schema at version %d", SCHEMA_VERSION)
+                return None, SCHEMA_VERSION
+
+        for migration in MIGRATIONS:
+            if before is None or migration.version > before:
+                logger.info("Applying migration %d: %s", migration.version, migration.description)
+                migration.apply(connection)
+        _stamp(connection, SCHEMA_VERSION)
+    return before, SCHEMA_VERSION
+
+
+class SchemaOutOfDateError(RuntimeError):
+    """The database schema is behind the code and DB_AUTO_MIGRATE is off."""
+
+
+def ensure_schema(engine: Engine, auto_migrate: bool) -> None:
+    """Start-up check: one version read, migrating (or refusing to start) only when behind."""
+    with engine.connect() as connection:
+        version = current_version(connection)
+    if version is not None and version >= SCHEMA_VERSION:
+        return
+    if not auto_migrate:
+        raise SchemaOutOfDateError(
+            f"Database schema is at version {version}, the code expects {SCHEMA_VERSION}: "
+            "run `python -m app.cli migrate` first"
+        )
+    migrate(engine)
@@ -0,0 +1,137 @@
+"""
+Connection pool with checkout metrics, and the engine options built from settings.
+
+Every checkout goes through InstrumentedQueuePool._do_get, which records how
+long the caller waited (queueing for a free connection plus opening a new one)
+and counts the checkouts that gave up after DB_POOL_TIMEOUT. With the pool's
+own gauges (size, checked out, overflow) this is what sizing DB_POOL_SIZE and
+DB_MAX_OVERFLOW against the server's connection limit needs: a growing wait
+time or any timeouts mean the pool is too small for the load; a pool that never
+leaves `size` connections checked out can shrink. See pool_stats().
+
+PostgreSQL drivers (DB_DRIVER):
+    psycopg2  the default (postgresql:// URLs).
+    psycopg   psycopg 3 (postgresql+psycopg://). Statements executed
+              DB_PREPARE_THRESHOLD times on a connection are prepared
+              server-side.
+
+DB_PGBOUNCER=true is for a transaction-pooling PgBouncer in front of the
+database (e.g. Neon's "-pooler" endpoint): server-side prepared statements are
+off because consecutive transactions may run on different server connections.
+"""
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.waiting = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def _waited(self, seconds: float) -> None:
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "waiting": self.waiting,
+                "wait_ms_avg": round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times each checkout. Metrics start over when the pool is recreated (dispose)."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        metrics = self.metrics
+        with metrics._lock:
+            metrics.waiting += 1
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            with metrics._lock:
+                metrics.timeouts += 1
+                metrics._waited(time.perf_counter() - started)
+            raise
+        finally:
+            with metrics._lock:
+                metrics.waiting -= 1
+        with metrics._lock:
+            metrics.checkouts += 1
+            metrics._waited(time.perf_counter() - started)
+        return record
+
+
+def database_url(url: str) -> str:
+    """Normalise DATABASE_URL and select the PostgreSQL driver (DB_DRIVER)."""
+    # Render (and some other hosts) provide "postgres://" but SQLAlchemy 2.0
+    # only accepts "postgresql://".
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    if settings.DB_DRIVER not in ("psycopg2", "psycopg"):
+        raise ValueError(f"Unknown DB_DRIVER {settings.DB_DRIVER!r} (expected 'psycopg2' or 'psycopg')")
+    if settings.DB_DRIVER == "psycopg" and url.startswith("postgresql://"):
+        url = url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
+
+
+def engine_options(url: str) -> dict[str, Any]:
+    """create_engine() keyword arguments for a normalised URL."""
+    if url.startswith("sqlite"):
+        options: dict[str, Any] = {"connect_args": {"check_same_thread": False}, "future": True}
+        if ":memory:" in url or url.rstrip("/") == "sqlite:":
+            return options  # in-memory databases keep SQLAlchemy's single-connection pool
+    else:
+        options = {
+            "future": True,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+            "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        }
+        if url.startswith("postgresql+psycopg:"):
+            # psycopg 3: None disables server-side prepared statements
+            prepare_threshold = None if settings.DB_PGBOUNCER else settings.DB_PREPARE_THRESHOLD
+            options["connect_args"] = {"prepare_threshold": prepare_threshold}
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    )
+    return options
+
+
+def pool_stats(engine: Engine) -> dict[str, Any]:
+    """Gauges and checkout metrics of an engine's pool (GET /ready)."""
+    pool = engine.pool
+    stats: dict[str, Any] = {"pool": type(pool).__name__}
+    for counter in ("size", "checkedout", "overflow"):
+        if hasattr(pool, counter):
+            stats[counter] = getattr(pool, counter)()
+    if isinstance(pool, InstrumentedQueuePool):
+        stats["max_overflow"] = pool._max_overflow
+        stats.update(pool.metrics.snapshot())
+    return stats
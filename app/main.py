@@ -1,8 +1,9 @@
+import hmac
 import os
 
-import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 
 # Imports des routers
@@ -10,18 +11,18 @@ from app.api.endpoints.calendar import router as calendar_router
 from app.api.endpoints.emails import router as email_router
 from app.api.endpoints.prediction import router as prediction_router
 from app.api.endpoints.suggestion import router as suggestion_router
+from app.api.routes.admin import router as admin_router
 from app.api.routes.auth_google import router as google_auth_router
 from app.api.routes.auth_microsoft import router as microsoft_auth_router
 from app.api.routes.detection import router as detection_router
 from app.api.routes.users import router as user_router
+from app.api.routes.webhooks import router as webhooks_router
 from app.core.config import settings
-from app.db.database import engine, init_db
-from app.models import Base
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.db.database import init_db
 
-# 1. Création des tables
-Base.metadata.create_all(bind=engine)
-
-# 2. Configuration de l'application
+# 1. Configuration de l'application
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=(
@@ -44,10 +45,12 @@ app = FastAPI(
         {"name": "suggestion", "description": "AI-generated email response suggestions."},
         {"name": "calendar", "description": "One-click calendar event creation (Google, Apple, Outlook)."},
         {"name": "auth", "description": "OAuth flows — Microsoft/Outlook account connection."},
+        {"name": "webhooks", "description": "Provider push notifications (Gmail Pub/Sub, Microsoft Graph)."},
+        {"name": "admin", "description": "Admin-only diagnostics (request profiles)."},
     ],
 )
 
-# 3. Middleware CORS
+# 2. Middleware CORS
 ALLOWED_ORIGINS = [
     "http://localhost:5173",
     "http://localhost:3000",
@@ -70,20 +73,39 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Opt-in per-request profiles (X-Iris-Profile header or PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware)
+# Request latency and SQL statements per route, exported at GET /metrics
+app.add_middleware(MetricsMiddleware)
 
-# 4. Événement de démarrage
+# 3. Événement de démarrage
 @app.on_event("startup")
 def startup_event():
     init_db()
     # Pre-warm the spaCy NLP model so the first /emails/feed request doesn't pay
-    # the 10-30s cold-start cost of loading the model under live traffic.
+    # the 10-30s cold-start cost of loading the model under live traffic. In the
+    # default "background" mode /health answers while it loads (see /health/nlp).
     try:
-        from app.services.detection import _get_extractor
-        _get_extractor()
+        from app.services.detection import start_nlp_preload
+        start_nlp_preload(settings.NLP_PRELOAD)
     except Exception:
         pass  # Never block startup if model loading fails
+    if settings.FEED_BROKER == "postgres":
+        # Fail at startup, not on the first /emails/events, if the broker cannot work
+        from app.services.feed_events import get_feed_broker
+        get_feed_broker()
+    if settings.JOB_EMBEDDED_WORKER:
+        from app.workers.job_worker import start_embedded_worker
+        start_embedded_worker()
+
 
-# 5. Inclusion des Routes
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Close the pooled Graph AsyncClient shared by the async email endpoints
+    from app.services.outlook_email_service import close_async_client
+    await close_async_client()
+
+# 4. Inclusion des Routes
 app.include_router(user_router, prefix="/api/v1", tags=["users"])
 app.include_router(detection_router, prefix="/api/v1", tags=["detection"])
 app.include_router(email_router, prefix="/api/v1", tags=["emails"])
@@ -92,12 +114,14 @@ app.include_router(suggestion_router, prefix="/api/v1", tags=["suggestions"])
 app.include_router(calendar_router, prefix="/api/v1", tags=["calendar"])
 app.include_router(google_auth_router, prefix="/api/v1", tags=["auth"])
 app.include_router(microsoft_auth_router, prefix="/api/v1", tags=["auth"])
+app.include_router(webhooks_router, prefix="/api/v1", tags=["webhooks"])
+app.include_router(admin_router, prefix="/api/v1", tags=["admin"])
 
-# 6. Fichiers statiques
+# 5. Fichiers statiques
 if os.path.exists("app/static"):
     app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
-# 7. Endpoints de base
+# 6. Endpoints de base
 @app.get("/", tags=["system"])
 async def root():
     return {"message": "Bienvenue sur l'API Iris - Le pipeline est opérationnel !"}
@@ -106,5 +130,44 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/nlp", tags=["system"])
+async def nlp_health():
+    """NLP model readiness: 503 while the start-up preload is still running."""
+    from app.services.detection import nlp_readiness
+    readiness = nlp_readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+@app.get("/ready", tags=["system"])
+def readiness_check():
+    """Readiness: NLP model loaded and warmed up, database reachable (503 otherwise)."""
+    from app.services.readiness import readiness
+    report = readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/metrics", tags=["system"], include_in_schema=False)
+def metrics(authorization: str | None = Header(default=None)):
+    """Prometheus scrape endpoint (see app.core.metrics)."""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    if settings.METRICS_TOKEN and not (
+        authorization and hmac.compare_digest(authorization, f"Bearer {settings.METRICS_TOKEN}")
+    ):
+        return Response(status_code=401)
+    from app.core.metrics import render_metrics
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health/page-cache", tags=["system"])
+async def page_cache_health():
+    """Feed page cache hit ratio per provider (see app.services.page_cache)."""
+    from app.services.page_cache import page_cache_stats
+    return page_cache_stats()
+
+@app.get("/.well-known/jwks.json", tags=["system"])
+async def jwks():
+    """Public keys verifying RS256/EdDSA access tokens, by kid (see app.core.jwks)."""
+    from app.core.jwks import public_jwks
+    return public_jwks()
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
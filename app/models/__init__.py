@@ -2,6 +2,9 @@
 from app.models.base import Base
 from app.models.email import Email
 from app.models.feedback import DetectionFeedback
+from app.models.job import Job
+from app.models.oauth_pkce import OAuthPKCEVerifier
+from app.models.schema_version import SchemaVersion
 from app.models.user import User
 
-__all__ = ["Base", "Email", "DetectionFeedback", "User"]
+__all__ = ["Base", "Email", "DetectionFeedback", "Job", "OAuthPKCEVerifier", "SchemaVersion", "User"]
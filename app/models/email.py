@@ -1,4 +1,8 @@
-from sqlalchemy import JSON, Column, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import JSON, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
 from app.models.base import Base  # Fix: was circular import via app.models
@@ -11,34 +15,35 @@ class Email(Base):
     )
 
     # Identifiants techniques
-    id = Column(Integer, primary_key=True, index=True)
-    message_id = Column(String, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    message_id: Mapped[str | None] = mapped_column(String, index=True)
+    user_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("users.id"))
 
     # Contenu brut de l'email
-    subject = Column(String)
-    body = Column(Text)
-    sender = Column(String, nullable=True)
-    received_at = Column(DateTime, server_default=func.now())
+    subject: Mapped[str | None] = mapped_column(String)
+    body: Mapped[str | None] = mapped_column(Text)
+    sender: Mapped[str | None] = mapped_column(String, nullable=True)
+    received_at: Mapped[datetime | None] = mapped_column(DateTime, server_default=func.now())
 
     # Etape 1 : Detection & Extraction
-    extraction_data = Column(JSON, nullable=True)
-    summary = Column(Text, nullable=True)
+    extraction_data: Mapped[dict[str, Any] | None] = mapped_column(JSON, nullable=True)
+    extraction_version: Mapped[str | None] = mapped_column(String(50), nullable=True)  # Extractor version that produced extraction_data
+    summary: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     # Etape 2 : Planification (Les creneaux suggeres)
-    predicted_slots = Column(JSON, nullable=True)
+    predicted_slots: Mapped[list[dict[str, Any]] | None] = mapped_column(JSON, nullable=True)
 
     # Etape 3 : Suggestion (Le texte final genere pour la reponse)
-    generated_suggestion = Column(Text, nullable=True)
+    generated_suggestion: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     # Statut pour le suivi du workflow
-    status = Column(String, default="pending")
+    status: Mapped[str | None] = mapped_column(String, default="pending")
 
     # Email metadata persisted from provider
-    email_date = Column(String(100), nullable=True)   # Date header value from the email
-    category = Column(String(20), nullable=True)       # UI tab: rdv|action|attente|bonsplans|info
-    provider = Column(String(20), nullable=True)       # "gmail" | "outlook"
+    email_date: Mapped[str | None] = mapped_column(String(100), nullable=True)   # Date header value from the email
+    category: Mapped[str | None] = mapped_column(String(20), nullable=True)       # UI tab: rdv|action|attente|bonsplans|info
+    provider: Mapped[str | None] = mapped_column(String(20), nullable=True)       # "gmail" | "outlook"
 
     # Calendar integration
-    calendar_event_id = Column(String, nullable=True)
-    calendar_event_ids = Column(JSON, nullable=True)
+    calendar_event_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    calendar_event_ids: Mapped[dict[str, str] | None] = mapped_column(JSON, nullable=True)
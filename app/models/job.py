@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, DateTime, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin
+
+
+class Job(Base, TimestampMixin):
+    """A unit of background work (inbox sync, detection, prediction) leased by a worker."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_claim", "status", "priority", "run_after"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(50))
+    # "sync_emails" | "detect_emails" | "predict_email"
+    user_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    provider: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    # "gmail" | "outlook" — used for per-provider concurrency limits; None for NLP-only jobs
+    payload: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
+    status: Mapped[str] = mapped_column(String(20), default="queued", index=True)
+    # "queued" | "running" | "done" | "failed"
+    priority: Mapped[int] = mapped_column(Integer, default=0)
+    # Higher runs first
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=5)
+    run_after: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    locked_by: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # Collapses duplicate enqueues while a job with the same key is still pending
+    dedupe_key: Mapped[str | None] = mapped_column(String(255), nullable=True, index=True)
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class OAuthPKCEVerifier(Base):
+    """PKCE code_verifier of a pending Google OAuth flow, keyed by the state nonce (single use)."""
+
+    __tablename__ = "oauth_pkce_verifiers"
+
+    nonce: Mapped[str] = mapped_column(String(64), primary_key=True)
+    code_verifier: Mapped[str] = mapped_column(String(128))
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
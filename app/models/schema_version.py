@@ -0,0 +1,12 @@
+from sqlalchemy import Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class SchemaVersion(Base):
+    """Single row holding the applied migration version (see app.db.migrations)."""
+
+    __tablename__ = "schema_version"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
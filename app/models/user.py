@@ -1,4 +1,6 @@
-from sqlalchemy import JSON, Boolean, Integer, String, Text
+from datetime import datetime
+
+from sqlalchemy import JSON, Boolean, DateTime, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base, TimestampMixin
@@ -17,6 +19,8 @@ class User(Base, TimestampMixin):
     bank_account_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     oauth_provider: Mapped[str | None] = mapped_column(String(50), nullable=True)
     require_password_reset: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    # Embedded in access tokens as "ver"; bumping it revokes every token issued before
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     # Calendar integration
     calendar_provider: Mapped[str | None] = mapped_column(String(20), nullable=True)
@@ -25,15 +29,26 @@ class User(Base, TimestampMixin):
     # List of active providers e.g. ["google", "apple", "outlook"]
     apple_caldav_user: Mapped[str | None] = mapped_column(String(255), nullable=True)
     # Apple ID email address (e.g. dan@icloud.com)
-    apple_caldav_password: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    apple_caldav_password: Mapped[str | None] = mapped_column(String(500), nullable=True, deferred=True)
     # App Password from appleid.apple.com — stored Fernet-encrypted
 
-    # Gmail OAuth — stored Fernet-encrypted
-    gmail_oauth_token: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Gmail OAuth — stored Fernet-encrypted. Secret columns are deferred: loading a
+    # User does not fetch them until they are accessed.
+    gmail_oauth_token: Mapped[str | None] = mapped_column(Text, nullable=True, deferred=True)
     gmail_email: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # Gmail push notifications (users.watch): last synced historyId and watch expiry
+    gmail_history_id: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    gmail_watch_expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     # Outlook OAuth — stored Fernet-encrypted
-    outlook_oauth_token: Mapped[str | None] = mapped_column(Text, nullable=True)
+    outlook_oauth_token: Mapped[str | None] = mapped_column(Text, nullable=True, deferred=True)
     outlook_email: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # Graph change-notification subscription on the Inbox and the delta query resume point
+    outlook_subscription_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    outlook_subscription_expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    outlook_delta_link: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # Last authenticated request (coarse, see app.core.auth) — drives inbox pre-fetch
+    last_seen_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
 
@@ -1,6 +1,9 @@
 import re
+import threading
 from datetime import datetime
 
+from app.core.metrics import stage_timer
+from app.nlp.textnorm import normalize_for_nlp
 from app.schemas.detection import (
     Classification,
     EmailInput,
@@ -10,6 +13,10 @@ from app.schemas.detection import (
     TimeWindow,
 )
 
+# Bump whenever the rules below change in a way that alters extraction output:
+# stored Email.extraction_data stamped with an older version is re-detected.
+EXTRACTOR_VERSION = "2"
+
 SCHEDULE_EN = re.compile(
     r"\b(meeting|appointment|réunion|"
     r"(?:prendre?|fixer|planifier|notre|votre|un)\s+rendez-vous|"
@@ -128,8 +135,7 @@ def _classify_with_spacy(text: str, nlp) -> tuple[str, float]:
     return "info", 0.3
 
 
-def _classify(text: str, nlp=None) -> tuple[Classification, float]:
-    # Layer 1: Regex — fast, high-confidence keyword matching
+def _classify_with_regex(text: str) -> tuple[Classification, float] | None:
     if CANCEL_EN.search(text):
         return "meeting_cancel", 0.9
     if RESCHEDULE_EN.search(text):
@@ -142,10 +148,20 @@ def _classify(text: str, nlp=None) -> tuple[Classification, float]:
         return "attente", 0.7
     if ACTION_RE.search(text):
         return "action", 0.7
+    return None
+
+
+def _classify(text: str, nlp=None) -> tuple[Classification, float]:
+    # Layer 1: Regex — fast, high-confidence keyword matching
+    with stage_timer("nlp.regex"):
+        result = _classify_with_regex(text)
+    if result is not None:
+        return result
     # Layer 2: spaCy NER + morphology for remaining emails
     if nlp is not None:
         try:
-            return _classify_with_spacy(text, nlp)
+            with stage_timer("nlp.spacy"):
+                return _classify_with_spacy(text, nlp)
         except Exception:
             pass
     return "info", 0.3
@@ -271,27 +287,33 @@ class EmailExtractor:
     def __init__(self, model_name: str = "fr_core_news_sm") -> None:
         self._model_name = model_name
         self._nlp = None
+        self._nlp_lock = threading.Lock()
 
     @property
     def nlp(self):
         if self._nlp is None:
-            self._nlp = _load_nlp(self._model_name)
+            # Requests arriving during a background preload wait for it instead of loading twice
+            with self._nlp_lock:
+                if self._nlp is None:
+                    self._nlp = _load_nlp(self._model_name)
         return self._nlp
 
     def extract(self, email: EmailInput) -> ExtractionResult:
-        text = f"{email.subject}\n{email.body}".strip()
+        text = normalize_for_nlp(email.body, subject=email.subject)
         if not text:
             return ExtractionResult(classification="info", confidence=0.0)
 
         classification, base_conf = _classify(text, self.nlp)
-        proposed_times = _extract_times(text)
-        duration_minutes = _extract_duration_minutes(text)
-        timezone = _extract_timezone(text)
-        meeting_link, link_platform = _extract_meeting_link(text)
-        modality = _extract_modality(text, link_platform)
-        participants = _extract_participants(text)
+        with stage_timer("nlp.dateparser"):
+            proposed_times = _extract_times(text)
+        with stage_timer("nlp.fields"):
+            duration_minutes = _extract_duration_minutes(text)
+            timezone = _extract_timezone(text)
+            meeting_link, link_platform = _extract_meeting_link(text)
+            modality = _extract_modality(text, link_platform)
+            participants = _extract_participants(text)
+            thread_status = _thread_status(text)
         organizer = participants[0] if participants else None
-        thread_status = _thread_status(text)
 
         needs_clarification = (
             classification == "meeting_schedule"
@@ -0,0 +1,237 @@
+"""
+Pluggable LLM backends for the detection fallback and reply suggestions.
+
+Callers send one user prompt plus a JSON response schema and get back the raw
+JSON text of the answer (or None). Backends (settings.LLM_BACKEND):
+
+    openai  OpenAI chat completions through the official SDK. With LLM_BASE_URL
+            set, the same client talks to any OpenAI-compatible server instead
+            (llama.cpp `llama-server`, vLLM, Ollama, or the stand-in in
+            benchmarks/llm_standin.py), so the fallback runs without external calls.
+    stub    in-process canned answers after LLM_STUB_LATENCY_SECONDS; no network.
+
+Clients are created once and reused, so HTTP connections are pooled (up to
+LLM_MAX_CONNECTIONS). Async calls run on one long-lived background event loop
+(run_async from sync code, run_on_llm_loop from request handlers) so the async
+connection pool is not tied to a short-lived loop and survives from batch to batch.
+
+Custom backends subclass LLMBackend and are installed with set_llm_backend().
+"""
+import asyncio
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Coroutine
+from concurrent.futures import Future
+from typing import Any, cast
+
+from app.core.config import settings
+
+
+class LLMBackend(ABC):
+    """One chat completion with a JSON-schema response format."""
+
+    @property
+    @abstractmethod
+    def cache_namespace(self) -> str:
+        """Identifies the model behind the backend in response-cache keys."""
+
+    @abstractmethod
+    def complete_json(self, prompt: str, response_format: dict) -> str | None: ...
+
+    async def acomplete_json(self, prompt: str, response_format: dict) -> str | None:
+        return await asyncio.to_thread(self.complete_json, prompt, response_format)
+
+    async def aclose(self) -> None:
+        """Release pooled connections."""
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI SDK client, optionally pointed at an OpenAI-compatible server (base_url)."""
+
+    def __init__(self, base_url: str | None = None, api_key: str | None = None, model: str | None = None) -> None:
+        self._base_url = base_url
+        self._api_key = api_key
+        self._model = model
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str | None:
+        return self._base_url if self._base_url is not None else settings.LLM_BASE_URL
+
+    @property
+    def api_key(self) -> str | None:
+        # Local servers accept any key, but the SDK refuses to start without one
+        return self._api_key or settings.OPENAI_API_KEY or ("not-needed" if self.base_url else None)
+
+    @property
+    def model(self) -> str:
+        return self._model or settings.OPENAI_MODEL
+
+    @property
+    def cache_namespace(self) -> str:
+        return f"{self.base_url or 'openai'}|{self.model}"
+
+    def _http_client_kwargs(self, async_: bool) -> dict[str, Any]:
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+        )
+        http_client = (httpx.AsyncClient if async_ else httpx.Client)(limits=limits)
+        return {
+            "api_key": self.api_key,
+            "base_url": self.base_url,
+            "timeout": settings.LLM_CALL_TIMEOUT_SECONDS,
+            "http_client": http_client,
+        }
+
+    @property
+    def client(self):
+        if self._client is None and self.api_key:
+            with self._lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    self._client = OpenAI(**self._http_client_kwargs(async_=False))
+        return self._client
+
+    @property
+    def async_client(self):
+        """AsyncOpenAI client; only use it from run_async() so it stays on one event loop."""
+        if self._async_client is None and self.api_key:
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(**self._http_client_kwargs(async_=True))
+        return self._async_client
+
+    def complete_json(self, prompt: str, response_format: dict) -> str | None:
+        if self.client is None:
+            return None
+        resp = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            response_format=response_format,
+        )
+        return cast(str | None, resp.choices[0].message.content)
+
+    async def acomplete_json(self, prompt: str, response_format: dict) -> str | None:
+        if self.async_client is None:
+            return None
+        resp = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            response_format=response_format,
+        )
+        return cast(str | None, resp.choices[0].message.content)
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+
+class StubBackend(LLMBackend):
+    """Offline backend: a fixed answer per response schema after a configurable delay.
+
+    Extraction patches come back as {"classification": "info"}; any other schema
+    gets an empty object unless an answer is registered for its name.
+    """
+
+    def __init__(self, latency_seconds: float | None = None, answers: dict[str, dict] | None = None) -> None:
+        self.latency_seconds = latency_seconds if latency_seconds is not None else settings.LLM_STUB_LATENCY_SECONDS
+        self.answers = {"extraction_patch": {"classification": "info"}, **(answers or {})}
+        self.calls = 0
+
+    @property
+    def cache_namespace(self) -> str:
+        return "stub"
+
+    def _answer(self, response_format: dict) -> str:
+        self.calls += 1
+        name = (response_format.get("json_schema") or {}).get("name", "")
+        return json.dumps(self.answers.get(name, {}))
+
+    def complete_json(self, prompt: str, response_format: dict) -> str | None:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self._answer(response_format)
+
+    async def acomplete_json(self, prompt: str, response_format: dict) -> str | None:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self._answer(response_format)
+
+
+_backend: LLMBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def llm_enabled() -> bool:
+    """True when the configured backend can answer (OpenAI needs a key or a local base URL)."""
+    if settings.LLM_BACKEND == "stub" or (_backend is not None and not isinstance(_backend, OpenAIBackend)):
+        return True
+    return bool(settings.OPENAI_API_KEY or settings.LLM_BASE_URL)
+
+
+def get_llm_backend() -> LLMBackend:
+    """Return the process-wide backend selected by settings.LLM_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = StubBackend() if settings.LLM_BACKEND == "stub" else OpenAIBackend()
+    return _backend
+
+
+def llm_backend_status() -> dict[str, Any]:
+    """Configured backend and whether its SDK client exists yet (GET /ready); never creates it."""
+    backend = _backend
+    status: dict[str, Any] = {
+        "enabled": llm_enabled(),
+        "backend": type(backend).__name__ if backend is not None else None,
+    }
+    if isinstance(backend, OpenAIBackend):
+        status["client"] = backend._client is not None or backend._async_client is not None
+    return status
+
+
+def set_llm_backend(backend: LLMBackend | None) -> None:
+    """Install a backend (custom implementation or tests). None resets to the configured default."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+class _LoopThread:
+    """A daemon thread running one event loop for the async LLM calls of the process."""
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-loop", daemon=True)
+        self.thread.start()
+
+
+_loop_thread: _LoopThread | None = None
+_loop_lock = threading.Lock()
+
+
+def _submit(coro: Coroutine) -> Future:
+    global _loop_thread
+    with _loop_lock:
+        if _loop_thread is None or not _loop_thread.thread.is_alive():
+            _loop_thread = _LoopThread()
+        loop = _loop_thread.loop
+    return asyncio.run_coroutine_threadsafe(coro, loop)
+
+
+def run_async(coro: Coroutine) -> Any:
+    """Run a coroutine on the shared LLM event loop and wait for its result (from sync code)."""
+    return _submit(coro).result()
+
+
+async def run_on_llm_loop(coro: Coroutine) -> Any:
+    """Await a coroutine on the shared LLM event loop from another event loop (e.g. a request)."""
+    return await asyncio.wrap_future(_submit(coro))
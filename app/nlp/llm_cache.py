@@ -0,0 +1,158 @@
+"""
+Response cache with in-flight coalescing for the LLM fallback.
+
+The same newsletter or notification often reaches many users, and each copy
+falls below the confidence threshold in the same way. The LLM answer depends
+only on the prompt, the model and the response schema, so it is cached under a
+hash of those three: later copies reuse it without a paid API call.
+
+Concurrent requests for a key that is already being fetched do not start a
+second call; they wait for the first one and share its result. Failed calls
+are not cached (every waiter sees the exception, the next request retries).
+
+Entries are kept in process memory, bounded by LLM_CACHE_MAX_ENTRIES (LRU) and
+LLM_CACHE_TTL_SECONDS.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+from typing import Any
+
+from app.core.config import settings
+
+
+def cache_key(model: str, schema: dict, prompt: str) -> str:
+    """Hash of everything the LLM answer depends on."""
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(schema, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """Thread-safe TTL/LRU cache whose get_or_call() coalesces concurrent misses."""
+
+    def __init__(self, max_entries: int | None = None, ttl_seconds: float | None = None) -> None:
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def max_entries(self) -> int:
+        return self._max_entries if self._max_entries is not None else settings.LLM_CACHE_MAX_ENTRIES
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self._ttl_seconds if self._ttl_seconds is not None else settings.LLM_CACHE_TTL_SECONDS
+
+    def _get_locked(self, key: str) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """Return (found, value)."""
+        with self._lock:
+            return self._get_locked(key)
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _claim(self, key: str) -> tuple[Future, bool]:
+        """(future, owner): a resolved future on a cache hit, else the in-flight future to wait on or to fulfil."""
+        with self._lock:
+            found, value = self._get_locked(key)
+            if found:
+                self.hits += 1
+                hit: Future = Future()
+                hit.set_result(value)
+                return hit, False
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            self.misses += 1
+            return future, True
+
+    def get_or_call(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Return the cached value for key, or call fn() once for all concurrent callers."""
+        future, owner = self._claim(key)
+        if not owner:
+            return future.result()
+
+        try:
+            value = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_call(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async get_or_call: coalesces with other tasks and with threads using get_or_call."""
+        future, owner = self._claim(key)
+        if not owner:
+            if future.done():  # cache hit: no event-loop round-trip
+                return future.result()
+            return await asyncio.wrap_future(future)
+
+        try:
+            value = await fn()
+        except asyncio.CancelledError:
+            # Waiters must not hang on a call abandoned by its owner (time budget)
+            future.set_exception(TimeoutError("LLM call cancelled"))
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
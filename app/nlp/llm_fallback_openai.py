@@ -1,6 +1,14 @@
+import asyncio
 import json
+import logging
+import time
+from typing import cast
 
 from app.core.config import settings
+from app.core.metrics import stage_timer
+from app.nlp.llm_backend import LLMBackend, get_llm_backend, llm_enabled, run_async
+from app.nlp.llm_cache import LLMResponseCache, cache_key
+from app.nlp.textnorm import normalize_for_nlp
 from app.schemas.detection import (
     EmailInput,
     ExtractionResult,
@@ -8,6 +16,8 @@ from app.schemas.detection import (
     TimeWindow,
 )
 
+logger = logging.getLogger(__name__)
+
 
 def _merge_patch(partial: ExtractionResult, patch: dict) -> ExtractionResult:
     data = partial.model_dump()
@@ -35,77 +45,163 @@ def _merge_patch(partial: ExtractionResult, patch: dict) -> ExtractionResult:
     return merged
 
 
+_PATCH_SCHEMA: dict = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "extraction_patch",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "classification": {
+                    "type": "string",
+                    "enum": [
+                        "meeting_schedule", "meeting_cancel", "meeting_reschedule",
+                        "action", "attente", "bonsplans", "info",
+                    ],
+                },
+                "timezone": {"type": "string"},
+                "duration_minutes": {"type": "integer"},
+                "proposed_times": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "start": {"type": "string"},
+                            "end": {"type": "string"},
+                            "timezone": {"type": "string"},
+                        },
+                    },
+                },
+            },
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Shared by every LLMFallbackOpenAI instance: identical emails across users hit the same entry
+_response_cache = LLMResponseCache()
+
+
+def get_response_cache() -> LLMResponseCache:
+    return _response_cache
+
+
+def _build_prompt(email: EmailInput) -> str:
+    return (
+        "From this email, extract ONLY missing or incorrect fields. "
+        "Return a JSON object with only the fields you can fill or correct:\n"
+        "- classification: one of meeting_schedule, meeting_cancel, meeting_reschedule, "
+        "action (requires reader to act), attente (waiting on someone), "
+        "bonsplans (promo/discount), info (newsletter/FYI)\n"
+        "- timezone, duration_minutes, proposed_times (list of {start, end, timezone})\n"
+        "Do not include fields that are already correct or that you cannot infer.\n\n"
+        f"Subject: {email.subject[:200]}\nBody: {normalize_for_nlp(email.body, 1500)}"
+    )
+
+
 class LLMFallbackOpenAI:
-    def __init__(self) -> None:
-        self._client = None
+    """Fills in low-confidence extractions with an LLM (see app.nlp.llm_backend for the backends)."""
+
+    def __init__(self, backend: LLMBackend | None = None) -> None:
+        self._backend = backend
 
     @property
-    def client(self):
-        if self._client is None and settings.OPENAI_API_KEY:
-            from openai import OpenAI
-            self._client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        return self._client
+    def backend(self) -> LLMBackend:
+        return self._backend or get_llm_backend()
+
+    def _enabled(self) -> bool:
+        return self._backend is not None or llm_enabled()
+
+    def _cache_key(self, prompt: str) -> str:
+        return cache_key(self.backend.cache_namespace, _PATCH_SCHEMA, prompt)
+
+    def _request_patch(self, prompt: str) -> dict | None:
+        """One chat completion; the JSON patch, or None if the answer is unusable."""
+        with stage_timer("nlp.llm"):
+            content = self.backend.complete_json(prompt, _PATCH_SCHEMA)
+        return _parse_patch(content)
 
     def enhance(self, email: EmailInput, partial: ExtractionResult) -> ExtractionResult:
         if partial.confidence >= settings.LLM_CONFIDENCE_THRESHOLD:
             return partial
-        if not settings.OPENAI_API_KEY or not self.client:
+        if not self._enabled():
             return partial
         try:
-            schema = {
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "extraction_patch",
-                    "strict": True,
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "classification": {
-                                "type": "string",
-                                "enum": [
-                                    "meeting_schedule", "meeting_cancel", "meeting_reschedule",
-                                    "action", "attente", "bonsplans", "info",
-                                ],
-                            },
-                            "timezone": {"type": "string"},
-                            "duration_minutes": {"type": "integer"},
-                            "proposed_times": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "start": {"type": "string"},
-                                        "end": {"type": "string"},
-                                        "timezone": {"type": "string"},
-                                    },
-                                },
-                            },
-                        },
-                        "additionalProperties": False,
-                    },
-                },
-            }
-            prompt = (
-                "From this email, extract ONLY missing or incorrect fields. "
-                "Return a JSON object with only the fields you can fill or correct:\n"
-                "- classification: one of meeting_schedule, meeting_cancel, meeting_reschedule, "
-                "action (requires reader to act), attente (waiting on someone), "
-                "bonsplans (promo/discount), info (newsletter/FYI)\n"
-                "- timezone, duration_minutes, proposed_times (list of {start, end, timezone})\n"
-                "Do not include fields that are already correct or that you cannot infer.\n\n"
-                f"Subject: {email.subject[:200]}\nBody: {email.body[:1500]}"
-            )
-            resp = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                response_format=schema,
-            )
-            content = resp.choices[0].message.content
-            if not content:
-                return partial
-            patch = json.loads(content)
-            if not isinstance(patch, dict):
+            prompt = _build_prompt(email)
+            if settings.LLM_CACHE_ENABLED:
+                patch = _response_cache.get_or_call(self._cache_key(prompt), lambda: self._request_patch(prompt))
+            else:
+                patch = self._request_patch(prompt)
+            if not patch:
                 return partial
             return _merge_patch(partial, patch)
         except Exception:
             return partial
+
+    def enhance_many(self, pairs: list[tuple[EmailInput, ExtractionResult]]) -> list[ExtractionResult]:
+        """Batch variant of enhance for detect_batch.
+
+        Low-confidence emails are sent concurrently (at most LLM_MAX_CONCURRENCY
+        calls at a time, each bounded by LLM_CALL_TIMEOUT_SECONDS). Whatever has
+        not finished after LLM_BATCH_BUDGET_SECONDS keeps its regex/spaCy result.
+        Returns one result per pair, in order.
+        """
+        results = [partial for _, partial in pairs]
+        todo = [i for i, (_, partial) in enumerate(pairs) if partial.confidence < settings.LLM_CONFIDENCE_THRESHOLD]
+        if not todo or not self._enabled():
+            return results
+        patches = run_async(self._request_patches_async([_build_prompt(pairs[i][0]) for i in todo]))
+        for i, patch in zip(todo, patches, strict=True):
+            if patch:
+                try:
+                    results[i] = _merge_patch(results[i], patch)
+                except Exception:
+                    logger.warning("Discarding unusable LLM patch", exc_info=True)
+        return results
+
+    async def _request_patches_async(self, prompts: list[str]) -> list[dict | None]:
+        semaphore = asyncio.Semaphore(max(1, settings.LLM_MAX_CONCURRENCY))
+        backend = self.backend
+
+        async def call(prompt: str) -> dict | None:
+            async with semaphore:
+                with stage_timer("nlp.llm"):
+                    content = await asyncio.wait_for(
+                        backend.acomplete_json(prompt, _PATCH_SCHEMA), settings.LLM_CALL_TIMEOUT_SECONDS
+                    )
+            return _parse_patch(content)
+
+        async def one(prompt: str) -> dict | None:
+            if not settings.LLM_CACHE_ENABLED:
+                return await call(prompt)
+            patch = await _response_cache.aget_or_call(self._cache_key(prompt), lambda: call(prompt))
+            return cast(dict | None, patch)
+
+        started = time.monotonic()
+        tasks = [asyncio.create_task(one(p)) for p in prompts]
+        done, pending = await asyncio.wait(tasks, timeout=settings.LLM_BATCH_BUDGET_SECONDS)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(
+                "LLM fallback budget of %.0fs exhausted: %d of %d emails keep the rule-based result",
+                settings.LLM_BATCH_BUDGET_SECONDS, len(pending), len(tasks),
+            )
+
+        patches: list[dict | None] = []
+        for task in tasks:
+            if task.cancelled() or task.exception() is not None:
+                patches.append(None)
+            else:
+                patches.append(task.result())
+        logger.debug("LLM fallback: %d prompts in %.2fs", len(prompts), time.monotonic() - started)
+        return patches
+
+
+def _parse_patch(content: str | None) -> dict | None:
+    if not content:
+        return None
+    patch = json.loads(content)
+    return patch if isinstance(patch, dict) else None
@@ -0,0 +1,214 @@
+"""
+Text normalisation applied to every email before NLP.
+
+Provider bodies arrive as plain text (Outlook, Gmail text/plain) or HTML
+(Gmail text/html, occasional Outlook fallbacks). Newsletters carry kilobytes of
+inline CSS and replies carry the whole quoted thread, none of which helps the
+regex/spaCy/dateparser steps and all of which they pay for. normalize_for_nlp()
+reduces an email to the text its author actually wrote:
+
+    1. HTML is converted to text in one pass (html.parser, script/style dropped)
+    2. quoted replies ("> ..." lines, "On ... wrote:", "-----Original Message-----",
+       Outlook "From:/Sent:" headers after the author's text) and signatures
+       ("-- ", "Sent from my ...") are cut. A forward keeps the forwarded
+       message and drops only its header block ("---------- Forwarded message
+       ---------", or "From:/Sent:" headers before any text of the author's)
+    3. whitespace is collapsed (line breaks are kept: FROM_TO_RE anchors on them)
+    4. the result is truncated to NLP_TEXT_MAX_CHARS
+
+Steps 2-4 run in a single pass over the lines and stop as soon as the budget
+is reached. Benchmarks: python -m benchmarks.bench_textnorm
+"""
+import re
+from collections.abc import Iterable
+from html.parser import HTMLParser
+
+from app.core.config import settings
+
+
+class HTMLTextExtractor(HTMLParser):
+    """Incremental HTML-to-text converter with an output character budget.
+
+    Text inside <script>/<style> is dropped and runs of whitespace collapse to
+    one space. Block-level tags become line breaks so reply markers and header
+    lines stay on their own line. Once `max_chars` characters have been
+    produced `done` is set and further input is ignored.
+    """
+
+    _SKIP_TAGS = frozenset({"script", "style", "head", "title"})
+    _BLOCK_TAGS = frozenset({
+        "br", "p", "div", "li", "tr", "table", "blockquote", "hr",
+        "h1", "h2", "h3", "h4", "h5", "h6",
+    })
+
+    def __init__(self, max_chars: int | None = None) -> None:
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.done = False
+        self._parts: list[str] = []
+        self._length = 0
+        self._skip_depth = 0
+        self._pending = ""  # separator owed before the next word: "", " " or "\n"
+
+    def _break(self, sep: str) -> None:
+        if sep == "\n" or not self._pending:
+            self._pending = sep
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in self._SKIP_TAGS:
+            self._skip_depth += 1
+        self._break("\n" if tag in self._BLOCK_TAGS else " ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self._SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        self._break("\n" if tag in self._BLOCK_TAGS else " ")
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._break("\n" if tag in self._BLOCK_TAGS else " ")
+
+    def handle_data(self, data: str) -> None:
+        if self.done or self._skip_depth:
+            return
+        if data[:1].isspace():
+            self._break(" ")
+        words = data.split()
+        if not words:
+            return
+        text = " ".join(words)
+        if self._pending and self._length:
+            text = self._pending + text
+        self._pending = " " if data[-1:].isspace() else ""
+        if self.max_chars is not None and self._length + len(text) >= self.max_chars:
+            text = text[:self.max_chars - self._length]
+            self.done = True
+        self._parts.append(text)
+        self._length += len(text)
+
+    def feed(self, data: str) -> None:
+        if not self.done:
+            super().feed(data)
+
+    def text(self) -> str:
+        return "".join(self._parts).strip()
+
+
+# Strings are fed to the parser in slices so the character budget can stop it early
+_FEED_CHUNK_CHARS = 16 * 1024
+
+
+def html_to_text(html: str | Iterable[str], max_chars: int | None = None) -> str:
+    """Convert HTML (a string or an iterable of chunks) to text, stopping at max_chars."""
+    if isinstance(html, str):
+        chunks: Iterable[str] = (
+            html[i:i + _FEED_CHUNK_CHARS] for i in range(0, len(html), _FEED_CHUNK_CHARS)
+        )
+    else:
+        chunks = html
+    parser = HTMLTextExtractor(max_chars)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    else:
+        parser.close()
+    return parser.text()
+
+
+_HTML_HINT_RE = re.compile(r"<(?:html|body|div|p|br|table|span|td|style|a)\b", re.IGNORECASE)
+
+
+def looks_like_html(text: str) -> bool:
+    """Cheap check on the head of a body: is this HTML markup?"""
+    return _HTML_HINT_RE.search(text, 0, 2000) is not None
+
+
+# A line at which the author's own text ends and a quoted message begins
+_REPLY_MARKER_RE = re.compile(
+    r"^\s*(?:"
+    r"-{2,}\s*(?:original message|message d.origine|forwarded by)\s*-{2,}"
+    r"|on\b.{0,200}\bwrote\s*:"
+    r"|le\b.{0,200}\ba\s+écrit\s*:"
+    r"|_{10,}"
+    r")\s*$",
+    re.IGNORECASE,
+)
+# Start of a forwarded message (Gmail, Apple Mail, in English and French): its
+# header block follows and is dropped, the forwarded text is kept
+_FORWARD_MARKER_RE = re.compile(
+    r"^\s*(?:"
+    r"-{2,}\s*(?:forwarded message|message transféré)\s*-{2,}"
+    r"|begin forwarded message\s*:"
+    r"|début du message (?:réexpédié|transféré)\s*:"
+    r")\s*$",
+    re.IGNORECASE,
+)
+_HEADER_FIELD_RE = re.compile(
+    r"^\s*(?:from|de|sent|envoyé|date|to|à|cc|cci|bcc|subject|objet|reply-to)\s*:", re.IGNORECASE
+)
+# Outlook-style quoted header: "From: ..." immediately followed by "Sent:"/"Date:".
+# After the author's text it starts a quoted reply; before any, a forward.
+_QUOTED_FROM_RE = re.compile(r"^\s*(?:from|de)\s*:", re.IGNORECASE)
+_QUOTED_SENT_RE = re.compile(r"^\s*(?:sent|envoyé|date)\s*:", re.IGNORECASE)
+_SIGNATURE_RE = re.compile(
+    r"^\s*(?:--|"
+    r"sent from my\b.*|envoyé de mon\b.*|"
+    r"get outlook for\b.*|obtenir outlook pour\b.*"
+    r")\s*$",
+    re.IGNORECASE,
+)
+_INLINE_WS_RE = re.compile(r"[ \t\f\v\r ]+")
+
+
+def normalize_for_nlp(text: str, max_chars: int | None = None, subject: str = "") -> str:
+    """Reduce an email body (HTML or text) to what the NLP steps should see.
+
+    `subject` becomes the first line; it does not count as the author's text
+    when telling a quoted reply's headers from a forward's.
+    """
+    if max_chars is None:
+        max_chars = settings.NLP_TEXT_MAX_CHARS
+    if text and looks_like_html(text):
+        # The HTML pass may produce a little more than the budget needs; markers cut it further
+        text = html_to_text(text, max_chars * 2)
+
+    subject_line = _INLINE_WS_RE.sub(" ", subject).strip()[:max_chars]
+    lines = (text or "").splitlines()
+    out: list[str] = [subject_line] if subject_line else []
+    length = len(subject_line) + 1 if subject_line else 0
+    authored = False  # a line of the body has been kept
+    in_header = False  # inside a forwarded message's header block
+    blank = False
+    for i, raw in enumerate(lines):
+        if in_header:
+            if not raw.strip() or _HEADER_FIELD_RE.match(raw):
+                continue
+            in_header = False
+            blank = bool(out)
+        if raw.lstrip().startswith(">"):
+            continue
+        if _FORWARD_MARKER_RE.match(raw):
+            in_header = True
+            continue
+        if _REPLY_MARKER_RE.match(raw) or _SIGNATURE_RE.match(raw):
+            break
+        if _QUOTED_FROM_RE.match(raw) and i + 1 < len(lines) and _QUOTED_SENT_RE.match(lines[i + 1]):
+            if authored:
+                break
+            in_header = True
+            continue
+        line = _INLINE_WS_RE.sub(" ", raw).strip()
+        if not line:
+            blank = bool(out)
+            continue
+        authored = True
+        if blank:
+            out.append("")  # keep one blank line between paragraphs
+            length += 1
+            blank = False
+        if length + len(line) >= max_chars:
+            out.append(line[:max(max_chars - length, 0)])
+            break
+        out.append(line)
+        length += len(line) + 1
+    return "\n".join(out).strip()
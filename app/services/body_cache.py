@@ -0,0 +1,150 @@
+"""
+On-disk cache of decoded email bodies.
+
+Opening an email from the feed (GET /emails/body/{message_id}) needs the full
+plain-text body, which the feed does not carry. The first open downloads and
+decodes it from the provider and stores it here; later opens are served from
+disk without a provider round-trip.
+
+Entries are zlib-compressed, then Fernet-encrypted with SECRET_ENCRYPTION_KEY
+(like the OAuth tokens in the DB), and keyed by (user_id, provider, message_id):
+
+    <BODY_CACHE_DIR>/<user_id>/<provider>/<sha256(message_id)>.enc
+
+Without an encryption key nothing is cached. A provider's directory is dropped
+when the mailbox is disconnected, the user's directory when the account is
+deleted.
+
+A file's mtime is its last access time; once the cache exceeds
+BODY_CACHE_MAX_MB the least recently used entries are evicted.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import zlib
+
+from app.core.config import settings
+from app.core.encryption import decrypt_bytes, encrypt_bytes
+
+logger = logging.getLogger(__name__)
+
+# Size-based eviction walks the whole cache, so it only runs every N writes
+_PRUNE_EVERY_WRITES = 200
+_writes_since_prune = 0
+_prune_lock = threading.Lock()
+
+
+def _user_dir(user_id: int) -> str:
+    return os.path.join(settings.BODY_CACHE_DIR, str(int(user_id)))
+
+
+def _provider_dir(user_id: int, provider: str) -> str:
+    if provider not in ("gmail", "outlook"):
+        raise ValueError(f"Unknown provider: {provider}")
+    return os.path.join(_user_dir(user_id), provider)
+
+
+def _entry_path(user_id: int, provider: str, message_id: str) -> str:
+    # Provider message ids may contain characters that are not filename-safe
+    digest = hashlib.sha256(message_id.encode("utf-8")).hexdigest()
+    return os.path.join(_provider_dir(user_id, provider), f"{digest}.enc")
+
+
+def _enabled() -> bool:
+    return settings.BODY_CACHE_ENABLED and bool(settings.SECRET_ENCRYPTION_KEY)
+
+
+def get_cached_body(user_id: int, provider: str, message_id: str) -> str | None:
+    """Return the cached body for a message, or None on a miss."""
+    if not _enabled():
+        return None
+    path = _entry_path(user_id, provider, message_id)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        body = zlib.decompress(decrypt_bytes(data)).decode("utf-8")
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, zlib.error):  # ValueError: bad token or key, or UnicodeDecodeError
+        logger.warning("Discarding unreadable body cache entry %s", path)
+        _remove_quietly(path)
+        return None
+    try:
+        os.utime(path)  # mark as recently used for LRU eviction
+    except OSError:
+        pass
+    return body
+
+
+def store_body(user_id: int, provider: str, message_id: str, body: str) -> None:
+    """Compress, encrypt and store a decoded body. Failures are logged, never raised."""
+    global _writes_since_prune
+    if not _enabled() or not body:
+        return
+    path = _entry_path(user_id, provider, message_id)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(encrypt_bytes(zlib.compress(body.encode("utf-8"), 6)))
+        os.replace(tmp_path, path)  # atomic: readers never see a partial entry
+    except OSError:
+        logger.exception("Failed to write body cache entry for user_id=%d", user_id)
+        _remove_quietly(tmp_path)
+        return
+
+    with _prune_lock:
+        _writes_since_prune += 1
+        due = _writes_since_prune >= _PRUNE_EVERY_WRITES
+        if due:
+            _writes_since_prune = 0
+    if due:
+        prune_body_cache()
+
+
+def delete_user_bodies(user_id: int, provider: str | None = None) -> None:
+    """Drop the cached bodies of one disconnected mailbox, or of every mailbox of a user."""
+    path = _provider_dir(user_id, provider) if provider else _user_dir(user_id)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def prune_body_cache(max_bytes: int | None = None) -> int:
+    """Evict least recently used entries until the cache fits in max_bytes.
+
+    Defaults to BODY_CACHE_MAX_MB. Returns the number of entries removed.
+    """
+    if max_bytes is None:
+        max_bytes = settings.BODY_CACHE_MAX_MB * 1024 * 1024
+    entries: list[tuple[float, int, str]] = []
+    total = 0
+    for root, _dirs, files in os.walk(settings.BODY_CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    for _mtime, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if _remove_quietly(path):
+            total -= size
+            removed += 1
+    logger.info("Body cache pruned: removed=%d remaining_bytes=%d", removed, total)
+    return removed
+
+
+def _remove_quietly(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,223 @@
+"""
+Streaming fetch → detect → serialise pipeline for POST /emails/fetch-and-detect?stream=...
+
+Each stage is a generator that pulls from the previous one:
+
+    fetch (provider pages, own thread)  --bounded queue-->  detect (small batches)  -->  serialise
+
+Fetching runs in a producer thread so provider I/O overlaps with detection, but
+the queue between them is bounded (STREAM_BUFFER_SIZE): when the client reads
+slowly, serialisation blocks, detection blocks, the queue fills and fetching
+pauses. At most one queue plus one detection batch of emails is held in memory.
+"""
+import json
+import logging
+import queue
+import threading
+from collections.abc import Generator, Iterable, Iterator
+from typing import Any, Literal
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.nlp.extractor import classification_to_category
+from app.schemas.detection import EmailInput, ExtractionResult
+from app.schemas.email import EmailItem
+
+logger = logging.getLogger(__name__)
+
+StreamFormat = Literal["ndjson", "sse"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+class ProviderError:
+    """Marker emitted in place of emails when a provider fails mid-stream."""
+
+    def __init__(self, provider: str, detail: str) -> None:
+        self.provider = provider
+        self.detail = detail
+
+
+def iter_user_emails(
+    user_id: int,
+    max_results: int | None,
+    gmail_connected: bool,
+    outlook_connected: bool,
+) -> Iterator[EmailItem | ProviderError]:
+    """Fetch stage: Gmail then Outlook, each newest first, one email at a time.
+
+    A failing provider yields a ProviderError and the stream continues with the
+    next one (same policy as the non-streaming endpoint, which skips it).
+    """
+    if gmail_connected:
+        from app.services.gmail_service import GmailService
+        try:
+            svc = GmailService()
+            if svc.authenticate_for_user(user_id):
+                for r in svc.iter_recent_emails(max_results):
+                    yield EmailItem(
+                        subject=r["subject"],
+                        body=r["body"],
+                        message_id=r["message_id"],
+                        sender=r.get("sender"),
+                        date=r.get("date"),
+                        provider="gmail",
+                    )
+        except Exception:
+            logger.exception("Streaming Gmail fetch failed for user_id=%d", user_id)
+            yield ProviderError("gmail", "Gmail fetch failed")
+
+    if outlook_connected:
+        from app.services.outlook_email_service import iter_outlook_emails
+        try:
+            yield from iter_outlook_emails(user_id, max_results, categorize=False)
+        except Exception:
+            logger.exception("Streaming Outlook fetch failed for user_id=%d", user_id)
+            yield ProviderError("outlook", "Outlook fetch failed")
+
+
+_DONE = object()
+
+
+def bounded(source: Iterable, maxsize: int | None = None) -> Generator[Any, None, None]:
+    """Run `source` in a producer thread and yield its items through a bounded queue.
+
+    Closing the returned generator (e.g. the client disconnected) tells the
+    producer to stop at its next put. Exceptions in the producer are re-raised
+    in the consumer.
+    """
+    buf: queue.Queue = queue.Queue(maxsize=maxsize or settings.STREAM_BUFFER_SIZE)
+    stop = threading.Event()
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                buf.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in source:
+                if not put(item):
+                    return
+        except BaseException as exc:  # handed to the consumer
+            put(exc)
+            return
+        put(_DONE)
+
+    thread = threading.Thread(target=produce, name="detect-stream-fetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buf.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def detect_stage(
+    items: Iterable[EmailItem | ProviderError],
+    db: Session,
+    user_id: int,
+    batch_size: int | None = None,
+) -> Iterator[tuple[EmailItem, ExtractionResult] | ProviderError]:
+    """Detect stage: persist and detect emails in small batches, yielding each pair.
+
+    Batches keep the DB round-trips (upsert + stored-extraction lookup) amortised
+    while the first results still reach the client quickly.
+    """
+    from app.services.detection import detect_batch
+    from app.services.email_sync_service import upsert_email_items
+
+    batch_size = batch_size or settings.STREAM_DETECT_BATCH
+
+    def flush(batch: list[EmailItem]) -> Iterator[tuple[EmailItem, ExtractionResult]]:
+        upsert_email_items(db, user_id, batch)
+        extractions = detect_batch(
+            [EmailInput(subject=e.subject, body=e.body, message_id=e.message_id or "") for e in batch],
+            db=db,
+            user_id=user_id,
+        )
+        for email, extraction in zip(batch, extractions, strict=True):
+            email.category = classification_to_category(extraction.classification)
+            yield email, extraction
+
+    batch: list[EmailItem] = []
+    for item in items:
+        if isinstance(item, ProviderError):
+            if batch:
+                yield from flush(batch)
+                batch = []
+            yield item
+            continue
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
+
+
+def serialise_stage(
+    results: Iterable[tuple[EmailItem, ExtractionResult] | ProviderError],
+    fmt: StreamFormat,
+) -> Iterator[bytes]:
+    """Serialise stage: one NDJSON line or SSE event per email, then a final "done" record.
+
+    If an earlier stage raises (detection, DB, the fetch thread), the stream ends
+    with an "error" record carrying the count sent so far instead of "done", so
+    clients can tell a failed stream from a complete one.
+    """
+    def dumps(data: dict) -> str:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+    def encode(event: str, data: dict) -> bytes:
+        if fmt == "sse":
+            return f"event: {event}\ndata: {dumps(data)}\n\n".encode()
+        return (dumps({"type": event, **data}) + "\n").encode()
+
+    count = 0
+    try:
+        for result in results:
+            if isinstance(result, ProviderError):
+                yield encode("error", {"provider": result.provider, "detail": result.detail})
+                continue
+            email, extraction = result
+            count += 1
+            yield encode("email", {
+                "email": email.model_dump(mode="json"),
+                "extraction": extraction.model_dump(mode="json"),
+            })
+    except Exception:
+        logger.exception("Streaming fetch-and-detect failed after %d emails", count)
+        yield encode("error", {"detail": "Detection failed", "count": count})
+        return
+    yield encode("done", {"count": count})
+
+
+def stream_fetch_and_detect(
+    db: Session,
+    user_id: int,
+    max_results: int | None,
+    fmt: StreamFormat,
+    gmail_connected: bool,
+    outlook_connected: bool,
+) -> Iterator[bytes]:
+    """Whole pipeline as one generator of response chunks. Closes `db` when done."""
+    fetched: Generator[EmailItem | ProviderError, None, None] = bounded(iter_user_emails(user_id, max_results, gmail_connected, outlook_connected))
+    try:
+        yield from serialise_stage(detect_stage(fetched, db, user_id), fmt)
+    finally:
+        fetched.close()  # stops the fetch thread if the client went away
+        db.close()
@@ -1,10 +1,18 @@
+import asyncio
 import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.metrics import timed
+from app.models.email import Email
 from app.models.feedback import DetectionFeedback
-from app.nlp.extractor import EmailExtractor, classification_to_category
+from app.nlp.extractor import EXTRACTOR_VERSION, EmailExtractor, classification_to_category
+from app.nlp.llm_backend import llm_enabled
 from app.nlp.llm_fallback_openai import LLMFallbackOpenAI
 from app.schemas.detection import (
     EmailInput,
@@ -15,17 +23,110 @@ from app.schemas.detection import (
     ValidationResult,
 )
 
+logger = logging.getLogger(__name__)
+
 _extractor: EmailExtractor | None = None
+_extractor_lock = threading.Lock()
 _llm_fallback: LLMFallbackOpenAI | None = None
+_nlp_executor: ThreadPoolExecutor | None = None
+
+# NLP model preload state, reported by GET /health/nlp and GET /ready: "disabled"
+# (NLP_PRELOAD=off), "pending", "loading", "warming", "ready" or "failed" (regex-only extraction)
+_nlp_state = "pending"
+_nlp_load_seconds: float | None = None
+_nlp_warmup_seconds: float | None = None
+
+# Synthetic emails run through the extractor before the process reports ready. The first
+# matches the scheduling regexes and carries a time, duration, timezone, link and
+# participant (dateparser search); the second matches no regex and goes to spaCy.
+_WARMUP_EMAILS = (
+    EmailInput(
+        subject="Réunion projet",
+        body=(
+            "De : alice@example.com\nBonjour, pouvons-nous fixer un rendez-vous demain à 14h30 "
+            "(Europe/Paris) pendant 45 minutes sur https://meet.google.com/abc-defg-hij ?"
+        ),
+    ),
+    EmailInput(
+        subject="Nouvelles de l'équipe",
+        body="Le rapport annuel de la société Iris à Lyon est disponible sur le site.",
+    ),
+)
 
 
 def _get_extractor() -> EmailExtractor:
     global _extractor
     if _extractor is None:
-        _extractor = EmailExtractor(model_name=settings.NLP_MODEL_PATH)
+        with _extractor_lock:
+            if _extractor is None:
+                _extractor = EmailExtractor(model_name=settings.NLP_MODEL_PATH)
     return _extractor
 
 
+def warm_up_extractor() -> None:
+    """Run the synthetic emails through regex, spaCy and the temporal extractor."""
+    extractor = _get_extractor()
+    for email in _WARMUP_EMAILS:
+        extractor.extract(email)
+
+
+def load_nlp_model() -> bool:
+    """Load the spaCy model and dateparser, then warm up (NLP_WARMUP). Returns True if spaCy loaded."""
+    global _nlp_state, _nlp_load_seconds, _nlp_warmup_seconds
+    _nlp_state = "loading"
+    started = time.perf_counter()
+    try:
+        loaded = _get_extractor().nlp is not None
+        import dateparser.search  # noqa: F401 — slow first import, paid here rather than in a request
+    except Exception:
+        logger.exception("NLP model preload failed")
+        loaded = False
+    _nlp_load_seconds = round(time.perf_counter() - started, 3)
+    if loaded:
+        logger.info("NLP model %s loaded in %.1fs", settings.NLP_MODEL_PATH, _nlp_load_seconds)
+    else:
+        logger.warning("NLP model %s unavailable, extraction is regex-only", settings.NLP_MODEL_PATH)
+
+    if settings.NLP_WARMUP:
+        _nlp_state = "warming"
+        started = time.perf_counter()
+        try:
+            warm_up_extractor()
+        except Exception:
+            logger.exception("NLP warm-up failed")
+        _nlp_warmup_seconds = round(time.perf_counter() - started, 3)
+    _nlp_state = "ready" if loaded else "failed"
+    return loaded
+
+
+def start_nlp_preload(mode: str) -> threading.Thread | None:
+    """Apply settings.NLP_PRELOAD at start-up. Returns the loader thread in "background" mode."""
+    global _nlp_state
+    if mode == "off":
+        _nlp_state = "disabled"
+        return None
+    if mode == "sync":
+        load_nlp_model()
+        return None
+    if mode != "background":
+        raise ValueError(f"Unknown NLP_PRELOAD {mode!r} (expected 'background', 'sync' or 'off')")
+    _nlp_state = "loading"
+    thread = threading.Thread(target=load_nlp_model, name="iris-nlp-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def nlp_readiness() -> dict[str, object]:
+    """Preload state of the NLP model; "ready" is False only while a preload is pending or running."""
+    return {
+        "ready": _nlp_state not in ("pending", "loading", "warming"),
+        "state": _nlp_state,
+        "model": settings.NLP_MODEL_PATH,
+        "load_seconds": _nlp_load_seconds,
+        "warmup_seconds": _nlp_warmup_seconds,
+    }
+
+
 def _get_llm_fallback() -> LLMFallbackOpenAI:
     global _llm_fallback
     if _llm_fallback is None:
@@ -33,6 +134,16 @@ def _get_llm_fallback() -> LLMFallbackOpenAI:
     return _llm_fallback
 
 
+def _get_nlp_executor() -> ThreadPoolExecutor:
+    global _nlp_executor
+    if _nlp_executor is None:
+        _nlp_executor = ThreadPoolExecutor(
+            max_workers=settings.NLP_EXECUTOR_WORKERS, thread_name_prefix="iris-nlp"
+        )
+    return _nlp_executor
+
+
+@timed("feed.categorize_email")
 def categorize_email(email: EmailInput) -> str:
     """Classify an email using regex + spaCy (no LLM). Returns the UI tab category.
 
@@ -42,16 +153,140 @@ def categorize_email(email: EmailInput) -> str:
     return classification_to_category(result.classification)
 
 
-def detect_single(email: EmailInput) -> ExtractionResult:
+def current_extraction_version() -> str:
+    """Version stamp stored with persisted extractions (rule set + spaCy model)."""
+    return f"{EXTRACTOR_VERSION}+{settings.NLP_MODEL_PATH}"
+
+
+def load_stored_extraction(row: Email, body: str | None = None) -> ExtractionResult | None:
+    """Return the persisted extraction for a row if the current extractor produced it.
+
+    A stored extraction describes row.body. When the caller is about to detect a
+    different body (e.g. the full text of an email stored from a Gmail snippet
+    by the feed), None is returned so it is detected again.
+    """
+    if not row.extraction_data or row.extraction_version != current_extraction_version():
+        return None
+    if body is not None and body != (row.body or ""):
+        return None
+    try:
+        return ExtractionResult.model_validate(row.extraction_data)
+    except ValueError:
+        return None
+
+
+def store_extraction(row: Email, result: ExtractionResult, body: str | None = None) -> None:
+    """Persist a detection result (and the UI category it implies) on an Email row.
+
+    body is the text the result was computed from; it replaces row.body when it
+    differs, so the stored extraction always matches the stored body.
+    """
+    if body is not None and body != row.body:
+        row.body = body
+    row.extraction_data = result.model_dump(mode="json")
+    row.extraction_version = current_extraction_version()
+    row.category = classification_to_category(result.classification)
+    if row.status in (None, "pending", "fetched"):
+        row.status = "detected"
+
+
+@timed("detection.run")
+def _run_detection(email: EmailInput) -> ExtractionResult:
     extractor = _get_extractor()
     partial = extractor.extract(email)
-    if partial.confidence < settings.LLM_CONFIDENCE_THRESHOLD and settings.OPENAI_API_KEY:
+    if partial.confidence < settings.LLM_CONFIDENCE_THRESHOLD and llm_enabled():
         partial = _get_llm_fallback().enhance(email, partial)
     return partial
 
 
-def detect_batch(emails: list[EmailInput]) -> list[ExtractionResult]:
-    return [detect_single(e) for e in emails]
+@timed("detection.batch")
+def _detect_many(emails: list[EmailInput]) -> list[ExtractionResult]:
+    """Rule-based extraction for every email, then one concurrent LLM pass over the low-confidence ones."""
+    if not llm_enabled() or len(emails) < 2:
+        return [_run_detection(email) for email in emails]
+    extractor = _get_extractor()
+    partials = [extractor.extract(email) for email in emails]
+    return _get_llm_fallback().enhance_many(list(zip(emails, partials, strict=True)))
+
+
+def detect_single(
+    email: EmailInput,
+    db: Session | None = None,
+    user_id: int | None = None,
+) -> ExtractionResult:
+    """Detect one email; see detect_batch for the read-through behaviour when db is given."""
+    if db is None or user_id is None or not email.message_id:
+        return _run_detection(email)
+    return detect_batch([email], db=db, user_id=user_id)[0]
+
+
+_LOOKUP_CHUNK = 500
+
+
+def detect_batch(
+    emails: list[EmailInput],
+    db: Session | None = None,
+    user_id: int | None = None,
+) -> list[ExtractionResult]:
+    """Detect a list of emails.
+
+    With db and user_id, the user's stored Email rows (matched by message_id) act
+    as a read-through cache: results stamped with the current extractor version
+    and computed from the same body are returned without running NLP, and fresh
+    results are persisted (with the body they describe) on the
+    matching rows before committing. Emails without a stored row are detected
+    but not persisted.
+    """
+    if db is None or user_id is None:
+        return _detect_many(emails)
+
+    message_ids = list({e.message_id for e in emails if e.message_id})
+    rows: dict[str, Email] = {}
+    for i in range(0, len(message_ids), _LOOKUP_CHUNK):
+        chunk = message_ids[i:i + _LOOKUP_CHUNK]
+        for row in db.query(Email).filter(Email.user_id == user_id, Email.message_id.in_(chunk)):
+            if row.message_id:
+                rows[row.message_id] = row
+    email_rows = [rows.get(e.message_id) if e.message_id else None for e in emails]
+
+    filled: list[ExtractionResult | None] = []
+    pending: list[int] = []
+    for email, stored_row in zip(emails, email_rows, strict=True):
+        stored = load_stored_extraction(stored_row, email.body) if stored_row is not None else None
+        if stored is None:
+            pending.append(len(filled))
+        filled.append(stored)
+
+    detected = _detect_many([emails[i] for i in pending])
+    for i, result in zip(pending, detected, strict=True):
+        filled[i] = result
+        stored_row = email_rows[i]
+        if stored_row is not None:
+            store_extraction(stored_row, result, emails[i].body)
+    db.commit()
+    results = [result for result in filled if result is not None]
+    assert len(results) == len(emails)  # every pending slot was filled above
+    return results
+
+
+async def categorize_emails_async(emails: list[EmailInput]) -> list[str]:
+    """Categorize a list of emails on the NLP executor without blocking the event loop.
+
+    The whole list is processed in a single executor hop so a page of 50 emails
+    costs one thread handoff instead of 50.
+    """
+    if not emails:
+        return []
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_nlp_executor(), lambda: [categorize_email(e) for e in emails]
+    )
+
+
+async def detect_single_async(email: EmailInput) -> ExtractionResult:
+    """Run detection for one email on the NLP executor (for async endpoints)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_nlp_executor(), _run_detection, email)
 
 
 def _merge_thread_results(results: list[ExtractionResult]) -> ExtractionResult:
@@ -79,6 +314,69 @@ def detect_thread(messages: list[EmailInput]) -> ThreadExtractionResult:
     return ThreadExtractionResult(merged=merged, message_results=results)
 
 
+def _detect_rows(rows: list[Email]) -> None:
+    results = _detect_many([
+        EmailInput(subject=row.subject or "", body=row.body or "", message_id=row.message_id)
+        for row in rows
+    ])
+    for row, result in zip(rows, results, strict=True):
+        store_extraction(row, result)
+
+
+def detect_stored_emails(
+    db: Session,
+    user_id: int,
+    email_ids: list[int] | None = None,
+    limit: int = 200,
+    provider: str | None = None,
+) -> int:
+    """Run detection on stored emails and persist the result on Email.extraction_data.
+
+    With email_ids=None, processes the user's most recent emails that have no
+    extraction yet, optionally only those of one provider. The UI category is
+    refreshed from the (possibly LLM-improved) classification. Returns the
+    number of emails processed.
+    """
+    query = db.query(Email).filter(Email.user_id == user_id)
+    if provider is not None:
+        query = query.filter(Email.provider == provider)
+    if email_ids is not None:
+        query = query.filter(Email.id.in_(email_ids))
+    else:
+        query = query.filter(Email.extraction_data.is_(None))
+    rows = query.order_by(Email.id.desc()).limit(limit).all()
+    _detect_rows(rows)
+    db.commit()
+    return len(rows)
+
+
+def redetect_stale_emails(
+    db: Session,
+    user_id: int | None = None,
+    batch_size: int = 200,
+) -> int:
+    """Re-run detection on every stored extraction produced by an older extractor version.
+
+    Works in committed batches so it can be interrupted and resumed. Returns the
+    number of emails re-detected.
+    """
+    version = current_extraction_version()
+    total = 0
+    while True:
+        query = db.query(Email).filter(
+            Email.extraction_data.isnot(None),
+            (Email.extraction_version.is_(None)) | (Email.extraction_version != version),
+        )
+        if user_id is not None:
+            query = query.filter(Email.user_id == user_id)
+        rows = query.order_by(Email.id).limit(batch_size).all()
+        if not rows:
+            return total
+        _detect_rows(rows)
+        db.commit()
+        total += len(rows)
+
+
 REQUIRED_FIELDS = ["classification", "proposed_times", "timezone", "duration_minutes"]
 CLARIFYING = {
     "timezone": "What timezone should we use?",
@@ -0,0 +1,162 @@
+"""
+Inbox sync engine shared by the web endpoints and the background job worker.
+
+sync_user_emails() fetches the first page from each requested provider,
+categorizes it and upserts it into the `emails` table. Unlike the historical
+BackgroundTask wrapper it raises when a provider fails, so the job queue can
+retry it with backoff.
+"""
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.core.metrics import timed
+from app.models.email import Email
+from app.schemas.detection import EmailInput as DetectionEmailInput
+from app.schemas.email import EmailItem
+from app.services.detection import (
+    categorize_email,
+    classification_to_category,
+    detect_batch,
+    store_extraction,
+)
+from app.services.feed_events import publish_email_items
+from app.services.gmail_service import GmailService
+from app.services.outlook_email_service import fetch_outlook_email_page, is_outlook_connected
+
+logger = logging.getLogger(__name__)
+
+ALL_PROVIDERS: tuple[str, ...] = ("gmail", "outlook")
+
+
+@timed("feed.upsert_email_items")
+def upsert_email_items(db: Session, user_id: int, items: list[EmailItem]) -> None:
+    """Insert or update each email in the DB and populate db_id on the item.
+
+    Inserted and changed emails are published to the user's feed subscribers
+    (GET /emails/events) once committed.
+    """
+    created: list[EmailItem] = []
+    updated: list[EmailItem] = []
+    for item in items:
+        if not item.message_id:
+            continue
+        existing = (
+            db.query(Email)
+            .filter(Email.message_id == item.message_id, Email.user_id == user_id)
+            .first()
+        )
+        if existing:
+            item.db_id = existing.id
+            # Backfill metadata that may have been missing on first insert
+            if not existing.category and item.category:
+                existing.category = item.category
+            if not existing.email_date and item.date:
+                existing.email_date = item.date
+            if not existing.provider and item.provider and item.provider != "unknown":
+                existing.provider = item.provider
+            if not existing.sender and item.sender:
+                existing.sender = item.sender
+            if db.is_modified(existing):
+                updated.append(item)
+        else:
+            db_email = Email(
+                subject=item.subject,
+                body=item.body,
+                message_id=item.message_id,
+                user_id=user_id,
+                status="fetched",
+                sender=item.sender,
+                category=item.category,
+                email_date=item.date,
+                provider=item.provider if item.provider != "unknown" else None,
+            )
+            db.add(db_email)
+            db.flush()
+            item.db_id = db_email.id
+            created.append(item)
+    db.commit()
+    publish_email_items(user_id, created, updated)
+
+
+def upsert_detected_items(db: Session, user_id: int, items: list[EmailItem]) -> None:
+    """Detect, categorise and upsert pushed emails, storing the extraction on each row.
+
+    Used by the push-notification syncs. Detection runs before the upsert so feed
+    subscribers receive the final category; emails already stored with a current
+    extraction are not re-detected.
+    """
+    if not items:
+        return
+    extractions = detect_batch(
+        [DetectionEmailInput(subject=i.subject, body=i.body, message_id=i.message_id or "") for i in items],
+        db=db,
+        user_id=user_id,
+    )
+    for item, extraction in zip(items, extractions, strict=True):
+        item.category = classification_to_category(extraction.classification)
+    upsert_email_items(db, user_id, items)
+    for item, extraction in zip(items, extractions, strict=True):
+        row = db.get(Email, item.db_id) if item.db_id else None
+        if row is not None and row.extraction_data is None:
+            store_extraction(row, extraction)
+    db.commit()
+
+
+def _fetch_gmail_first_page(user_id: int, limit: int) -> list[EmailItem]:
+    svc = GmailService()
+    if not svc.authenticate_for_user(user_id):
+        return []
+    raw_list, _ = svc.fetch_email_page(page_token=None, limit=limit)
+    logger.info("Sync: fetched %d Gmail emails for user_id=%d", len(raw_list), user_id)
+    return [
+        EmailItem(
+            subject=r["subject"],
+            body=r["body"],
+            message_id=r["message_id"],
+            sender=r.get("sender"),
+            date=r.get("date"),
+            category=categorize_email(DetectionEmailInput(subject=r["subject"], body=r["body"])),
+            provider="gmail",
+        )
+        for r in raw_list
+    ]
+
+
+def _fetch_outlook_first_page(user_id: int, limit: int) -> list[EmailItem]:
+    if not is_outlook_connected(user_id):
+        return []
+    outlook_page, _ = fetch_outlook_email_page(user_id, skip=0, limit=limit)
+    logger.info("Sync: fetched %d Outlook emails for user_id=%d", len(outlook_page), user_id)
+    return outlook_page
+
+
+def sync_user_emails(
+    db: Session,
+    user_id: int,
+    providers: tuple[str, ...] = ALL_PROVIDERS,
+    limit: int = 50,
+) -> list[EmailItem]:
+    """Fetch the first page from each provider and persist it.
+
+    Items from providers that succeeded are always persisted. If any provider
+    raised, a RuntimeError summarising the failures is raised afterwards.
+    """
+    fetchers = {"gmail": _fetch_gmail_first_page, "outlook": _fetch_outlook_first_page}
+    items: list[EmailItem] = []
+    errors: list[str] = []
+    for provider in providers:
+        fetch = fetchers.get(provider)
+        if fetch is None:
+            errors.append(f"{provider}: unknown provider")
+            continue
+        try:
+            items.extend(fetch(user_id, limit))
+        except Exception as exc:
+            logger.exception("Sync failed for provider=%s user_id=%d", provider, user_id)
+            errors.append(f"{provider}: {exc}")
+    if items:
+        upsert_email_items(db, user_id, items)
+    if errors:
+        raise RuntimeError("; ".join(errors))
+    return items
@@ -0,0 +1,284 @@
+"""
+Server-push feed updates: per-user pub/sub behind GET /emails/events (SSE).
+
+The sync engine (upsert_email_items) publishes an event for every email it
+inserts or changes; each open SSE connection of that user receives it. An idle
+connection is one awaiting coroutine plus a keep-alive comment every
+FEED_KEEPALIVE_SECONDS, with no provider calls.
+
+Brokers (settings.FEED_BROKER):
+    memory    in-process fan-out. Enough when the sync runs in the web process
+              (JOB_EMBEDDED_WORKER, streaming fetch-and-detect, feed endpoints).
+    postgres  events are sent with pg_notify and every web process LISTENs, so
+              syncs done by a separate worker process reach the clients too.
+              Works with both DB_DRIVERs; not with DB_PGBOUNCER, since LISTEN
+              needs a session-level server connection.
+
+Custom brokers subclass FeedBroker and are installed with set_feed_broker().
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bodies are trimmed in events: the feed only renders a preview, the full body
+# is fetched on open (GET /emails/body), and pg_notify payloads are capped at 8 kB.
+_EVENT_BODY_CHARS = 1000
+
+# The listener re-checks whether anyone is still subscribed this often
+_LISTEN_POLL_SECONDS = 5.0
+
+# pg_notify rejects payloads of 8000 bytes or more (server encoding, UTF-8 here)
+_NOTIFY_MAX_BYTES = 7900
+# Fields kept when an event must be shrunk to fit a NOTIFY: enough to place the
+# email in the feed; the client reads the rest from GET /emails/cached.
+_SUMMARY_FIELDS = ("message_id", "db_id", "provider", "category", "date")
+_SUMMARY_TEXT_CHARS = 200
+
+
+class FeedSubscription:
+    """One client connection's queue of events, bound to the event loop that created it."""
+
+    def __init__(self, user_id: int, maxsize: int) -> None:
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def deliver(self, event: dict[str, Any]) -> None:
+        """Queue an event; safe to call from any thread."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._put(event)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: dict[str, Any]) -> None:
+        # A slow client loses its oldest events rather than growing without bound
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float | None = None) -> dict[str, Any] | None:
+        """Next event, or None if nothing arrived within timeout."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class FeedBroker:
+    """Fan-out of feed events to the subscriptions of this process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscriptions: dict[int, set[FeedSubscription]] = {}
+
+    def subscribe(self, user_id: int) -> FeedSubscription:
+        sub = FeedSubscription(user_id, settings.FEED_SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: FeedSubscription) -> None:
+        with self._lock:
+            subs = self._subscriptions.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscriptions[sub.user_id]
+
+    def subscriber_count(self, user_id: int | None = None) -> int:
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscriptions.get(user_id, ()))
+            return sum(len(s) for s in self._subscriptions.values())
+
+    def publish(self, user_id: int, event: dict[str, Any]) -> None:
+        """Send an event to every subscription of user_id."""
+        self._deliver_local(user_id, event)
+
+    def _deliver_local(self, user_id: int, event: dict[str, Any]) -> None:
+        with self._lock:
+            subs = list(self._subscriptions.get(user_id, ()))
+        for sub in subs:
+            sub.deliver(event)
+
+
+class PostgresFeedBroker(FeedBroker):
+    """Cross-process broker using Postgres LISTEN/NOTIFY on one channel.
+
+    publish() only sends the NOTIFY; local subscribers receive the event through
+    this process's listener like everyone else, so it is never delivered twice.
+    The listener thread starts with the first subscription.
+    """
+
+    CHANNEL = "iris_feed"
+
+    def __init__(self, engine) -> None:
+        super().__init__()
+        self._engine = engine
+        self._listener: threading.Thread | None = None
+
+    def subscribe(self, user_id: int) -> FeedSubscription:
+        sub = super().subscribe(user_id)
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="feed-listener", daemon=True)
+                self._listener.start()
+        return sub
+
+    def publish(self, user_id: int, event: dict[str, Any]) -> None:
+        from sqlalchemy import text
+
+        payload = notify_payload(user_id, event)
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                             {"channel": self.CHANNEL, "payload": payload})
+        except Exception:
+            logger.exception("Failed to publish feed event for user_id=%d", user_id)
+
+    def _connect(self):
+        """A DBAPI connection of its own, outside the engine's pool.
+
+        LISTEN needs autocommit and holds the connection for as long as anyone is
+        subscribed, so it must neither take a pool slot nor return to the pool
+        with session state the next checkout would inherit.
+        """
+        raw = self._engine.raw_connection()
+        conn = raw.driver_connection
+        raw.detach()  # the pool forgets it and frees its slot; we close it ourselves
+        conn.autocommit = True
+        return conn
+
+    def _notifications(self, conn) -> Iterator[Any]:
+        """Notifications received within _LISTEN_POLL_SECONDS, for either DB_DRIVER."""
+        if self._engine.dialect.driver == "psycopg":
+            # psycopg 3: notifies() is a generator, stopping at the timeout
+            yield from conn.notifies(timeout=_LISTEN_POLL_SECONDS)
+            return
+        # psycopg2: wait for the socket, then drain the connection's notifies list
+        if select.select([conn], [], [], _LISTEN_POLL_SECONDS) == ([], [], []):
+            return
+        conn.poll()
+        while conn.notifies:
+            yield conn.notifies.pop(0)
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                conn = self._connect()
+                try:
+                    conn.cursor().execute(f"LISTEN {self.CHANNEL}")
+                    while self.subscriber_count():
+                        for note in self._notifications(conn):
+                            message = json.loads(note.payload)
+                            self._deliver_local(int(message["user_id"]), message["event"])
+                    return
+                finally:
+                    conn.close()
+            except Exception:
+                logger.exception("Feed listener failed; reconnecting")
+                threading.Event().wait(2.0)
+
+
+def notify_payload(user_id: int, event: dict[str, Any]) -> str:
+    """Serialise an event for pg_notify, shrinking it to fit _NOTIFY_MAX_BYTES.
+
+    An email event that is too large loses its body first; if it still does not
+    fit, only the _SUMMARY_FIELDS and a shortened subject and sender are sent,
+    with "partial": true.
+    """
+    def dumps(e: dict[str, Any]) -> str:
+        return json.dumps({"user_id": user_id, "event": e}, ensure_ascii=False, separators=(",", ":"))
+
+    payload = dumps(event)
+    email = event.get("email")
+    if len(payload.encode()) < _NOTIFY_MAX_BYTES or not isinstance(email, dict):
+        return payload
+
+    payload = dumps({**event, "email": {**email, "body": ""}, "partial": True})
+    if len(payload.encode()) < _NOTIFY_MAX_BYTES:
+        return payload
+
+    summary = {key: email.get(key) for key in _SUMMARY_FIELDS}
+    for key in ("subject", "sender"):
+        summary[key] = (email.get(key) or "")[:_SUMMARY_TEXT_CHARS]
+    return dumps({**event, "email": summary, "partial": True})
+
+
+_broker: FeedBroker | None = None
+_broker_lock = threading.Lock()
+
+
+def get_feed_broker() -> FeedBroker:
+    """Return the process-wide broker selected by settings.FEED_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                if settings.FEED_BROKER == "postgres":
+                    if settings.DB_PGBOUNCER:
+                        # Transaction pooling hands each statement any server connection:
+                        # the one that ran LISTEN is not the one notifications arrive on
+                        raise ValueError(
+                            "FEED_BROKER=postgres needs a direct database connection "
+                            "(LISTEN does not work through PgBouncer, DB_PGBOUNCER=true)"
+                        )
+                    from app.db.database import engine
+                    _broker = PostgresFeedBroker(engine)
+                else:
+                    _broker = FeedBroker()
+    return _broker
+
+
+def set_feed_broker(broker: FeedBroker | None) -> None:
+    """Install a broker (custom backend or tests). None resets to the configured default."""
+    global _broker
+    with _broker_lock:
+        _broker = broker
+
+
+def publish_email_items(user_id: int, created: list, updated: list) -> None:
+    """Publish email.created / email.updated events for EmailItems. Never raises."""
+    if not created and not updated:
+        return
+    broker = get_feed_broker()
+    for event_type, items in (("email.created", created), ("email.updated", updated)):
+        for item in items:
+            data = item.model_dump(mode="json")
+            if data.get("body") and len(data["body"]) > _EVENT_BODY_CHARS:
+                data["body"] = data["body"][:_EVENT_BODY_CHARS]
+            try:
+                broker.publish(user_id, {"type": event_type, "email": data})
+            except Exception:
+                logger.exception("Feed publish failed for user_id=%d", user_id)
+
+
+async def sse_event_stream(
+    sub: FeedSubscription,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    keepalive_seconds: float | None = None,
+) -> AsyncIterator[str]:
+    """Render a subscription as Server-Sent Events until the client disconnects."""
+    keepalive = keepalive_seconds or settings.FEED_KEEPALIVE_SECONDS
+    yield "retry: 5000\n: connected\n\n"
+    while not await is_disconnected():
+        event = await sub.get(timeout=keepalive)
+        if event is None:
+            yield ": keepalive\n\n"
+            continue
+        data = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        yield f"event: {event['type']}\ndata: {data}\n\n"
@@ -0,0 +1,215 @@
+"""
+Gmail push notifications: users.watch() registration and incremental history sync.
+
+Flow:
+    1. After Gmail is connected (and every few hours, to renew), a "gmail_watch"
+       job calls users.watch() so Gmail publishes INBOX changes to
+       settings.GMAIL_PUBSUB_TOPIC.
+    2. The topic's push subscription POSTs to /api/v1/webhooks/gmail with
+       {"emailAddress", "historyId"} base64-encoded in message.data.
+    3. The webhook enqueues one "gmail_history_sync" job per user. The job is
+       delayed by GMAIL_PUSH_DEBOUNCE_SECONDS and deduplicated while queued, so
+       a burst of notifications costs one sync.
+    4. The job lists history since the stored User.gmail_history_id, fetches
+       only the added messages, upserts and detects them (feed subscribers get
+       them pushed, see feed_events) and advances gmail_history_id.
+
+Users with an active watch are skipped for Gmail by the periodic pre-fetch.
+build_push_envelope() produces the same request body Pub/Sub sends, for tests
+and for `python -m app.cli gmail-push` against a local server.
+"""
+import base64
+import json
+import logging
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.job import Job
+from app.models.user import User
+from app.services.job_queue import enqueue_job
+
+logger = logging.getLogger(__name__)
+
+# Watches last 7 days; renew those expiring within this margin
+_WATCH_RENEW_MARGIN = timedelta(days=1)
+WATCH_RENEW_INTERVAL_SECONDS = 6 * 3600
+HISTORY_SYNC_PRIORITY = 20  # new mail the user is waiting for outranks first syncs
+
+
+def gmail_push_enabled() -> bool:
+    return bool(settings.GMAIL_PUBSUB_TOPIC)
+
+
+def has_active_watch(user: User, now: datetime | None = None) -> bool:
+    expires = user.gmail_watch_expires_at
+    if expires is None:
+        return False
+    if expires.tzinfo is None:  # SQLite drops tzinfo
+        expires = expires.replace(tzinfo=UTC)
+    return expires > (now or datetime.now(UTC))
+
+
+def enqueue_gmail_watch(db: Session, user_id: int) -> Job | None:
+    """Queue a watch registration for a user (no-op unless GMAIL_PUBSUB_TOPIC is set)."""
+    if not gmail_push_enabled():
+        return None
+    return enqueue_job(
+        db, "gmail_watch", user_id, provider="gmail", dedupe_key=f"gmail_watch:{user_id}", max_attempts=3
+    )
+
+
+def register_gmail_watch(db: Session, user_id: int) -> bool:
+    """Call users.watch() for a user and store the expiry (and a starting historyId)."""
+    from app.services.gmail_service import GmailService
+
+    topic = settings.GMAIL_PUBSUB_TOPIC  # None unless gmail_push_enabled()
+    user = db.get(User, user_id)
+    if user is None or not user.gmail_oauth_token or not topic:
+        return False
+    svc = GmailService()
+    if not svc.authenticate_for_user(user_id):
+        return False
+    response = svc.start_watch(topic)
+    user.gmail_watch_expires_at = datetime.fromtimestamp(int(response["expiration"]) / 1000, tz=UTC)
+    if not user.gmail_history_id:
+        # Nothing synced incrementally yet: start from now; the first-page sync covers the past
+        user.gmail_history_id = str(response["historyId"])
+    db.commit()
+    logger.info("Gmail watch registered for user_id=%d until %s", user_id, user.gmail_watch_expires_at)
+    return True
+
+
+def stop_gmail_watch(user: User) -> None:
+    """Stop a user's watch (before the Gmail token is dropped) and forget the push state.
+
+    The users.stop() call is best effort: the watch lapses within 7 days anyway.
+    The caller commits.
+    """
+    from app.services.gmail_service import GmailService
+
+    if has_active_watch(user) and user.gmail_oauth_token:
+        try:
+            svc = GmailService()
+            if svc.authenticate_for_user(user.id):
+                svc.stop_watch()
+        except Exception:
+            logger.exception("Failed to stop Gmail watch for user_id=%d", user.id)
+    user.gmail_watch_expires_at = None
+    user.gmail_history_id = None
+
+
+def renew_gmail_watches(db: Session) -> int:
+    """Queue watch renewals for Gmail users whose watch is missing or about to expire."""
+    if not gmail_push_enabled():
+        return 0
+    horizon = datetime.now(UTC) + _WATCH_RENEW_MARGIN
+    user_ids = [
+        row.id
+        for row in db.query(User.id).filter(
+            User.gmail_oauth_token.isnot(None),
+            (User.gmail_watch_expires_at.is_(None)) | (User.gmail_watch_expires_at < horizon),
+        )
+    ]
+    for user_id in user_ids:
+        enqueue_gmail_watch(db, user_id)
+    return len(user_ids)
+
+
+def build_push_envelope(email_address: str, history_id: str | int, message_id: str = "local-1") -> dict:
+    """The JSON body Cloud Pub/Sub POSTs to a push endpoint for a Gmail notification."""
+    data = json.dumps({"emailAddress": email_address, "historyId": int(history_id)})
+    return {
+        "message": {
+            "data": base64.b64encode(data.encode()).decode(),
+            "messageId": message_id,
+            "publishTime": datetime.now(UTC).isoformat(),
+        },
+        "subscription": "projects/local/subscriptions/gmail-push",
+    }
+
+
+def decode_push_envelope(body: dict) -> tuple[str, str] | None:
+    """Return (emailAddress, historyId) from a Pub/Sub push body, or None if malformed."""
+    try:
+        data = json.loads(base64.b64decode((body.get("message") or {})["data"]))
+        return str(data["emailAddress"]), str(data["historyId"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def handle_gmail_notification(db: Session, email_address: str, history_id: str) -> Job | None:
+    """Queue a (debounced, deduplicated) history sync for the user owning this mailbox."""
+    user = (
+        db.query(User)
+        .filter(func.lower(User.gmail_email) == email_address.lower(), User.gmail_oauth_token.isnot(None))
+        .first()
+    )
+    if user is None:
+        logger.info("Gmail notification for unknown mailbox ignored")
+        return None
+    return enqueue_job(
+        db,
+        "gmail_history_sync",
+        user.id,
+        provider="gmail",
+        payload={"history_id": history_id},
+        priority=HISTORY_SYNC_PRIORITY,
+        dedupe_key=f"gmail_history_sync:{user.id}",
+        delay_seconds=settings.GMAIL_PUSH_DEBOUNCE_SECONDS,
+    )
+
+
+def sync_gmail_history(db: Session, user_id: int) -> int:
+    """Upsert and detect INBOX messages added since the stored historyId. Returns the count.
+
+    Without a stored historyId, or when Gmail no longer has history that old, a
+    first-page sync is done instead and the historyId is reset to the current one.
+    """
+    from googleapiclient.errors import HttpError
+
+    from app.schemas.email import EmailItem
+    from app.services.email_sync_service import sync_user_emails, upsert_detected_items
+    from app.services.gmail_service import GmailService
+
+    user = db.get(User, user_id)
+    if user is None or not user.gmail_oauth_token:
+        return 0
+    svc = GmailService()
+    if not svc.authenticate_for_user(user_id):
+        return 0
+
+    def full_resync() -> int:
+        sync_user_emails(db, user_id, providers=("gmail",))
+        user.gmail_history_id = svc.get_history_id()
+        db.commit()
+        return 0
+
+    if not user.gmail_history_id:
+        return full_resync()
+    try:
+        message_ids, latest = svc.list_history_message_ids(user.gmail_history_id)
+    except HttpError as exc:
+        if exc.resp.status == 404:
+            logger.info("Gmail history for user_id=%d expired; resyncing first page", user_id)
+            return full_resync()
+        raise
+
+    items = [
+        EmailItem(
+            subject=r["subject"],
+            body=r["body"],
+            message_id=r["message_id"],
+            sender=r.get("sender"),
+            date=r.get("date"),
+            provider="gmail",
+        )
+        for r in svc.fetch_messages(message_ids)
+    ]
+    upsert_detected_items(db, user_id, items)
+    user.gmail_history_id = latest
+    db.commit()
+    logger.info("Gmail history sync for user_id=%d: %d new messages", user_id, len(items))
+    return len(items)
@@ -1,20 +1,27 @@
+import asyncio
 import base64
+import binascii
+import codecs
+import functools
 import glob
-import html as _html
 import json
 import logging
 import os
-import re as _re
-from typing import Any
-
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import Resource, build
+import time
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any, cast
 
+from app.core.config import settings
 from app.core.encryption import decrypt, encrypt
+from app.core.metrics import observe_provider_call
+from app.nlp.textnorm import html_to_text
 from app.schemas.detection import EmailInput
 
+if TYPE_CHECKING:
+    # The Google SDK is imported where it is used: it costs ~200 ms at start-up
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import Resource
+
 SCOPES = [
     "https://www.googleapis.com/auth/gmail.readonly",
     "https://www.googleapis.com/auth/userinfo.email",
@@ -51,70 +58,171 @@ def _save_gmail_token_to_db(user_id: int, token_json_str: str, gmail_email: str)
 def _load_gmail_token_from_db(user_id: int) -> tuple[str, str] | None:
     from app.db.database import SessionLocal
     from app.models.user import User as UserModel
-    db = SessionLocal()
-    try:
-        user = db.get(UserModel, user_id)
-        if user and user.gmail_oauth_token:
-            return (decrypt(user.gmail_oauth_token), user.gmail_email or "")
-        return None
-    finally:
-        db.close()
-
-
-def _decode_body(data: str | None) -> str:
+    # One narrow query: the token column is deferred on User, and the pooled
+    # connection goes back as soon as the row is read
+    with SessionLocal() as db:
+        row = db.query(UserModel.gmail_oauth_token, UserModel.gmail_email).filter(UserModel.id == user_id).first()
+    if row and row.gmail_oauth_token:
+        return (decrypt(row.gmail_oauth_token), row.gmail_email or "")
+    return None
+
+
+@functools.cache
+def _timed_request_builder() -> type:
+    """HttpRequest subclass observing each Gmail API call in the provider latency histogram."""
+    from googleapiclient.errors import HttpError
+    from googleapiclient.http import HttpRequest
+
+    class TimedHttpRequest(HttpRequest):
+        def execute(self, http=None, num_retries=0):
+            started = time.perf_counter()
+            status = "200"
+            try:
+                return super().execute(http=http, num_retries=num_retries)
+            except HttpError as exc:
+                status = str(exc.resp.status)
+                raise
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                observe_provider_call("gmail", self.methodId or "unknown", status, time.perf_counter() - started)
+
+    return TimedHttpRequest
+
+
+# Base64 is decoded in slices of this many characters (a multiple of 4)
+_B64_CHUNK_CHARS = 64 * 1024
+
+
+def _iter_decoded_chunks(data: str) -> Iterator[str]:
+    """Yield a base64url part body as text, one slice at a time.
+
+    Slices are decoded independently and fed through an incremental UTF-8
+    decoder, so multi-byte characters split across slices are preserved and the
+    caller can stop early without materialising the whole part.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for start in range(0, len(data), _B64_CHUNK_CHARS):
+        piece = data[start:start + _B64_CHUNK_CHARS]
+        if start + _B64_CHUNK_CHARS >= len(data):
+            piece += "=" * (-len(piece) % 4)
+        try:
+            raw = base64.urlsafe_b64decode(piece.encode("ascii"))
+        except (binascii.Error, ValueError):
+            logger.warning("Invalid base64 in Gmail message part; stopping decode")
+            return
+        text = decoder.decode(raw)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _decode_body(data: str | None, max_chars: int | None = None) -> str:
+    """Decode a base64url part body, stopping once max_chars characters are decoded."""
     if not data:
         return ""
-    try:
-        decoded = base64.urlsafe_b64decode(data.encode("ASCII"))
-        return decoded.decode("utf-8", errors="replace")
-    except Exception:
-        return ""
+    out: list[str] = []
+    remaining = max_chars
+    for text in _iter_decoded_chunks(data):
+        if remaining is not None:
+            text = text[:remaining]
+            remaining -= len(text)
+        out.append(text)
+        if remaining is not None and remaining <= 0:
+            break
+    return "".join(out)
 
 
 def _strip_html(raw: str) -> str:
     """Remove HTML tags and decode entities, returning plain text."""
-    text = _re.sub(r"<(style|script)[^>]*>.*?</\1>", " ", raw, flags=_re.DOTALL | _re.IGNORECASE)
-    text = _re.sub(r"<[^>]+>", " ", text)
-    text = _html.unescape(text)
-    return _re.sub(r"\s+", " ", text).strip()
-
+    return html_to_text(raw)
 
-def _extract_body_from_payload(payload: dict[str, Any], snippet_fallback: str = "") -> str:
-    """Extract plain-text body from Gmail message payload (recursive MIME traversal)."""
-    body = payload.get("body", {})
-    if body.get("data"):
-        return _decode_body(body["data"])
 
+def _find_part_data(payload: dict[str, Any], mime_type: str) -> str | None:
+    """Return the base64 data of the first part of mime_type (depth-first), without decoding it."""
     parts = payload.get("parts") or []
-    text_plain: str | None = None
-    text_html: str | None = None
-
     for part in parts:
         mime = (part.get("mimeType") or "").lower()
-        part_body = part.get("body") or {}
-
         if mime.startswith("multipart/"):
-            # Recurse into nested containers (e.g. multipart/mixed → multipart/alternative)
-            nested = _extract_body_from_payload(part, "")
-            if nested and text_plain is None:
-                text_plain = nested
+            nested = _find_part_data(part, mime_type)
+            if nested:
+                return nested
             continue
-
-        if not part_body.get("data"):
-            continue
-        decoded = _decode_body(part_body["data"])
-        if mime == "text/plain" and text_plain is None:
-            text_plain = decoded
-        elif mime == "text/html" and text_html is None:
-            text_html = decoded
-
-    if text_plain:
-        return text_plain
-    if text_html:
-        return _strip_html(text_html)
+        if mime == mime_type:
+            data = (part.get("body") or {}).get("data")
+            if data:
+                return cast(str, data)
+    return None
+
+
+def _extract_body_from_payload(
+    payload: dict[str, Any],
+    snippet_fallback: str = "",
+    max_chars: int | None = None,
+) -> str:
+    """Extract the plain-text body from a Gmail message payload.
+
+    The MIME tree is searched first and only the selected part is decoded:
+    text/plain is preferred, text/html is converted to text while it is
+    decoded. With max_chars set, decoding stops after that many characters, so
+    a multi-megabyte newsletter costs no more than the budget; None decodes the
+    whole part (the /emails/body view).
+    """
+    body = payload.get("body") or {}
+    if body.get("data"):
+        if (payload.get("mimeType") or "").lower() == "text/html":
+            return html_to_text(_iter_decoded_chunks(body["data"]), max_chars)
+        return _decode_body(body["data"], max_chars)
+
+    plain = _find_part_data(payload, "text/plain")
+    if plain:
+        text = _decode_body(plain, max_chars)
+        if text:
+            return text
+    html = _find_part_data(payload, "text/html")
+    if html:
+        text = html_to_text(_iter_decoded_chunks(html), max_chars)
+        if text:
+            return text
     return snippet_fallback
 
 
+def _email_dict_from_message(msg: dict[str, Any]) -> dict[str, str]:
+    """Flatten a format="full" Gmail message into the dict shape used by the email endpoints.
+
+    The body feeds the feed and detection, so it is cut at EMAIL_BODY_MAX_CHARS.
+    """
+    payload = msg.get("payload", {})
+    headers: list[dict[str, Any]] = payload.get("headers", [])
+    snippet: str = msg.get("snippet", "")
+    return {
+        "subject": next((h["value"] for h in headers if h["name"] == "Subject"), "No Subject"),
+        "body": _extract_body_from_payload(payload, snippet, settings.EMAIL_BODY_MAX_CHARS),
+        "message_id": msg.get("id", ""),
+        "sender": next((h["value"] for h in headers if h["name"] == "From"), "Unknown Sender"),
+        "date": next((h["value"] for h in headers if h["name"] == "Date"), "Unknown Date"),
+    }
+
+
+def _body_fields_mask(depth: int = 4) -> str:
+    """Partial-response mask for messages.get: only the MIME tree and part data.
+
+    Headers, part headers, filenames and attachment ids are dropped, which is most
+    of a format="full" response for small messages. `depth` is how many levels of
+    nested multipart containers are kept (mixed > related > alternative > text).
+    """
+    part = "mimeType,body/data"
+    for _ in range(depth):
+        part = f"mimeType,body/data,parts({part})"
+    return f"snippet,payload({part})"
+
+
+_BODY_FIELDS = _body_fields_mask()
+
+
 class GmailService:
     def __init__(self, credentials_path: str = "credentials.json"):
         self.credentials_path = credentials_path
@@ -146,30 +254,42 @@ class GmailService:
         if record is None:
             return False
         token_str, gmail_email = record
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from googleapiclient.discovery import build
+
         try:
             self.creds = Credentials.from_authorized_user_info(json.loads(token_str), SCOPES)
             if self.creds and self.creds.expired and self.creds.refresh_token:
                 self.creds.refresh(Request())
                 _save_gmail_token_to_db(user_id, self.creds.to_json(), gmail_email)
-            self.service = build("gmail", "v1", credentials=self.creds)
+            self.service = build("gmail", "v1", credentials=self.creds, requestBuilder=_timed_request_builder())
             self.current_email = gmail_email
             return True
         except Exception:
             logger.exception("Failed to authenticate stored Gmail token for user_id=%s", user_id)
             return False
 
+    async def authenticate_for_user_async(self, user_id: int) -> bool:
+        """Async variant of authenticate_for_user — DB load and token refresh run in a worker thread."""
+        return await asyncio.to_thread(self.authenticate_for_user, user_id)
+
     def authenticate_existing_account(self, email: str) -> bool:
         """Authenticates using an existing token for the given email (legacy)."""
         token_path = os.path.join(TOKENS_DIR, f"gmail_{email}.json")
         if not os.path.exists(token_path):
             return False
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from googleapiclient.discovery import build
+
         try:
             self.creds = Credentials.from_authorized_user_file(token_path, SCOPES)
             if self.creds and self.creds.expired and self.creds.refresh_token:
                 self.creds.refresh(Request())
                 with open(token_path, "w") as token:
                     token.write(self.creds.to_json())
-            self.service = build("gmail", "v1", credentials=self.creds)
+            self.service = build("gmail", "v1", credentials=self.creds, requestBuilder=_timed_request_builder())
             self.current_email = email
             return True
         except Exception:
@@ -179,6 +299,9 @@ class GmailService:
         """Starts a new OAuth flow, saves the token with the email address, and returns the email."""
         if not os.path.exists(self.credentials_path):
             raise FileNotFoundError(f"Credentials file not found at: {self.credentials_path}")
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
+
         flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, SCOPES)
         self.creds = flow.run_local_server(port=0)
         service = build("oauth2", "v2", credentials=self.creds)
@@ -190,11 +313,11 @@ class GmailService:
         token_path = os.path.join(TOKENS_DIR, f"gmail_{email_str}.json")
         with open(token_path, "w") as token:
             token.write(self.creds.to_json())
-        self.service = build("gmail", "v1", credentials=self.creds)
+        self.service = build("gmail", "v1", credentials=self.creds, requestBuilder=_timed_request_builder())
         self.current_email = email_str
         return email_str
 
-    def save_token_for_user(self, user_id: int, creds: Credentials, gmail_email: str | None = None) -> None:
+    def save_token_for_user(self, user_id: int, creds: "Credentials", gmail_email: str | None = None) -> None:
         """Save token and optional gmail_email for an app user to the DB."""
         _save_gmail_token_to_db(user_id, creds.to_json(), gmail_email or "")
 
@@ -234,7 +357,15 @@ class GmailService:
                     ),
                     request_id=stub["id"],
                 )
-            batch.execute()
+            batch_status = "200"
+            batch_started = time.perf_counter()
+            try:
+                batch.execute()
+            except Exception:
+                batch_status = "error"
+                raise
+            finally:
+                observe_provider_call("gmail", "batch", batch_status, time.perf_counter() - batch_started)
 
             email_data: list[dict[str, str]] = []
             for stub in stubs:
@@ -259,12 +390,16 @@ class GmailService:
             return [], None
 
     def fetch_email_body(self, message_id: str) -> str:
-        """Fetch the full body of a single Gmail email by message_id."""
+        """Fetch the full body of a single Gmail email by message_id.
+
+        Only the MIME tree and part payloads are requested (see _BODY_FIELDS);
+        callers cache the decoded result in app.services.body_cache.
+        """
         if not self.service:
             return ""
         try:
             msg = self.service.users().messages().get(
-                userId="me", id=message_id, format="full"
+                userId="me", id=message_id, format="full", fields=_BODY_FIELDS
             ).execute()
             payload = msg.get("payload", {})
             snippet = msg.get("snippet", "")
@@ -273,56 +408,170 @@ class GmailService:
             logger.exception("Failed to fetch Gmail email body for message_id=%s", message_id)
             return ""
 
+    def fetch_email_page_cached(
+        self, user_id: int, page_token: str | None = None, limit: int = 50
+    ) -> tuple[list[dict[str, str]], str | None]:
+        """fetch_email_page behind the conditional page cache (see app.services.page_cache).
+
+        One getProfile call reads the mailbox historyId; if it matches the one
+        the page was cached under, the cached page is returned without the
+        messages.list and batch get requests.
+        """
+        from app.services import page_cache
+
+        page = (page_token or "", limit)
+        entry = page_cache.lookup(user_id, "gmail", page)
+        try:
+            history_id = self.get_history_id()
+        except Exception:
+            logger.warning("Gmail historyId unavailable; fetching page uncached", exc_info=True)
+            history_id = None
+        if entry is not None and history_id is not None and entry.validator == history_id:
+            page_cache.record("gmail", hit=True)
+            return page_cache.cached_items(entry), entry.extra.get("next_token")
+
+        page_cache.record("gmail", hit=False)
+        emails, next_token = self.fetch_email_page(page_token, limit)
+        if emails and history_id is not None:
+            page_cache.store(user_id, "gmail", page, history_id, emails, next_token=next_token)
+        return emails, next_token
+
+    async def fetch_email_page_async(
+        self, page_token: str | None = None, limit: int = 50, user_id: int | None = None
+    ) -> tuple[list[dict[str, str]], str | None]:
+        """Async variant of fetch_email_page; with user_id the page cache is used.
+
+        googleapiclient is blocking (httplib2), so the batch request runs in a
+        worker thread and the event loop stays free for other requests.
+        """
+        if user_id is not None:
+            return await asyncio.to_thread(self.fetch_email_page_cached, user_id, page_token, limit)
+        return await asyncio.to_thread(self.fetch_email_page, page_token, limit)
+
+    async def fetch_email_body_async(self, message_id: str) -> str:
+        """Async variant of fetch_email_body."""
+        return await asyncio.to_thread(self.fetch_email_body, message_id)
+
     def fetch_recent_emails(self, n: int | None = None) -> list[dict[str, str]]:
         """Fetch emails with full body. n=None fetches all (up to Gmail API limits via pagination)."""
         if not self.service:
             raise RuntimeError("Gmail service is not initialized.")
         try:
-            # Collect message stubs via paginated list (Gmail max per page is 500)
-            message_stubs: list[dict] = []
-            page_token: str | None = None
-            while True:
-                kwargs: dict = {"userId": "me", "maxResults": 500}
-                if page_token:
-                    kwargs["pageToken"] = page_token
-                results = self.service.users().messages().list(**kwargs).execute()
-                stubs = results.get("messages", [])
-                message_stubs.extend(stubs)
-                page_token = results.get("nextPageToken")
-                if not page_token or (n is not None and len(message_stubs) >= n):
-                    break
-
-            if n is not None:
-                message_stubs = message_stubs[:n]
-
-            if not message_stubs:
-                return []
-
-            email_data = []
-            for message in message_stubs:
-                msg = self.service.users().messages().get(
-                    userId="me", id=message["id"], format="full"
-                ).execute()
-                payload = msg.get("payload", {})
-                headers: list[dict[str, Any]] = payload.get("headers", [])
-                snippet: str = msg.get("snippet", "")
-                subject = next((h["value"] for h in headers if h["name"] == "Subject"), "No Subject")
-                sender = next((h["value"] for h in headers if h["name"] == "From"), "Unknown Sender")
-                date = next((h["value"] for h in headers if h["name"] == "Date"), "Unknown Date")
-                body = _extract_body_from_payload(payload, snippet)
-                message_id = msg.get("id", "")
-                email_data.append({
-                    "subject": subject,
-                    "body": body,
-                    "message_id": message_id,
-                    "sender": sender,
-                    "date": date,
-                })
-            return email_data
+            return list(self.iter_recent_emails(n))
         except Exception:
             logger.exception("Failed to fetch Gmail emails for account=%s", self.current_email or "unknown")
             return []
 
+    def iter_recent_emails(self, n: int | None = None) -> Iterator[dict[str, str]]:
+        """Yield emails with full body one at a time, newest first.
+
+        Message ids are listed a page (500) at a time and each message is only
+        downloaded when the consumer asks for it, so streaming callers see the
+        first email after two API calls instead of after the whole mailbox.
+        Errors propagate to the caller.
+        """
+        if not self.service:
+            raise RuntimeError("Gmail service is not initialized.")
+        page_token: str | None = None
+        yielded = 0
+        while True:
+            kwargs: dict = {"userId": "me", "maxResults": 500}
+            if page_token:
+                kwargs["pageToken"] = page_token
+            results = self.service.users().messages().list(**kwargs).execute()
+            for stub in results.get("messages", []):
+                if n is not None and yielded >= n:
+                    return
+                msg = self.service.users().messages().get(
+                    userId="me", id=stub["id"], format="full"
+                ).execute()
+                yield _email_dict_from_message(msg)
+                yielded += 1
+            page_token = results.get("nextPageToken")
+            if not page_token or (n is not None and yielded >= n):
+                return
+
+    def start_watch(self, topic_name: str) -> dict[str, Any]:
+        """Register (or renew) push notifications for the INBOX on a Cloud Pub/Sub topic.
+
+        Returns Gmail's response: {"historyId": ..., "expiration": <epoch ms>}.
+        A watch lasts 7 days and must be renewed before it expires.
+        """
+        if not self.service:
+            raise RuntimeError("Gmail service is not initialized.")
+        response = self.service.users().watch(
+            userId="me",
+            body={"topicName": topic_name, "labelIds": ["INBOX"], "labelFilterBehavior": "INCLUDE"},
+        ).execute()
+        return cast(dict[str, Any], response)
+
+    def stop_watch(self) -> None:
+        if not self.service:
+            raise RuntimeError("Gmail service is not initialized.")
+        self.service.users().stop(userId="me").execute()
+
+    def get_history_id(self) -> str:
+        """Current mailbox historyId (starting point for incremental history sync)."""
+        if not self.service:
+            raise RuntimeError("Gmail service is not initialized.")
+        return str(self.service.users().getProfile(userId="me", fields="historyId").execute()["historyId"])
+
+    def list_history_message_ids(self, start_history_id: str) -> tuple[list[str], str]:
+        """Ids of INBOX messages added since start_history_id, oldest first, and the new historyId.
+
+        Raises googleapiclient.errors.HttpError (404) when start_history_id is too
+        old for Gmail to answer; callers fall back to a full first-page sync.
+        """
+        if not self.service:
+            raise RuntimeError("Gmail service is not initialized.")
+        message_ids: list[str] = []
+        seen: set[str] = set()
+        latest = start_history_id
+        page_token: str | None = None
+        while True:
+            kwargs: dict = {
+                "userId": "me",
+                "startHistoryId": start_history_id,
+                "historyTypes": ["messageAdded"],
+                "labelId": "INBOX",
+            }
+            if page_token:
+                kwargs["pageToken"] = page_token
+            result = self.service.users().history().list(**kwargs).execute()
+            for record in result.get("history", []):
+                for added in record.get("messagesAdded", []):
+                    msg_id = (added.get("message") or {}).get("id")
+                    if msg_id and msg_id not in seen:
+                        seen.add(msg_id)
+                        message_ids.append(msg_id)
+            latest = str(result.get("historyId", latest))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return message_ids, latest
+
+    def fetch_messages(self, message_ids: list[str]) -> list[dict[str, str]]:
+        """Fetch full messages by id; messages deleted in the meantime are skipped."""
+        if not self.service:
+            raise RuntimeError("Gmail service is not initialized.")
+        from googleapiclient.errors import HttpError
+
+        emails: list[dict[str, str]] = []
+        for message_id in message_ids:
+            try:
+                msg = self.service.users().messages().get(
+                    userId="me", id=message_id, format="full"
+                ).execute()
+            except HttpError as exc:
+                if exc.resp.status == 404:
+                    continue
+                raise
+            emails.append(_email_dict_from_message(msg))
+        return emails
+
+    async def fetch_recent_emails_async(self, n: int | None = None) -> list[dict[str, str]]:
+        """Async variant of fetch_recent_emails."""
+        return await asyncio.to_thread(self.fetch_recent_emails, n)
+
     def fetch_recent_emails_as_inputs(self, n: int | None = None) -> list[EmailInput]:
         """Fetch emails and return as list[EmailInput] for detection."""
         raw = self.fetch_recent_emails(n=n)
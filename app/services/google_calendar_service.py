@@ -1,9 +1,6 @@
 import json
 from datetime import datetime
-
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from typing import TYPE_CHECKING
 
 from app.services.gmail_service import (
     SCOPES,
@@ -11,11 +8,17 @@ from app.services.gmail_service import (
     _save_gmail_token_to_db,
 )
 
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
 
-def _load_creds_for_user(user_id: int) -> Credentials:
+def _load_creds_for_user(user_id: int) -> "Credentials":
     """Load and auto-refresh the user's stored Google OAuth credentials from DB."""
     record = _load_gmail_token_from_db(user_id)
     if record is not None:
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+
         token_str, gmail_email = record
         creds = Credentials.from_authorized_user_info(json.loads(token_str), SCOPES)
         if creds.expired and creds.refresh_token:
@@ -52,6 +55,7 @@ def create_google_calendar_event(
     sendUpdates="all" automatically emails calendar invites to all attendees.
     """
     creds = _load_creds_for_user(user_id)
+    from googleapiclient.discovery import build
 
     # Same build() pattern as gmail_service.py — just a different API name
     service = build("calendar", "v3", credentials=creds)
@@ -14,20 +14,15 @@ The `state` parameter is an HMAC-signed string containing the user_id to prevent
 """
 import hashlib
 import hmac
-import json
 import os
 from pathlib import Path
 from secrets import choice, token_urlsafe
 from string import ascii_letters, digits
-from time import time
-
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 
 from app.core.config import settings
 from app.db.database import SessionLocal
-from app.services.gmail_service import SCOPES, TOKENS_DIR, GmailService
+from app.services.gmail_service import SCOPES, GmailService
+from app.services.pkce_store import get_pkce_store
 
 
 class GoogleOAuthExchangeError(RuntimeError):
@@ -52,68 +47,12 @@ def _build_client_config() -> dict:
     }
 
 
-def _get_pkce_store_path() -> Path:
-    tokens_dir = Path(TOKENS_DIR)
-    resolved_tokens_dir = tokens_dir if tokens_dir.is_absolute() else Path.cwd() / tokens_dir
-    return resolved_tokens_dir / ".google_oauth_pkce.json"
-
-
-def _load_pkce_store() -> dict[str, dict[str, float | str]]:
-    store_path = _get_pkce_store_path()
-    if not store_path.exists():
-        return {}
-
-    try:
-        data = json.loads(store_path.read_text())
-    except Exception:
-        return {}
-
-    if not isinstance(data, dict):
-        return {}
-
-    return data
-
-
-def _save_pkce_store(store: dict[str, dict[str, float | str]]) -> None:
-    store_path = _get_pkce_store_path()
-    store_path.parent.mkdir(parents=True, exist_ok=True)
-    store_path.write_text(json.dumps(store))
-
-
-def _prune_expired_pkce_store(
-    store: dict[str, dict[str, float | str]],
-    now: float | None = None,
-) -> dict[str, dict[str, float | str]]:
-    current_time = now if now is not None else time()
-    return {
-        nonce: entry
-        for nonce, entry in store.items()
-        if isinstance(entry, dict)
-        and isinstance(entry.get("expires_at"), (int, float))
-        and float(entry["expires_at"]) > current_time
-        and isinstance(entry.get("code_verifier"), str)
-    }
-
-
 def _store_code_verifier(nonce: str, code_verifier: str) -> None:
-    store = _prune_expired_pkce_store(_load_pkce_store())
-    now = time()
-    store[nonce] = {
-        "code_verifier": code_verifier,
-        "created_at": now,
-        "expires_at": now + PKCE_VERIFIER_TTL_SECONDS,
-    }
-    _save_pkce_store(store)
+    get_pkce_store().put(nonce, code_verifier, PKCE_VERIFIER_TTL_SECONDS)
 
 
 def _consume_code_verifier(nonce: str) -> str | None:
-    store = _prune_expired_pkce_store(_load_pkce_store())
-    entry = store.pop(nonce, None)
-    _save_pkce_store(store)
-    if not entry:
-        return None
-    code_verifier = entry.get("code_verifier")
-    return code_verifier if isinstance(code_verifier, str) else None
+    return get_pkce_store().consume(nonce)
 
 
 def _generate_state_nonce() -> str:
@@ -125,7 +64,6 @@ def _generate_code_verifier(length: int = 96) -> str:
 
 
 def get_google_oauth_runtime_diagnostics() -> dict[str, str | bool | None]:
-    pkce_store_path = _get_pkce_store_path()
     settings_source = "environment" if os.getenv("DATABASE_URL") else ".env"
     return {
         "settings_source": settings_source,
@@ -133,8 +71,7 @@ def get_google_oauth_runtime_diagnostics() -> dict[str, str | bool | None]:
         "redirect_uri": settings.GMAIL_REDIRECT_URI,
         "client_id_configured": bool(settings.GOOGLE_CLIENT_ID),
         "client_secret_configured": bool(settings.GOOGLE_CLIENT_SECRET),
-        "pkce_store_path": str(pkce_store_path),
-        "pkce_store_exists": pkce_store_path.exists(),
+        "pkce_store": type(get_pkce_store()).__name__,
         "secret_key_configured": bool(settings.SECRET_KEY),
     }
 
@@ -178,6 +115,8 @@ def _verify_state(state: str) -> tuple[int, str]:
 def get_auth_url(user_id: int) -> str:
     """Build the Google OAuth consent URL for the given user."""
     _ensure_runtime_config()
+    from google_auth_oauthlib.flow import Flow
+
     try:
         flow = Flow.from_client_config(
             _build_client_config(),
@@ -217,6 +156,8 @@ def exchange_code_for_token(state: str, code: str) -> int:
         ) from exc
 
     _ensure_runtime_config()
+    from google_auth_oauthlib.flow import Flow
+    from googleapiclient.discovery import build
 
     try:
         flow = Flow.from_client_config(
@@ -249,7 +190,7 @@ def exchange_code_for_token(state: str, code: str) -> int:
             "Google OAuth token exchange failed.",
         ) from exc
 
-    creds: Credentials = flow.credentials
+    creds = flow.credentials
 
     try:
         oauth2_service = build("oauth2", "v2", credentials=creds)
@@ -1,7 +1,5 @@
 from datetime import datetime
 
-from googleapiclient.discovery import build
-
 from app.services.google_calendar_service import _load_creds_for_user
 
 
@@ -20,6 +18,7 @@ def create_google_task(
     Returns the created task ID (store if you need to update/delete later).
     """
     creds = _load_creds_for_user(user_id)
+    from googleapiclient.discovery import build
 
     # Same build() pattern as Gmail and Calendar services
     service = build("tasks", "v1", credentials=creds)
@@ -0,0 +1,187 @@
+"""
+Persistent, DB-backed job queue for background work.
+
+Web processes enqueue jobs with enqueue_job(); the separate worker process
+(python -m app.workers.job_worker) leases them with claim_jobs(), runs them and
+reports back with complete_job() / fail_job(). A job whose lease expires before
+it is completed (e.g. the worker crashed) becomes claimable again, so nothing
+is lost on restart.
+"""
+import logging
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_MAX_BACKOFF_SECONDS = 3600
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC)
+
+
+def enqueue_job(
+    db: Session,
+    kind: str,
+    user_id: int | None = None,
+    *,
+    provider: str | None = None,
+    payload: dict | None = None,
+    priority: int = 0,
+    dedupe_key: str | None = None,
+    delay_seconds: float = 0,
+    max_attempts: int = 5,
+) -> Job:
+    """Add a job to the queue and commit.
+
+    If dedupe_key is set and a queued (not yet running) job with the same key
+    exists, that job is returned instead — its priority is raised if needed.
+    """
+    if dedupe_key:
+        existing = (
+            db.query(Job)
+            .filter(Job.dedupe_key == dedupe_key, Job.status == JOB_QUEUED)
+            .first()
+        )
+        if existing:
+            if priority > existing.priority:
+                existing.priority = priority
+                db.commit()
+            return existing
+
+    job = Job(
+        kind=kind,
+        user_id=user_id,
+        provider=provider,
+        payload=payload,
+        priority=priority,
+        dedupe_key=dedupe_key,
+        max_attempts=max_attempts,
+        status=JOB_QUEUED,
+        attempts=0,
+        run_after=_utcnow() + timedelta(seconds=delay_seconds),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def claim_jobs(
+    db: Session,
+    worker_id: str,
+    limit: int,
+    *,
+    lease_seconds: int | None = None,
+    accept: Callable[[Job], bool] | None = None,
+) -> list[Job]:
+    """Lease up to `limit` runnable jobs for this worker, highest priority first.
+
+    `accept` is called for each candidate in claim order; returning False skips
+    the job (e.g. its user or provider is already at its concurrency limit).
+    On PostgreSQL candidates are locked with SKIP LOCKED so several workers can
+    poll the same table without handing out the same job twice.
+    """
+    if limit <= 0:
+        return []
+    now = _utcnow()
+    lease = lease_seconds or settings.JOB_LEASE_SECONDS
+    query = (
+        db.query(Job)
+        .filter(
+            or_(
+                and_(Job.status == JOB_QUEUED, Job.run_after <= now),
+                and_(Job.status == JOB_RUNNING, Job.lease_expires_at < now),
+            )
+        )
+        .order_by(Job.priority.desc(), Job.run_after, Job.id)
+        .limit(limit * 4)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    claimed: list[Job] = []
+    for job in query.all():
+        if len(claimed) >= limit:
+            break
+        if job.status == JOB_RUNNING and job.attempts >= job.max_attempts:
+            # Lease expired on the final attempt — give up rather than loop forever
+            job.status = JOB_FAILED
+            job.last_error = job.last_error or "lease expired"
+            job.lease_expires_at = None
+            continue
+        if accept is not None and not accept(job):
+            continue
+        job.status = JOB_RUNNING
+        job.locked_by = worker_id
+        job.lease_expires_at = now + timedelta(seconds=lease)
+        job.attempts = (job.attempts or 0) + 1
+        claimed.append(job)
+    db.commit()
+    return claimed
+
+
+def complete_job(db: Session, job: Job) -> None:
+    """Mark a leased job as done and release its lease."""
+    job.status = JOB_DONE
+    job.lease_expires_at = None
+    job.locked_by = None
+    job.last_error = None
+    db.commit()
+
+
+def fail_job(db: Session, job: Job, error: str) -> None:
+    """Record a failure; requeue with exponential backoff until max_attempts is reached."""
+    job.last_error = error[:2000]
+    job.lease_expires_at = None
+    job.locked_by = None
+    if job.attempts < job.max_attempts:
+        backoff = min(
+            settings.JOB_RETRY_BASE_SECONDS * 2 ** max(job.attempts - 1, 0),
+            _MAX_BACKOFF_SECONDS,
+        )
+        job.status = JOB_QUEUED
+        job.run_after = _utcnow() + timedelta(seconds=backoff)
+        logger.warning(
+            "Job %d (%s) failed on attempt %d, retrying in %ds: %s",
+            job.id, job.kind, job.attempts, backoff, error,
+        )
+    else:
+        job.status = JOB_FAILED
+        logger.error("Job %d (%s) failed permanently: %s", job.id, job.kind, error)
+    db.commit()
+
+
+def prune_finished_jobs(db: Session, older_than_seconds: int = 7 * 24 * 3600) -> int:
+    """Delete done/failed jobs last updated before the cutoff. Returns the number deleted."""
+    cutoff = _utcnow() - timedelta(seconds=older_than_seconds)
+    deleted = (
+        db.query(Job)
+        .filter(Job.status.in_((JOB_DONE, JOB_FAILED)), Job.updated_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+def enqueue_inbox_sync(db: Session, user_id: int, provider: str, priority: int = 10) -> Job:
+    """Queue a first-page inbox sync for one provider (deduplicated per user+provider)."""
+    return enqueue_job(
+        db,
+        "sync_emails",
+        user_id,
+        provider=provider,
+        priority=priority,
+        dedupe_key=f"sync_emails:{user_id}:{provider}",
+    )
@@ -52,14 +52,12 @@ def _save_outlook_token_to_db(user_id: int, token_data: dict) -> None:
 def _load_outlook_token_from_db(user_id: int) -> dict | None:
     from app.db.database import SessionLocal
     from app.models.user import User as UserModel
-    db = SessionLocal()
-    try:
-        user = db.get(UserModel, user_id)
-        if user and user.outlook_oauth_token:
-            return json.loads(decrypt(user.outlook_oauth_token))
-        return None
-    finally:
-        db.close()
+    # One narrow query (the token column is deferred on User)
+    with SessionLocal() as db:
+        token = db.query(UserModel.outlook_oauth_token).filter(UserModel.id == user_id).scalar()
+    if token:
+        return json.loads(decrypt(token))
+    return None
 
 
 def _sign_state(user_id: int) -> str:
@@ -1,13 +1,69 @@
 import asyncio
+import json
+import logging
 import random
 
+from app.core.config import settings
+from app.nlp.llm_backend import get_llm_backend, llm_enabled, run_on_llm_loop
+
+logger = logging.getLogger(__name__)
+
+_SUGGESTIONS_SCHEMA: dict = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "mail_suggestions",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "amical": {"type": "string"},
+                "formel": {"type": "string"},
+                "court": {"type": "string"},
+            },
+            "required": ["amical", "formel", "court"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def _suggestions_prompt(summary: str) -> str:
+    return (
+        "Rédige trois réponses en français à cet email : une amicale, une formelle et une très courte. "
+        "Réponds en JSON avec les clés amical, formel et court.\n\n"
+        f"Email : {summary}"
+    )
+
+
+def _as_variants(chosen: dict) -> list[dict]:
+    return [
+        {"label": "Amical", "content": chosen["amical"]},
+        {"label": "Formel", "content": chosen["formel"]},
+        {"label": "Court", "content": chosen["court"]}
+    ]
+
 
 async def generate_mail_suggestions(summary: str):
     """
-    VERSION TEST (MOCK) : Simule l'appel à GPT-5.4 Mini.
-    Permet de tester le Frontend et le Backend sans clé API.
+    Trois variantes de réponse (Amical / Formel / Court).
+
+    Avec un backend LLM configuré (OPENAI_API_KEY, LLM_BASE_URL pour un serveur
+    local, ou LLM_BACKEND=stub) les variantes sont générées par le modèle ;
+    sinon, ou si l'appel échoue, on retombe sur les templates de démo.
     """
-    # On simule un petit délai réseau de 0.8 seconde pour faire "vrai" lors de la démo
+    if llm_enabled():
+        try:
+            content = await run_on_llm_loop(asyncio.wait_for(
+                get_llm_backend().acomplete_json(_suggestions_prompt(summary), _SUGGESTIONS_SCHEMA),
+                settings.LLM_CALL_TIMEOUT_SECONDS,
+            ))
+            chosen = json.loads(content or "{}")
+            if all(isinstance(chosen.get(k), str) and chosen[k] for k in ("amical", "formel", "court")):
+                return _as_variants(chosen)
+        except Exception:
+            logger.warning("LLM suggestion generation failed; using templates", exc_info=True)
+
+    # VERSION TEST (MOCK) : on simule un petit délai réseau de 0.8 seconde pour faire "vrai" lors de la démo
     await asyncio.sleep(0.8)
 
     # Liste de templates pour varier un peu les tests
@@ -25,10 +81,4 @@ async def generate_mail_suggestions(summary: str):
     ]
 
     # On choisit un set de réponses au hasard
-    chosen = random.choice(templates)
-
-    return [
-        {"label": "Amical", "content": chosen["amical"]},
-        {"label": "Formel", "content": chosen["formel"]},
-        {"label": "Court", "content": chosen["court"]}
-    ]
+    return _as_variants(random.choice(templates))
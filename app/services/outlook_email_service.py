@@ -12,11 +12,21 @@ Usage:
 
     if is_outlook_connected(user_id):
         emails = fetch_outlook_emails(user_id, n=10)
+
+Async endpoints use the *_async variants, which offload categorization to the NLP
+executor; the page and body variants share one pooled httpx.AsyncClient.
 """
+import asyncio
 import logging
+from collections.abc import Iterator
+from datetime import datetime
+from typing import cast
+from urllib.parse import quote
 
 import httpx
 
+from app.core.metrics import httpx_event_hooks
+from app.nlp.textnorm import html_to_text
 from app.schemas.email import EmailItem
 from app.schemas.detection import EmailInput as DetectionEmailInput
 from app.services.microsoft_oauth_service import _load_outlook_token_from_db, get_valid_token
@@ -28,19 +38,79 @@ _GRAPH_BASE = "https://graph.microsoft.com/v1.0"
 # Fields we request from the Graph API (minimise payload)
 _SELECT = "id,subject,body,from,receivedDateTime,isRead,isDraft"
 
+# Shared AsyncClient — keeps TLS connections to Graph alive across requests.
+# httpx pools are bound to the event loop that created them, so the client is
+# rebuilt if it is requested from a different loop (e.g. a fresh TestClient).
+_async_client: httpx.AsyncClient | None = None
+_async_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the process-wide AsyncClient for Graph calls, creating it lazily."""
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            timeout=30,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            event_hooks=httpx_event_hooks("outlook"),
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+def async_client_state() -> str:
+    """"not_created", "open" or "closed" (GET /ready)."""
+    if _async_client is None:
+        return "not_created"
+    return "closed" if _async_client.is_closed else "open"
+
+
+async def close_async_client() -> None:
+    """Close the shared AsyncClient (called on application shutdown)."""
+    global _async_client, _async_client_loop
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
+
+
+def _graph_headers(access_token: str) -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Prefer": 'outlook.body-content-type="text"',
+    }
+
 
 def is_outlook_connected(user_id: int) -> bool:
     """Return True if the user has a stored Outlook OAuth token in the DB."""
     return _load_outlook_token_from_db(user_id) is not None
 
 
-def _parse_email_item(msg: dict) -> EmailItem:
-    """Convert a Microsoft Graph message object into an EmailItem."""
+async def is_outlook_connected_async(user_id: int) -> bool:
+    """Async variant of is_outlook_connected (DB lookup runs in a worker thread)."""
+    return await asyncio.to_thread(is_outlook_connected, user_id)
+
+
+def _body_text(body_obj: dict | None) -> str:
+    """Return a Graph itemBody as text; HTML is converted if Graph ignored the Prefer header."""
+    body_obj = body_obj or {}
+    content = body_obj.get("content") or ""
+    if (body_obj.get("contentType") or "").lower() == "html":
+        return html_to_text(content)
+    return content
+
+
+def _parse_email_item(msg: dict, categorize: bool = True) -> EmailItem:
+    """Convert a Microsoft Graph message object into an EmailItem.
+
+    With categorize=False the category is left at its default so the caller can
+    batch categorization elsewhere (see _categorize_items_async).
+    """
     subject = msg.get("subject") or "(Sans objet)"
 
-    # Body — we request plain text via the Prefer header; fall back to HTML content
-    body_obj = msg.get("body") or {}
-    body = body_obj.get("content") or ""
+    # Body — we request plain text via the Prefer header; HTML is converted if it is ignored
+    body = _body_text(msg.get("body"))
 
     # Sender
     from_obj = (msg.get("from") or {}).get("emailAddress", {})
@@ -57,19 +127,30 @@ def _parse_email_item(msg: dict) -> EmailItem:
     # Use the Graph message id as our message_id (stable per message)
     message_id = msg.get("id")
 
-    # Import here to avoid circular import (detection → extractor, not outlook → detection)
-    from app.services.detection import categorize_email  # noqa: PLC0415
-    category = categorize_email(DetectionEmailInput(subject=subject, body=body))
-
-    return EmailItem(
+    item = EmailItem(
         subject=subject,
         body=body,
         message_id=message_id,
         sender=sender,
         date=date,
-        category=category,
         provider="outlook",
     )
+    if categorize:
+        # Import here to avoid circular import (detection → extractor, not outlook → detection)
+        from app.services.detection import categorize_email  # noqa: PLC0415
+        item.category = categorize_email(DetectionEmailInput(subject=subject, body=body))
+    return item
+
+
+async def _categorize_items_async(items: list[EmailItem]) -> list[EmailItem]:
+    """Fill in item.category for a list of items on the NLP executor."""
+    from app.services.detection import categorize_emails_async  # noqa: PLC0415
+    categories = await categorize_emails_async(
+        [DetectionEmailInput(subject=i.subject, body=i.body) for i in items]
+    )
+    for item, category in zip(items, categories, strict=True):
+        item.category = category
+    return items
 
 
 def fetch_outlook_emails(user_id: int, n: int | None = None) -> list[EmailItem]:
@@ -83,6 +164,18 @@ def fetch_outlook_emails(user_id: int, n: int | None = None) -> list[EmailItem]:
         FileNotFoundError — if the user has not connected Outlook yet.
         httpx.HTTPStatusError — if the Graph API returns a non-2xx status.
     """
+    items = list(iter_outlook_emails(user_id, n))
+    logger.info("Fetched %d Outlook messages for user_id=%d", len(items), user_id)
+    return items
+
+
+def iter_outlook_emails(
+    user_id: int, n: int | None = None, categorize: bool = True
+) -> Iterator[EmailItem]:
+    """Yield Outlook emails newest first, requesting the next Graph page only when needed.
+
+    Same errors as fetch_outlook_emails, raised when the failing page is reached.
+    """
     access_token = get_valid_token(user_id)  # auto-refreshes if expired
 
     next_url: str | None = f"{_GRAPH_BASE}/me/messages"
@@ -93,7 +186,7 @@ def fetch_outlook_emails(user_id: int, n: int | None = None) -> list[EmailItem]:
         "$filter": "isDraft eq false",
     }
 
-    all_messages: list[dict] = []
+    yielded = 0
     while next_url:
         resp = httpx.get(
             next_url,
@@ -106,18 +199,18 @@ def fetch_outlook_emails(user_id: int, n: int | None = None) -> list[EmailItem]:
         )
         resp.raise_for_status()
         data = resp.json()
-        all_messages.extend(data.get("value", []))
+        for msg in data.get("value", []):
+            if n is not None and yielded >= n:
+                return
+            yield _parse_email_item(msg, categorize=categorize)
+            yielded += 1
 
         # nextLink already contains all query params — don't pass params again
         next_url = data.get("@odata.nextLink")
         params = None
 
-        if n is not None and len(all_messages) >= n:
-            all_messages = all_messages[:n]
-            break
-
-    logger.info("Fetched %d Outlook messages for user_id=%d", len(all_messages), user_id)
-    return [_parse_email_item(m) for m in all_messages]
+        if n is not None and yielded >= n:
+            return
 
 
 def fetch_outlook_email_page(
@@ -150,6 +243,175 @@ def fetch_outlook_email_page(
     return [_parse_email_item(m) for m in messages], has_more
 
 
+async def fetch_outlook_emails_async(user_id: int, n: int | None = None) -> list[EmailItem]:
+    """Async variant of fetch_outlook_emails.
+
+    Paging goes through iter_outlook_emails in a worker thread; categorization
+    is then batched on the NLP executor.
+    """
+    items = await asyncio.to_thread(lambda: list(iter_outlook_emails(user_id, n, categorize=False)))
+    logger.info("Fetched %d Outlook messages for user_id=%d", len(items), user_id)
+    return await _categorize_items_async(items)
+
+
+async def fetch_outlook_email_page_async(
+    user_id: int, skip: int = 0, limit: int = 50
+) -> tuple[list[EmailItem], bool]:
+    """Async variant of fetch_outlook_email_page. Returns (emails, has_more).
+
+    Pages go through the conditional page cache (app.services.page_cache): a
+    stored ETag is sent as If-None-Match, and a page whose message ids and
+    @odata.etag values are unchanged is served from the cache instead of being
+    parsed and categorised again.
+    """
+    from app.services import page_cache  # noqa: PLC0415
+
+    access_token = await asyncio.to_thread(get_valid_token, user_id)
+    page = (skip, limit)
+    entry = page_cache.lookup(user_id, "outlook", page)
+    headers = _graph_headers(access_token)
+    if entry is not None and entry.extra.get("etag"):
+        headers["If-None-Match"] = entry.extra["etag"]
+    resp = await get_async_client().get(
+        f"{_GRAPH_BASE}/me/messages",
+        params={
+            "$select": _SELECT,
+            "$top": str(limit),
+            "$skip": str(skip),
+            "$orderby": "receivedDateTime desc",
+            "$filter": "isDraft eq false",
+        },
+        headers=headers,
+    )
+    if resp.status_code == 304 and entry is not None:
+        page_cache.record("outlook", hit=True)
+        return page_cache.cached_items(entry), entry.extra["has_more"]
+    resp.raise_for_status()
+    data = resp.json()
+    messages = data.get("value", [])
+    has_more = "@odata.nextLink" in data or len(messages) == limit
+
+    # Without an @odata.etag on every message an edit could go unnoticed: no validator, no caching
+    validator = ""
+    if all(m.get("@odata.etag") for m in messages):
+        validator = page_cache.fingerprint(
+            [f"{m.get('id')}:{m['@odata.etag']}" for m in messages] + [str(has_more)]
+        )
+    if entry is not None and validator and entry.validator == validator:
+        page_cache.record("outlook", hit=True)
+        return page_cache.cached_items(entry), has_more
+
+    page_cache.record("outlook", hit=False)
+    items = await _categorize_items_async([_parse_email_item(m, categorize=False) for m in messages])
+    if messages:
+        page_cache.store(
+            user_id, "outlook", page, validator, items, etag=resp.headers.get("ETag"), has_more=has_more
+        )
+    return items, has_more
+
+
+async def fetch_outlook_email_body_async(user_id: int, message_id: str) -> str:
+    """Fetch the plain-text body of a single Outlook message.
+
+    Graph converts HTML to text server-side (Prefer header), so only the body
+    field is transferred and no local HTML stripping is needed.
+    """
+    access_token = await asyncio.to_thread(get_valid_token, user_id)
+    resp = await get_async_client().get(
+        f"{_GRAPH_BASE}/me/messages/{quote(message_id, safe='')}",
+        params={"$select": "body"},
+        headers=_graph_headers(access_token),
+    )
+    resp.raise_for_status()
+    return _body_text(resp.json().get("body"))
+
+
+# Change notifications and delta queries cover the Inbox folder: delta is only
+# available per mail folder, and the subscription must watch the same scope.
+INBOX_MESSAGES_RESOURCE = "me/mailFolders('Inbox')/messages"
+
+
+def _graph_time(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%S.0000000Z")
+
+
+def create_mail_subscription(
+    user_id: int, notification_url: str, client_state: str | None, expires_at: datetime
+) -> dict:
+    """Subscribe to new Inbox messages. Returns the Graph subscription (id, expirationDateTime).
+
+    Graph validates notification_url synchronously before answering, so the
+    webhook must be reachable when this is called.
+    """
+    access_token = get_valid_token(user_id)
+    body = {
+        "changeType": "created",
+        "notificationUrl": notification_url,
+        "resource": INBOX_MESSAGES_RESOURCE,
+        "expirationDateTime": _graph_time(expires_at),
+    }
+    if client_state:
+        body["clientState"] = client_state
+    resp = httpx.post(
+        f"{_GRAPH_BASE}/subscriptions",
+        json=body,
+        headers={"Authorization": f"Bearer {access_token}"},
+        timeout=30,
+    )
+    resp.raise_for_status()
+    return cast(dict, resp.json())
+
+
+def renew_mail_subscription(user_id: int, subscription_id: str, expires_at: datetime) -> dict:
+    """Extend a subscription. Raises httpx.HTTPStatusError (404 if Graph already dropped it)."""
+    access_token = get_valid_token(user_id)
+    resp = httpx.patch(
+        f"{_GRAPH_BASE}/subscriptions/{quote(subscription_id, safe='')}",
+        json={"expirationDateTime": _graph_time(expires_at)},
+        headers={"Authorization": f"Bearer {access_token}"},
+        timeout=30,
+    )
+    resp.raise_for_status()
+    return cast(dict, resp.json())
+
+
+def fetch_outlook_inbox_delta(
+    user_id: int, delta_link: str | None = None, since: datetime | None = None
+) -> tuple[list[EmailItem], str]:
+    """Run one delta round on the Inbox. Returns (new or changed messages, next deltaLink).
+
+    Without a delta_link a new round starts; `since` limits it to messages
+    received from then on, so starting costs one small page instead of walking
+    the whole Inbox. Removed messages are skipped. A 410 from Graph (delta state
+    expired) is raised as httpx.HTTPStatusError for the caller to restart.
+    """
+    access_token = get_valid_token(user_id)
+    next_url: str | None
+    params: dict | None
+    if delta_link:
+        next_url, params = delta_link, None
+    else:
+        next_url = f"{_GRAPH_BASE}/{INBOX_MESSAGES_RESOURCE}/delta"
+        params = {"$select": _SELECT}
+        if since is not None:
+            params["$filter"] = f"receivedDateTime ge {since.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+
+    items: list[EmailItem] = []
+    while True:
+        resp = httpx.get(next_url, params=params, headers=_graph_headers(access_token), timeout=30)
+        resp.raise_for_status()
+        data = resp.json()
+        for msg in data.get("value", []):
+            if "@removed" in msg or msg.get("isDraft"):
+                continue
+            items.append(_parse_email_item(msg, categorize=False))
+        params = None  # next/delta links carry the query
+        if "@odata.nextLink" in data:
+            next_url = data["@odata.nextLink"]
+            continue
+        return items, data["@odata.deltaLink"]
+
+
 def get_outlook_connection_status(user_id: int) -> dict:
     """
     Return connection status for the given user.
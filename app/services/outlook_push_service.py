@@ -0,0 +1,188 @@
+"""
+Outlook push notifications: Graph change-notification subscriptions and delta sync.
+
+Flow:
+    1. After Outlook is connected (and periodically, to renew), an
+       "outlook_subscription" job creates or extends a Graph subscription on
+       the Inbox that delivers to settings.OUTLOOK_NOTIFICATION_URL.
+    2. Graph first validates the URL (POST ?validationToken=..., answered by
+       the webhook with the token as text/plain), then POSTs
+       {"value": [{"subscriptionId", "clientState", ...}]} for new messages.
+    3. The webhook enqueues one "outlook_delta_sync" job per user, delayed by
+       OUTLOOK_PUSH_DEBOUNCE_SECONDS and deduplicated while queued.
+    4. The job resumes the Inbox delta query from User.outlook_delta_link,
+       detects and upserts the returned messages and stores the new deltaLink.
+
+Users with an active subscription are skipped for Outlook by the periodic
+pre-fetch.
+"""
+import hmac
+import logging
+from datetime import UTC, datetime, timedelta
+
+import httpx
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.job import Job
+from app.models.user import User
+from app.services.job_queue import enqueue_job
+
+logger = logging.getLogger(__name__)
+
+# Graph allows up to ~7 days for mail subscriptions; renew well before expiry
+SUBSCRIPTION_LIFETIME = timedelta(days=3)
+_SUBSCRIPTION_RENEW_MARGIN = timedelta(days=1)
+SUBSCRIPTION_RENEW_INTERVAL_SECONDS = 6 * 3600
+DELTA_SYNC_PRIORITY = 20  # same as Gmail history sync
+# A delta round started without a deltaLink only looks this far back
+_DELTA_BOOTSTRAP_WINDOW = timedelta(days=1)
+
+
+def outlook_push_enabled() -> bool:
+    return bool(settings.OUTLOOK_NOTIFICATION_URL)
+
+
+def has_active_subscription(user: User, now: datetime | None = None) -> bool:
+    expires = user.outlook_subscription_expires_at
+    if not user.outlook_subscription_id or expires is None:
+        return False
+    if expires.tzinfo is None:  # SQLite drops tzinfo
+        expires = expires.replace(tzinfo=UTC)
+    return expires > (now or datetime.now(UTC))
+
+
+def enqueue_outlook_subscription(db: Session, user_id: int) -> Job | None:
+    """Queue a subscription create/renew for a user (no-op unless OUTLOOK_NOTIFICATION_URL is set)."""
+    if not outlook_push_enabled():
+        return None
+    return enqueue_job(
+        db,
+        "outlook_subscription",
+        user_id,
+        provider="outlook",
+        dedupe_key=f"outlook_subscription:{user_id}",
+        max_attempts=3,
+    )
+
+
+def _parse_graph_time(value: str) -> datetime:
+    # Graph returns up to 7 fractional digits, more than fromisoformat accepts
+    head, _, frac = value.rstrip("Z").partition(".")
+    return datetime.fromisoformat(f"{head}.{(frac + '000000')[:6]}").replace(tzinfo=UTC)
+
+
+def ensure_outlook_subscription(db: Session, user_id: int) -> bool:
+    """Extend the user's subscription, or create one if there is none (or Graph dropped it)."""
+    from app.services.outlook_email_service import create_mail_subscription, renew_mail_subscription
+
+    notification_url = settings.OUTLOOK_NOTIFICATION_URL  # None unless outlook_push_enabled()
+    user = db.get(User, user_id)
+    if user is None or not user.outlook_oauth_token or not notification_url:
+        return False
+    expires_at = datetime.now(UTC) + SUBSCRIPTION_LIFETIME
+
+    subscription: dict | None = None
+    if user.outlook_subscription_id:
+        try:
+            subscription = renew_mail_subscription(user_id, user.outlook_subscription_id, expires_at)
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code != 404:
+                raise
+            logger.info("Outlook subscription for user_id=%d no longer exists; recreating", user_id)
+    if subscription is None:
+        subscription = create_mail_subscription(
+            user_id, notification_url, settings.OUTLOOK_CLIENT_STATE, expires_at
+        )
+
+    user.outlook_subscription_id = subscription["id"]
+    user.outlook_subscription_expires_at = _parse_graph_time(subscription["expirationDateTime"])
+    db.commit()
+    logger.info(
+        "Outlook subscription %s for user_id=%d until %s",
+        user.outlook_subscription_id, user_id, user.outlook_subscription_expires_at,
+    )
+    return True
+
+
+def renew_outlook_subscriptions(db: Session) -> int:
+    """Queue subscription renewals for Outlook users whose subscription is missing or expiring."""
+    if not outlook_push_enabled():
+        return 0
+    horizon = datetime.now(UTC) + _SUBSCRIPTION_RENEW_MARGIN
+    user_ids = [
+        row.id
+        for row in db.query(User.id).filter(
+            User.outlook_oauth_token.isnot(None),
+            (User.outlook_subscription_expires_at.is_(None))
+            | (User.outlook_subscription_expires_at < horizon),
+        )
+    ]
+    for user_id in user_ids:
+        enqueue_outlook_subscription(db, user_id)
+    return len(user_ids)
+
+
+def handle_outlook_notifications(db: Session, body: dict) -> int:
+    """Queue a (debounced, deduplicated) delta sync for each user named in a notification batch.
+
+    Notifications whose clientState does not match OUTLOOK_CLIENT_STATE, or whose
+    subscription is unknown, are ignored. Returns the number of users queued.
+    """
+    expected_state = settings.OUTLOOK_CLIENT_STATE
+    subscription_ids: set[str] = set()
+    for notification in body.get("value") or []:
+        if not isinstance(notification, dict):
+            continue
+        if expected_state and not hmac.compare_digest(expected_state, str(notification.get("clientState") or "")):
+            logger.warning("Ignoring Outlook notification with a wrong clientState")
+            continue
+        if notification.get("subscriptionId"):
+            subscription_ids.add(str(notification["subscriptionId"]))
+    if not subscription_ids:
+        return 0
+
+    users = (
+        db.query(User.id)
+        .filter(User.outlook_subscription_id.in_(subscription_ids), User.outlook_oauth_token.isnot(None))
+        .all()
+    )
+    for row in users:
+        enqueue_job(
+            db,
+            "outlook_delta_sync",
+            row.id,
+            provider="outlook",
+            priority=DELTA_SYNC_PRIORITY,
+            dedupe_key=f"outlook_delta_sync:{row.id}",
+            delay_seconds=settings.OUTLOOK_PUSH_DEBOUNCE_SECONDS,
+        )
+    return len(users)
+
+
+def sync_outlook_delta(db: Session, user_id: int) -> int:
+    """Upsert and detect Inbox messages returned by the delta query. Returns the count.
+
+    Without a stored deltaLink, or when Graph has expired it (410 Gone), a new
+    round is started covering the last _DELTA_BOOTSTRAP_WINDOW.
+    """
+    from app.services.email_sync_service import upsert_detected_items
+    from app.services.outlook_email_service import fetch_outlook_inbox_delta
+
+    user = db.get(User, user_id)
+    if user is None or not user.outlook_oauth_token:
+        return 0
+    since = datetime.now(UTC) - _DELTA_BOOTSTRAP_WINDOW
+    try:
+        items, delta_link = fetch_outlook_inbox_delta(user_id, user.outlook_delta_link, since=since)
+    except httpx.HTTPStatusError as exc:
+        if exc.response.status_code != 410 or not user.outlook_delta_link:
+            raise
+        logger.info("Outlook delta state for user_id=%d expired; starting a new round", user_id)
+        items, delta_link = fetch_outlook_inbox_delta(user_id, None, since=since)
+
+    upsert_detected_items(db, user_id, items)
+    user.outlook_delta_link = delta_link
+    db.commit()
+    logger.info("Outlook delta sync for user_id=%d: %d messages", user_id, len(items))
+    return len(items)
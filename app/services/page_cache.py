@@ -0,0 +1,122 @@
+"""
+Conditional cache of provider feed pages (GET /emails/feed).
+
+Refreshing the feed re-requests the same first page over and over, and most of
+the time nothing has changed. Each cached page is stored with a validator and
+is only served after the provider has confirmed the validator still holds:
+
+    gmail    the mailbox historyId (users.getProfile, a few bytes) — any change
+             to the mailbox moves it, so an equal historyId means the list and
+             the message metadata are unchanged and messages.list + the batch
+             of messages.get are skipped.
+    outlook  the response ETag, sent back as If-None-Match (a 304 is a hit),
+             or else a fingerprint of the page's message ids and @odata.etag
+             values; an equal fingerprint skips parsing and categorisation.
+
+Entries live in process memory (LRU, PAGE_CACHE_MAX_ENTRIES, expiring after
+PAGE_CACHE_TTL_SECONDS) and hold no state that a miss would not rebuild.
+Hit and miss counts per provider are available from page_cache_stats().
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.core.config import settings
+
+
+@dataclass
+class CachedPage:
+    validator: str
+    items: Any
+    extra: dict[str, Any] = field(default_factory=dict)
+    stored_at: float = field(default_factory=time.monotonic)
+
+
+_lock = threading.Lock()
+_pages: "OrderedDict[tuple, CachedPage]" = OrderedDict()
+_stats: dict[str, dict[str, int]] = {}
+
+
+def _key(user_id: int, provider: str, page: tuple) -> tuple:
+    return (user_id, provider, *page)
+
+
+def lookup(user_id: int, provider: str, page: tuple) -> CachedPage | None:
+    """Return the cached entry for a page (not yet revalidated), or None."""
+    if not settings.PAGE_CACHE_ENABLED:
+        return None
+    key = _key(user_id, provider, page)
+    with _lock:
+        entry = _pages.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > settings.PAGE_CACHE_TTL_SECONDS:
+            del _pages[key]
+            return None
+        _pages.move_to_end(key)
+        return entry
+
+
+def store(user_id: int, provider: str, page: tuple, validator: str, items: Any, **extra: Any) -> None:
+    """Cache a page under a validator. `items` is copied so callers may mutate theirs."""
+    if not settings.PAGE_CACHE_ENABLED or not validator:
+        return
+    key = _key(user_id, provider, page)
+    entry = CachedPage(validator=validator, items=copy.deepcopy(items), extra=extra)
+    with _lock:
+        _pages[key] = entry
+        _pages.move_to_end(key)
+        while len(_pages) > settings.PAGE_CACHE_MAX_ENTRIES:
+            _pages.popitem(last=False)
+
+
+def cached_items(entry: CachedPage) -> Any:
+    """A copy of a cached page's items, safe to hand to the caller."""
+    return copy.deepcopy(entry.items)
+
+
+def record(provider: str, hit: bool) -> None:
+    with _lock:
+        counts = _stats.setdefault(provider, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+
+def fingerprint(parts: Iterable[str]) -> str:
+    """Stable digest of a page's identity (ids and version tags)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def page_cache_stats() -> dict[str, dict[str, float]]:
+    """Hits, misses and hit ratio per provider since start (or the last reset)."""
+    with _lock:
+        return {
+            provider: {
+                "hits": c["hits"],
+                "misses": c["misses"],
+                "hit_ratio": round(c["hits"] / (c["hits"] + c["misses"]), 4) if c["hits"] + c["misses"] else 0.0,
+            }
+            for provider, c in _stats.items()
+        }
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop every cached page of a user (e.g. after disconnecting a provider)."""
+    with _lock:
+        for key in [k for k in _pages if k[0] == user_id]:
+            del _pages[key]
+
+
+def reset_page_cache() -> None:
+    """Clear all pages and counters (tests)."""
+    with _lock:
+        _pages.clear()
+        _stats.clear()
@@ -0,0 +1,150 @@
+"""
+Storage for the PKCE code_verifier of pending Google OAuth flows.
+
+GET /auth/google stores a verifier under the random nonce embedded in the
+signed state; the callback consumes it exactly once. Backends
+(settings.PKCE_STORE):
+
+    database  the oauth_pkce_verifiers table, shared by every instance.
+              consume() is a single DELETE ... RETURNING, so two callbacks
+              racing on the same nonce cannot both get the verifier. Expired
+              rows are never returned and are deleted by the worker's
+              periodic prune_expired_verifiers().
+    memory    a process-local dict (tests, single-process development).
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from typing import cast
+
+from sqlalchemy import CursorResult, delete, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.oauth_pkce import OAuthPKCEVerifier
+
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+class PKCEStore(ABC):
+    """Single-use code_verifier storage keyed by the OAuth state nonce."""
+
+    @abstractmethod
+    def put(self, nonce: str, code_verifier: str, ttl_seconds: float) -> None: ...
+
+    @abstractmethod
+    def consume(self, nonce: str) -> str | None:
+        """Remove and return the verifier if present and unexpired."""
+
+    @abstractmethod
+    def prune(self) -> int:
+        """Drop expired verifiers. Returns the number removed."""
+
+
+class MemoryPKCEStore(PKCEStore):
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[str, float]] = {}
+
+    def put(self, nonce: str, code_verifier: str, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[nonce] = (code_verifier, time.monotonic() + ttl_seconds)
+
+    def consume(self, nonce: str) -> str | None:
+        with self._lock:
+            entry = self._entries.pop(nonce, None)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def prune(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [nonce for nonce, (_, expires) in self._entries.items() if expires <= now]
+            for nonce in expired:
+                del self._entries[nonce]
+        return len(expired)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC)
+
+
+def prune_expired_verifiers(db: Session) -> int:
+    """Delete expired rows of oauth_pkce_verifiers (scheduled by the job worker)."""
+    result = cast(CursorResult, db.execute(delete(OAuthPKCEVerifier).where(OAuthPKCEVerifier.expires_at <= _utcnow())))
+    deleted = result.rowcount
+    db.commit()
+    return deleted
+
+
+class DatabasePKCEStore(PKCEStore):
+    def __init__(self, session_factory: Callable[[], Session] | None = None) -> None:
+        self._session_factory = session_factory
+
+    def _session(self) -> Session:
+        if self._session_factory is not None:
+            return self._session_factory()
+        from app.db.database import SessionLocal
+        return SessionLocal()
+
+    def put(self, nonce: str, code_verifier: str, ttl_seconds: float) -> None:
+        with self._session() as db:
+            db.add(OAuthPKCEVerifier(
+                nonce=nonce,
+                code_verifier=code_verifier,
+                expires_at=_utcnow() + timedelta(seconds=ttl_seconds),
+            ))
+            db.commit()
+
+    def consume(self, nonce: str) -> str | None:
+        with self._session() as db:
+            stmt = delete(OAuthPKCEVerifier).where(OAuthPKCEVerifier.nonce == nonce)
+            if db.get_bind().dialect.delete_returning:
+                row = db.execute(
+                    stmt.returning(OAuthPKCEVerifier.code_verifier, OAuthPKCEVerifier.expires_at)
+                ).first()
+            else:
+                # No DELETE ... RETURNING: read, then let the DELETE's rowcount pick the single winner
+                row = db.execute(
+                    select(OAuthPKCEVerifier.code_verifier, OAuthPKCEVerifier.expires_at)
+                    .where(OAuthPKCEVerifier.nonce == nonce)
+                ).first()
+                if row is not None and cast(CursorResult, db.execute(stmt)).rowcount != 1:
+                    row = None
+            db.commit()
+        if row is None:
+            return None
+        expires_at = row.expires_at
+        if expires_at.tzinfo is None:  # SQLite drops tzinfo
+            expires_at = expires_at.replace(tzinfo=UTC)
+        return row.code_verifier if expires_at > _utcnow() else None
+
+    def prune(self) -> int:
+        with self._session() as db:
+            return prune_expired_verifiers(db)
+
+
+_store: PKCEStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_pkce_store() -> PKCEStore:
+    """The process-wide store selected by settings.PKCE_STORE."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.PKCE_STORE not in ("database", "memory"):
+                    raise ValueError(f"Unknown PKCE_STORE {settings.PKCE_STORE!r} (expected 'database' or 'memory')")
+                _store = MemoryPKCEStore() if settings.PKCE_STORE == "memory" else DatabasePKCEStore()
+    return _store
+
+
+def set_pkce_store(store: PKCEStore | None) -> None:
+    """Install a store (custom implementation or tests). None resets to the configured default."""
+    global _store
+    with _store_lock:
+        _store = store
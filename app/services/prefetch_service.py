@@ -0,0 +1,120 @@
+"""
+Periodic inbox pre-fetch and pre-detection for recently active users.
+
+The job worker's scheduler calls schedule_prefetch() every
+PREFETCH_INTERVAL_SECONDS; it queues one low-priority "prefetch_inbox" job per
+connected provider of each user seen in the last PREFETCH_ACTIVE_DAYS, so the
+worker's per-provider concurrency cap applies. Each job fetches the newest page
+from its provider and runs detection on that provider's emails that have none yet,
+so GET /emails/cached can serve a categorised, detected inbox on first paint
+without calling Gmail or Graph.
+"""
+import logging
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User
+from app.services.job_queue import enqueue_job
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_PRIORITY = -10  # below user-triggered work such as OAuth first sync
+
+
+def find_active_users(db: Session, active_within_days: int | None = None) -> dict[int, tuple[str, ...]]:
+    """Return {user_id: connected providers} for users seen recently with at least one provider."""
+    days = active_within_days if active_within_days is not None else settings.PREFETCH_ACTIVE_DAYS
+    cutoff = datetime.now(UTC) - timedelta(days=days)
+    # Only test the encrypted token columns for NULL; their contents are not loaded.
+    rows = (
+        db.query(
+            User.id,
+            User.gmail_oauth_token.isnot(None).label("has_gmail"),
+            User.outlook_oauth_token.isnot(None).label("has_outlook"),
+        )
+        .filter(
+            User.last_seen_at >= cutoff,
+            or_(User.gmail_oauth_token.isnot(None), User.outlook_oauth_token.isnot(None)),
+        )
+        .all()
+    )
+    return {
+        row.id: tuple(
+            provider
+            for provider, connected in (("gmail", row.has_gmail), ("outlook", row.has_outlook))
+            if connected
+        )
+        for row in rows
+    }
+
+
+def schedule_prefetch(db: Session, active_within_days: int | None = None) -> int:
+    """Queue a prefetch_inbox job per connected provider of each active user.
+
+    Returns the number of users scheduled.
+    """
+    users = find_active_users(db, active_within_days)
+    for user_id, providers in users.items():
+        for provider in providers:
+            enqueue_job(
+                db,
+                "prefetch_inbox",
+                user_id,
+                provider=provider,
+                priority=PREFETCH_PRIORITY,
+                dedupe_key=f"prefetch_inbox:{user_id}:{provider}",
+                max_attempts=2,  # the next tick retries anyway
+            )
+    if users:
+        logger.info("Scheduled inbox prefetch for %d active users", len(users))
+    return len(users)
+
+
+def _providers_to_poll(
+    db: Session, user_id: int, providers: tuple[str, ...] | None = None
+) -> tuple[str, ...]:
+    """Providers that still need polling: those with active push notifications are skipped."""
+    from app.services.email_sync_service import ALL_PROVIDERS
+    from app.services.gmail_push_service import has_active_watch
+    from app.services.outlook_push_service import has_active_subscription
+
+    candidates = providers or ALL_PROVIDERS
+    user = db.get(User, user_id)
+    if user is None:
+        return candidates
+    pushed = set()
+    if has_active_watch(user):
+        pushed.add("gmail")
+    if has_active_subscription(user):
+        pushed.add("outlook")
+    return tuple(p for p in candidates if p not in pushed)
+
+
+def prefetch_user_inbox(
+    db: Session, user_id: int, limit: int | None = None, provider: str | None = None
+) -> int:
+    """Fetch the newest page from one provider (every provider if None), then detect
+    that provider's emails without an extraction.
+
+    Detection still runs if the provider fails, so previously fetched rows are not
+    left undetected; the provider error is re-raised afterwards for the job retry.
+    Returns the number of emails detected.
+    """
+    from app.services.detection import detect_stored_emails
+    from app.services.email_sync_service import sync_user_emails
+
+    page_size = limit or settings.PREFETCH_PAGE_SIZE
+    providers = (provider,) if provider else None
+    sync_error: Exception | None = None
+    try:
+        sync_user_emails(db, user_id, providers=_providers_to_poll(db, user_id, providers), limit=page_size)
+    except Exception as exc:
+        db.rollback()
+        sync_error = exc
+    detected = detect_stored_emails(db, user_id, limit=page_size * 2, provider=provider)
+    if sync_error is not None:
+        raise sync_error
+    return detected
@@ -0,0 +1,60 @@
+"""
+Readiness report for GET /ready.
+
+/health only says the process answers HTTP. /ready says whether it should get
+traffic:
+
+    nlp       the spaCy model preload and warm-up (NLP_PRELOAD, NLP_WARMUP);
+              not ready while they run.
+    database  a SELECT 1 through the pool, with the pool's gauges and checkout
+              metrics (app.db.pool); not ready when it fails.
+    clients   the process-wide provider clients (Graph AsyncClient, LLM
+              backend). They are created on first use, so their state is
+              reported but never makes the process unready.
+"""
+import logging
+import time
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+
+def database_status() -> dict[str, Any]:
+    from app.db.database import engine
+    from app.db.pool import pool_stats
+
+    status: dict[str, Any] = {"ok": False, **pool_stats(engine)}
+    started = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        status["ok"] = True
+    except SQLAlchemyError as exc:
+        logger.warning("Readiness database check failed: %s", exc)
+        status["error"] = type(exc).__name__
+    status["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return status
+
+
+def clients_status() -> dict[str, Any]:
+    from app.nlp.llm_backend import llm_backend_status
+    from app.services.outlook_email_service import async_client_state
+
+    return {"outlook_graph": async_client_state(), "llm": llm_backend_status()}
+
+
+def readiness() -> dict[str, Any]:
+    """The full report; report["ready"] is what a load balancer should act on."""
+    from app.services.detection import nlp_readiness
+
+    nlp = nlp_readiness()
+    database = database_status()
+    return {
+        "ready": bool(nlp["ready"] and database["ok"]),
+        "nlp": nlp,
+        "database": database,
+        "clients": clients_status(),
+    }
@@ -0,0 +1,311 @@
+"""
+Background job worker.
+
+    python -m app.workers.job_worker
+
+Leases jobs from the `jobs` table (see app.services.job_queue) and executes them
+on a bounded thread pool. Concurrency is capped globally (JOB_WORKER_CONCURRENCY),
+per provider (JOB_MAX_PER_PROVIDER — protects Gmail/Graph quotas) and per user
+(JOB_MAX_PER_USER — one user's backlog cannot starve everyone else).
+
+By default the web process runs the same loop in a daemon thread
+(JOB_EMBEDDED_WORKER); deployments with a dedicated worker service turn that off.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.email import Email
+from app.models.job import Job
+from app.services.job_queue import claim_jobs, complete_job, fail_job, prune_finished_jobs
+from app.workers.scheduler import Scheduler
+
+logger = logging.getLogger(__name__)
+
+# Handlers get the job's user_id narrowed to int: jobs without one fail in _execute
+JobHandler = Callable[[Session, Job, int], None]
+JOB_HANDLERS: dict[str, JobHandler] = {}
+
+_PRUNE_INTERVAL_SECONDS = 3600
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Register a function as the handler for a job kind."""
+    def decorator(fn: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+@job_handler("sync_emails")
+def _handle_sync_emails(db: Session, job: Job, user_id: int) -> None:
+    from app.services.email_sync_service import ALL_PROVIDERS, sync_user_emails
+    providers = (job.provider,) if job.provider else ALL_PROVIDERS
+    limit = int((job.payload or {}).get("limit", 50))
+    sync_user_emails(db, user_id, providers=providers, limit=limit)
+
+
+@job_handler("detect_emails")
+def _handle_detect_emails(db: Session, job: Job, user_id: int) -> None:
+    from app.services.detection import detect_stored_emails
+    detect_stored_emails(db, user_id, email_ids=(job.payload or {}).get("email_ids"))
+
+
+@job_handler("redetect_emails")
+def _handle_redetect_emails(db: Session, job: Job, user_id: int) -> None:
+    from app.services.detection import redetect_stale_emails
+    batch_size = int((job.payload or {}).get("batch_size", 200))
+    redetect_stale_emails(db, user_id=user_id, batch_size=batch_size)
+
+
+@job_handler("gmail_watch")
+def _handle_gmail_watch(db: Session, job: Job, user_id: int) -> None:
+    from app.services.gmail_push_service import register_gmail_watch
+    register_gmail_watch(db, user_id)
+
+
+@job_handler("gmail_history_sync")
+def _handle_gmail_history_sync(db: Session, job: Job, user_id: int) -> None:
+    from app.services.gmail_push_service import sync_gmail_history
+    sync_gmail_history(db, user_id)
+
+
+@job_handler("outlook_subscription")
+def _handle_outlook_subscription(db: Session, job: Job, user_id: int) -> None:
+    from app.services.outlook_push_service import ensure_outlook_subscription
+    ensure_outlook_subscription(db, user_id)
+
+
+@job_handler("outlook_delta_sync")
+def _handle_outlook_delta_sync(db: Session, job: Job, user_id: int) -> None:
+    from app.services.outlook_push_service import sync_outlook_delta
+    sync_outlook_delta(db, user_id)
+
+
+@job_handler("prefetch_inbox")
+def _handle_prefetch_inbox(db: Session, job: Job, user_id: int) -> None:
+    from app.services.prefetch_service import prefetch_user_inbox
+    prefetch_user_inbox(db, user_id, provider=job.provider)
+
+
+@job_handler("predict_email")
+def _handle_predict_email(db: Session, job: Job, user_id: int) -> None:
+    from app.schemas.detection import EmailInput
+    from app.services.detection import detect_single, load_stored_extraction, store_extraction
+    from app.services.prediction_service import get_suggested_slots
+
+    email_id = (job.payload or {}).get("email_id")
+    row = db.query(Email).filter(Email.id == email_id, Email.user_id == user_id).first()
+    if row is None:
+        logger.info("predict_email job %d: email %s no longer exists", job.id, email_id)
+        return
+    extraction = load_stored_extraction(row)
+    if extraction is None:
+        extraction = detect_single(EmailInput(subject=row.subject or "", body=row.body or ""))
+        store_extraction(row, extraction)
+    slots = get_suggested_slots(extraction)
+    row.predicted_slots = [s.model_dump(mode="json") for s in slots]
+    row.status = "predicted"
+    db.commit()
+
+
+class JobWorker:
+    def __init__(
+        self,
+        worker_id: str | None = None,
+        concurrency: int | None = None,
+        max_per_provider: int | None = None,
+        max_per_user: int | None = None,
+        session_factory: sessionmaker = SessionLocal,
+    ) -> None:
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency or settings.JOB_WORKER_CONCURRENCY
+        self.max_per_provider = max_per_provider or settings.JOB_MAX_PER_PROVIDER
+        self.max_per_user = max_per_user or settings.JOB_MAX_PER_USER
+        self._session_factory = session_factory
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="iris-job"
+        )
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._per_user: Counter[int] = Counter()
+        self._per_provider: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self.scheduler = Scheduler()
+        self.scheduler.every(_PRUNE_INTERVAL_SECONDS, "prune_jobs", self._with_session(prune_finished_jobs))
+        if settings.PKCE_STORE == "database":
+            from app.services.pkce_store import PRUNE_INTERVAL_SECONDS, prune_expired_verifiers
+            self.scheduler.every(
+                PRUNE_INTERVAL_SECONDS, "prune_pkce_verifiers", self._with_session(prune_expired_verifiers)
+            )
+        if settings.GMAIL_PUBSUB_TOPIC:
+            from app.services.gmail_push_service import (
+                WATCH_RENEW_INTERVAL_SECONDS,
+                renew_gmail_watches,
+            )
+            self.scheduler.every(
+                WATCH_RENEW_INTERVAL_SECONDS, "renew_gmail_watches", self._with_session(renew_gmail_watches)
+            )
+        if settings.OUTLOOK_NOTIFICATION_URL:
+            from app.services.outlook_push_service import (
+                SUBSCRIPTION_RENEW_INTERVAL_SECONDS,
+                renew_outlook_subscriptions,
+            )
+            self.scheduler.every(
+                SUBSCRIPTION_RENEW_INTERVAL_SECONDS,
+                "renew_outlook_subscriptions",
+                self._with_session(renew_outlook_subscriptions),
+            )
+        if settings.PREFETCH_ENABLED:
+            from app.services.prefetch_service import schedule_prefetch
+            self.scheduler.every(
+                settings.PREFETCH_INTERVAL_SECONDS, "schedule_prefetch", self._with_session(schedule_prefetch)
+            )
+
+    def _with_session(self, fn: Callable[[Session], object]) -> Callable[[], None]:
+        """Adapt a fn(db) to the scheduler's zero-argument callables."""
+        def run() -> None:
+            db = self._session_factory()
+            try:
+                fn(db)
+            finally:
+                db.close()
+        return run
+
+    @property
+    def inflight(self) -> int:
+        with self._lock:
+            return self._inflight
+
+    def _reserve(self, job: Job) -> bool:
+        """Claim-time filter; caller holds self._lock."""
+        if job.user_id is not None and self._per_user[job.user_id] >= self.max_per_user:
+            return False
+        if job.provider and self._per_provider[job.provider] >= self.max_per_provider:
+            return False
+        if job.user_id is not None:
+            self._per_user[job.user_id] += 1
+        if job.provider:
+            self._per_provider[job.provider] += 1
+        self._inflight += 1
+        return True
+
+    def _release(self, user_id: int | None, provider: str | None) -> None:
+        with self._lock:
+            if user_id is not None:
+                self._per_user[user_id] -= 1
+            if provider:
+                self._per_provider[provider] -= 1
+            self._inflight -= 1
+
+    def run_once(self) -> int:
+        """Claim as many jobs as there are free slots and submit them. Returns the number claimed."""
+        with self._lock:
+            free = self.concurrency - self._inflight
+            if free <= 0:
+                return 0
+            db = self._session_factory()
+            try:
+                jobs = claim_jobs(db, self.worker_id, free, accept=self._reserve)
+                claimed = [(j.id, j.user_id, j.provider) for j in jobs]
+            finally:
+                db.close()
+        for job_id, user_id, provider in claimed:
+            self._executor.submit(self._execute, job_id, user_id, provider)
+        return len(claimed)
+
+    def _execute(self, job_id: int, user_id: int | None, provider: str | None) -> None:
+        db = self._session_factory()
+        try:
+            job = db.get(Job, job_id)
+            if job is None:
+                return
+            handler = JOB_HANDLERS.get(job.kind)
+            if handler is None:
+                job.max_attempts = job.attempts  # retrying cannot help
+                fail_job(db, job, f"No handler registered for job kind {job.kind!r}")
+                return
+            if job.user_id is None:
+                job.max_attempts = job.attempts  # a malformed job: retrying cannot help
+                fail_job(db, job, f"Job kind {job.kind!r} needs a user_id")
+                return
+            started = time.perf_counter()
+            try:
+                handler(db, job, job.user_id)
+            except Exception as exc:
+                db.rollback()
+                job = db.get(Job, job_id)
+                if job is not None:
+                    fail_job(db, job, f"{type(exc).__name__}: {exc}")
+                return
+            complete_job(db, job)
+            logger.info(
+                "Job %d (%s) done in %.2fs", job_id, job.kind, time.perf_counter() - started
+            )
+        except Exception:
+            logger.exception("Worker crashed while executing job %d", job_id)
+        finally:
+            db.close()
+            self._release(user_id, provider)
+
+    def run_until_idle(self, timeout: float = 60.0) -> None:
+        """Process jobs until nothing is runnable and nothing is in flight (tests, CLI drains)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            claimed = self.run_once()
+            if claimed == 0 and self.inflight == 0:
+                return
+            time.sleep(0.01)
+
+    def run_forever(self, poll_interval: float | None = None) -> None:
+        """Poll until stop() is called, then wait for in-flight jobs to finish."""
+        interval = poll_interval if poll_interval is not None else settings.JOB_POLL_INTERVAL_SECONDS
+        logger.info(
+            "Job worker %s started (concurrency=%d, per_provider=%d, per_user=%d)",
+            self.worker_id, self.concurrency, self.max_per_provider, self.max_per_user,
+        )
+        while not self._stop.is_set():
+            try:
+                self.scheduler.run_pending()
+                claimed = self.run_once()
+            except Exception:
+                logger.exception("Job worker poll failed")
+                claimed = 0
+            if claimed == 0:
+                self._stop.wait(interval)
+        self._executor.shutdown(wait=True)
+        logger.info("Job worker %s stopped", self.worker_id)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def start_embedded_worker() -> JobWorker:
+    """Run a JobWorker in a daemon thread inside the current (web) process."""
+    worker = JobWorker()
+    threading.Thread(target=worker.run_forever, name="iris-job-worker", daemon=True).start()
+    return worker
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    from app.db.database import init_db
+    init_db()
+    worker = JobWorker()
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Minimal interval scheduler driven by the job worker's poll loop.
+
+Periodic work (pre-fetch scheduling, job pruning, ...) is registered with
+Scheduler.every() and executed from run_pending(); each callable should only
+enqueue jobs or do short DB housekeeping so the poll loop stays responsive.
+"""
+import logging
+import time
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    def __init__(self) -> None:
+        self._tasks: dict[str, tuple[float, Callable[[], None]]] = {}
+        self._next_run: dict[str, float] = {}
+
+    def every(self, seconds: float, name: str, fn: Callable[[], None], run_immediately: bool = True) -> None:
+        """Register fn to run every `seconds` (first run on the next tick unless run_immediately=False)."""
+        self._tasks[name] = (seconds, fn)
+        self._next_run[name] = 0.0 if run_immediately else time.monotonic() + seconds
+
+    def run_pending(self, now: float | None = None) -> list[str]:
+        """Run every task that is due. Returns the names of the tasks that ran."""
+        current = now if now is not None else time.monotonic()
+        ran: list[str] = []
+        for name, (interval, fn) in self._tasks.items():
+            if current < self._next_run[name]:
+                continue
+            self._next_run[name] = current + interval
+            try:
+                fn()
+            except Exception:
+                logger.exception("Scheduled task %s failed", name)
+            ran.append(name)
+        return ran
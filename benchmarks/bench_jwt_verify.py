@@ -0,0 +1,65 @@
+"""
+Micro-benchmark of access-token verification: python-jose vs the native verifier.
+
+    python -m benchmarks.bench_jwt_verify [--iterations 5000]
+
+For HS256, RS256 and EdDSA (python-jose has no EdDSA) it reports verifications
+per second for JoseVerifier, NativeVerifier without its verified-token cache
+(every call checks the signature) and NativeVerifier with the cache (the same
+token presented again, as on every request of a session). Keys are generated
+in a temporary directory.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+from app.core import jwks
+from app.core.config import settings
+from app.core.security import JoseVerifier, NativeVerifier, TokenVerifier, create_access_token
+
+SECRET = "bench-secret"
+
+
+def _use_private_key(directory: str, private_key) -> None:
+    path = os.path.join(directory, f"{type(private_key).__name__}.pem")
+    with open(path, "wb") as fh:
+        fh.write(private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    settings.JWT_PRIVATE_KEY_PATH = path
+    jwks.reset_key_cache()
+
+
+def _rate(verifier: TokenVerifier, token: str, algorithm: str, iterations: int) -> float:
+    assert verifier.decode(token, SECRET, algorithm) is not None, "token did not verify"
+    start = time.perf_counter()
+    for _ in range(iterations):
+        verifier.decode(token, SECRET, algorithm)
+    return iterations / (time.perf_counter() - start)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="bench_jwt_")
+    keys = {"HS256": None, "RS256": rsa.generate_private_key(65537, 2048), "EdDSA": ed25519.Ed25519PrivateKey.generate()}
+    print(f"{'algorithm':<10}{'jose':>14}{'native':>14}{'native+cache':>16}   (verifications/s)")
+    for algorithm, private_key in keys.items():
+        if private_key is not None:
+            _use_private_key(directory, private_key)
+        token = create_access_token("1", {"email": "bench@example.com", "role": "regular"},
+                                    secret=SECRET, algorithm=algorithm, minutes=60)
+        jose = "n/a" if algorithm == "EdDSA" else f"{_rate(JoseVerifier(), token, algorithm, args.iterations):,.0f}"
+        native = _rate(NativeVerifier(cache_size=0), token, algorithm, args.iterations)
+        cached = _rate(NativeVerifier(cache_size=1024), token, algorithm, args.iterations)
+        print(f"{algorithm:<10}{jose:>14}{native:>14,.0f}{cached:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
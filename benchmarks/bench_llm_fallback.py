@@ -0,0 +1,67 @@
+"""
+Benchmark for the LLM fallback path: serial enhance() vs batched enhance_many().
+
+    python -m benchmarks.bench_llm_fallback [--emails 50] [--base-url http://localhost:8080/v1]
+                                            [--latency 0.3] [--concurrency 8]
+
+Without --base-url the in-process stub backend (same latency) is used; with it,
+requests go over HTTP to an OpenAI-compatible server, e.g. benchmarks.llm_standin
+or a local llama.cpp/vLLM. The response cache is disabled so every email costs
+one call.
+"""
+import argparse
+import time
+
+from app.core.config import settings
+from app.nlp.llm_backend import LLMBackend, OpenAIBackend, StubBackend
+from app.nlp.llm_fallback_openai import LLMFallbackOpenAI
+from app.schemas.detection import EmailInput, ExtractionResult
+
+
+def _pairs(n: int) -> list[tuple[EmailInput, ExtractionResult]]:
+    return [
+        (EmailInput(subject=f"Newsletter n°{i}", body=f"Les nouveautés de la semaine {i}."),
+         ExtractionResult(classification="info", confidence=0.3))
+        for i in range(n)
+    ]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible server; default: stub backend")
+    parser.add_argument("--model", default="stand-in")
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub backend latency per call")
+    parser.add_argument("--concurrency", type=int, default=settings.LLM_MAX_CONCURRENCY)
+    parser.add_argument("--no-serial", action="store_true", help="Skip the serial baseline")
+    args = parser.parse_args(argv)
+
+    settings.LLM_CACHE_ENABLED = False
+    settings.LLM_MAX_CONCURRENCY = args.concurrency
+    backend: LLMBackend = (
+        OpenAIBackend(base_url=args.base_url, model=args.model) if args.base_url
+        else StubBackend(latency_seconds=args.latency)
+    )
+    fallback = LLMFallbackOpenAI(backend=backend)
+    pairs = _pairs(args.emails)
+
+    print(f"backend: {args.base_url or f'stub ({args.latency}s/call)'}, emails: {args.emails}")
+    if not args.no_serial:
+        start = time.perf_counter()
+        for email, partial in pairs:
+            fallback.enhance(email, partial)
+        serial = time.perf_counter() - start
+        print(f"{'serial enhance()':<34}{serial:>8.2f}s{serial / args.emails * 1e3:>10.0f}ms/email")
+
+    # First batch opens the pooled connections; the second shows the warm pool
+    for label in ("enhance_many() cold", "enhance_many() warm"):
+        start = time.perf_counter()
+        results = fallback.enhance_many(pairs)
+        elapsed = time.perf_counter() - start
+        improved = sum(1 for r in results if r.confidence > 0.3)
+        print(f"{label + f' x{args.concurrency}':<34}{elapsed:>8.2f}s{elapsed / args.emails * 1e3:>10.0f}ms/email"
+              f"  ({improved}/{args.emails} enhanced)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Load benchmark for login: logins/second through POST /api/v1/users/login.
+
+    python -m benchmarks.bench_password_hashing [--logins 200] [--clients 32]
+                                                [--workers 2] [--queue 16]
+                                                [--time-cost 3] [--memory-cost 65536]
+
+`--clients` threads log in as fast as they can against a throw-away SQLite
+database while a probe thread calls GET /health, to show whether the rest of
+the API still answers during the burst. Logins beyond the hashing executor's
+capacity (workers + queue) are rejected with a 503 and counted separately.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.security import hash_password, password_hashing_stats
+from app.db.database import get_db, get_session_factory
+from app.main import app
+from app.models import Base
+from app.models.user import User
+
+PASSWORD = "Secret12!"
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--queue", type=int, default=settings.PASSWORD_HASH_MAX_QUEUE)
+    parser.add_argument("--time-cost", type=int, default=settings.ARGON2_TIME_COST)
+    parser.add_argument("--memory-cost", type=int, default=settings.ARGON2_MEMORY_COST)
+    parser.add_argument("--parallelism", type=int, default=settings.ARGON2_PARALLELISM)
+    args = parser.parse_args(argv)
+
+    settings.PASSWORD_HASH_WORKERS = args.workers
+    settings.PASSWORD_HASH_MAX_QUEUE = args.queue
+    settings.ARGON2_TIME_COST = args.time_cost
+    settings.ARGON2_MEMORY_COST = args.memory_cost
+    settings.ARGON2_PARALLELISM = args.parallelism
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_login_"), "bench.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    password_hash = hash_password(PASSWORD)
+    with session_factory() as db:
+        db.add_all(User(email=f"bench{i}@example.com", password_hash=password_hash) for i in range(args.users))
+        db.commit()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: contextmanager(override_get_db)
+    client = TestClient(app)
+
+    def login(i: int) -> tuple[int, float]:
+        start = time.perf_counter()
+        response = client.post(
+            "/api/v1/users/login",
+            json={"email": f"bench{i % args.users}@example.com", "password": PASSWORD},
+        )
+        return response.status_code, time.perf_counter() - start
+
+    probe_latencies: list[float] = []
+    stop = threading.Event()
+
+    def probe() -> None:
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get("/health")
+            probe_latencies.append(time.perf_counter() - start)
+            time.sleep(0.05)
+
+    print(
+        f"argon2 t={args.time_cost} m={args.memory_cost} p={args.parallelism}, "
+        f"executor {args.workers} workers + {args.queue} queued, {args.clients} clients"
+    )
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_session_factory, None)
+
+    ok = [latency for code, latency in results if code == 200]
+    rejected = sum(1 for code, _ in results if code == 503)
+    print(f"{'successful logins':<24}{len(ok):>8}{len(ok) / elapsed:>10.1f}/s")
+    print(f"{'rejected (503)':<24}{rejected:>8}")
+    print(f"{'login p50 / p95':<24}{_percentile(ok, 0.5) * 1e3:>8.0f}ms{_percentile(ok, 0.95) * 1e3:>8.0f}ms")
+    if probe_latencies:
+        print(
+            f"{'/health p50 / max':<24}{statistics.median(probe_latencies) * 1e3:>8.1f}ms"
+            f"{max(probe_latencies) * 1e3:>8.1f}ms"
+        )
+    print(f"executor: {password_hashing_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark for app/nlp/textnorm.normalize_for_nlp.
+
+Reports, per synthetic email type, the time to normalise one email and how much
+text is left for the NLP steps, plus the end-to-end extraction time with and
+without normalisation.
+
+    python -m benchmarks.bench_textnorm [--repeat 200] [--no-extract]
+"""
+import argparse
+import statistics
+import time
+
+from app.nlp.textnorm import normalize_for_nlp
+
+_CSS = "".join(f".c{i}{{color:#{i:06x};margin:0 {i % 9}px;font-family:Arial}}" for i in range(2000))
+
+SAMPLES: dict[str, str] = {
+    "short_plain": "Meeting\nCan we meet tomorrow at 3pm for 30 min? Thanks, Alice",
+    "reply_chain": (
+        "Tuesday 10am works for me.\n\n"
+        + "".join(
+            f"On Mon, Jan {i}, 2024 at 10:00 AM Bob <bob@example.com> wrote:\n"
+            + "> Could we move our sync to next week?\n> Thanks\n" * 20
+            for i in range(1, 10)
+        )
+    ),
+    "outlook_reply": (
+        "Confirmé pour jeudi 14h.\n\nCordialement,\nJean\n\n"
+        "From: Marie <marie@example.com>\nSent: Monday, January 1, 2024 9:00 AM\n"
+        "Subject: RE: Réunion\n\n" + "Ancien message du fil. " * 400
+    ),
+    "newsletter_html": (
+        f"<html><head><style>{_CSS}</style></head><body>"
+        + "".join(
+            f"<table><tr><td><a href='https://shop.example.com/p/{i}'>Offre {i}</a></td>"
+            f"<td>-{i % 70}% sur la sélection, code promo SOLDES{i}</td></tr></table>"
+            for i in range(3000)
+        )
+        + "</body></html>"
+    ),
+}
+
+
+_RAW_EXTRACT_MAX_CHARS = 50_000
+
+
+def _time_per_call(fn, arg, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--no-extract", action="store_true", help="Skip the end-to-end extraction timing")
+    args = parser.parse_args(argv)
+
+    print(f"{'sample':<18}{'input chars':>12}{'output chars':>14}{'reduction':>11}{'normalise':>13}")
+    for name, text in SAMPLES.items():
+        out = normalize_for_nlp(text)
+        per_call = _time_per_call(normalize_for_nlp, text, args.repeat)
+        reduction = 1 - len(out) / len(text)
+        print(f"{name:<18}{len(text):>12}{len(out):>14}{reduction:>10.1%}{per_call * 1e6:>11.0f}µs")
+
+    if args.no_extract:
+        return
+
+    # Extraction with the rules only (no spaCy model needed) to isolate the text-size effect
+    from app.nlp import extractor as ex
+
+    def extract_raw(text: str) -> None:
+        ex._classify(text)
+        ex._extract_times(text)
+        ex._extract_participants(text)
+
+    def extract_normalised(text: str) -> None:
+        extract_raw(normalize_for_nlp(text))
+
+    print(f"\n{'sample':<18}{'rules on raw':>14}{'normalise+rules':>17}")
+    repeat = max(args.repeat // 20, 3)
+    for name, text in SAMPLES.items():
+        norm = _time_per_call(extract_normalised, text, repeat)
+        if len(text) > _RAW_EXTRACT_MAX_CHARS:
+            # dateparser over the raw newsletter takes minutes; not worth waiting for
+            print(f"{name:<18}{'(skipped)':>14}{norm * 1e3:>15.1f}ms")
+            continue
+        raw = _time_per_call(extract_raw, text, repeat)
+        print(f"{name:<18}{raw * 1e3:>12.1f}ms{norm * 1e3:>15.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
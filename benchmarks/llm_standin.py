@@ -0,0 +1,72 @@
+"""
+Stand-in for an OpenAI-compatible LLM server (llama.cpp / vLLM style), for
+load-testing the LLM fallback and suggestions offline.
+
+    python -m benchmarks.llm_standin [--port 8080] [--latency 0.3]
+
+then run the backend (or a benchmark) with LLM_BASE_URL=http://localhost:8080/v1.
+POST /v1/chat/completions answers after `--latency` seconds with a JSON object
+that satisfies the requested json_schema: the first enum value, 30 for
+integers, [] for arrays and "stand-in" for other strings.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI, Request
+
+
+def _value_for(schema: dict):
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: _value_for(prop) for name, prop in (schema.get("properties") or {}).items()}
+    if kind == "array":
+        return []
+    if kind == "integer":
+        return 30
+    return "stand-in"
+
+
+def create_app(latency_seconds: float = 0.3) -> FastAPI:
+    app = FastAPI(title="LLM stand-in")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> dict:
+        body = await request.json()
+        app.state.requests += 1
+        if latency_seconds:
+            await asyncio.sleep(latency_seconds)
+        schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("schema") or {}
+        return {
+            "id": f"chatcmpl-standin-{app.state.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stand-in"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps(_value_for(schema))},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    return app
+
+
+def main(argv: list[str] | None = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before each answer")
+    args = parser.parse_args(argv)
+    uvicorn.run(create_app(args.latency), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,31 @@ Each test module sets app.dependency_overrides[get_db] at import time.
 Since all modules are imported at collection time, the last import wins and
 all tests would use the wrong DB. This autouse fixture re-applies the correct
 override from the test's own module before each test.
+
+The in-process user cache is cleared as well: every module's database starts
+its users at id 1, so a cached principal must not leak into the next test.
+
+Test databases are created in a temporary directory (tests/db.py); so is the
+application database unless DATABASE_URL is set.
 """
+import os
+from contextlib import contextmanager
+
 import pytest
 
-from app.db.database import get_db
-from app.main import app
+from tests.db import sqlite_url
+
+os.environ.setdefault("DATABASE_URL", sqlite_url("test.db"))
+
+from app.core.user_cache import clear_user_cache  # noqa: E402
+from app.db.database import get_db, get_session_factory, init_db  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def app_schema():
+    """Bring the application database (DATABASE_URL) up to date, as app startup does."""
+    init_db()
 
 
 @pytest.fixture(autouse=True)
@@ -17,6 +37,9 @@ def set_db_override(request):
     module = request.module
     if hasattr(module, "override_get_db"):
         app.dependency_overrides[get_db] = module.override_get_db
+        app.dependency_overrides[get_session_factory] = lambda: contextmanager(module.override_get_db)
+    clear_user_cache()
     yield
     if hasattr(module, "override_get_db"):
         app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_session_factory, None)
@@ -0,0 +1,15 @@
+"""
+SQLite files for the test databases, in a temporary directory removed when the
+test run exits: test runs never write into the working tree.
+"""
+import atexit
+import shutil
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="iris-tests-")
+atexit.register(shutil.rmtree, _DB_DIR, ignore_errors=True)
+
+
+def sqlite_url(name: str) -> str:
+    """URL of the test database file `name` (created on first connect)."""
+    return f"sqlite:///{_DB_DIR}/{name}"
@@ -0,0 +1,94 @@
+"""
+Tests for the on-disk email body cache (app/services/body_cache.py).
+"""
+import os
+
+import pytest
+from cryptography.fernet import Fernet
+
+from app.services import body_cache
+from app.services.body_cache import (
+    delete_user_bodies,
+    get_cached_body,
+    prune_body_cache,
+    store_body,
+)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(body_cache.settings, "BODY_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(body_cache.settings, "BODY_CACHE_ENABLED", True)
+    monkeypatch.setattr(body_cache.settings, "SECRET_ENCRYPTION_KEY", Fernet.generate_key().decode())
+    return tmp_path
+
+
+def _files(cache_dir) -> list[str]:
+    return [os.path.join(r, f) for r, _d, fs in os.walk(cache_dir) for f in fs]
+
+
+def test_store_and_get_round_trip_compressed_and_encrypted(cache_dir):
+    body = "Bonjour, réunion demain à 15h. " * 200
+    store_body(1, "gmail", "msg/with:odd+chars", body)
+
+    assert get_cached_body(1, "gmail", "msg/with:odd+chars") == body
+    files = _files(cache_dir)
+    assert len(files) == 1
+    with open(files[0], "rb") as f:
+        data = f.read()
+    assert len(data) < len(body.encode("utf-8"))
+    assert b"Bonjour" not in data
+
+
+def test_entries_are_isolated_per_user_and_provider():
+    store_body(1, "gmail", "m1", "user one")
+    store_body(1, "outlook", "m1", "user one outlook")
+    assert get_cached_body(2, "gmail", "m1") is None
+
+    delete_user_bodies(1, "gmail")
+    assert get_cached_body(1, "gmail", "m1") is None
+    assert get_cached_body(1, "outlook", "m1") == "user one outlook"
+
+    delete_user_bodies(1)
+    assert get_cached_body(1, "outlook", "m1") is None
+
+
+def test_corrupt_entry_is_treated_as_miss(cache_dir):
+    store_body(1, "gmail", "m1", "hello")
+    path = body_cache._entry_path(1, "gmail", "m1")
+    with open(path, "wb") as f:
+        f.write(b"not a token")
+    assert get_cached_body(1, "gmail", "m1") is None
+    assert not os.path.exists(path)
+
+
+def test_entry_written_with_another_key_is_a_miss(monkeypatch):
+    store_body(1, "gmail", "m1", "hello")
+    monkeypatch.setattr(body_cache.settings, "SECRET_ENCRYPTION_KEY", Fernet.generate_key().decode())
+    assert get_cached_body(1, "gmail", "m1") is None
+
+
+def test_prune_evicts_least_recently_used_first():
+    for i in range(3):
+        store_body(1, "gmail", f"m{i}", f"body {i} " * 50)
+    os.utime(body_cache._entry_path(1, "gmail", "m0"), (1, 1))
+    os.utime(body_cache._entry_path(1, "gmail", "m1"), (2, 2))
+
+    keep = os.path.getsize(body_cache._entry_path(1, "gmail", "m2"))
+    removed = prune_body_cache(max_bytes=keep)
+
+    assert removed == 2
+    assert get_cached_body(1, "gmail", "m2") is not None
+    assert get_cached_body(1, "gmail", "m0") is None
+
+
+def test_disabled_cache_is_a_no_op(monkeypatch):
+    monkeypatch.setattr(body_cache.settings, "BODY_CACHE_ENABLED", False)
+    store_body(1, "gmail", "m1", "hello")
+    assert get_cached_body(1, "gmail", "m1") is None
+
+
+def test_nothing_is_cached_without_an_encryption_key(cache_dir, monkeypatch):
+    monkeypatch.setattr(body_cache.settings, "SECRET_ENCRYPTION_KEY", None)
+    store_body(1, "gmail", "m1", "hello")
+    assert _files(cache_dir) == []
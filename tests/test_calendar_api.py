@@ -29,8 +29,9 @@ from app.main import app  # noqa: E402
 from app.models.base import Base  # noqa: E402
 from app.models.email import Email  # noqa: E402, F401 — needed to register the table
 from app.models.user import User  # noqa: E402, F401
+from tests.db import sqlite_url  # noqa: E402
 
-TEST_DB_URL = "sqlite:///./test_calendar.db"
+TEST_DB_URL = sqlite_url("test_calendar.db")
 test_engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
 TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
@@ -56,9 +56,9 @@ class TestGoogleCalendarService:
         with (
             patch("app.services.google_calendar_service.get_token_path_for_user",
                   return_value=str(token_file)),
-            patch("app.services.google_calendar_service.Credentials.from_authorized_user_file",
+            patch("google.oauth2.credentials.Credentials.from_authorized_user_file",
                   return_value=self._mock_creds()),
-            patch("app.services.google_calendar_service.build") as mock_build,
+            patch("googleapiclient.discovery.build") as mock_build,
         ):
             mock_service = MagicMock()
             mock_build.return_value = mock_service
@@ -90,9 +90,9 @@ class TestGoogleCalendarService:
         with (
             patch("app.services.google_calendar_service.get_token_path_for_user",
                   return_value=str(token_file)),
-            patch("app.services.google_calendar_service.Credentials.from_authorized_user_file",
+            patch("google.oauth2.credentials.Credentials.from_authorized_user_file",
                   return_value=self._mock_creds()),
-            patch("app.services.google_calendar_service.build") as mock_build,
+            patch("googleapiclient.discovery.build") as mock_build,
         ):
             mock_service = MagicMock()
             mock_build.return_value = mock_service
@@ -133,10 +133,10 @@ class TestGoogleCalendarService:
         with (
             patch("app.services.google_calendar_service.get_token_path_for_user",
                   return_value=str(token_file)),
-            patch("app.services.google_calendar_service.Credentials.from_authorized_user_file",
+            patch("google.oauth2.credentials.Credentials.from_authorized_user_file",
                   return_value=expired_creds),
-            patch("app.services.google_calendar_service.Request"),
-            patch("app.services.google_calendar_service.build") as mock_build,
+            patch("google.auth.transport.requests.Request"),
+            patch("googleapiclient.discovery.build") as mock_build,
         ):
             mock_service = MagicMock()
             mock_build.return_value = mock_service
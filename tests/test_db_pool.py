@@ -0,0 +1,131 @@
+"""
+Tests for the instrumented connection pool and the engine options built from
+settings (app/db/pool.py).
+"""
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core.config import settings
+from app.db.pool import InstrumentedQueuePool, database_url, engine_options, pool_stats
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_db_pool.db")
+
+
+@pytest.fixture
+def make_pool(monkeypatch):
+    """A one-connection pool with the given checkout timeout."""
+    engines = []
+
+    def _make(timeout: float):
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+        monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+        monkeypatch.setattr(settings, "DB_POOL_TIMEOUT_SECONDS", timeout)
+        engines.append(create_engine(TEST_DB_URL, **engine_options(TEST_DB_URL)))
+        return engines[-1]
+
+    yield _make
+    for engine in engines:
+        engine.dispose()
+
+
+def test_checkouts_and_timeouts_are_counted(make_pool):
+    small_pool = make_pool(0.2)
+    with small_pool.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(PoolTimeoutError):
+            small_pool.connect()
+    with small_pool.connect():
+        pass
+
+    stats = pool_stats(small_pool)
+    assert stats["pool"] == "InstrumentedQueuePool"
+    assert stats["size"] == 1 and stats["max_overflow"] == 0 and stats["checkedout"] == 0
+    assert stats["checkouts"] == 2 and stats["timeouts"] == 1
+    assert stats["wait_ms_max"] >= 150
+
+
+def test_waiting_checkouts_are_reported(make_pool):
+    small_pool = make_pool(5)
+    conn = small_pool.connect()
+    waited: list[float] = []
+
+    def _wait_for_connection():
+        started = time.perf_counter()
+        with small_pool.connect():
+            waited.append(time.perf_counter() - started)
+
+    thread = threading.Thread(target=_wait_for_connection)
+    thread.start()
+    deadline = time.monotonic() + 2
+    while pool_stats(small_pool)["waiting"] != 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool_stats(small_pool)["waiting"] == 1
+
+    time.sleep(0.1)
+    conn.close()
+    thread.join(5)
+    assert waited and waited[0] >= 0.1
+    assert pool_stats(small_pool)["waiting"] == 0
+
+
+def test_database_url_normalisation_and_driver(monkeypatch):
+    assert database_url("postgres://u:p@h/db") == "postgresql://u:p@h/db"
+    monkeypatch.setattr(settings, "DB_DRIVER", "psycopg")
+    assert database_url("postgres://u:p@h/db") == "postgresql+psycopg://u:p@h/db"
+    assert database_url("sqlite:///./x.db") == "sqlite:///./x.db"
+    monkeypatch.setattr(settings, "DB_DRIVER", "asyncpg")
+    with pytest.raises(ValueError):
+        database_url("postgresql://u:p@h/db")
+
+
+def test_postgres_options(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 2)
+    options = engine_options("postgresql://u:p@h/db")
+    assert options["pool_size"] == 3 and options["max_overflow"] == 2
+    assert options["pool_pre_ping"] is True and "connect_args" not in options
+    engine = create_engine("postgresql://u:p@h/db", **options)
+    assert isinstance(engine.pool, InstrumentedQueuePool) and engine.pool.size() == 3
+
+    assert engine_options("postgresql+psycopg://u:p@h/db")["connect_args"] == {"prepare_threshold": 5}
+    monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+    assert engine_options("postgresql+psycopg://u:p@h/db")["connect_args"] == {"prepare_threshold": None}
+
+
+def test_in_memory_sqlite_keeps_the_default_pool():
+    options = engine_options("sqlite://")
+    assert "poolclass" not in options
+
+
+def test_gmail_token_lookup_is_one_narrow_query(monkeypatch):
+    from app.db.database import SessionLocal, engine
+    from app.models.user import User
+    from app.services import gmail_service
+
+    monkeypatch.setattr(gmail_service, "decrypt", lambda value: value)
+    with SessionLocal() as db:
+        user = User(email="pool-token@example.com", password_hash="x", gmail_oauth_token="tok", gmail_email="g@x.com")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        assert gmail_service._load_gmail_token_from_db(user_id) == ("tok", "g@x.com")
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+        with SessionLocal() as db:
+            db.query(User).filter(User.id == user_id).delete()
+            db.commit()
+    assert len(statements) == 1
+    assert "password_hash" not in statements[0]
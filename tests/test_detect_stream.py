@@ -0,0 +1,76 @@
+"""
+Tests for the bounded generator pipeline behind streaming fetch-and-detect
+(app/services/detect_stream.py).
+"""
+import json
+import threading
+import time
+
+import pytest
+
+from app.schemas.detection import ExtractionResult
+from app.schemas.email import EmailItem
+from app.services.detect_stream import bounded, serialise_stage
+
+
+def test_bounded_yields_items_in_order():
+    assert list(bounded(iter(range(50)), maxsize=4)) == list(range(50))
+
+
+def test_bounded_applies_backpressure_to_producer():
+    produced = []
+
+    def source():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    stream = bounded(source(), maxsize=5)
+    assert next(stream) == 0
+    time.sleep(0.2)
+    # One item consumed, at most `maxsize` buffered, one blocked in put()
+    assert len(produced) <= 7
+    stream.close()
+
+
+def test_bounded_close_stops_producer_thread():
+    started = threading.Event()
+
+    def endless():
+        started.set()
+        i = 0
+        while True:
+            yield i
+            i += 1
+
+    before = threading.active_count()
+    stream = bounded(endless(), maxsize=2)
+    next(stream)
+    started.wait(1)
+    stream.close()
+    deadline = time.monotonic() + 3
+    while threading.active_count() > before and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert threading.active_count() == before
+
+
+def test_bounded_reraises_producer_errors():
+    def failing():
+        yield 1
+        raise ValueError("fetch failed")
+
+    stream = bounded(failing(), maxsize=2)
+    assert next(stream) == 1
+    with pytest.raises(ValueError, match="fetch failed"):
+        next(stream)
+
+
+def test_serialise_stage_ends_with_error_record_when_detection_fails():
+    def detected():
+        yield EmailItem(subject="Hi", body="FYI", message_id="m1"), ExtractionResult()
+        raise RuntimeError("database is locked")
+
+    records = [json.loads(chunk) for chunk in serialise_stage(detected(), "ndjson")]
+
+    assert [r["type"] for r in records] == ["email", "error"]
+    assert records[-1] == {"type": "error", "detail": "Detection failed", "count": 1}
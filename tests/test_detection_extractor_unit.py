@@ -83,3 +83,21 @@ def test_empty_email(extractor):
     result = extractor.extract(email)
     assert result.classification == "info"
     assert result.confidence == 0.0
+
+
+def test_forwarded_meeting_invite_keeps_its_times(extractor):
+    email = EmailInput(
+        subject="Fwd: Call next week",
+        body=(
+            "---------- Forwarded message ---------\n"
+            "From: Alice <alice@example.com>\n"
+            "Date: Mon, Mar 3, 2025 at 9:00 AM\n"
+            "Subject: Call next week\n"
+            "To: Bob <bob@example.com>\n\n"
+            "Let's meet on Tuesday March 4 at 2:30 PM for 30 minutes. Zoom link: https://zoom.us/j/123.\n"
+        ),
+    )
+    result = extractor.extract(email)
+    assert result.classification == "meeting_schedule"
+    assert len(result.proposed_times) >= 1
+    assert result.duration_minutes == 30
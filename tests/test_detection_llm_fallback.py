@@ -1,11 +1,22 @@
+import threading
+import time
 from unittest.mock import MagicMock
 
 import pytest
 
-from app.nlp.llm_fallback_openai import LLMFallbackOpenAI, _merge_patch
+from app.nlp.llm_backend import OpenAIBackend, StubBackend
+from app.nlp.llm_cache import LLMResponseCache
+from app.nlp.llm_fallback_openai import LLMFallbackOpenAI, _merge_patch, get_response_cache
 from app.schemas.detection import EmailInput, ExtractionResult
 
 
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    get_response_cache().clear()
+    yield
+    get_response_cache().clear()
+
+
 @pytest.fixture
 def low_confidence_result():
     return ExtractionResult(
@@ -46,8 +57,8 @@ def test_enhance_merges_patch_only_missing_fields(monkeypatch, email, low_confid
     mock_client.chat.completions.create.return_value = MagicMock(
         choices=[MagicMock(message=MagicMock(content='{"timezone": "Europe/Paris", "duration_minutes": 30}'))]
     )
-    fallback = LLMFallbackOpenAI()
-    fallback._client = mock_client
+    fallback = LLMFallbackOpenAI(backend=OpenAIBackend())
+    fallback.backend._client = mock_client
     result = fallback.enhance(email, low_confidence_result)
     assert result.timezone == "Europe/Paris"
     assert result.duration_minutes == 30
@@ -78,3 +89,195 @@ def test_merge_patch_proposed_times():
     merged = _merge_patch(partial, patch)
     assert len(merged.proposed_times) == 1
     assert merged.proposed_times[0].start == "2025-03-01T14:00:00"
+
+
+def _mock_client(content: str = '{"timezone": "Europe/Paris"}') -> MagicMock:
+    client = MagicMock()
+    client.chat.completions.create.return_value = MagicMock(
+        choices=[MagicMock(message=MagicMock(content=content))]
+    )
+    return client
+
+
+def test_identical_emails_share_one_llm_call(monkeypatch, email, low_confidence_result):
+    monkeypatch.setattr("app.nlp.llm_fallback_openai.settings.OPENAI_API_KEY", "sk-test")
+    fallback = LLMFallbackOpenAI(backend=OpenAIBackend())
+    fallback.backend._client = _mock_client()
+
+    first = fallback.enhance(email, low_confidence_result)
+    second = fallback.enhance(EmailInput(subject=email.subject, body=email.body), low_confidence_result)
+
+    assert first.timezone == second.timezone == "Europe/Paris"
+    assert fallback.backend._client.chat.completions.create.call_count == 1
+    assert get_response_cache().stats()["hits"] == 1
+
+
+def test_model_change_misses_cache(monkeypatch, email, low_confidence_result):
+    monkeypatch.setattr("app.nlp.llm_fallback_openai.settings.OPENAI_API_KEY", "sk-test")
+    fallback = LLMFallbackOpenAI(backend=OpenAIBackend())
+    fallback.backend._client = _mock_client()
+
+    fallback.enhance(email, low_confidence_result)
+    monkeypatch.setattr("app.nlp.llm_fallback_openai.settings.OPENAI_MODEL", "gpt-4o")
+    fallback.enhance(email, low_confidence_result)
+
+    assert fallback.backend._client.chat.completions.create.call_count == 2
+
+
+def test_failed_call_is_not_cached(monkeypatch, email, low_confidence_result):
+    monkeypatch.setattr("app.nlp.llm_fallback_openai.settings.OPENAI_API_KEY", "sk-test")
+    fallback = LLMFallbackOpenAI(backend=OpenAIBackend())
+    fallback.backend._client = _mock_client()
+    fallback.backend._client.chat.completions.create.side_effect = [RuntimeError("rate limited"), MagicMock(
+        choices=[MagicMock(message=MagicMock(content='{"duration_minutes": 45}'))]
+    )]
+
+    assert fallback.enhance(email, low_confidence_result).duration_minutes is None
+    assert fallback.enhance(email, low_confidence_result).duration_minutes == 45
+
+
+def test_concurrent_misses_are_coalesced():
+    cache = LLMResponseCache(max_entries=10, ttl_seconds=60)
+    release = threading.Event()
+    calls = []
+
+    def slow_call():
+        calls.append(1)
+        release.wait(2)
+        return {"timezone": "UTC"}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_call("k", slow_call))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"timezone": "UTC"}] * 5
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] + stats["coalesced"] == 4
+
+
+def test_cache_bounds_entries_and_expires():
+    cache = LLMResponseCache(max_entries=2, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        cache.put(key, key)
+    assert cache.get("a") == (False, None)
+    assert cache.get("c") == (True, "c")
+
+    expiring = LLMResponseCache(max_entries=2, ttl_seconds=-1)
+    expiring.put("a", 1)
+    assert expiring.get("a") == (False, None)
+
+
+class _FakeAsyncClient:
+    """Stands in for AsyncOpenAI: records concurrency, optional per-prompt delays."""
+
+    def __init__(self, delays: dict[str, float] | None = None, content: str = '{"timezone": "Europe/Paris"}'):
+        self.delays = delays or {}
+        self.content = content
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self.closed = False
+        self.chat = MagicMock()
+        self.chat.completions.create = self._create
+
+    async def _create(self, model, messages, response_format):
+        import asyncio
+
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            prompt = messages[0]["content"]
+            delay = next((d for marker, d in self.delays.items() if marker in prompt), 0.01)
+            await asyncio.sleep(delay)
+            return MagicMock(choices=[MagicMock(message=MagicMock(content=self.content))])
+        finally:
+            self.active -= 1
+
+    async def close(self):
+        self.closed = True
+
+
+def _pairs(n: int, confidence: float = 0.3) -> list[tuple[EmailInput, ExtractionResult]]:
+    return [
+        (EmailInput(subject=f"Newsletter {i}", body=f"Issue {i}"),
+         ExtractionResult(classification="info", confidence=confidence))
+        for i in range(n)
+    ]
+
+
+def test_enhance_many_runs_calls_concurrently_under_limit(monkeypatch):
+    monkeypatch.setattr("app.nlp.llm_fallback_openai.settings.OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr("app.nlp.llm_fallback_openai.settings.LLM_MAX_CONCURRENCY", 3)
+    fake = _FakeAsyncClient()
+    backend = OpenAIBackend()
+    backend._async_client = fake
+    fallback = LLMFallbackOpenAI(backend=backend)
+
+    results = fallback.enhance_many(_pairs(10) + _pairs(1, confidence=0.9))
+
+    assert fake.calls == 10
+    assert fake.max_active == 3
+    assert all(r.timezone == "Europe/Paris" for r in results[:10])
+    assert results[10].timezone is None
+
+
+@pytest.mark.parametrize("call_timeout, budget", [(0.2, 10.0), (10.0, 0.3)])
+def test_enhance_many_keeps_rule_result_after_timeout_or_budget(monkeypatch, call_timeout, budget):
+    monkeypatch.setattr("app.nlp.llm_fallback_openai.settings.OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr("app.nlp.llm_fallback_openai.settings.LLM_CALL_TIMEOUT_SECONDS", call_timeout)
+    monkeypatch.setattr("app.nlp.llm_fallback_openai.settings.LLM_BATCH_BUDGET_SECONDS", budget)
+    fake = _FakeAsyncClient(delays={"Newsletter 1": 5.0})
+    backend = OpenAIBackend()
+    backend._async_client = fake
+    fallback = LLMFallbackOpenAI(backend=backend)
+
+    started = time.monotonic()
+    results = fallback.enhance_many(_pairs(3))
+
+    assert time.monotonic() - started < 2
+    assert [r.timezone for r in results] == ["Europe/Paris", None, "Europe/Paris"]
+    assert results[1].confidence == 0.3
+
+
+def test_detect_batch_sends_low_confidence_emails_in_one_pass(monkeypatch):
+    from app.services import detection
+
+    monkeypatch.setattr("app.services.detection.settings.OPENAI_API_KEY", "sk-test")
+    fallback = MagicMock()
+    fallback.enhance_many.side_effect = lambda pairs: [p for _, p in pairs]
+    monkeypatch.setattr(detection, "_llm_fallback", fallback)
+
+    detection.detect_batch([EmailInput(subject="Hi", body="Hello"), EmailInput(subject="Yo", body="Hey")])
+
+    fallback.enhance_many.assert_called_once()
+    assert len(fallback.enhance_many.call_args.args[0]) == 2
+    fallback.enhance.assert_not_called()
+
+
+def test_stub_backend_serves_fallback_without_network(monkeypatch, email, low_confidence_result):
+    monkeypatch.setattr("app.nlp.llm_fallback_openai.settings.OPENAI_API_KEY", None)
+    stub = StubBackend(latency_seconds=0, answers={"extraction_patch": {"timezone": "Europe/Paris"}})
+    fallback = LLMFallbackOpenAI(backend=stub)
+
+    single = fallback.enhance(email, low_confidence_result)
+    batch = fallback.enhance_many(_pairs(3))
+
+    assert single.timezone == "Europe/Paris"
+    assert all(r.timezone == "Europe/Paris" for r in batch)
+    assert stub.calls == 4
+
+
+def test_openai_backend_targets_local_base_url_without_key(monkeypatch):
+    monkeypatch.setattr("app.nlp.llm_backend.settings.OPENAI_API_KEY", None)
+    backend = OpenAIBackend(base_url="http://localhost:8080/v1", model="local-model")
+
+    assert backend.api_key == "not-needed"
+    assert str(backend.client.base_url).startswith("http://localhost:8080/v1")
+    assert backend.cache_namespace == "http://localhost:8080/v1|local-model"
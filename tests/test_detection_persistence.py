@@ -0,0 +1,181 @@
+"""
+Tests for persisted detection results (read-through in app/services/detection.py)
+and the `redetect` command in app/cli.py.
+"""
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.models.email import Email
+from app.models.job import Job
+from app.models.user import User
+from app.schemas.detection import EmailInput, ExtractionResult
+from app.services import detection
+from app.services.detection import (
+    current_extraction_version,
+    detect_batch,
+    detect_single,
+    load_stored_extraction,
+    redetect_stale_emails,
+    store_extraction,
+)
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_detection.db")
+test_engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+@pytest.fixture(autouse=True)
+def reset_db(monkeypatch):
+    monkeypatch.setattr("app.services.detection.settings.OPENAI_API_KEY", None)
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    yield
+    Base.metadata.drop_all(bind=test_engine)
+
+
+@pytest.fixture
+def db():
+    session = TestSession()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    u = User(email="persist@example.com", password_hash="x")
+    db.add(u)
+    db.commit()
+    return u
+
+
+def _email(db, user, message_id: str, **kwargs) -> Email:
+    row = Email(
+        user_id=user.id,
+        message_id=message_id,
+        subject="Meeting",
+        body="Can we meet tomorrow at 3pm?",
+        **kwargs,
+    )
+    db.add(row)
+    db.commit()
+    return row
+
+
+def _input(message_id: str) -> EmailInput:
+    return EmailInput(subject="Meeting", body="Can we meet tomorrow at 3pm?", message_id=message_id)
+
+
+def test_detect_batch_persists_results_with_version(db, user):
+    row = _email(db, user, "m1", status="fetched")
+
+    results = detect_batch([_input("m1")], db=db, user_id=user.id)
+
+    db.refresh(row)
+    assert row.extraction_data == results[0].model_dump(mode="json")
+    assert row.extraction_version == current_extraction_version()
+    assert row.status == "detected"
+
+
+def test_detect_batch_reads_through_current_version(db, user):
+    row = _email(db, user, "m1")
+    stored = ExtractionResult(classification="meeting_cancel", confidence=0.9)
+    store_extraction(row, stored)
+    db.commit()
+
+    with patch.object(detection, "_run_detection") as run:
+        results = detect_batch([_input("m1")], db=db, user_id=user.id)
+
+    run.assert_not_called()
+    assert results[0].classification == "meeting_cancel"
+
+
+def test_detect_single_reruns_on_version_mismatch(db, user):
+    row = _email(db, user, "m1")
+    store_extraction(row, ExtractionResult(classification="meeting_cancel", confidence=0.9))
+    row.extraction_version = "0+old-model"
+    db.commit()
+
+    fresh = ExtractionResult(classification="meeting_schedule", confidence=0.8)
+    with patch.object(detection, "_run_detection", return_value=fresh) as run:
+        result = detect_single(_input("m1"), db=db, user_id=user.id)
+
+    run.assert_called_once()
+    assert result.classification == "meeting_schedule"
+    db.refresh(row)
+    assert row.extraction_version == current_extraction_version()
+
+
+def test_detect_batch_redetects_extraction_made_from_a_snippet(db, user):
+    row = _email(db, user, "m1")
+    row.body = "Can we meet..."  # Gmail snippet stored by the feed
+    store_extraction(row, ExtractionResult(classification="other", confidence=0.9))
+    db.commit()
+
+    fresh = ExtractionResult(classification="meeting_schedule", confidence=0.8)
+    with patch.object(detection, "_run_detection", return_value=fresh) as run:
+        results = detect_batch([_input("m1")], db=db, user_id=user.id)
+
+    run.assert_called_once()
+    assert results[0].classification == "meeting_schedule"
+    db.refresh(row)
+    assert row.body == "Can we meet tomorrow at 3pm?"
+    assert load_stored_extraction(row, row.body).classification == "meeting_schedule"
+
+
+def test_detect_batch_does_not_read_other_users_rows(db, user):
+    other = User(email="other@example.com", password_hash="x")
+    db.add(other)
+    db.commit()
+    row = _email(db, other, "m1")
+    store_extraction(row, ExtractionResult(classification="meeting_cancel", confidence=0.9))
+    db.commit()
+
+    with patch.object(detection, "_run_detection", return_value=ExtractionResult()) as run:
+        detect_batch([_input("m1")], db=db, user_id=user.id)
+
+    run.assert_called_once()
+
+
+def test_load_stored_extraction_ignores_unstamped_rows(db, user):
+    row = _email(db, user, "m1", extraction_data={"classification": "other"})
+    assert load_stored_extraction(row) is None
+
+
+def test_redetect_stale_emails_only_touches_old_versions(db, user):
+    current = _email(db, user, "m1")
+    store_extraction(current, ExtractionResult(classification="meeting_cancel"))
+    stale = _email(db, user, "m2", extraction_data={"classification": "other"}, extraction_version="0")
+    untouched = _email(db, user, "m3")
+    db.commit()
+
+    fresh = ExtractionResult(classification="meeting_schedule", confidence=0.8)
+    with patch.object(detection, "_run_detection", return_value=fresh) as run:
+        count = redetect_stale_emails(db, batch_size=1)
+
+    assert count == 1
+    run.assert_called_once()
+    db.refresh(stale)
+    db.refresh(untouched)
+    assert stale.extraction_version == current_extraction_version()
+    assert stale.extraction_data["classification"] == "meeting_schedule"
+    assert untouched.extraction_data is None
+
+
+def test_cli_redetect_enqueue_creates_one_job_per_user(db, user, monkeypatch):
+    from app import cli
+
+    _email(db, user, "m1", extraction_data={"classification": "other"}, extraction_version="0")
+    _email(db, user, "m2", extraction_data={"classification": "other"}, extraction_version="0")
+    monkeypatch.setattr("app.db.database.SessionLocal", TestSession)
+
+    assert cli.main(["redetect", "--enqueue"]) == 0
+
+    jobs = db.query(Job).all()
+    assert [(j.kind, j.user_id) for j in jobs] == [("redetect_emails", user.id)]
@@ -1,4 +1,4 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
@@ -10,8 +10,9 @@ from app.db.database import get_db
 from app.main import app
 from app.models import Base
 from app.schemas.detection import EmailInput
+from tests.db import sqlite_url
 
-TEST_DATABASE_URL = "sqlite:///./test_emails.db"
+TEST_DATABASE_URL = sqlite_url("test_emails.db")
 test_engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
@@ -178,3 +179,140 @@ def test_fetch_detect_predict_returns_emails_extractions_and_suggested_slots(
     assert len(data["extractions"]) == 1
     assert isinstance(data["suggested_slots"], list)
     assert data["extractions"][0]["classification"] == "meeting_schedule"
+
+
+@patch("app.api.endpoints.emails.is_outlook_connected_async", new_callable=AsyncMock, return_value=False)
+@patch("app.api.endpoints.emails.GmailService")
+def test_feed_categorizes_and_persists_gmail_page(
+    mock_gmail, _mock_outlook, client_with_db, setup_database, auth_headers
+):
+    mock_svc = MagicMock()
+    mock_gmail.return_value = mock_svc
+    mock_svc.authenticate_for_user_async = AsyncMock(return_value=True)
+    mock_svc.fetch_email_page_async = AsyncMock(return_value=(
+        [{"subject": "Meeting", "body": "Can we meet tomorrow at 3pm?", "message_id": "g1",
+          "sender": "a@b.com", "date": "Mon, 1 Jan 2024 10:00:00 +0000"}],
+        "next-token",
+    ))
+    r = client_with_db.get("/api/v1/emails/feed", headers=auth_headers)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["has_more"] is True
+    assert data["gmail_next_cursor"] == "next-token"
+    assert data["emails"][0]["category"] == "rdv"
+    assert data["emails"][0]["db_id"] is not None
+
+
+@pytest.fixture
+def body_cache_dir(monkeypatch, tmp_path):
+    from cryptography.fernet import Fernet
+
+    monkeypatch.setattr(settings, "BODY_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "SECRET_ENCRYPTION_KEY", Fernet.generate_key().decode())
+    return tmp_path
+
+
+@patch("app.services.gmail_service._load_gmail_token_from_db", return_value=("token", "me@gmail.com"))
+@patch("app.api.endpoints.emails.GmailService")
+def test_email_body_is_cached_after_first_open(
+    mock_gmail, _mock_token, client_with_db, setup_database, auth_headers, body_cache_dir
+):
+    mock_svc = MagicMock()
+    mock_gmail.return_value = mock_svc
+    mock_svc.authenticate_for_user_async = AsyncMock(return_value=True)
+    mock_svc.fetch_email_body_async = AsyncMock(return_value="Full body text")
+
+    first = client_with_db.get("/api/v1/emails/body/g1", headers=auth_headers)
+    second = client_with_db.get("/api/v1/emails/body/g1", headers=auth_headers)
+
+    assert first.json() == {"body": "Full body text"}
+    assert second.json() == {"body": "Full body text"}
+    mock_svc.fetch_email_body_async.assert_awaited_once_with("g1")
+
+
+@patch("app.services.gmail_service._load_gmail_token_from_db", return_value=None)
+def test_email_body_cache_is_not_served_once_disconnected(
+    _mock_token, client_with_db, setup_database, auth_headers, body_cache_dir
+):
+    from app.services.body_cache import store_body
+
+    store_body(1, "gmail", "g1", "Full body text")
+    r = client_with_db.get("/api/v1/emails/body/g1", headers=auth_headers)
+    assert r.status_code == 404
+
+
+def test_disconnecting_gmail_and_deleting_the_user_drop_cached_bodies(
+    client_with_db, setup_database, auth_headers, body_cache_dir
+):
+    from app.services.body_cache import get_cached_body, store_body
+
+    store_body(1, "gmail", "g1", "Gmail body")
+    store_body(1, "outlook", "o1", "Outlook body")
+
+    assert client_with_db.delete("/api/v1/auth/google", headers=auth_headers).status_code == 204
+    assert get_cached_body(1, "gmail", "g1") is None
+    assert get_cached_body(1, "outlook", "o1") == "Outlook body"
+
+    assert client_with_db.delete("/api/v1/users/1", headers=auth_headers).status_code == 204
+    assert get_cached_body(1, "outlook", "o1") is None
+
+
+@patch("app.api.endpoints.emails.fetch_outlook_email_body_async", new_callable=AsyncMock, return_value="Outlook body")
+@patch("app.api.endpoints.emails.is_outlook_connected_async", new_callable=AsyncMock, return_value=True)
+def test_email_body_supports_outlook(
+    _mock_connected, mock_fetch, client_with_db, setup_database, auth_headers, body_cache_dir
+):
+    r = client_with_db.get("/api/v1/emails/body/AAMk-1?provider=outlook", headers=auth_headers)
+    assert r.status_code == 200
+    assert r.json() == {"body": "Outlook body"}
+    mock_fetch.assert_awaited_once()
+
+
+@patch("app.api.endpoints.emails._require_connected_providers", return_value=(True, False))
+@patch("app.services.gmail_service.GmailService")
+def test_fetch_and_detect_streams_ndjson(
+    mock_gmail, _mock_connected, client_with_db, setup_database, auth_headers
+):
+    import json
+
+    mock_svc = MagicMock()
+    mock_gmail.return_value = mock_svc
+    mock_svc.authenticate_for_user.return_value = True
+    mock_svc.iter_recent_emails.return_value = iter([
+        {"subject": "Meeting", "body": "Can we meet tomorrow at 3pm?", "message_id": f"m{i}",
+         "sender": "a@b.com", "date": "Mon, 1 Jan 2024 10:00:00 +0000"}
+        for i in range(3)
+    ])
+    r = client_with_db.post("/api/v1/emails/fetch-and-detect?stream=ndjson", headers=auth_headers)
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in r.text.splitlines()]
+    assert [rec["type"] for rec in records] == ["email", "email", "email", "done"]
+    assert records[0]["email"]["message_id"] == "m0"
+    assert records[0]["email"]["db_id"] is not None
+    assert records[0]["extraction"]["classification"] == "meeting_schedule"
+    assert records[-1]["count"] == 3
+
+
+@patch("app.api.endpoints.emails._require_connected_providers", return_value=(True, False))
+@patch("app.services.gmail_service.GmailService")
+def test_fetch_and_detect_sse_reports_provider_errors(
+    mock_gmail, _mock_connected, client_with_db, setup_database, auth_headers
+):
+    mock_svc = MagicMock()
+    mock_gmail.return_value = mock_svc
+    mock_svc.authenticate_for_user.return_value = True
+    mock_svc.iter_recent_emails.side_effect = RuntimeError("boom")
+
+    r = client_with_db.post("/api/v1/emails/fetch-and-detect?stream=sse", headers=auth_headers)
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert 'event: error\ndata: {"provider":"gmail","detail":"Gmail fetch failed"}\n\n' in r.text
+    assert r.text.endswith('event: done\ndata: {"count":0}\n\n')
+
+
+def test_email_events_requires_auth(client_with_db, setup_database):
+    r = client_with_db.get("/api/v1/emails/events")
+    assert r.status_code == 403
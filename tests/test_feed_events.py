@@ -0,0 +1,193 @@
+"""
+Tests for server-push feed updates (app/services/feed_events.py) and their
+publication from the sync engine.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.models import Base
+from app.models.user import User
+from app.schemas.email import EmailItem
+from app.services import feed_events
+from app.services.email_sync_service import upsert_email_items
+from app.services.feed_events import (
+    FeedBroker,
+    PostgresFeedBroker,
+    get_feed_broker,
+    notify_payload,
+    set_feed_broker,
+    sse_event_stream,
+)
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_feed.db")
+test_engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+@pytest.fixture(autouse=True)
+def broker():
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    b = FeedBroker()
+    set_feed_broker(b)
+    yield b
+    set_feed_broker(None)
+    Base.metadata.drop_all(bind=test_engine)
+
+
+def _item(message_id: str, **kwargs) -> EmailItem:
+    return EmailItem(subject="Hello", body="Body", message_id=message_id, provider="gmail", **kwargs)
+
+
+async def test_publish_reaches_only_that_users_subscriptions(broker):
+    mine = broker.subscribe(1)
+    other = broker.subscribe(2)
+
+    broker.publish(1, {"type": "email.created", "email": {"message_id": "m1"}})
+
+    assert (await mine.get(timeout=1))["email"]["message_id"] == "m1"
+    assert await other.get(timeout=0.05) is None
+
+
+async def test_publish_from_another_thread_is_delivered(broker):
+    sub = broker.subscribe(1)
+    t = threading.Thread(target=broker.publish, args=(1, {"type": "email.created", "email": {}}))
+    t.start()
+    t.join()
+    assert await sub.get(timeout=1) == {"type": "email.created", "email": {}}
+
+
+async def test_slow_subscriber_drops_oldest_events(broker, monkeypatch):
+    monkeypatch.setattr("app.services.feed_events.settings.FEED_SUBSCRIBER_QUEUE_SIZE", 2)
+    sub = broker.subscribe(1)
+    for i in range(5):
+        broker.publish(1, {"type": "email.created", "n": i})
+    assert sub.dropped == 3
+    assert [(await sub.get(0.1))["n"] for _ in range(2)] == [3, 4]
+
+
+async def test_unsubscribe_removes_subscription(broker):
+    sub = broker.subscribe(1)
+    broker.unsubscribe(sub)
+    assert broker.subscriber_count(1) == 0
+
+
+async def test_sse_stream_renders_events_and_keepalives(broker):
+    sub = broker.subscribe(1)
+    disconnected = False
+
+    async def is_disconnected():
+        return disconnected
+
+    stream = sse_event_stream(sub, is_disconnected, keepalive_seconds=0.05)
+    assert (await stream.__anext__()).endswith(": connected\n\n")
+    assert await stream.__anext__() == ": keepalive\n\n"
+    broker.publish(1, {"type": "email.created", "email": {"message_id": "m1"}})
+    assert await stream.__anext__() == (
+        'event: email.created\ndata: {"type":"email.created","email":{"message_id":"m1"}}\n\n'
+    )
+    disconnected = True
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(stream.__anext__(), 1)
+
+
+async def test_upsert_publishes_created_then_only_changed_emails(broker):
+    sub = broker.subscribe(1)
+    db = TestSession()
+    try:
+        db.add(User(id=1, email="feed@example.com", password_hash="x"))
+        db.commit()
+
+        upsert_email_items(db, 1, [_item("m1"), _item("m2")])
+        first = [await sub.get(0.5), await sub.get(0.5)]
+        assert [e["type"] for e in first] == ["email.created", "email.created"]
+        assert first[0]["email"]["db_id"] is not None
+
+        # Re-syncing unchanged emails publishes nothing; a backfilled field does
+        upsert_email_items(db, 1, [_item("m1"), _item("m2", sender="a@b.com")])
+        event = await sub.get(0.5)
+        assert event["type"] == "email.updated"
+        assert event["email"]["message_id"] == "m2"
+        assert await sub.get(0.05) is None
+    finally:
+        db.close()
+
+
+def test_notify_payload_keeps_small_events_whole():
+    event = {"type": "email.created", "email": {"message_id": "m1", "body": "Réunion"}}
+    assert json.loads(notify_payload(1, event)) == {"user_id": 1, "event": event}
+
+
+def test_notify_payload_fits_pg_notify_limit():
+    email = _item("m1", db_id=7).model_dump(mode="json")
+    email["body"] = "é" * 1000
+    assert json.loads(notify_payload(1, {"type": "email.created", "email": email}))["event"]["email"]["body"]
+
+    email["subject"] = "€" * 3000  # 9000 bytes of UTF-8
+    payload = notify_payload(1, {"type": "email.created", "email": email})
+    assert len(payload.encode()) < 8000
+    event = json.loads(payload)["event"]
+    assert event["partial"] is True
+    assert event["email"]["message_id"] == "m1" and event["email"]["db_id"] == 7
+    assert len(event["email"]["subject"]) == 200
+
+
+class _AutocommitConnection(sqlite3.Connection):
+    autocommit = False  # psycopg connections have it; sqlite3 only from Python 3.12
+
+
+def test_postgres_listener_connection_is_outside_the_pool():
+    engine = create_engine(
+        "sqlite://",
+        creator=lambda: sqlite3.connect(":memory:", factory=_AutocommitConnection, check_same_thread=False),
+        pool_size=1,
+        max_overflow=0,
+        poolclass=QueuePool,
+    )
+    conn = PostgresFeedBroker(engine)._connect()
+    try:
+        with engine.connect():  # the only pool slot is still free
+            pass
+        assert engine.pool.checkedout() == 0
+        assert conn.autocommit is True
+    finally:
+        conn.close()
+
+
+class _Psycopg3Connection:
+    """psycopg 3 delivers notifications through a notifies() generator, not a list."""
+
+    def __init__(self, payloads: list[str]) -> None:
+        self.payloads = payloads
+        self.timeouts: list[float] = []
+
+    def notifies(self, timeout: float):
+        self.timeouts.append(timeout)
+        for payload in self.payloads:
+            yield type("Notify", (), {"payload": payload})()
+
+
+def test_psycopg3_listener_reads_the_notifies_generator():
+    engine = SimpleNamespace(dialect=SimpleNamespace(driver="psycopg"))  # DB_DRIVER=psycopg
+    conn = _Psycopg3Connection([notify_payload(1, {"type": "email.created"})])
+    notes = list(PostgresFeedBroker(engine)._notifications(conn))
+    assert [json.loads(n.payload)["event"] for n in notes] == [{"type": "email.created"}]
+    assert conn.timeouts == [feed_events._LISTEN_POLL_SECONDS]
+
+
+def test_postgres_broker_is_rejected_behind_pgbouncer(monkeypatch):
+    set_feed_broker(None)
+    monkeypatch.setattr(settings, "FEED_BROKER", "postgres")
+    monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+    with pytest.raises(ValueError, match="PgBouncer"):
+        get_feed_broker()
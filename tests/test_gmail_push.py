@@ -0,0 +1,181 @@
+"""
+Tests for Gmail push notifications: webhook ingestion, watch registration and
+incremental history sync (app/services/gmail_push_service.py).
+"""
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import httplib2
+import pytest
+from fastapi.testclient import TestClient
+from googleapiclient.errors import HttpError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.models import Base
+from app.models.email import Email
+from app.models.job import Job
+from app.models.user import User
+from app.services.gmail_push_service import (
+    build_push_envelope,
+    register_gmail_watch,
+    stop_gmail_watch,
+    sync_gmail_history,
+)
+from app.services.prefetch_service import _providers_to_poll
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_gmail_push.db")
+test_engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+def override_get_db():
+    db = TestSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def reset_db(monkeypatch):
+    monkeypatch.setattr("app.services.gmail_push_service.settings.GMAIL_PUBSUB_TOPIC", "projects/p/topics/gmail")
+    monkeypatch.setattr("app.services.gmail_push_service.settings.GMAIL_PUBSUB_VERIFICATION_TOKEN", "secret")
+    monkeypatch.setattr("app.services.gmail_push_service.settings.OPENAI_API_KEY", None)
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    yield
+    Base.metadata.drop_all(bind=test_engine)
+
+
+@pytest.fixture
+def db():
+    session = TestSession()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    u = User(email="push@example.com", password_hash="x", gmail_oauth_token="enc", gmail_email="Me@Gmail.com")
+    db.add(u)
+    db.commit()
+    return u
+
+
+def _http_error(status: int) -> HttpError:
+    return HttpError(httplib2.Response({"status": status}), b"{}")
+
+
+def test_webhook_bursts_are_coalesced_into_one_delayed_job(db, user):
+    for history_id in range(100, 105):
+        r = client.post(
+            "/api/v1/webhooks/gmail?token=secret", json=build_push_envelope("me@gmail.com", history_id)
+        )
+        assert r.status_code == 204
+
+    jobs = db.query(Job).all()
+    assert len(jobs) == 1
+    assert jobs[0].kind == "gmail_history_sync"
+    assert jobs[0].user_id == user.id
+    run_after = jobs[0].run_after.replace(tzinfo=UTC) if jobs[0].run_after.tzinfo is None else jobs[0].run_after
+    assert run_after > datetime.now(UTC)
+
+
+def test_webhook_rejects_wrong_token(db, user):
+    r = client.post("/api/v1/webhooks/gmail?token=nope", json=build_push_envelope("me@gmail.com", 1))
+    assert r.status_code == 403
+    assert db.query(Job).count() == 0
+
+
+def test_webhook_requires_token_once_push_is_configured(db, user, monkeypatch):
+    monkeypatch.setattr("app.services.gmail_push_service.settings.GMAIL_PUBSUB_VERIFICATION_TOKEN", None)
+    r = client.post("/api/v1/webhooks/gmail", json=build_push_envelope("me@gmail.com", 1))
+    assert r.status_code == 403
+
+    monkeypatch.setattr("app.services.gmail_push_service.settings.GMAIL_PUBSUB_TOPIC", None)
+    r = client.post("/api/v1/webhooks/gmail", json=build_push_envelope("me@gmail.com", 1))
+    assert r.status_code == 404
+    assert db.query(Job).count() == 0
+
+
+def test_webhook_acknowledges_malformed_and_unknown_notifications(db, user):
+    assert client.post("/api/v1/webhooks/gmail?token=secret", json={"message": {}}).status_code == 204
+    r = client.post("/api/v1/webhooks/gmail?token=secret", json=build_push_envelope("other@gmail.com", 1))
+    assert r.status_code == 204
+    assert db.query(Job).count() == 0
+
+
+@patch("app.services.gmail_service.GmailService")
+def test_register_watch_stores_expiry_and_start_history(mock_gmail, db, user):
+    svc = mock_gmail.return_value
+    svc.authenticate_for_user.return_value = True
+    expires = datetime.now(UTC) + timedelta(days=7)
+    svc.start_watch.return_value = {"historyId": "500", "expiration": str(int(expires.timestamp() * 1000))}
+
+    assert register_gmail_watch(db, user.id) is True
+
+    svc.start_watch.assert_called_once_with("projects/p/topics/gmail")
+    db.refresh(user)
+    assert user.gmail_history_id == "500"
+    assert _providers_to_poll(db, user.id) == ("outlook",)
+
+
+@patch("app.services.gmail_service.GmailService")
+def test_stop_watch_stops_an_active_watch_and_clears_push_state(mock_gmail, db, user):
+    svc = mock_gmail.return_value
+    svc.authenticate_for_user.return_value = True
+    user.gmail_watch_expires_at = datetime.now(UTC) + timedelta(days=3)
+    user.gmail_history_id = "500"
+    db.commit()
+
+    stop_gmail_watch(user)
+
+    svc.stop_watch.assert_called_once_with()
+    assert user.gmail_watch_expires_at is None and user.gmail_history_id is None
+
+
+@patch("app.services.gmail_service.GmailService")
+def test_history_sync_stores_detected_new_messages_and_advances(mock_gmail, db, user):
+    user.gmail_history_id = "100"
+    db.commit()
+    svc = mock_gmail.return_value
+    svc.authenticate_for_user.return_value = True
+    svc.list_history_message_ids.return_value = (["g1"], "150")
+    svc.fetch_messages.return_value = [
+        {"subject": "Meeting", "body": "Can we meet tomorrow at 3pm?", "message_id": "g1",
+         "sender": "a@b.com", "date": "Mon, 1 Jan 2024 10:00:00 +0000"},
+    ]
+
+    assert sync_gmail_history(db, user.id) == 1
+
+    svc.list_history_message_ids.assert_called_once_with("100")
+    row = db.query(Email).filter(Email.message_id == "g1").one()
+    assert row.category == "rdv"
+    assert row.extraction_data["classification"] == "meeting_schedule"
+    db.refresh(user)
+    assert user.gmail_history_id == "150"
+
+
+@patch("app.services.email_sync_service.sync_user_emails")
+@patch("app.services.gmail_service.GmailService")
+def test_history_sync_falls_back_to_full_sync_when_history_expired(mock_gmail, mock_sync, db, user):
+    user.gmail_history_id = "1"
+    db.commit()
+    svc = mock_gmail.return_value
+    svc.authenticate_for_user.return_value = True
+    svc.list_history_message_ids.side_effect = _http_error(404)
+    svc.get_history_id.return_value = "900"
+
+    sync_gmail_history(db, user.id)
+
+    mock_sync.assert_called_once()
+    db.refresh(user)
+    assert user.gmail_history_id == "900"
@@ -3,12 +3,15 @@ import json
 import os
 from unittest.mock import MagicMock, patch
 
+from app.nlp.textnorm import html_to_text
 from app.schemas.detection import EmailInput
 from app.services.gmail_service import (
     TOKENS_DIR,
     GmailService,
     _decode_body,
+    _email_dict_from_message,
     _extract_body_from_payload,
+    _strip_html,
     fetch_recent_emails_as_inputs_for_user,
     get_token_path_for_user,
 )
@@ -59,13 +62,65 @@ def test_extract_body_from_payload_no_body_fallback():
     assert _extract_body_from_payload(payload, "snippet fallback") == "snippet fallback"
 
 
+def test_decode_body_stops_at_budget_and_keeps_multibyte_chars():
+    encoded = base64.urlsafe_b64encode(("é" * 100_000).encode("utf-8")).decode("ascii")
+    assert _decode_body(encoded, max_chars=10) == "é" * 10
+    assert _decode_body(encoded) == "é" * 100_000
+
+
+def test_strip_html_drops_scripts_and_collapses_whitespace():
+    raw = "<html><head><style>p{color:red}</style></head><body><p>Hello&nbsp;<b>world</b></p>\n\n<script>x()</script><div>Bye &amp; thanks</div></body></html>"
+    assert _strip_html(raw) == "Hello world\nBye & thanks"
+
+
+def test_html_to_text_consumes_chunks_lazily_until_budget():
+    fed = []
+
+    def chunks():
+        for i in range(1000):
+            fed.append(i)
+            yield f"<p>paragraph {i}</p>"
+
+    text = html_to_text(chunks(), max_chars=50)
+    assert len(text) <= 50
+    assert text.startswith("paragraph 0\nparagraph 1")
+    assert len(fed) < 10
+
+
+def test_extract_body_from_payload_html_only_is_converted_with_budget():
+    html = "<div>" + "<p>Réunion demain</p>" * 50_000 + "</div>"
+    encoded = base64.urlsafe_b64encode(html.encode("utf-8")).decode("ascii")
+    payload = {
+        "mimeType": "multipart/mixed",
+        "parts": [
+            {"mimeType": "multipart/alternative", "parts": [{"mimeType": "text/html", "body": {"data": encoded}}]},
+            {"mimeType": "application/pdf", "body": {"attachmentId": "a1"}},
+        ],
+    }
+    text = _extract_body_from_payload(payload, "snippet", max_chars=100)
+    assert text.startswith("Réunion demain\nRéunion demain")
+    assert len(text) <= 100
+
+
+def test_body_limit_applies_to_the_feed_but_not_the_full_body_view():
+    encoded = base64.urlsafe_b64encode(("x" * 500).encode()).decode()
+    msg = {"id": "m1", "snippet": "snip", "payload": {"mimeType": "text/plain", "body": {"data": encoded}}}
+    svc = GmailService()
+    svc.service = MagicMock()
+    svc.service.users.return_value.messages.return_value.get.return_value.execute.return_value = msg
+
+    with patch("app.services.gmail_service.settings.EMAIL_BODY_MAX_CHARS", 100):
+        assert _email_dict_from_message(msg)["body"] == "x" * 100
+        assert svc.fetch_email_body("m1") == "x" * 500
+
+
 def test_get_token_path_for_user():
     path = get_token_path_for_user(42)
     assert path.endswith("gmail_user_42.json")
     assert "tokens" in path
 
 
-@patch("app.services.gmail_service.build")
+@patch("googleapiclient.discovery.build")
 def test_fetch_recent_emails_returns_body_and_message_id(mock_build):
     encoded = base64.urlsafe_b64encode(b"Email body here").decode("ascii")
     mock_get = MagicMock()
@@ -101,7 +156,7 @@ def test_fetch_recent_emails_returns_body_and_message_id(mock_build):
     assert result[0]["subject"] == "Test Subject"
 
 
-@patch("app.services.gmail_service.build")
+@patch("googleapiclient.discovery.build")
 def test_fetch_recent_emails_multipart_body(mock_build):
     encoded = base64.urlsafe_b64encode(b"Multipart body").decode("ascii")
     mock_get = MagicMock()
@@ -178,12 +233,27 @@ def test_authenticate_for_user_returns_true_when_token_exists(tmp_path):
     }
     token_path.write_text(json.dumps(token_data))
     with patch("app.services.gmail_service.get_token_path_for_user", return_value=str(token_path)):
-        with patch("app.services.gmail_service.Credentials") as mock_creds:
+        with patch("google.oauth2.credentials.Credentials") as mock_creds:
             mock_cred_instance = MagicMock()
             mock_cred_instance.expired = False
             mock_cred_instance.refresh_token = None
             mock_creds.from_authorized_user_file.return_value = mock_cred_instance
-            with patch("app.services.gmail_service.build") as _mock_build:
+            with patch("googleapiclient.discovery.build") as _mock_build:
                 svc = GmailService()
                 result = svc.authenticate_for_user(1)
     assert result is True
+
+
+def test_fetch_email_body_requests_only_mime_tree_fields():
+    svc = GmailService()
+    svc.service = MagicMock()
+    get = svc.service.users.return_value.messages.return_value.get
+    get.return_value.execute.return_value = {
+        "snippet": "snip",
+        "payload": {"mimeType": "text/plain", "body": {"data": base64.urlsafe_b64encode(b"Full body").decode()}},
+    }
+
+    assert svc.fetch_email_body("m1") == "Full body"
+    fields = get.call_args.kwargs["fields"]
+    assert fields.startswith("snippet,payload(")
+    assert "headers" not in fields
@@ -1,4 +1,3 @@
-import json
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -10,6 +9,7 @@ from app.services.google_oauth_service import (
     exchange_code_for_token,
     get_auth_url,
 )
+from app.services.pkce_store import MemoryPKCEStore, set_pkce_store
 
 
 @patch("app.services.google_oauth_service._verify_state", side_effect=ValueError("bad state"))
@@ -23,7 +23,7 @@ def test_exchange_code_for_token_classifies_state_failures(_mock_verify):
 @patch("app.services.google_oauth_service._ensure_runtime_config")
 @patch("app.services.google_oauth_service._consume_code_verifier", return_value="stored-verifier")
 @patch("app.services.google_oauth_service._verify_state", return_value=(1, "nonce-123"))
-@patch("app.services.google_oauth_service.Flow.from_client_config")
+@patch("google_auth_oauthlib.flow.Flow.from_client_config")
 def test_exchange_code_for_token_classifies_token_exchange_failures(
     mock_flow_factory,
     _mock_verify,
@@ -43,8 +43,8 @@ def test_exchange_code_for_token_classifies_token_exchange_failures(
 @patch("app.services.google_oauth_service._ensure_runtime_config")
 @patch("app.services.google_oauth_service._consume_code_verifier", return_value="stored-verifier")
 @patch("app.services.google_oauth_service._verify_state", return_value=(1, "nonce-123"))
-@patch("app.services.google_oauth_service.build")
-@patch("app.services.google_oauth_service.Flow.from_client_config")
+@patch("googleapiclient.discovery.build")
+@patch("google_auth_oauthlib.flow.Flow.from_client_config")
 def test_exchange_code_for_token_classifies_userinfo_failures(
     mock_flow_factory,
     mock_build,
@@ -70,8 +70,8 @@ def test_exchange_code_for_token_classifies_userinfo_failures(
 @patch("app.services.google_oauth_service._consume_code_verifier", return_value="stored-verifier")
 @patch("app.services.google_oauth_service._verify_state", return_value=(1, "nonce-123"))
 @patch("app.services.google_oauth_service.GmailService")
-@patch("app.services.google_oauth_service.build")
-@patch("app.services.google_oauth_service.Flow.from_client_config")
+@patch("googleapiclient.discovery.build")
+@patch("google_auth_oauthlib.flow.Flow.from_client_config")
 def test_exchange_code_for_token_classifies_token_persist_failures(
     mock_flow_factory,
     mock_build,
@@ -100,7 +100,7 @@ def test_exchange_code_for_token_classifies_token_persist_failures(
 @patch("app.services.google_oauth_service._generate_code_verifier", return_value="verifier-123")
 @patch("app.services.google_oauth_service._generate_state_nonce", return_value="nonce-123")
 @patch("app.services.google_oauth_service._store_code_verifier")
-@patch("app.services.google_oauth_service.Flow.from_client_config")
+@patch("google_auth_oauthlib.flow.Flow.from_client_config")
 def test_get_auth_url_stores_code_verifier_by_nonce(
     mock_flow_factory,
     mock_store_verifier,
@@ -121,21 +121,20 @@ def test_get_auth_url_stores_code_verifier_by_nonce(
     assert called_state.startswith("7:nonce-123.")
 
 
-def test_store_and_consume_code_verifier_round_trip(tmp_path):
-    store_path = tmp_path / "pkce.json"
-
-    with patch("app.services.google_oauth_service._get_pkce_store_path", return_value=store_path):
+def test_store_and_consume_code_verifier_round_trip():
+    set_pkce_store(MemoryPKCEStore())
+    try:
         _store_code_verifier("nonce-abc", "verifier-abc")
         assert _consume_code_verifier("nonce-abc") == "verifier-abc"
-
-        data = json.loads(store_path.read_text())
-        assert data == {}
+        assert _consume_code_verifier("nonce-abc") is None
+    finally:
+        set_pkce_store(None)
 
 
 @patch("app.services.google_oauth_service._ensure_runtime_config")
 @patch("app.services.google_oauth_service._consume_code_verifier", return_value=None)
 @patch("app.services.google_oauth_service._verify_state", return_value=(1, "missing-nonce"))
-@patch("app.services.google_oauth_service.Flow.from_client_config")
+@patch("google_auth_oauthlib.flow.Flow.from_client_config")
 def test_exchange_code_for_token_classifies_missing_pkce_verifier(
     mock_flow_factory,
     _mock_verify,
@@ -154,8 +153,8 @@ def test_exchange_code_for_token_classifies_missing_pkce_verifier(
 @patch("app.services.google_oauth_service._consume_code_verifier", return_value="stored-verifier")
 @patch("app.services.google_oauth_service._verify_state", return_value=(1, "nonce-123"))
 @patch("app.services.google_oauth_service.GmailService")
-@patch("app.services.google_oauth_service.build")
-@patch("app.services.google_oauth_service.Flow.from_client_config")
+@patch("googleapiclient.discovery.build")
+@patch("google_auth_oauthlib.flow.Flow.from_client_config")
 def test_exchange_code_for_token_uses_stored_pkce_verifier(
     mock_flow_factory,
     mock_build,
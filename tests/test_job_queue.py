@@ -0,0 +1,180 @@
+"""
+Tests for the DB-backed job queue (app/services/job_queue.py) and the worker
+(app/workers/job_worker.py).
+"""
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.models.job import Job
+from app.services.job_queue import (
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    claim_jobs,
+    complete_job,
+    enqueue_job,
+    fail_job,
+)
+from app.workers import job_worker
+from app.workers.job_worker import JobWorker
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_jobs.db")
+test_engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+@pytest.fixture(autouse=True)
+def reset_db():
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    yield
+    Base.metadata.drop_all(bind=test_engine)
+
+
+@pytest.fixture
+def db():
+    session = TestSession()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+class TestEnqueue:
+    def test_dedupe_key_returns_existing_queued_job(self, db):
+        first = enqueue_job(db, "sync_emails", 1, dedupe_key="sync:1")
+        second = enqueue_job(db, "sync_emails", 1, dedupe_key="sync:1", priority=5)
+        assert second.id == first.id
+        assert second.priority == 5
+        assert db.query(Job).count() == 1
+
+    def test_dedupe_ignores_running_jobs(self, db):
+        first = enqueue_job(db, "sync_emails", 1, dedupe_key="sync:1")
+        claim_jobs(db, "w1", 1)
+        second = enqueue_job(db, "sync_emails", 1, dedupe_key="sync:1")
+        assert second.id != first.id
+
+
+class TestClaim:
+    def test_claims_highest_priority_first_and_sets_lease(self, db):
+        enqueue_job(db, "a", 1, priority=0)
+        high = enqueue_job(db, "b", 2, priority=10)
+        claimed = claim_jobs(db, "w1", 1)
+        assert [j.id for j in claimed] == [high.id]
+        assert claimed[0].status == JOB_RUNNING
+        assert claimed[0].locked_by == "w1"
+        assert claimed[0].attempts == 1
+        assert claimed[0].lease_expires_at is not None
+
+    def test_delayed_job_is_not_claimable_yet(self, db):
+        enqueue_job(db, "a", 1, delay_seconds=60)
+        assert claim_jobs(db, "w1", 5) == []
+
+    def test_expired_lease_is_reclaimed(self, db):
+        job = enqueue_job(db, "a", 1)
+        claim_jobs(db, "w1", 1, lease_seconds=-1)
+        reclaimed = claim_jobs(db, "w2", 1)
+        assert [j.id for j in reclaimed] == [job.id]
+        assert reclaimed[0].locked_by == "w2"
+        assert reclaimed[0].attempts == 2
+
+    def test_accept_filter_skips_jobs(self, db):
+        enqueue_job(db, "a", 1)
+        other = enqueue_job(db, "a", 2)
+        claimed = claim_jobs(db, "w1", 5, accept=lambda j: j.user_id == 2)
+        assert [j.id for j in claimed] == [other.id]
+
+
+class TestCompleteAndFail:
+    def test_complete_releases_lease(self, db):
+        enqueue_job(db, "a", 1)
+        job = claim_jobs(db, "w1", 1)[0]
+        complete_job(db, job)
+        assert job.status == JOB_DONE
+        assert job.lease_expires_at is None
+
+    def test_fail_requeues_with_backoff_then_fails_permanently(self, db):
+        enqueue_job(db, "a", 1, max_attempts=2)
+        job = claim_jobs(db, "w1", 1)[0]
+        fail_job(db, job, "boom")
+        assert job.status == JOB_QUEUED
+        assert job.last_error == "boom"
+        # Backoff pushes run_after into the future
+        assert claim_jobs(db, "w1", 1) == []
+
+        job.run_after = job.created_at
+        db.commit()
+        job = claim_jobs(db, "w1", 1)[0]
+        fail_job(db, job, "boom again")
+        assert job.status == JOB_FAILED
+
+
+class TestJobWorker:
+    def test_runs_registered_handler_and_marks_done(self, db, monkeypatch):
+        seen: list[int] = []
+        monkeypatch.setitem(job_worker.JOB_HANDLERS, "test_kind", lambda _db, job, user_id: seen.append(user_id))
+        job = enqueue_job(db, "test_kind", 7)
+
+        JobWorker(session_factory=TestSession).run_until_idle(timeout=5)
+
+        db.refresh(job)
+        assert seen == [7]
+        assert job.status == JOB_DONE
+
+    def test_handler_exception_is_recorded_for_retry(self, db, monkeypatch):
+        def _boom(_db, _job, _user_id):
+            raise RuntimeError("provider down")
+
+        monkeypatch.setitem(job_worker.JOB_HANDLERS, "test_kind", _boom)
+        job = enqueue_job(db, "test_kind", 7)
+
+        JobWorker(session_factory=TestSession).run_until_idle(timeout=5)
+
+        db.refresh(job)
+        assert job.status == JOB_QUEUED
+        assert "provider down" in job.last_error
+
+    def test_unknown_kind_fails_without_retry(self, db):
+        job = enqueue_job(db, "no_such_kind", 7)
+        JobWorker(session_factory=TestSession).run_until_idle(timeout=5)
+        db.refresh(job)
+        assert job.status == JOB_FAILED
+
+    def test_job_without_user_fails_without_retry(self, db, monkeypatch):
+        seen: list[int] = []
+        monkeypatch.setitem(job_worker.JOB_HANDLERS, "test_kind", lambda _db, job, user_id: seen.append(user_id))
+        job = enqueue_job(db, "test_kind", None)
+        JobWorker(session_factory=TestSession).run_until_idle(timeout=5)
+        db.refresh(job)
+        assert job.status == JOB_FAILED and "user_id" in job.last_error
+        assert seen == []
+
+    def test_per_user_concurrency_is_bounded(self, db, monkeypatch):
+        lock = threading.Lock()
+        running: dict[int, int] = {}
+        peak: dict[int, int] = {}
+
+        def _slow(_db, _job, user_id):
+            with lock:
+                running[user_id] = running.get(user_id, 0) + 1
+                peak[user_id] = max(peak.get(user_id, 0), running[user_id])
+            time.sleep(0.05)
+            with lock:
+                running[user_id] -= 1
+
+        monkeypatch.setitem(job_worker.JOB_HANDLERS, "test_kind", _slow)
+        for _ in range(3):
+            enqueue_job(db, "test_kind", 1)
+        enqueue_job(db, "test_kind", 2)
+
+        JobWorker(concurrency=4, max_per_user=1, session_factory=TestSession).run_until_idle(timeout=10)
+
+        assert peak == {1: 1, 2: 1}
+        assert db.query(Job).filter(Job.status == JOB_DONE).count() == 4
@@ -0,0 +1,130 @@
+"""
+Tests for asymmetric access tokens, the JWKS key set (app/core/jwks.py) and
+the pluggable token verifiers in app/core/security.py.
+"""
+import json
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from fastapi.testclient import TestClient
+
+from app.core import jwks, security
+from app.core.config import settings
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def reset_keys(monkeypatch):
+    monkeypatch.setattr(settings, "JWT_PRIVATE_KEY_PATH", None)
+    monkeypatch.setattr(settings, "JWT_JWKS_PATH", None)
+    monkeypatch.setattr(settings, "JWT_JWKS_URL", None)
+    monkeypatch.setattr(settings, "JWT_KEY_ID", None)
+    jwks.reset_key_cache()
+    security._verifier_named("native").clear()
+    yield
+    jwks.reset_key_cache()
+    security.set_token_verifier(None)
+
+
+def _write_key(tmp_path, private_key, name="signing.pem") -> str:
+    path = tmp_path / name
+    path.write_bytes(private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ))
+    return str(path)
+
+
+def _token(algorithm: str, minutes: int = 5, secret: str = "s3cret") -> str:
+    return security.create_access_token("7", {"role": "regular"}, secret=secret, algorithm=algorithm, minutes=minutes)
+
+
+def _header(token: str) -> dict:
+    return json.loads(jwks.b64url_decode(token.split(".")[0]))
+
+
+@pytest.mark.parametrize("verifier", ["native", "jose"])
+def test_hs256_round_trip_with_both_verifiers(monkeypatch, verifier):
+    monkeypatch.setattr(settings, "JWT_VERIFIER", verifier)
+    token = _token("HS256")
+    assert security.decode_access_token(token, "s3cret", "HS256")["sub"] == "7"
+    assert security.decode_access_token(token, "other", "HS256") is None
+    assert security.decode_access_token(_token("HS256", minutes=-1), "s3cret", "HS256") is None
+
+
+@pytest.mark.parametrize(
+    ("algorithm", "private_key"),
+    [("RS256", rsa.generate_private_key(65537, 2048)), ("EdDSA", ed25519.Ed25519PrivateKey.generate())],
+)
+@pytest.mark.parametrize("verifier", ["native", "jose"])
+def test_asymmetric_tokens_carry_kid_and_verify(monkeypatch, tmp_path, algorithm, private_key, verifier):
+    monkeypatch.setattr(settings, "JWT_PRIVATE_KEY_PATH", _write_key(tmp_path, private_key))
+    monkeypatch.setattr(settings, "JWT_VERIFIER", verifier)
+    token = _token(algorithm)
+
+    assert _header(token) == {"alg": algorithm, "typ": "JWT", "kid": jwks.get_signing_key().kid}
+    assert security.decode_access_token(token, "", algorithm)["role"] == "regular"
+    # Tampered payload
+    head, _, sig = token.split(".")
+    forged = jwks.b64url_encode(json.dumps({"sub": "1", "role": "admin"}).encode())
+    assert security.decode_access_token(f"{head}.{forged}.{sig}", "", algorithm) is None
+
+
+def test_other_node_verifies_with_published_key_set(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "JWT_PRIVATE_KEY_PATH", _write_key(tmp_path, ed25519.Ed25519PrivateKey.generate()))
+    token = _token("EdDSA")
+    published = client.get("/.well-known/jwks.json").json()
+    assert [k["kty"] for k in published["keys"]] == ["OKP"]
+    assert "d" not in published["keys"][0]
+
+    # A verifying node: no private key, only the key set
+    jwks_file = tmp_path / "jwks.json"
+    jwks_file.write_text(json.dumps(published))
+    monkeypatch.setattr(settings, "JWT_PRIVATE_KEY_PATH", None)
+    monkeypatch.setattr(settings, "JWT_JWKS_PATH", str(jwks_file))
+    jwks.reset_key_cache()
+    assert security.decode_access_token(token, "", "EdDSA")["sub"] == "7"
+
+
+def test_unknown_kid_and_algorithm_confusion_are_rejected(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "JWT_PRIVATE_KEY_PATH", _write_key(tmp_path, rsa.generate_private_key(65537, 2048)))
+    rs_token = _token("RS256")
+
+    # A rotated-out key: its kid is no longer in the set
+    new_key = rsa.generate_private_key(65537, 2048)
+    monkeypatch.setattr(settings, "JWT_PRIVATE_KEY_PATH", _write_key(tmp_path, new_key, "new.pem"))
+    jwks.reset_key_cache()
+    assert security.decode_access_token(rs_token, "", "RS256") is None
+
+    # Algorithm confusion: an HS256 token is refused when RS256 is configured
+    hs_token = _token("HS256", secret="anything")
+    assert security.decode_access_token(hs_token, "anything", "RS256") is None
+
+
+def test_native_verifier_remembers_verified_tokens_until_exp():
+    verifier = security.NativeVerifier(cache_size=8)
+    now = int(time.time())
+    token = security.create_access_token("7", {}, secret="k", algorithm="HS256", minutes=1)
+    assert verifier.decode(token, "k", "HS256") is not None
+    assert len(verifier._verified) == 1
+    assert verifier.decode(token, "wrong", "HS256") is None
+
+    # exp is re-checked on cache hits
+    key = next(iter(verifier._verified))
+    stored_at, payload = verifier._verified[key]
+    verifier._verified[key] = (stored_at, {**payload, "exp": now - 1})
+    assert verifier.decode(token, "k", "HS256") is None
+
+
+def test_custom_verifier_is_used_by_authentication():
+    class Reject(security.TokenVerifier):
+        def decode(self, token, secret, algorithm):
+            return None
+
+    security.set_token_verifier(Reject())
+    token = _token(settings.ALGORITHM, secret=settings.SECRET_KEY)
+    response = client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
@@ -0,0 +1,182 @@
+"""
+Tests for the in-process metrics and GET /metrics (app/core/metrics.py).
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import metrics
+from app.core.config import settings
+from app.main import app
+from app.models import Base
+from app.schemas.detection import EmailInput
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_metrics.db")
+test_engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+def override_get_db():
+    db = TestSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    metrics.reset_metrics()
+    yield
+    metrics.reset_metrics()
+
+
+def _sample(text: str, prefix: str) -> float:
+    """Value of the exposition line starting with `prefix` (name and labels)."""
+    for line in text.splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"no sample {prefix!r}")
+
+
+def test_histogram_exposition_is_cumulative():
+    histogram = metrics.Histogram("t_seconds", "test", ("op",), buckets=(0.1, 1.0))
+    child = histogram.labels("a\"b")
+    for value in (0.05, 0.5, 0.5, 3.0):
+        child.observe(value)
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP t_seconds test", "# TYPE t_seconds histogram"]
+    assert lines[2:] == [
+        't_seconds_bucket{op="a\\"b",le="0.1"} 1',
+        't_seconds_bucket{op="a\\"b",le="1"} 3',
+        't_seconds_bucket{op="a\\"b",le="+Inf"} 4',
+        't_seconds_sum{op="a\\"b"} 4.05',
+        't_seconds_count{op="a\\"b"} 4',
+    ]
+
+
+async def test_timed_decorator_covers_sync_and_async_functions():
+    @metrics.timed("test.sync")
+    def add(a, b):
+        return a + b
+
+    @metrics.timed("test.async")
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError
+
+    assert add(1, 2) == 3
+    with pytest.raises(RuntimeError):
+        await fail()
+    assert metrics.STAGE_SECONDS.labels("test.sync").count == 1
+    assert metrics.STAGE_SECONDS.labels("test.async").count == 1
+
+
+def test_http_requests_are_labelled_by_route_template_with_query_counts():
+    client.post("/api/v1/users/", json={"email": "metrics@example.com", "password": "Secret12!"})
+    client.post("/api/v1/users/login", json={"email": "metrics@example.com", "password": "Secret12!"})
+    client.get("/no/such/path")
+
+    text = client.get("/metrics").text
+    login = 'route="/api/v1/users/login",status="200"'
+    assert _sample(text, f'iris_http_request_duration_seconds_count{{method="POST",{login}}}') == 1
+    assert _sample(text, 'iris_http_request_duration_seconds_count{method="GET",route="<unmatched>",status="404"}') == 1
+    assert _sample(text, 'iris_http_request_db_queries_count{route="/api/v1/users/login"}') == 1
+    assert _sample(text, 'iris_http_request_db_queries_sum{route="/api/v1/users/login"}') >= 1
+    assert _sample(text, 'iris_http_request_db_queries_sum{route="<unmatched>"}') == 0
+
+
+def test_detection_records_nlp_stages():
+    from app.services.detection import detect_single
+
+    detect_single(EmailInput(subject="Réunion", body="Can we schedule a meeting tomorrow at 10am for 30 minutes?"))
+    text = client.get("/metrics").text
+    for stage in ("nlp.regex", "nlp.dateparser", "nlp.fields", "detection.run"):
+        assert _sample(text, f'iris_stage_duration_seconds_count{{stage="{stage}"}}') >= 1
+
+
+async def test_httpx_hooks_observe_provider_calls_by_endpoint():
+    def handler(request):
+        return httpx.Response(404 if "missing" in request.url.path else 200, json={})
+
+    async with httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), event_hooks=metrics.httpx_event_hooks("outlook")
+    ) as graph:
+        await graph.get("https://graph.microsoft.com/v1.0/me/messages/AAMkAGI2TG93AAA=")
+        await graph.get("https://graph.microsoft.com/v1.0/me/messages/AAMkAGI2THVSAAA=")
+        await graph.get("https://graph.microsoft.com/v1.0/me/missing")
+
+    assert metrics.PROVIDER_REQUEST_SECONDS.labels("outlook", "me/messages/{id}", "200").count == 2
+    assert metrics.PROVIDER_REQUEST_SECONDS.labels("outlook", "me/missing", "404").count == 1
+
+
+def test_endpoint_from_path():
+    assert metrics.endpoint_from_path("/v1.0/me/mailFolders/inbox/messages") == "me/mailFolders/inbox/messages"
+    assert metrics.endpoint_from_path("/gmail/v1/users/me/messages/18c2f1d5a3b4c6d7") == "gmail/v1/users/me/messages/{id}"
+    assert metrics.endpoint_from_path("/items/42") == "items/{id}"
+
+
+def test_gmail_requests_are_timed_per_api_method():
+    from googleapiclient.errors import HttpError
+    from httplib2 import Response
+
+    from app.services.gmail_service import _timed_request_builder
+
+    class _Http:
+        def __init__(self, status):
+            self.status = status
+
+        def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+            return Response({"status": self.status}), b"{}"
+
+    request_class = _timed_request_builder()
+    ok = request_class(_Http(200), lambda resp, content: {}, "https://gmail.googleapis.com/x", methodId="gmail.users.messages.list")
+    ok.execute()
+    failing = request_class(_Http(429), lambda resp, content: {}, "https://gmail.googleapis.com/x", methodId="gmail.users.messages.get")
+    with pytest.raises(HttpError):
+        failing.execute()
+
+    assert metrics.PROVIDER_REQUEST_SECONDS.labels("gmail", "gmail.users.messages.list", "200").count == 1
+    assert metrics.PROVIDER_REQUEST_SECONDS.labels("gmail", "gmail.users.messages.get", "429").count == 1
+
+
+def test_cache_hit_ratios_and_pool_gauges_are_exported():
+    from app.core import user_cache
+
+    user_cache.clear_user_cache()
+    user_cache.cache_principal(user_cache.CurrentPrincipal(id=7, email="c@x.com", role="user", token_version=0))
+    user_cache.get_cached_principal(7)
+    user_cache.get_cached_principal(8)
+
+    text = client.get("/metrics").text
+    assert _sample(text, 'iris_cache_hits_total{cache="user"}') == 1
+    assert _sample(text, 'iris_cache_misses_total{cache="user"}') == 1
+    assert _sample(text, 'iris_cache_hit_ratio{cache="user"}') == 0.5
+    assert 'iris_cache_hits_total{cache="llm"}' in text
+    assert "iris_db_pool_checked_out" in text
+
+
+def test_metrics_are_disabled_by_default():
+    assert settings.model_fields["METRICS_ENABLED"].default is False
+
+
+def test_metrics_token_and_disable(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-me")
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-me"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    monkeypatch.setattr(settings, "METRICS_ENABLED", False)
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-me"}).status_code == 404
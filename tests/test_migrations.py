@@ -0,0 +1,108 @@
+"""
+Tests for the versioned schema migrations (app/db/migrations.py) and
+`python -m app.cli migrate`.
+"""
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+
+from app.db import migrations
+from app.models import Base
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_migrations.db")
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        for table in ("users", "emails", "schema_version"):
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+def _version(engine) -> int | None:
+    with engine.connect() as conn:
+        return migrations.current_version(conn)
+
+
+def test_empty_database_is_created_and_stamped(engine):
+    assert migrations.migrate(engine) == (None, migrations.SCHEMA_VERSION)
+    assert _version(engine) == migrations.SCHEMA_VERSION
+    assert {"users", "emails", "jobs", "schema_version"} <= set(inspect(engine).get_table_names())
+
+
+def test_database_from_before_versioning_gets_missing_columns(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR(225), password_hash VARCHAR(255), "
+            "role VARCHAR(20), has_subscription BOOLEAN, name VARCHAR(100), bank_account_id VARCHAR(255), "
+            "oauth_provider VARCHAR(50), require_password_reset BOOLEAN NOT NULL DEFAULT 0, "
+            "created_at TIMESTAMP, updated_at TIMESTAMP)"
+        ))
+        conn.execute(text("INSERT INTO users (id, email, password_hash, role) VALUES (1, 'a@b.c', 'x', 'regular')"))
+        conn.execute(text(
+            "CREATE TABLE emails (id INTEGER PRIMARY KEY, message_id VARCHAR(512), user_id INTEGER, "
+            "subject TEXT, body TEXT, created_at TIMESTAMP, updated_at TIMESTAMP)"
+        ))
+
+    assert migrations.migrate(engine) == (None, migrations.SCHEMA_VERSION)
+    user_columns = {c["name"] for c in inspect(engine).get_columns("users")}
+    assert {"gmail_oauth_token", "last_seen_at", "token_version"} <= user_columns
+    assert "extraction_version" in {c["name"] for c in inspect(engine).get_columns("emails")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT token_version FROM users WHERE id = 1")).scalar() == 0
+
+
+def test_startup_check_on_current_schema_is_a_single_query(engine):
+    migrations.migrate(engine)
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.upper().startswith(("SAVEPOINT", "RELEASE")):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        migrations.ensure_schema(engine, auto_migrate=True)
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert statements == ["SELECT version FROM schema_version"]
+
+
+def test_pending_migrations_run_in_order(engine, monkeypatch):
+    migrations.migrate(engine)
+    applied: list[int] = []
+
+    def _add_note(conn):
+        applied.append(2)
+        migrations.add_column_if_missing(conn, "users", "note", "VARCHAR(20)")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [
+        *migrations.MIGRATIONS,
+        migrations.Migration(2, "users.note", _add_note),
+    ])
+    monkeypatch.setattr(migrations, "SCHEMA_VERSION", 2)
+
+    with pytest.raises(migrations.SchemaOutOfDateError):
+        migrations.ensure_schema(engine, auto_migrate=False)
+
+    migrations.ensure_schema(engine, auto_migrate=True)
+    assert applied == [2]
+    assert _version(engine) == 2
+    assert "note" in {c["name"] for c in inspect(engine).get_columns("users")}
+
+
+def test_cli_migrate_and_status(engine, monkeypatch, capsys):
+    from app import cli
+
+    monkeypatch.setattr("app.db.database.engine", engine)
+    assert cli.main(["migrate", "--status"]) == 1
+    assert cli.main(["migrate"]) == 0
+    assert cli.main(["migrate", "--status"]) == 0
+    output = capsys.readouterr().out
+    assert f"Migrated schema from version none to {migrations.SCHEMA_VERSION}." in output
+    assert f"Schema version: {migrations.SCHEMA_VERSION}" in output
@@ -183,3 +183,41 @@ class TestGetOutlookConnectionStatus:
             result = get_outlook_connection_status(1)
         assert result["connected"] is True
         assert result["email"] == "user@contoso.com"
+
+
+# ---------------------------------------------------------------------------
+# fetch_outlook_email_page_async
+# ---------------------------------------------------------------------------
+
+class TestFetchOutlookEmailPageAsync:
+    async def test_returns_categorized_items_via_shared_client(self, monkeypatch):
+        import httpx
+
+        from app.services import outlook_email_service as svc
+
+        fake_messages = [_make_graph_message(msg_id=f"M{i}") for i in range(2)]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.headers["Authorization"] == "Bearer fake-access-token"
+            assert request.url.params["$top"] == "2"
+            return httpx.Response(200, json={"value": fake_messages})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(svc, "get_valid_token", lambda uid: "fake-access-token")
+        monkeypatch.setattr(svc, "get_async_client", lambda: client)
+
+        items, has_more = await svc.fetch_outlook_email_page_async(user_id=1, skip=0, limit=2)
+        await client.aclose()
+
+        assert [i.message_id for i in items] == ["M0", "M1"]
+        assert has_more is True
+        assert all(i.provider == "outlook" for i in items)
+        assert items[0].category == "rdv"
+
+    async def test_shared_client_is_reused_within_a_loop(self):
+        from app.services import outlook_email_service as svc
+
+        first = svc.get_async_client()
+        assert svc.get_async_client() is first
+        await svc.close_async_client()
+        assert first.is_closed
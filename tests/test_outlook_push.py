@@ -0,0 +1,187 @@
+"""
+Tests for Outlook change notifications: Graph subscription management, the
+validation-aware webhook and delta sync (app/services/outlook_push_service.py).
+"""
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.models import Base
+from app.models.email import Email
+from app.models.job import Job
+from app.models.user import User
+from app.schemas.email import EmailItem
+from app.services.outlook_push_service import (
+    ensure_outlook_subscription,
+    renew_outlook_subscriptions,
+    sync_outlook_delta,
+)
+from app.services.prefetch_service import _providers_to_poll
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_outlook_push.db")
+test_engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+def override_get_db():
+    db = TestSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def reset_db(monkeypatch):
+    monkeypatch.setattr("app.services.outlook_push_service.settings.OUTLOOK_NOTIFICATION_URL", "https://iris.test/hook")
+    monkeypatch.setattr("app.services.outlook_push_service.settings.OUTLOOK_CLIENT_STATE", "state-secret")
+    monkeypatch.setattr("app.services.outlook_push_service.settings.OPENAI_API_KEY", None)
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    yield
+    Base.metadata.drop_all(bind=test_engine)
+
+
+@pytest.fixture
+def db():
+    session = TestSession()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    u = User(email="push@example.com", password_hash="x", outlook_oauth_token="enc", outlook_subscription_id="sub-1")
+    db.add(u)
+    db.commit()
+    return u
+
+
+def _status_error(code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://graph.microsoft.com")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(code, request=request))
+
+
+def _notification(subscription_id="sub-1", client_state="state-secret") -> dict:
+    return {"value": [{
+        "subscriptionId": subscription_id,
+        "clientState": client_state,
+        "changeType": "created",
+        "resource": "Users/abc/Messages/xyz",
+    }]}
+
+
+def test_webhook_echoes_validation_token():
+    r = client.post("/api/v1/webhooks/outlook?validationToken=Validation%3A%20abc")
+    assert r.status_code == 200
+    assert r.text == "Validation: abc"
+    assert r.headers["content-type"].startswith("text/plain")
+
+
+def test_webhook_coalesces_notifications_into_one_delayed_job(db, user):
+    for _ in range(3):
+        assert client.post("/api/v1/webhooks/outlook", json=_notification()).status_code == 202
+
+    jobs = db.query(Job).all()
+    assert len(jobs) == 1
+    assert jobs[0].kind == "outlook_delta_sync"
+    assert jobs[0].user_id == user.id
+
+
+def test_webhook_ignores_wrong_client_state_and_unknown_subscription(db, user):
+    assert client.post("/api/v1/webhooks/outlook", json=_notification(client_state="nope")).status_code == 202
+    assert client.post("/api/v1/webhooks/outlook", json=_notification(subscription_id="sub-x")).status_code == 202
+    assert db.query(Job).count() == 0
+
+
+@patch("app.services.outlook_email_service.create_mail_subscription")
+@patch("app.services.outlook_email_service.renew_mail_subscription")
+def test_subscription_is_recreated_when_graph_dropped_it(mock_renew, mock_create, db, user):
+    mock_renew.side_effect = _status_error(404)
+    mock_create.return_value = {"id": "sub-2", "expirationDateTime": "2030-01-04T10:00:00.1234567Z"}
+
+    assert ensure_outlook_subscription(db, user.id) is True
+
+    mock_create.assert_called_once()
+    assert mock_create.call_args.args[1:3] == ("https://iris.test/hook", "state-secret")
+    db.refresh(user)
+    assert user.outlook_subscription_id == "sub-2"
+    assert _providers_to_poll(db, user.id) == ("gmail",)
+
+
+def test_renewal_queues_only_expiring_subscriptions(db, user):
+    fresh = User(
+        email="fresh@example.com", password_hash="x", outlook_oauth_token="enc",
+        outlook_subscription_id="sub-f", outlook_subscription_expires_at=datetime.now(UTC) + timedelta(days=2),
+    )
+    user.outlook_subscription_expires_at = datetime.now(UTC) + timedelta(hours=3)
+    db.add(fresh)
+    db.commit()
+
+    assert renew_outlook_subscriptions(db) == 1
+    assert [j.user_id for j in db.query(Job).filter(Job.kind == "outlook_subscription")] == [user.id]
+
+
+@patch("app.services.outlook_email_service.fetch_outlook_inbox_delta")
+def test_delta_sync_stores_detected_messages_and_delta_link(mock_delta, db, user):
+    user.outlook_delta_link = "https://graph/delta?$deltatoken=old"
+    db.commit()
+    mock_delta.return_value = (
+        [EmailItem(subject="Meeting", body="Can we meet tomorrow at 3pm?", message_id="o1", provider="outlook")],
+        "https://graph/delta?$deltatoken=new",
+    )
+
+    assert sync_outlook_delta(db, user.id) == 1
+
+    assert mock_delta.call_args.args[1] == "https://graph/delta?$deltatoken=old"
+    row = db.query(Email).filter(Email.message_id == "o1").one()
+    assert row.category == "rdv"
+    assert row.extraction_data["classification"] == "meeting_schedule"
+    db.refresh(user)
+    assert user.outlook_delta_link == "https://graph/delta?$deltatoken=new"
+
+
+@patch("app.services.outlook_email_service.fetch_outlook_inbox_delta")
+def test_delta_sync_restarts_round_when_delta_link_expired(mock_delta, db, user):
+    user.outlook_delta_link = "https://graph/delta?$deltatoken=old"
+    db.commit()
+    mock_delta.side_effect = [_status_error(410), ([], "https://graph/delta?$deltatoken=fresh")]
+
+    assert sync_outlook_delta(db, user.id) == 0
+
+    assert mock_delta.call_args.args[1] is None
+    db.refresh(user)
+    assert user.outlook_delta_link == "https://graph/delta?$deltatoken=fresh"
+
+
+@patch("app.services.outlook_email_service.get_valid_token", return_value="tok")
+@patch("app.services.outlook_email_service.httpx.get")
+def test_inbox_delta_follows_pages_and_skips_removed(mock_get, _token):
+    from app.services.outlook_email_service import fetch_outlook_inbox_delta
+
+    def page(data):
+        return httpx.Response(200, json=data, request=httpx.Request("GET", "https://graph"))
+
+    mock_get.side_effect = [
+        page({"value": [{"id": "m1", "subject": "A", "body": {"content": "x"}}], "@odata.nextLink": "https://next"}),
+        page({"value": [{"id": "m2", "@removed": {"reason": "deleted"}}], "@odata.deltaLink": "https://delta"}),
+    ]
+
+    items, link = fetch_outlook_inbox_delta(1, since=datetime(2026, 1, 1, tzinfo=UTC))
+
+    assert [i.message_id for i in items] == ["m1"]
+    assert link == "https://delta"
+    assert mock_get.call_args_list[0].kwargs["params"]["$filter"] == "receivedDateTime ge 2026-01-01T00:00:00Z"
+    assert mock_get.call_args_list[1].args[0] == "https://next"
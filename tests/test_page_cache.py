@@ -0,0 +1,94 @@
+"""
+Tests for the conditional provider page cache (app/services/page_cache.py) and
+its use by the Gmail and Outlook feed page fetchers.
+"""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.schemas.email import EmailItem
+from app.services import page_cache
+from app.services.gmail_service import GmailService
+from app.services.outlook_email_service import fetch_outlook_email_page_async
+
+
+@pytest.fixture(autouse=True)
+def reset_cache():
+    page_cache.reset_page_cache()
+    yield
+    page_cache.reset_page_cache()
+
+
+def test_store_and_lookup_return_independent_copies():
+    items = [EmailItem(subject="A", body="x", message_id="m1")]
+    page_cache.store(1, "outlook", (0, 50), "v1", items)
+    items[0].category = "rdv"
+
+    entry = page_cache.lookup(1, "outlook", (0, 50))
+    cached = page_cache.cached_items(entry)
+    assert entry.validator == "v1"
+    assert cached[0].category != "rdv"
+    assert page_cache.lookup(2, "outlook", (0, 50)) is None
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    monkeypatch.setattr(settings, "PAGE_CACHE_MAX_ENTRIES", 2)
+    for skip in (0, 50, 100):
+        page_cache.store(1, "outlook", (skip, 50), "v", [])
+    assert page_cache.lookup(1, "outlook", (0, 50)) is None
+    assert page_cache.lookup(1, "outlook", (100, 50)) is not None
+
+    monkeypatch.setattr(settings, "PAGE_CACHE_TTL_SECONDS", -1)
+    assert page_cache.lookup(1, "outlook", (100, 50)) is None
+
+
+def test_stats_report_hit_ratio_per_provider():
+    page_cache.record("gmail", hit=True)
+    page_cache.record("gmail", hit=True)
+    page_cache.record("gmail", hit=False)
+    assert page_cache.page_cache_stats() == {"gmail": {"hits": 2, "misses": 1, "hit_ratio": 0.6667}}
+
+
+def test_gmail_page_served_from_cache_while_history_id_unchanged():
+    svc = GmailService()
+    svc.service = MagicMock()
+    page = [{"subject": "A", "body": "s", "message_id": "g1", "sender": "", "date": ""}]
+    with patch.object(GmailService, "get_history_id", side_effect=["10", "10", "11"]), \
+         patch.object(GmailService, "fetch_email_page", return_value=(page, "next")) as mock_fetch:
+        assert svc.fetch_email_page_cached(1) == (page, "next")
+        assert svc.fetch_email_page_cached(1) == (page, "next")
+        assert mock_fetch.call_count == 1
+        svc.fetch_email_page_cached(1)  # mailbox changed
+        assert mock_fetch.call_count == 2
+    assert page_cache.page_cache_stats()["gmail"] == {"hits": 1, "misses": 2, "hit_ratio": 0.3333}
+
+
+def _graph_page(etag_header: str | None = None, status: int = 200, message_etag: str = 'W/"a"'):
+    data = {"value": [{"id": "o1", "@odata.etag": message_etag, "subject": "S", "body": {"content": "b"}}]}
+    headers = {"ETag": etag_header} if etag_header else {}
+    return httpx.Response(status, json=data if status == 200 else None, headers=headers,
+                          request=httpx.Request("GET", "https://graph"))
+
+
+@patch("app.services.outlook_email_service._categorize_items_async", new_callable=AsyncMock,
+       side_effect=lambda items: items)
+@patch("app.services.outlook_email_service.get_valid_token", return_value="tok")
+@patch("app.services.outlook_email_service.get_async_client")
+async def test_outlook_page_revalidated_with_etag_and_fingerprint(mock_client, _token, mock_categorize):
+    client = mock_client.return_value
+    client.get = AsyncMock(side_effect=[
+        _graph_page(etag_header='"p1"'),
+        _graph_page(status=304),
+        _graph_page(),                       # no ETag but same message etags
+        _graph_page(message_etag='W/"b"'),   # message changed
+    ])
+
+    for _ in range(4):
+        items, has_more = await fetch_outlook_email_page_async(7, limit=50)
+        assert [i.message_id for i in items] == ["o1"]
+
+    assert client.get.call_args_list[1].kwargs["headers"]["If-None-Match"] == '"p1"'
+    assert mock_categorize.await_count == 2
+    assert page_cache.page_cache_stats()["outlook"] == {"hits": 2, "misses": 2, "hit_ratio": 0.5}
@@ -0,0 +1,101 @@
+"""
+Tests for the bounded password-hashing executor and rehash-on-login
+(app/core/security.py).
+"""
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import security
+from app.core.config import settings
+from app.main import app
+from app.models import Base
+from app.models.user import User
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_password_hashing.db")
+test_engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+def override_get_db():
+    db = TestSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+client = TestClient(app)
+
+BASE = "/api/v1/users"
+EMAIL = "hash@example.com"
+PASSWORD = "Secret12!"
+
+
+@pytest.fixture(autouse=True)
+def reset_db():
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    yield
+
+
+def _stored_hash() -> str:
+    with TestSession() as db:
+        return db.query(User.password_hash).filter(User.email == EMAIL).scalar()
+
+
+async def test_hash_uses_configured_argon2_parameters(monkeypatch):
+    monkeypatch.setattr(settings, "ARGON2_TIME_COST", 2)
+    monkeypatch.setattr(settings, "ARGON2_MEMORY_COST", 8192)
+    monkeypatch.setattr(settings, "ARGON2_PARALLELISM", 1)
+    hashed = await security.hash_password_bounded(PASSWORD)
+    assert "m=8192,t=2,p=1" in hashed
+    assert await security.verify_password_bounded(PASSWORD, hashed) == (True, None)
+    assert await security.verify_password_bounded("Wrong123!", hashed) == (False, None)
+
+
+def test_login_rehashes_when_parameters_change(monkeypatch):
+    client.post(f"{BASE}/", json={"email": EMAIL, "password": PASSWORD})
+    assert "m=65536,t=3,p=4" in _stored_hash()
+
+    monkeypatch.setattr(settings, "ARGON2_MEMORY_COST", 8192)
+    monkeypatch.setattr(settings, "ARGON2_PARALLELISM", 1)
+    response = client.post(f"{BASE}/login", json={"email": EMAIL, "password": PASSWORD})
+    assert response.status_code == 200
+    assert "m=8192,t=3,p=1" in _stored_hash()
+
+    # The new hash is accepted and not rewritten again
+    rehashed = _stored_hash()
+    assert client.post(f"{BASE}/login", json={"email": EMAIL, "password": PASSWORD}).status_code == 200
+    assert _stored_hash() == rehashed
+
+
+def test_saturated_executor_rejects_fast_with_503(monkeypatch):
+    client.post(f"{BASE}/", json={"email": EMAIL, "password": PASSWORD})
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_QUEUE", 0)
+
+    release = threading.Event()
+    started = threading.Event()
+
+    def _hold() -> None:
+        started.set()
+        release.wait(5)
+
+    holder = threading.Thread(target=security._hashing_pool().run, args=(_hold,))
+    holder.start()
+    try:
+        assert started.wait(5)
+        response = client.post(f"{BASE}/login", json={"email": EMAIL, "password": PASSWORD})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert security.password_hashing_stats()["rejected"] == 1
+    finally:
+        release.set()
+        holder.join()
+
+    assert client.post(f"{BASE}/login", json={"email": EMAIL, "password": PASSWORD}).status_code == 200
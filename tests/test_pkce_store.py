@@ -0,0 +1,80 @@
+"""
+Tests for the PKCE verifier stores (app/services/pkce_store.py).
+"""
+import threading
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.models.oauth_pkce import OAuthPKCEVerifier
+from app.services.pkce_store import DatabasePKCEStore, MemoryPKCEStore, prune_expired_verifiers
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_pkce.db")
+test_engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+@pytest.fixture(autouse=True)
+def reset_db():
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    yield
+
+
+@pytest.fixture(params=["database", "memory"])
+def store(request):
+    return DatabasePKCEStore(TestSession) if request.param == "database" else MemoryPKCEStore()
+
+
+def test_verifier_is_consumed_once(store):
+    store.put("nonce-1", "verifier-1", 600)
+    assert store.consume("nonce-1") == "verifier-1"
+    assert store.consume("nonce-1") is None
+    assert store.consume("unknown") is None
+
+
+def test_expired_verifier_is_not_returned(store):
+    store.put("nonce-1", "verifier-1", -1)
+    assert store.consume("nonce-1") is None
+
+
+def test_prune_removes_only_expired_entries(store):
+    store.put("old", "v-old", -1)
+    store.put("new", "v-new", 600)
+    assert store.prune() == 1
+    assert store.consume("new") == "v-new"
+
+
+def test_concurrent_callbacks_get_the_verifier_once():
+    store = DatabasePKCEStore(TestSession)
+    store.put("nonce-race", "verifier", 600)
+    results: list[str | None] = []
+    barrier = threading.Barrier(4)
+
+    def callback() -> None:
+        barrier.wait()
+        results.append(store.consume("nonce-race"))
+
+    threads = [threading.Thread(target=callback) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count("verifier") == 1
+    assert results.count(None) == 3
+
+
+def test_scheduled_prune_deletes_expired_rows():
+    now = datetime.now(UTC)
+    with TestSession() as db:
+        db.add_all([
+            OAuthPKCEVerifier(nonce="a", code_verifier="x", expires_at=now - timedelta(minutes=1)),
+            OAuthPKCEVerifier(nonce="b", code_verifier="y", expires_at=now + timedelta(minutes=10)),
+        ])
+        db.commit()
+        assert prune_expired_verifiers(db) == 1
+        assert [row.nonce for row in db.query(OAuthPKCEVerifier)] == ["b"]
@@ -0,0 +1,150 @@
+"""
+Tests for periodic inbox pre-fetch (app/services/prefetch_service.py) and the
+worker scheduler (app/workers/scheduler.py).
+"""
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.models.email import Email
+from app.models.job import Job
+from app.models.user import User
+from app.services.prefetch_service import (
+    find_active_users,
+    prefetch_user_inbox,
+    schedule_prefetch,
+)
+from app.workers.scheduler import Scheduler
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_prefetch.db")
+test_engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+@pytest.fixture(autouse=True)
+def reset_db(monkeypatch):
+    monkeypatch.setattr("app.services.prefetch_service.settings.OPENAI_API_KEY", None)
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    yield
+    Base.metadata.drop_all(bind=test_engine)
+
+
+@pytest.fixture
+def db():
+    session = TestSession()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _user(
+    db, email: str, last_seen_days_ago: int | None, gmail: bool = True, outlook: bool = False
+) -> User:
+    user = User(
+        email=email,
+        password_hash="x",
+        gmail_oauth_token="encrypted" if gmail else None,
+        outlook_oauth_token="encrypted" if outlook else None,
+        last_seen_at=(
+            datetime.now(UTC) - timedelta(days=last_seen_days_ago)
+            if last_seen_days_ago is not None else None
+        ),
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_active_users_require_recent_activity_and_a_provider(db):
+    active = _user(db, "a@example.com", 1)
+    _user(db, "stale@example.com", 30)
+    _user(db, "never@example.com", None)
+    _user(db, "noprovider@example.com", 1, gmail=False)
+    outlook_only = _user(db, "outlook@example.com", 1, gmail=False, outlook=True)
+    assert find_active_users(db, active_within_days=7) == {
+        active.id: ("gmail",),
+        outlook_only.id: ("outlook",),
+    }
+
+
+def test_schedule_prefetch_is_deduplicated_per_user(db):
+    _user(db, "a@example.com", 1)
+    assert schedule_prefetch(db, active_within_days=7) == 1
+    assert schedule_prefetch(db, active_within_days=7) == 1
+    jobs = db.query(Job).all()
+    assert len(jobs) == 1
+    assert jobs[0].kind == "prefetch_inbox"
+    assert jobs[0].provider == "gmail"
+
+
+def test_schedule_prefetch_queues_one_job_per_connected_provider(db):
+    user = _user(db, "a@example.com", 1, outlook=True)
+    assert schedule_prefetch(db, active_within_days=7) == 1
+    jobs = db.query(Job).order_by(Job.provider).all()
+    assert [(j.user_id, j.provider) for j in jobs] == [(user.id, "gmail"), (user.id, "outlook")]
+
+
+def test_provider_prefetch_only_polls_and_detects_that_provider(db):
+    user = _user(db, "a@example.com", 1, outlook=True)
+    db.add_all([
+        Email(message_id="g1", user_id=user.id, provider="gmail", subject="Hi", body="FYI", status="fetched"),
+        Email(message_id="o1", user_id=user.id, provider="outlook", subject="Hi", body="FYI", status="fetched"),
+    ])
+    db.commit()
+
+    with patch("app.services.email_sync_service.sync_user_emails", return_value=[]) as sync:
+        detected = prefetch_user_inbox(db, user.id, provider="outlook")
+
+    assert detected == 1
+    assert sync.call_args.kwargs["providers"] == ("outlook",)
+    rows = {row.message_id: row for row in db.query(Email).all()}
+    assert rows["o1"].extraction_data is not None
+    assert rows["g1"].extraction_data is None
+
+
+def test_prefetch_detects_new_emails_and_stores_extraction(db):
+    user = _user(db, "a@example.com", 1)
+    db.add(Email(message_id="m1", user_id=user.id, subject="Réunion",
+                 body="Can we meet tomorrow at 3pm?", status="fetched"))
+    db.commit()
+
+    with patch("app.services.email_sync_service.sync_user_emails", return_value=[]):
+        detected = prefetch_user_inbox(db, user.id)
+
+    row = db.query(Email).filter(Email.message_id == "m1").one()
+    assert detected == 1
+    assert row.extraction_data["classification"] == "meeting_schedule"
+    assert row.category == "rdv"
+    assert row.status == "detected"
+
+
+def test_prefetch_still_detects_when_provider_fails(db):
+    user = _user(db, "a@example.com", 1)
+    db.add(Email(message_id="m1", user_id=user.id, subject="Hi", body="FYI", status="fetched"))
+    db.commit()
+
+    with patch(
+        "app.services.email_sync_service.sync_user_emails",
+        side_effect=RuntimeError("gmail: quota"),
+    ):
+        with pytest.raises(RuntimeError):
+            prefetch_user_inbox(db, user.id)
+
+    assert db.query(Email).one().extraction_data is not None
+
+
+def test_scheduler_runs_due_tasks_once_per_interval():
+    calls: list[str] = []
+    scheduler = Scheduler()
+    scheduler.every(10, "tick", lambda: calls.append("tick"))
+    assert scheduler.run_pending(now=100.0) == ["tick"]
+    assert scheduler.run_pending(now=105.0) == []
+    assert scheduler.run_pending(now=110.0) == ["tick"]
+    assert calls == ["tick", "tick"]
@@ -0,0 +1,153 @@
+"""
+Tests for request profiling (app/core/profiling.py) and the admin endpoints
+serving the stored profiles.
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import profiling
+from app.core.config import settings
+from app.core.metrics import observe_provider_call
+from app.main import app
+from app.models import Base
+from app.models.user import User
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_profiling.db")
+test_engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+def override_get_db():
+    db = TestSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+client = TestClient(app)
+
+BASE = "/api/v1/users"
+PASSWORD = "Secret12!"
+PROFILE_TOKEN = "let-me-profile"
+
+
+@pytest.fixture(autouse=True)
+def reset(monkeypatch):
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    monkeypatch.setattr(settings, "PROFILE_TOKEN", PROFILE_TOKEN)
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 0.0)
+    profiling.clear_profiles()
+    yield
+    profiling.clear_profiles()
+
+
+def _login(email: str, role: str = "regular") -> dict[str, str]:
+    client.post(f"{BASE}/", json={"email": email, "password": PASSWORD})
+    if role != "regular":
+        with TestSession() as db:
+            db.query(User).filter(User.email == email).update({User.role: role})
+            db.commit()
+    token = client.post(f"{BASE}/login", json={"email": email, "password": PASSWORD}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_requests_are_not_profiled_by_default():
+    response = client.get("/health")
+    assert "x-iris-profile-id" not in response.headers
+    assert profiling.list_profiles() == []
+
+
+def test_profile_header_records_functions_and_query_timeline():
+    admin = _login("admin@example.com", role="admin")
+    response = client.get(f"{BASE}/me", headers={**admin, "X-Iris-Profile": PROFILE_TOKEN})
+    assert response.status_code == 200
+    profile_id = int(response.headers["x-iris-profile-id"])
+
+    detail = client.get(f"/api/v1/admin/profiles/{profile_id}", headers=admin).json()
+    assert detail["route"] == "/api/v1/users/me" and detail["status"] == 200
+    assert detail["trigger"] == "header" and detail["duration_ms"] > 0
+    assert detail["functions"] and {"function", "calls", "tottime_ms", "cumtime_ms"} <= set(detail["functions"][0])
+    queries = [item for item in detail["timeline"] if item["kind"] == "db"]
+    assert queries and detail["db_count"] == len(queries)
+    assert all(item["detail"].startswith(("SELECT", "UPDATE")) for item in queries)
+
+    summaries = client.get("/api/v1/admin/profiles", headers=admin).json()
+    assert [s["id"] for s in summaries] == [profile_id]
+    assert "timeline" not in summaries[0]
+
+
+def test_wrong_profile_token_is_ignored():
+    response = client.get("/health", headers={"X-Iris-Profile": "guess"})
+    assert "x-iris-profile-id" not in response.headers
+
+
+def test_sampled_requests_are_profiled(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 1.0)
+    client.get("/health")
+    profiles = profiling.list_profiles()
+    assert len(profiles) == 1 and profiles[0]["trigger"] == "sampled" and profiles[0]["route"] == "/health"
+
+
+def test_only_the_last_profiles_are_kept(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_MAX_STORED", 2)
+    ids = [client.get("/health", headers={"X-Iris-Profile": PROFILE_TOKEN}).headers["x-iris-profile-id"] for _ in range(3)]
+    assert [p["id"] for p in profiling.list_profiles()] == [int(ids[2]), int(ids[1])]
+    assert profiling.get_profile(int(ids[0])) is None
+
+
+def test_profiles_are_admin_only():
+    user = _login("user@example.com")
+    assert client.get("/api/v1/admin/profiles", headers=user).status_code == 403
+    admin = _login("admin@example.com", role="admin")
+    assert client.get("/api/v1/admin/profiles/999", headers=admin).status_code == 404
+
+
+async def test_provider_calls_from_worker_threads_join_the_timeline():
+    profile = profiling.RequestProfile(1, "GET", "/api/v1/emails/feed", "header")
+    token = profiling._active.set(profile)
+    try:
+        await asyncio.to_thread(observe_provider_call, "gmail", "gmail.users.messages.list", "200", 0.25)
+    finally:
+        profiling._active.reset(token)
+    observe_provider_call("gmail", "gmail.users.messages.list", "200", 0.1)  # outside the request
+
+    assert len(profile.events) == 1
+    event = profile.events[0]
+    assert event["kind"] == "provider" and event["detail"] == "gmail gmail.users.messages.list"
+    assert event["duration_ms"] == 250.0 and event["status"] == "200"
+    assert event["thread"] != "MainThread"
+
+
+async def test_streaming_response_is_profiled_up_to_its_first_chunk():
+    stored_while_streaming = []
+
+    async def stream(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"data: 1\n\n", "more_body": True})
+        stored_while_streaming.extend(profiling.list_profiles())
+        profiling.record_provider_call("gmail", "gmail.users.history.list", "200", 0.1)
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/emails/events",
+             "headers": [(profiling.PROFILE_HEADER, PROFILE_TOKEN.encode())]}
+    await profiling.ProfilingMiddleware(stream)(scope, receive, send)
+
+    assert [p["streamed"] for p in stored_while_streaming] == [True]
+    profile = profiling.get_profile(stored_while_streaming[0]["id"])
+    assert profile["status"] == 200 and profile["functions"] and profile["timeline"] == []
+    assert len(profiling.list_profiles()) == 1
+    assert profiling._profiler_lock.acquire(blocking=False)  # released at the first chunk
+    profiling._profiler_lock.release()
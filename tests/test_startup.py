@@ -0,0 +1,165 @@
+"""
+Tests for cold-start behaviour: lazy provider SDK imports, the background NLP
+model preload and warm-up (GET /health/nlp, GET /ready) and
+`python -m app.cli startup-profile`.
+"""
+import subprocess
+import sys
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app import cli
+from app.core.config import settings
+from app.main import app
+from app.services import detection
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def fresh_extractor(monkeypatch):
+    monkeypatch.setattr(detection, "_extractor", None)
+    monkeypatch.setattr(detection, "_nlp_state", "pending")
+    monkeypatch.setattr(detection, "_nlp_load_seconds", None)
+    monkeypatch.setattr(detection, "_nlp_warmup_seconds", None)
+    monkeypatch.setattr(settings, "NLP_WARMUP", False)
+
+
+def test_importing_the_app_does_not_load_provider_sdks():
+    code = (
+        "import sys, app.main; "
+        "print(','.join(m for m in ('googleapiclient.discovery', 'google_auth_oauthlib', "
+        "'google.auth.transport.requests', 'pendulum', 'uvicorn', 'spacy') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+
+def test_background_preload_reports_readiness_separately(monkeypatch):
+    release = threading.Event()
+    model = object()
+
+    def _slow_load(model_name):
+        release.wait(5)
+        return model
+
+    monkeypatch.setattr("app.nlp.extractor._load_nlp", _slow_load)
+    thread = detection.start_nlp_preload("background")
+    try:
+        assert client.get("/health").status_code == 200
+        response = client.get("/health/nlp")
+        assert response.status_code == 503
+        assert response.json()["state"] == "loading"
+    finally:
+        release.set()
+        thread.join(5)
+
+    response = client.get("/health/nlp")
+    assert response.status_code == 200
+    assert response.json()["state"] == "ready"
+    assert detection._get_extractor().nlp is model
+
+
+def test_requests_during_preload_share_the_model_load(monkeypatch):
+    calls: list[str] = []
+    release = threading.Event()
+
+    def _slow_load(model_name):
+        calls.append(model_name)
+        release.wait(5)
+        return object()
+
+    monkeypatch.setattr("app.nlp.extractor._load_nlp", _slow_load)
+    thread = detection.start_nlp_preload("background")
+    waiter = threading.Thread(target=lambda: detection._get_extractor().nlp)
+    waiter.start()
+    release.set()
+    thread.join(5)
+    waiter.join(5)
+    assert len(calls) == 1
+
+
+def test_missing_model_is_reported_but_ready(monkeypatch):
+    monkeypatch.setattr("app.nlp.extractor._load_nlp", lambda model_name: None)
+    assert detection.start_nlp_preload("sync") is None
+    readiness = detection.nlp_readiness()
+    assert readiness["ready"] is True and readiness["state"] == "failed"
+
+
+def test_preload_off_and_unknown_mode():
+    assert detection.start_nlp_preload("off") is None
+    assert detection.nlp_readiness()["state"] == "disabled"
+    assert detection._extractor is None
+    with pytest.raises(ValueError):
+        detection.start_nlp_preload("eager")
+
+
+def test_warm_up_runs_synthetic_emails_through_spacy(monkeypatch):
+    seen: list[str] = []
+
+    def _fake_nlp(text):
+        seen.append(text)
+        raise RuntimeError("not a real pipeline")  # _classify falls back to "info"
+
+    monkeypatch.setattr(settings, "NLP_WARMUP", True)
+    monkeypatch.setattr("app.nlp.extractor._load_nlp", lambda model_name: _fake_nlp)
+    assert detection.load_nlp_model() is True
+    readiness = detection.nlp_readiness()
+    assert readiness["state"] == "ready" and readiness["warmup_seconds"] is not None
+    # Only the email no regex matches reaches spaCy
+    assert len(seen) == 1 and "rapport annuel" in seen[0]
+
+
+def test_ready_reports_nlp_database_and_clients(monkeypatch):
+    monkeypatch.setattr(detection, "_nlp_state", "ready")
+    response = client.get("/ready")
+    assert response.status_code == 200
+    report = response.json()
+    assert report["ready"] is True
+    assert report["database"]["ok"] is True and report["database"]["latency_ms"] >= 0
+    assert report["clients"]["outlook_graph"] in ("not_created", "open", "closed")
+    assert "enabled" in report["clients"]["llm"]
+
+
+def test_ready_is_503_while_the_model_warms_up(monkeypatch):
+    monkeypatch.setattr(detection, "_nlp_state", "warming")
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["nlp"]["state"] == "warming"
+    assert client.get("/health").status_code == 200
+
+
+def test_ready_is_503_when_the_database_is_unreachable(monkeypatch, tmp_path):
+    monkeypatch.setattr(detection, "_nlp_state", "ready")
+    broken = create_engine(f"sqlite:///{tmp_path}/missing/dir/iris.db")
+    monkeypatch.setattr("app.db.database.engine", broken)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    database = response.json()["database"]
+    assert database["ok"] is False and database["error"] == "OperationalError"
+
+
+def test_parse_importtime():
+    output = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     json.decoder\n"
+        "import time:       300 |        420 |   json\n"
+        "import time:        50 |        470 | app.core\n"
+    )
+    rows = cli.parse_importtime(output)
+    assert [(r.module, r.self_us, r.cumulative_us, r.depth) for r in rows] == [
+        ("json.decoder", 120, 120, 2),
+        ("json", 300, 420, 1),
+        ("app.core", 50, 470, 0),
+    ]
+
+
+def test_cli_startup_profile(capsys):
+    assert cli.main(["startup-profile", "--module", "json", "--top", "3"]) == 0
+    output = capsys.readouterr().out
+    assert output.startswith("import json: ")
+    assert "By top-level package (self time):" in output
+    assert "Slowest modules (cumulative / self):" in output
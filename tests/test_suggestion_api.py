@@ -9,8 +9,9 @@ from app.main import app
 from app.models.base import Base
 from app.models.email import Email  # registers Email table
 from app.models.user import User   # registers User table
+from tests.db import sqlite_url
 
-TEST_DATABASE_URL = "sqlite:///./test_suggestion.db"
+TEST_DATABASE_URL = sqlite_url("test_suggestion.db")
 test_engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
@@ -86,6 +87,25 @@ def test_suggest_inline_empty_strings_returns_200():
     assert response.status_code == 200
 
 
+def test_suggest_inline_uses_configured_llm_backend():
+    """With an LLM backend installed the variants come from the model, not the templates."""
+    from app.nlp.llm_backend import StubBackend, set_llm_backend
+
+    stub = StubBackend(latency_seconds=0, answers={"mail_suggestions": {
+        "amical": "Avec plaisir, jeudi 14h !", "formel": "Je vous confirme jeudi 14h.", "court": "OK jeudi.",
+    }})
+    set_llm_backend(stub)
+    try:
+        response = client.post("/api/v1/suggest-inline", json={"subject": "Réunion", "body": "Jeudi 14h ?"})
+    finally:
+        set_llm_backend(None)
+    assert response.status_code == 200, response.text
+    assert [v["content"] for v in response.json()["variants"]] == [
+        "Avec plaisir, jeudi 14h !", "Je vous confirme jeudi 14h.", "OK jeudi.",
+    ]
+    assert stub.calls == 1
+
+
 # ── /suggest/{email_id} ──────────────────────────────────────────────────────
 
 def _create_email_in_db(db, predicted_slots=None):
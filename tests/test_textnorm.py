@@ -0,0 +1,96 @@
+"""
+Tests for NLP text normalisation (app/nlp/textnorm.py).
+"""
+from app.nlp.textnorm import html_to_text, looks_like_html, normalize_for_nlp
+
+
+def test_plain_text_whitespace_is_collapsed_but_lines_kept():
+    text = "Subject\n\n\n\nHello   team,\t\tcall  tomorrow at 3pm?\n\n\nThanks"
+    assert normalize_for_nlp(text) == "Subject\n\nHello team, call tomorrow at 3pm?\n\nThanks"
+
+
+def test_html_is_converted_and_css_dropped():
+    html = (
+        "<html><head><style>" + ".x{color:red}" * 1000 + "</style></head>"
+        "<body><div>Réunion&nbsp;lundi à 10h</div><p>Merci</p></body></html>"
+    )
+    assert looks_like_html(html)
+    assert normalize_for_nlp(html) == "Réunion lundi à 10h\nMerci"
+
+
+def test_quoted_reply_is_removed():
+    text = (
+        "Ok for Tuesday 3pm.\n\n"
+        "On Mon, Jan 1, 2024 at 10:00 AM Alice <alice@example.com> wrote:\n"
+        "> Can we meet Monday at 9am?\n"
+    )
+    assert normalize_for_nlp(text) == "Ok for Tuesday 3pm."
+
+
+def test_french_reply_marker_and_outlook_header_are_removed():
+    fr = "Parfait, à jeudi.\nLe lun. 1 janv. 2024 à 10:00, Bob <bob@example.com> a écrit :\nAncien message"
+    assert normalize_for_nlp(fr) == "Parfait, à jeudi."
+
+    outlook = "Confirmed.\n\nFrom: Bob <bob@example.com>\nSent: Monday\nSubject: Meeting\nOld text"
+    assert normalize_for_nlp(outlook) == "Confirmed."
+
+
+def test_from_line_without_quoted_header_is_kept():
+    text = "From: Alice\nTo: Bob\nLet's meet on Monday at 10"
+    assert normalize_for_nlp(text) == text
+
+
+def test_signature_is_removed():
+    text = "See you at 3pm\n-- \nJohn Doe\nCEO"
+    assert normalize_for_nlp(text) == "See you at 3pm"
+    assert normalize_for_nlp("See you\n\nSent from my iPhone") == "See you"
+
+
+def test_output_is_truncated_to_budget():
+    text = "word " * 10_000
+    assert len(normalize_for_nlp(text, max_chars=100)) <= 100
+
+
+def test_html_to_text_accepts_chunks():
+    assert html_to_text(["<p>Hel", "lo</p><p>wor", "ld</p>"]) == "Hello\nworld"
+
+
+def test_gmail_forward_keeps_the_forwarded_message():
+    text = (
+        "FYI, see below.\n\n"
+        "---------- Forwarded message ---------\n"
+        "From: Alice <alice@example.com>\n"
+        "Date: Mon, Jan 1, 2024 at 10:00 AM\n"
+        "Subject: Project sync\n"
+        "To: Bob <bob@example.com>\n\n"
+        "Can we meet Tuesday at 3pm?\n"
+    )
+    assert normalize_for_nlp(text, subject="Fwd: Project sync") == (
+        "Fwd: Project sync\nFYI, see below.\n\nCan we meet Tuesday at 3pm?"
+    )
+
+
+def test_outlook_forward_drops_only_the_header_block():
+    text = (
+        "From: Alice <alice@example.com>\n"
+        "Sent: Monday, January 1, 2024 10:00 AM\n"
+        "To: Bob <bob@example.com>\n"
+        "Subject: Project sync\n\n"
+        "Can we meet Tuesday at 3pm?\n"
+    )
+    assert normalize_for_nlp(text, subject="FW: Project sync") == "FW: Project sync\n\nCan we meet Tuesday at 3pm?"
+
+
+def test_french_forward_keeps_the_forwarded_message():
+    gmail = (
+        "---------- Message transféré ---------\n"
+        "De : Alice <alice@example.com>\n"
+        "Date : lun. 1 janv. 2024 à 10:00\n"
+        "Subject: Réunion\n"
+        "À : Bob <bob@example.com>\n\n"
+        "Réunion mardi prochain à 10h avec Claire.\n"
+    )
+    assert normalize_for_nlp(gmail, subject="Fwd: Réunion") == "Fwd: Réunion\n\nRéunion mardi prochain à 10h avec Claire."
+
+    outlook = "De : Alice\nEnvoyé : lundi 1 janvier 2024 10:00\nÀ : Bob\nObjet : Réunion\n\nRéunion jeudi à 14h."
+    assert normalize_for_nlp(outlook, subject="TR: Réunion") == "TR: Réunion\n\nRéunion jeudi à 14h."
@@ -6,9 +6,10 @@ from sqlalchemy.orm import sessionmaker
 from app.db.database import get_db
 from app.main import app
 from app.models.base import Base
+from tests.db import sqlite_url
 
 # Create a test database engine (in-memory SQLite)
-TEST_DATABASE_URL = "sqlite:///./test.db"
+TEST_DATABASE_URL = sqlite_url("test.db")
 test_engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
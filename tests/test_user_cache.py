@@ -0,0 +1,143 @@
+"""
+Tests for the authenticated-user cache (app/core/user_cache.py), token_version
+revocation and the deferred secret columns of User.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core import user_cache
+from app.core.config import settings
+from app.main import app
+from app.models import Base
+from app.models.user import User
+from tests.db import sqlite_url
+
+TEST_DB_URL = sqlite_url("test_user_cache.db")
+test_engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+def override_get_db():
+    db = TestSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+client = TestClient(app)
+
+BASE = "/api/v1/users"
+PASSWORD = "Secret12!"
+
+
+@pytest.fixture(autouse=True)
+def reset_db():
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    user_cache.clear_user_cache()
+    yield
+    user_cache.clear_user_cache()
+
+
+def _signup_and_login(email: str = "cache@example.com") -> tuple[int, str]:
+    user_id = client.post(f"{BASE}/", json={"email": email, "password": PASSWORD}).json()["id"]
+    token = client.post(f"{BASE}/login", json={"email": email, "password": PASSWORD}).json()["access_token"]
+    return user_id, token
+
+
+def _users_selects(fn) -> list[str]:
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(test_engine, "before_cursor_execute", _record)
+    try:
+        fn()
+    finally:
+        event.remove(test_engine, "before_cursor_execute", _record)
+    return statements
+
+
+def test_repeat_requests_are_authenticated_from_the_cache():
+    user_id, token = _signup_and_login()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get(f"{BASE}/{user_id}", headers=headers).status_code == 200
+    # Second call: the principal is cached, only the endpoint's own lookup hits users
+    selects = _users_selects(lambda: client.get(f"{BASE}/{user_id}", headers=headers))
+    assert len(selects) == 1
+
+    principal = user_cache.get_cached_principal(user_id)
+    assert principal is not None and principal.email == "cache@example.com"
+
+
+def test_principal_query_does_not_load_secret_columns():
+    user_id, token = _signup_and_login()
+    selects = _users_selects(lambda: client.get(f"{BASE}/{user_id}", headers={"Authorization": f"Bearer {token}"}))
+    assert selects
+    assert all("oauth_token" not in s and "caldav_password" not in s for s in selects)
+
+
+def test_user_rows_load_with_secret_columns_deferred():
+    with TestSession() as db:
+        db.add(User(email="d@example.com", password_hash="x", gmail_oauth_token="enc"))
+        db.commit()
+    with TestSession() as db:
+        user = db.query(User).filter(User.email == "d@example.com").one()
+        assert "gmail_oauth_token" not in user.__dict__
+        assert user.gmail_oauth_token == "enc"  # loaded on access
+
+
+def test_orm_update_invalidates_cached_principal():
+    user_id, token = _signup_and_login()
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get(f"{BASE}/me", headers=headers)
+    assert user_cache.get_cached_principal(user_id) is not None
+
+    with TestSession() as db:
+        db.get(User, user_id).role = "admin"
+        db.commit()
+    assert user_cache.get_cached_principal(user_id) is None
+    # Admin-only listing now succeeds with the same token
+    assert client.get(f"{BASE}/", headers=headers).status_code == 200
+
+
+def test_cached_principal_expires_after_ttl(monkeypatch):
+    user_id, token = _signup_and_login()
+    client.get(f"{BASE}/me", headers={"Authorization": f"Bearer {token}"})
+    # A write from another process is not seen until the entry expires
+    with test_engine.begin() as conn:
+        conn.execute(text("UPDATE users SET role = 'admin' WHERE id = :id"), {"id": user_id})
+    assert user_cache.get_cached_principal(user_id).role == "regular"
+
+    monkeypatch.setattr(settings, "USER_CACHE_TTL_SECONDS", -1)
+    assert user_cache.get_cached_principal(user_id) is None
+
+
+def test_password_change_revokes_existing_tokens():
+    user_id, token = _signup_and_login()
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.patch(f"{BASE}/{user_id}", headers=headers, json={"password": "NewPass123!"}).status_code == 200
+
+    response = client.get(f"{BASE}/me", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+
+    new_token = client.post(
+        f"{BASE}/login", json={"email": "cache@example.com", "password": "NewPass123!"}
+    ).json()["access_token"]
+    assert client.get(f"{BASE}/me", headers={"Authorization": f"Bearer {new_token}"}).status_code == 200
+
+
+def test_deleted_user_is_rejected():
+    user_id, token = _signup_and_login()
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.delete(f"{BASE}/{user_id}", headers=headers).status_code == 204
+    response = client.get(f"{BASE}/me", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User not found"
@@ -3,8 +3,9 @@ from sqlalchemy.orm import sessionmaker
 
 # Import all models to ensure they're registered with Base.metadata before create_all()
 from app.models import Base, User
+from tests.db import sqlite_url
 
-DATABASE_URL = "sqlite:///.test.db"
+DATABASE_URL = sqlite_url("test_user_model.db")
 
 engine = create_engine(DATABASE_URL, future=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)